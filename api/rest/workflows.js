@@ -53,6 +53,19 @@ var workflowsPost = controller({success: 201}, function(req) {
     return workflowApiService.createAndRunGraph(configuration, id);
 });
 
+/**
+* @api {post} /api/2.0/workflows/bulk POST /workflows/bulk
+* @apiVersion 2.0.0
+* @apiDescription Run many new workflows
+* @apiName workflows-run-bulk
+* @apiGroup workflows
+* @apiSuccess {json} A result for each workflow, in the order they were requested.
+*/
+
+var workflowsPostBulk = controller({success: 201}, function(req) {
+    return workflowApiService.createAndRunGraphs(req.body.workflows);
+});
+
 /**
 * @api {get} /api/2.0/workflows/:identifier GET /workflows/:identifier
 * @apiVersion 2.0.0
@@ -112,6 +125,7 @@ var workflowsDeleteByInstanceId = controller({success: 204}, function(req) {
 module.exports = {
     workflowsGet: workflowsGet,
     workflowsPost: workflowsPost,
+    workflowsPostBulk: workflowsPostBulk,
     workflowsGetByInstanceId: workflowsGetByInstanceId,
     workflowsDeleteByInstanceId: workflowsDeleteByInstanceId,
     workflowsAction: workflowsAction
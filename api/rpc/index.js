@@ -61,6 +61,7 @@ function schedulerServerFactory(
                 workflowsDeleteGraphsByName: grpcWrapper(workflowGraphs.workflowsDeleteGraphsByName), // jshint ignore:line
                 workflowsGet: grpcWrapper(workflows.workflowsGet),
                 workflowsPost: grpcWrapper(workflows.workflowsPost),
+                workflowsPostBulk: grpcWrapper(workflows.workflowsPostBulk),
                 workflowsGetByInstanceId: grpcWrapper(workflows.workflowsGetByInstanceId),
                 workflowsDeleteByInstanceId: grpcWrapper(workflows.workflowsDeleteByInstanceId),
                 workflowsAction: grpcWrapper(workflows.workflowsAction),
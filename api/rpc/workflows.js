@@ -20,6 +20,10 @@ var workflowsPost = function (call) {
     }
 };
 
+var workflowsPostBulk = function (call) {
+    return workflowApiService.createAndRunGraphs(JSON.parse(call.request.workflows));
+};
+
 var workflowsGetByInstanceId = function (call) {
     return workflowApiService.getWorkflowByInstanceId(call.request.identifier);
 };
@@ -42,6 +46,7 @@ var workflowsDeleteByInstanceId = function (call) {
 module.exports = {
     workflowsGet: workflowsGet,
     workflowsPost: workflowsPost,
+    workflowsPostBulk: workflowsPostBulk,
     workflowsGetByInstanceId: workflowsGetByInstanceId,
     workflowsDeleteByInstanceId: workflowsDeleteByInstanceId,
     workflowsAction: workflowsAction
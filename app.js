@@ -14,11 +14,12 @@ di.annotate(Runner, new di.Inject(
     'Protocol.Events',
     'Services.Lookup',
     'Errors',
-    'Events'
+    'Events',
+    'TaskGraph.Metrics'
     )
 );
 function Runner(configureFile, Logger, uuid, constants,
-                eventsProtocol, lookupService, Errors, events) {
+                eventsProtocol, lookupService, Errors, events, metrics) {
     var logger = Logger.initialize('TaskGraph');
     var server;
     function start() {
@@ -45,6 +46,12 @@ function Runner(configureFile, Logger, uuid, constants,
             app.use(require('body-parser').json({limit: '10mb'}));
             app.use(rewriter('/api/current/*', '/api/2.0/$1'));
             app.use(rewriter('/api/common/*', '/api/2.0/$1'));
+
+            // Scheduler, runner and poller metrics in the Prometheus text format
+            app.get('/metrics', function(req, res) {
+                res.set('Content-Type', metrics.contentType);
+                res.send(metrics.render());
+            });
             // Imaging Event Middleware
 
             // Interpret Swagger resources and attach metadata to request -
@@ -0,0 +1,80 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+/*
+ * Compare the time and heap allocation of deep cloning task event records
+ * (the previous behavior of the scheduler and runner progress publishing)
+ * with frozen copy-on-write records.
+ *
+ * Usage: node --expose-gc benchmark/event-record-allocation.js [events] [contextSize]
+ *
+ * Results are printed as JSON.
+ */
+
+'use strict';
+
+var _ = require('lodash');
+var eventRecord = require('../lib/event-record.js')(_);
+
+var events = parseInt(process.argv[2], 10) || 10000;
+var contextSize = parseInt(process.argv[3], 10) || 200;
+
+function createContext() {
+    return _.transform(_.range(contextSize), function(context, i) {
+        context['key' + i] = { value: 'value' + i, items: [i, i + 1, i + 2] };
+    }, { graphId: 'graph1', target: 'node1' });
+}
+
+// A finished task document, as the scheduler receives it from markTaskEvaluated
+function createFinishedTask(i) {
+    return {
+        taskId: 'task' + i,
+        graphId: 'graph1',
+        state: 'succeeded',
+        terminalOnStates: ['succeeded'],
+        context: createContext()
+    };
+}
+
+// A running task instance, as the runner publishes it when it starts
+function RunningTask(i) {
+    this.instanceId = 'task' + i;
+    this.state = 'pending';
+    this.definition = { injectableName: 'Task.Benchmark', options: createContext() };
+    this.context = createContext();
+}
+RunningTask.prototype.run = function() {};
+
+function measure(name, create, copy) {
+    var inputs = _.map(_.range(events), create);
+    var outputs = new Array(events);
+    if (global.gc) {
+        global.gc();
+    }
+    var heapBefore = process.memoryUsage().heapUsed;
+    var start = process.hrtime();
+    for (var i = 0; i < events; i += 1) {
+        outputs[i] = copy(inputs[i]);
+    }
+    var diff = process.hrtime(start);
+    var heapAfter = process.memoryUsage().heapUsed;
+    return {
+        name: name,
+        events: events,
+        totalMs: diff[0] * 1e3 + diff[1] * 1e-6,
+        usPerEvent: (diff[0] * 1e9 + diff[1]) / 1e3 / events,
+        heapBytesPerEvent: Math.max(heapAfter - heapBefore, 0) / events
+    };
+}
+
+console.log(JSON.stringify({
+    contextSize: contextSize,
+    gc: !!global.gc,
+    results: [
+        measure('scheduler: cloneDeep', createFinishedTask, _.cloneDeep),
+        measure('scheduler: freeze', createFinishedTask, eventRecord.freeze),
+        measure('runner: cloneDeep', function(i) { return new RunningTask(i); }, _.cloneDeep),
+        measure('runner: snapshot', function(i) { return new RunningTask(i); }, function(task) {
+            return eventRecord.snapshot(task, ['context']);
+        })
+    ]
+}, null, 4));
@@ -0,0 +1,86 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+/*
+ * End-to-end TaskScheduler and TaskRunner throughput on synthetic graphs.
+ *
+ * Both run in this process against the embedded memory store, an in-process
+ * messenger and no-op tasks, so the results reflect the scheduling pipeline
+ * itself rather than MongoDB or AMQP. For each scenario it reports tasks per
+ * second, p50/p99 ready-to-running latency overall and per DAG level, where
+ * a task is ready once the last task it waits on has finished, and the number
+ * of store calls per task.
+ *
+ * Usage: node benchmark/scheduler-throughput.js [--scenarios fan-out,chain,diamond,small-graphs]
+ *            [--scale 1] [--mode poll|event] [--task-duration ms] [--timeout ms]
+ *            [--output file]
+ *
+ * Results are printed as JSON, or written to the --output file, so runs against
+ * different versions can be compared. Log output goes through the configured
+ * on-core logger, so raise the log level to keep it out of the measurements.
+ */
+
+'use strict';
+
+var fs = require('fs');
+var _ = require('lodash');
+var parseArgs = require('minimist');
+var graphs = require('./scheduler/graphs.js');
+var Harness = require('./scheduler/harness.js');
+
+var argv = parseArgs(process.argv.slice(2));
+var scale = parseFloat(argv.scale) || 1;
+
+function scaled(n) {
+    return Math.max(Math.round(n * scale), 1);
+}
+
+var SCENARIOS = {
+    'fan-out': function() { return graphs.fanOut(scaled(1000)); },
+    'chain': function() { return graphs.chain(scaled(200)); },
+    'diamond': function() { return graphs.diamond(scaled(10), 20); },
+    'small-graphs': function() { return graphs.smallGraphs(scaled(2000), 3); }
+};
+
+var scenarios = argv.scenarios ? String(argv.scenarios).split(',') : _.keys(SCENARIOS);
+var unknown = _.difference(scenarios, _.keys(SCENARIOS));
+if (!_.isEmpty(unknown)) {
+    console.error('Unknown scenarios: ' + unknown.join(', ') +
+        ', expected any of ' + _.keys(SCENARIOS).join(', '));
+    process.exit(1);
+}
+
+var options = {
+    scheduler: { schedulingMode: argv.mode || 'poll' },
+    runner: {},
+    taskDuration: parseInt(argv['task-duration'], 10) || 0,
+    timeout: parseInt(argv.timeout, 10) || 5 * 60 * 1000
+};
+var harness = new Harness(options);
+
+// One scenario at a time, so they don't compete for the event loop
+harness.Promise.reduce(scenarios, function(results, name) {
+    return harness.run(name, SCENARIOS[name]())
+    .then(function(result) {
+        return results.concat([result]);
+    });
+}, [])
+.then(function(results) {
+    var output = JSON.stringify({
+        version: require('../package.json').version,
+        node: process.version,
+        timestamp: new Date().toISOString(),
+        scale: scale,
+        options: options,
+        results: results
+    }, null, 4);
+    if (argv.output) {
+        fs.writeFileSync(argv.output, output + '\n');
+    } else {
+        console.log(output);
+    }
+    process.exit(_.some(results, 'timedOut') ? 1 : 0);
+})
+.catch(function(error) {
+    console.error(error.stack || error);
+    process.exit(1);
+});
@@ -0,0 +1,143 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+/*
+ * Synthetic graph generators for the scheduler benchmark.
+ *
+ * Each generator returns one or more graphs in the form the store holds them:
+ * a graph object and the task dependency documents for its tasks, along with
+ * the dependencies and DAG level of every task so the harness can work out when
+ * each task became ready.
+ */
+
+'use strict';
+
+var _ = require('lodash');
+var uuid = require('node-uuid');
+
+var TASK_NAME = 'Task.Benchmark.Noop';
+var FINISHED_STATES = ['succeeded', 'failed', 'timeout', 'cancelled'];
+
+/**
+ * Build a graph from a list of dependencies.
+ *
+ * @param {String} name - the graph name
+ * @param {Array} waitOn - for each task, the indexes of the earlier tasks it waits on
+ * @returns {Object} graph, dependencies, waitOn (taskId -> taskIds) and level
+ * (taskId -> depth in the DAG)
+ */
+function buildGraph(name, waitOn) {
+    var graphId = uuid.v4();
+    var taskIds = _.map(waitOn, function() { return uuid.v4(); });
+    var hasDependents = {};
+    var levels = [];
+
+    _.forEach(waitOn, function(indexes, i) {
+        levels[i] = _.isEmpty(indexes) ? 0 :
+            _.max(_.map(indexes, function(index) { return levels[index]; })) + 1;
+        _.forEach(indexes, function(index) {
+            hasDependents[index] = true;
+        });
+    });
+
+    var graph = {
+        instanceId: graphId,
+        name: name,
+        injectableName: name,
+        _status: 'pending',
+        serviceGraph: false,
+        context: { graphId: graphId, graphName: name },
+        tasks: {}
+    };
+    var result = {
+        graph: graph,
+        dependencies: [],
+        waitOn: {},
+        level: {}
+    };
+
+    _.forEach(waitOn, function(indexes, i) {
+        var taskId = taskIds[i];
+        var terminalOnStates = hasDependents[i] ? [] : FINISHED_STATES;
+        var dependencies = _.transform(indexes, function(deps, index) {
+            deps[taskIds[index]] = 'succeeded';
+        }, {});
+
+        graph.tasks[taskId] = {
+            instanceId: taskId,
+            injectableName: TASK_NAME,
+            label: 'task-' + i,
+            state: 'pending',
+            waitingOn: dependencies,
+            terminalOnStates: terminalOnStates
+        };
+        result.dependencies.push({
+            taskId: taskId,
+            dependencies: dependencies,
+            terminalOnStates: terminalOnStates
+        });
+        result.waitOn[taskId] = _.keys(dependencies);
+        result.level[taskId] = levels[i];
+    });
+
+    return result;
+}
+
+/**
+ * One task that every other task waits on.
+ *
+ * @param {Number} width - number of tasks waiting on the root
+ */
+exports.fanOut = function(width) {
+    return [buildGraph('Graph.Benchmark.FanOut', _.flatten([
+        [[]],
+        _.times(width, function() { return [[0]]; })
+    ], true))];
+};
+
+/**
+ * Tasks that each wait on the one before.
+ *
+ * @param {Number} depth
+ */
+exports.chain = function(depth) {
+    return [buildGraph('Graph.Benchmark.Chain', _.times(depth, function(i) {
+        return i ? [i - 1] : [];
+    }))];
+};
+
+/**
+ * A root, levels of tasks that each wait on every task of the level before, and
+ * a sink waiting on the last level.
+ *
+ * @param {Number} levels
+ * @param {Number} width - tasks per level
+ */
+exports.diamond = function(levels, width) {
+    var waitOn = [[]];
+    var previous = [0];
+    _.times(levels, function() {
+        var level = _.times(width, function() {
+            waitOn.push(previous);
+            return waitOn.length - 1;
+        });
+        previous = level;
+    });
+    waitOn.push(previous);
+    return [buildGraph('Graph.Benchmark.Diamond', waitOn)];
+};
+
+/**
+ * Many small chained graphs, all submitted at once.
+ *
+ * @param {Number} count - number of graphs
+ * @param {Number} size - tasks per graph
+ */
+exports.smallGraphs = function(count, size) {
+    return _.times(count, function() {
+        return buildGraph('Graph.Benchmark.Small', _.times(size, function(i) {
+            return i ? [i - 1] : [];
+        }));
+    });
+};
+
+exports.TASK_NAME = TASK_NAME;
@@ -0,0 +1,323 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+/*
+ * Runs a TaskScheduler and a TaskRunner in one process against the memory
+ * store, a local messenger and no-op tasks, submits a set of graphs and
+ * measures how long they take to run.
+ */
+
+'use strict';
+
+var di = require('di');
+var _ = require('lodash');
+var core = require('on-core')(di);
+var LocalMessenger = require('./local-messenger.js');
+var noopTaskFactory = require('./noop-task.js');
+
+function now() {
+    var time = process.hrtime();
+    return time[0] * 1e3 + time[1] * 1e-6;
+}
+
+/**
+ * @param {Array} values
+ * @returns {Object} p50, p99, max and mean of the values
+ */
+function summarize(values) {
+    if (_.isEmpty(values)) {
+        return { count: 0 };
+    }
+    var sorted = _.sortBy(values);
+    function percentile(p) {
+        return sorted[Math.max(Math.ceil(p * sorted.length) - 1, 0)];
+    }
+    return {
+        count: sorted.length,
+        p50: percentile(0.5),
+        p99: percentile(0.99),
+        max: _.last(sorted),
+        mean: _.sum(sorted) / sorted.length
+    };
+}
+
+/**
+ * Wrap every method of a store to count calls by method name.
+ *
+ * @param {Object} store
+ * @returns {Object} the wrapped store, with the counts in its calls property
+ */
+function countCalls(store) {
+    var counting = { calls: {}, backend: store.backend };
+    _.forEach(_.functions(store), function(method) {
+        counting[method] = function() {
+            counting.calls[method] = (counting.calls[method] || 0) + 1;
+            return store[method].apply(store, arguments);
+        };
+    });
+    return counting;
+}
+
+/**
+ * @param {Object} [options]
+ * @param {String} [options.domain]
+ * @param {Object} [options.scheduler] - TaskScheduler options
+ * @param {Object} [options.runner] - TaskRunner options
+ * @param {Number} [options.taskDuration] - ms each no-op task takes
+ * @param {Number} [options.timeout] - ms to wait for a scenario's graphs to finish
+ * @constructor
+ */
+function Harness(options) {
+    var self = this;
+    self.options = _.defaults({}, options, {
+        domain: 'default',
+        scheduler: {},
+        runner: {},
+        taskDuration: 0,
+        timeout: 5 * 60 * 1000
+    });
+    self.state = null;
+
+    function messengerFactory(Promise) {
+        return new LocalMessenger(Promise);
+    }
+    di.annotate(messengerFactory, new di.Provide('Task.Messenger'));
+    di.annotate(messengerFactory, new di.Inject('Promise'));
+
+    function bulkMessengerFactory(messenger) {
+        return {
+            publishCancelTasks: messenger.publishCancelTasks.bind(messenger),
+            subscribeCancelTasks: messenger.subscribeCancelTasks.bind(messenger)
+        };
+    }
+    di.annotate(bulkMessengerFactory, new di.Provide('TaskGraph.BulkMessenger'));
+    di.annotate(bulkMessengerFactory, new di.Inject('Task.Messenger'));
+
+    function taskFactory(Promise) {
+        return noopTaskFactory(Promise, {
+            duration: self.options.taskDuration,
+            onRun: function(task) {
+                self.state.started[task.instanceId] = now();
+            }
+        });
+    }
+    di.annotate(taskFactory, new di.Provide('Task.Task'));
+    di.annotate(taskFactory, new di.Inject('Promise'));
+
+    function storeFactory(memoryStore) {
+        return countCalls(memoryStore);
+    }
+    di.annotate(storeFactory, new di.Provide('TaskGraph.Store'));
+    di.annotate(storeFactory, new di.Inject('TaskGraph.Stores.Memory'));
+
+    function eventsFactory(Promise) {
+        return {
+            publishGraphFinished: function(graphId) {
+                self.graphFinished(graphId);
+                return Promise.resolve();
+            }
+        };
+    }
+    di.annotate(eventsFactory, new di.Provide('Protocol.Events'));
+    di.annotate(eventsFactory, new di.Inject('Promise'));
+
+    function graphProgressFactory(Promise) {
+        var publish = function() { return Promise.resolve(); };
+        return {
+            publishGraphStarted: publish,
+            publishGraphFinished: publish,
+            publishTaskStarted: publish,
+            publishTaskFinished: publish,
+            publishTaskProgress: publish
+        };
+    }
+    di.annotate(graphProgressFactory, new di.Provide('Services.GraphProgress'));
+    di.annotate(graphProgressFactory, new di.Inject('Promise'));
+
+    function schedulerServerFactory(Promise) {
+        function SchedulerServer(serverOptions) {
+            this.options = serverOptions;
+        }
+        SchedulerServer.prototype.start = SchedulerServer.prototype.stop = function() {
+            return Promise.resolve();
+        };
+        return SchedulerServer;
+    }
+    di.annotate(schedulerServerFactory, new di.Provide('TaskGraph.TaskScheduler.Server'));
+    di.annotate(schedulerServerFactory, new di.Inject('Promise'));
+
+    self.injector = new di.Injector(_.flattenDeep([
+        core.injectables,
+        core.workflowInjectables,
+        require('../../lib/task-scheduler.js'),
+        require('../../lib/task-runner.js'),
+        require('../../lib/lease-expiration-poller.js'),
+        require('../../lib/rx-mixins.js'),
+        require('../../lib/bulk-store.js'),
+        require('../../lib/graph-state-cache.js'),
+        require('../../lib/active-graph-index.js'),
+        require('../../lib/hash-ring.js'),
+        require('../../lib/leader-election.js'),
+        require('../../lib/metrics.js'),
+        require('../../lib/event-record.js'),
+        require('../../lib/stores/memory-store.js'),
+        core.helper.simpleWrapper(function() {}, 'consul'),
+        messengerFactory,
+        bulkMessengerFactory,
+        taskFactory,
+        storeFactory,
+        eventsFactory,
+        graphProgressFactory,
+        schedulerServerFactory
+    ]));
+    self.Promise = self.injector.get('Promise');
+    self.memoryStore = self.injector.get('TaskGraph.Stores.Memory');
+    self.store = self.injector.get('TaskGraph.Store');
+    self.messenger = self.injector.get('Task.Messenger');
+}
+
+/**
+ * @param {String} graphId
+ */
+Harness.prototype.graphFinished = function(graphId) {
+    var state = this.state;
+    if (!state || _.has(state.graphsFinished, graphId)) {
+        return;
+    }
+    state.graphsFinished[graphId] = now();
+    if (_.size(state.graphsFinished) === state.graphCount) {
+        state.resolve();
+    }
+};
+
+/**
+ * Run a scenario on a fresh scheduler, runner and store.
+ *
+ * @param {String} name
+ * @param {Array} graphs - graphs from the generators in graphs.js
+ * @returns {Promise} the scenario's results
+ */
+Harness.prototype.run = function(name, graphs) {
+    var self = this;
+    var Promise = self.Promise;
+    var options = self.options;
+    var TaskScheduler = self.injector.get('TaskGraph.TaskScheduler');
+    var TaskRunner = self.injector.get('TaskGraph.TaskRunner');
+    var scheduler = TaskScheduler.create(_.defaults({ domain: options.domain },
+        options.scheduler));
+    var runner = TaskRunner.create(_.defaults({ domain: options.domain }, options.runner));
+    var finishedSubscription;
+
+    self.memoryStore.reset();
+    self.state = {
+        graphCount: graphs.length,
+        submitted: {},
+        started: {},
+        finished: {},
+        graphsFinished: {}
+    };
+    var done = new Promise(function(resolve) {
+        self.state.resolve = resolve;
+    });
+
+    return Promise.each(graphs, function(generated) {
+        return self.memoryStore.persistGraphObject(generated.graph)
+        .then(function() {
+            return Promise.map(generated.dependencies, function(item) {
+                return self.memoryStore.persistTaskDependencies(item,
+                    generated.graph.instanceId);
+            });
+        });
+    })
+    .then(function() {
+        return Promise.all([scheduler.start(), runner.start()]);
+    })
+    .then(function() {
+        return self.messenger.subscribeTaskFinished(options.domain, function(data) {
+            self.state.finished[data.taskId] = now();
+        });
+    })
+    .then(function(subscription) {
+        finishedSubscription = subscription;
+        self.store.calls = {};
+        self.messenger.published = {};
+        self.state.startTime = now();
+        _.forEach(graphs, function(generated) {
+            var graphId = generated.graph.instanceId;
+            self.state.submitted[graphId] = now();
+            self.messenger.publishRunTaskGraph(options.domain, graphId);
+        });
+        return done.timeout(options.timeout)
+        .then(function() {
+            return false;
+        })
+        .catch(Promise.TimeoutError, function() {
+            return true;
+        });
+    })
+    .then(function(timedOut) {
+        return self.report(name, graphs, timedOut, now() - self.state.startTime);
+    })
+    .finally(function() {
+        if (finishedSubscription) {
+            finishedSubscription.dispose();
+        }
+        return Promise.all([runner.stop(), scheduler.stop()]);
+    });
+};
+
+/**
+ * @param {String} name
+ * @param {Array} graphs
+ * @param {Boolean} timedOut
+ * @param {Number} durationMs
+ * @returns {Object} the scenario's results
+ */
+Harness.prototype.report = function(name, graphs, timedOut, durationMs) {
+    var state = this.state;
+    var latencies = [];
+    var byLevel = {};
+
+    _.forEach(graphs, function(generated) {
+        var graphId = generated.graph.instanceId;
+        _.forEach(generated.level, function(level, taskId) {
+            var waitOn = generated.waitOn[taskId];
+            var ran = _.has(state.started, taskId) && _.every(waitOn, function(id) {
+                return _.has(state.finished, id);
+            });
+            if (!ran) {
+                return;
+            }
+            var readyAt = _.isEmpty(waitOn) ? state.submitted[graphId] :
+                _.max(_.map(waitOn, function(id) { return state.finished[id]; }));
+            var latency = state.started[taskId] - readyAt;
+            latencies.push(latency);
+            byLevel[level] = byLevel[level] || [];
+            byLevel[level].push(latency);
+        });
+    });
+
+    var tasks = _.sum(graphs, function(generated) { return generated.dependencies.length; });
+    var tasksRun = _.size(state.finished);
+    var storeCalls = _.sum(_.values(this.store.calls));
+
+    return {
+        scenario: name,
+        timedOut: timedOut,
+        graphs: graphs.length,
+        graphsFinished: _.size(state.graphsFinished),
+        tasks: tasks,
+        tasksRun: tasksRun,
+        durationMs: durationMs,
+        tasksPerSecond: tasksRun / (durationMs / 1000),
+        readyToRunningMs: summarize(latencies),
+        readyToRunningByLevelMs: _.mapValues(byLevel, summarize),
+        storeCalls: {
+            total: storeCalls,
+            perTask: tasksRun ? storeCalls / tasksRun : null,
+            byMethod: this.store.calls
+        },
+        messages: this.messenger.published
+    };
+};
+
+module.exports = Harness;
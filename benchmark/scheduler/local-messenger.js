@@ -0,0 +1,109 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+/*
+ * An in-process stand-in for Task.Messenger. Messages are delivered to every
+ * subscriber on a later turn of the event loop, as they would be over AMQP, but
+ * without a broker.
+ */
+
+'use strict';
+
+var _ = require('lodash');
+
+/**
+ * @param {Object} Promise - the injector's Promise implementation
+ * @constructor
+ */
+function LocalMessenger(Promise) {
+    this.Promise = Promise;
+    this.subscribers = {};
+    this.published = {};
+}
+
+/**
+ * @param {String} topic
+ * @param {Function} callback
+ * @returns {Promise} a subscription with a dispose method
+ */
+LocalMessenger.prototype.subscribe = function(topic, callback) {
+    var subscribers = this.subscribers;
+    subscribers[topic] = (subscribers[topic] || []).concat([callback]);
+    return this.Promise.resolve({
+        dispose: function() {
+            subscribers[topic] = _.without(subscribers[topic], callback);
+        }
+    });
+};
+
+/**
+ * @param {String} topic
+ * @param {Object} data
+ * @returns {Promise}
+ */
+LocalMessenger.prototype.publish = function(topic, data) {
+    var callbacks = this.subscribers[topic] || [];
+    this.published[topic] = (this.published[topic] || 0) + 1;
+    setImmediate(function() {
+        _.forEach(callbacks, function(callback) {
+            callback(data);
+        });
+    });
+    return this.Promise.resolve();
+};
+
+LocalMessenger.prototype.start = function() {
+    return this.Promise.resolve();
+};
+
+LocalMessenger.prototype.subscribeRunTaskGraph = function(domain, callback) {
+    return this.subscribe('runTaskGraph.' + domain, callback);
+};
+
+LocalMessenger.prototype.publishRunTaskGraph = function(domain, graphId) {
+    return this.publish('runTaskGraph.' + domain, { graphId: graphId });
+};
+
+LocalMessenger.prototype.subscribeRunTask = function(domain, callback) {
+    return this.subscribe('runTask.' + domain, callback);
+};
+
+LocalMessenger.prototype.publishRunTask = function(domain, taskId, graphId) {
+    return this.publish('runTask.' + domain, { taskId: taskId, graphId: graphId });
+};
+
+LocalMessenger.prototype.subscribeTaskFinished = function(domain, callback) {
+    return this.subscribe('taskFinished.' + domain, callback);
+};
+
+LocalMessenger.prototype.publishTaskFinished = function(domain, task) {
+    return this.publish('taskFinished.' + domain, {
+        taskId: task.instanceId,
+        graphId: task.context.graphId,
+        state: task.state,
+        error: task.error,
+        context: task.context,
+        terminalOnStates: task.definition.terminalOnStates
+    });
+};
+
+LocalMessenger.prototype.subscribeCancelTask = function(callback) {
+    return this.subscribe('cancelTask', callback);
+};
+
+LocalMessenger.prototype.publishCancelTask = function(taskId) {
+    return this.publish('cancelTask', { taskId: taskId });
+};
+
+LocalMessenger.prototype.subscribeCancelTasks = function(callback) {
+    return this.subscribe('cancelTasks', callback);
+};
+
+LocalMessenger.prototype.publishCancelTasks = function(taskIds) {
+    return this.publish('cancelTasks', { taskIds: taskIds });
+};
+
+LocalMessenger.prototype.subscribeCancelGraph = function(callback) {
+    return this.subscribe('cancelGraph', callback);
+};
+
+module.exports = LocalMessenger;
@@ -0,0 +1,49 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+/*
+ * A stand-in for Task.Task whose tasks do nothing but succeed, optionally
+ * after a fixed delay, and report when they started running.
+ */
+
+'use strict';
+
+/**
+ * @param {Object} Promise - the injector's Promise implementation
+ * @param {Object} [options]
+ * @param {Number} [options.duration] - ms each task takes to run
+ * @param {Function} [options.onRun] - called with each task as it starts running
+ * @returns {Object} an object with a Task.Task compatible create method
+ */
+module.exports = function noopTaskFactory(Promise, options) {
+    options = options || {};
+
+    function NoopTask(definition, taskOptions, context) {
+        this.definition = definition;
+        this.instanceId = taskOptions.instanceId;
+        this.context = context;
+        this.state = 'pending';
+        this.terminalOnStates = definition.terminalOnStates;
+    }
+
+    NoopTask.prototype.run = function() {
+        var self = this;
+        if (options.onRun) {
+            options.onRun(self);
+        }
+        return Promise.delay(options.duration || 0)
+        .then(function() {
+            self.state = 'succeeded';
+            return self;
+        });
+    };
+
+    NoopTask.prototype.stop = function() {
+        return Promise.resolve();
+    };
+
+    return {
+        create: function(definition, taskOptions, context) {
+            return new NoopTask(definition, taskOptions, context);
+        }
+    };
+};
@@ -0,0 +1,171 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+/*
+ * Measure how long each phase of building the task graph service takes on a cold
+ * start, loading the graph library and the service and view modules from the
+ * build time manifest and by globbing the source tree.
+ *
+ * Each run is made in a fresh node process, so module loading isn't cached
+ * between runs. The manifest runs need a manifest, see `npm run build-manifest`.
+ *
+ * Usage: node benchmark/startup.js [--runs N] [--mode glob|manifest|both] [--output file]
+ *
+ * Results (median ms per phase) are printed as JSON.
+ */
+
+'use strict';
+
+var childProcess = require('child_process');
+var fs = require('fs');
+var _ = require('lodash');
+var parseArgs = require('minimist');
+
+function now() {
+    var time = process.hrtime();
+    return time[0] * 1e3 + time[1] * 1e-6;
+}
+
+/**
+ * Build the injector the way index.js does, timing each phase, and write the
+ * timings to fd 3 for the parent process, away from any logging on stdout.
+ */
+function child() {
+    var timings = {};
+    var start = now();
+    var last = start;
+    function phase(name) {
+        var time = now();
+        timings[name] = time - last;
+        last = time;
+    }
+
+    var di = require('di');
+    var core = require('on-core')(di);
+    var helper = core.helper;
+    phase('onCore');
+
+    var onTasks = require('on-tasks').injectables;
+    phase('onTasks');
+
+    var libraryManifest = require('../lib/library-manifest.js');
+    var loader = require('../lib/loader.js');
+    phase('graphLibrary');
+
+    var modules = [
+        libraryManifest.requireModules('services', function() {
+            return helper.requireGlob(__dirname + '/../lib/services/**/*.js');
+        }),
+        libraryManifest.requireModules('views', function() {
+            return helper.requireGlob(__dirname + '/../api/rest/view/**/*.js');
+        })
+    ];
+    phase('servicesAndViews');
+
+    var injector = new di.Injector(_.flattenDeep([
+        core.injectables,
+        core.workflowInjectables,
+        onTasks,
+        require('../app.js'),
+        require('../lib/task-graph-runner.js'),
+        require('../lib/task-runner.js'),
+        loader,
+        require('../lib/task-scheduler.js'),
+        require('../lib/lease-expiration-poller.js'),
+        require('../lib/service-graph.js'),
+        require('../lib/completed-task-poller.js'),
+        require('../lib/rx-mixins.js'),
+        require('../lib/bulk-store.js'),
+        require('../lib/bulk-messenger.js'),
+        require('../lib/graph-state-cache.js'),
+        require('../lib/active-graph-index.js'),
+        require('../lib/hash-ring.js'),
+        require('../lib/leader-election.js'),
+        require('../lib/metrics.js'),
+        require('../lib/event-record.js'),
+        require('../lib/graph-archive.js'),
+        require('../lib/graph-definition-cache.js'),
+        modules,
+        require('../api/rpc/index.js'),
+        helper.simpleWrapper(require('consul'), 'consul'),
+        require('../lib/stores/memory-store.js').asTaskGraphStore
+    ]));
+    phase('injector');
+
+    injector.get('TaskGraph.Runner');
+    injector.get('TaskGraph.DataLoader');
+    phase('resolve');
+
+    timings.total = now() - start;
+    fs.writeSync(3, JSON.stringify({
+        timings: timings,
+        graphs: injector.get('TaskGraph.DataLoader').graphLibrary.length
+    }));
+}
+
+/**
+ * @param {String} mode - 'glob' or 'manifest'
+ * @returns {Object} the timings of one run in a fresh process
+ */
+function runOnce(mode) {
+    var env = _.clone(process.env);
+    // The manifest is never used in development
+    env.NODE_ENV = mode === 'glob' ? 'development' : 'production';
+    var result = childProcess.spawnSync(process.execPath, [__filename, '--child'], {
+        env: env,
+        stdio: ['ignore', 'ignore', 'inherit', 'pipe']
+    });
+    if (result.status !== 0 || !result.output[3].length) {
+        throw new Error('Startup run in ' + mode + ' mode failed');
+    }
+    return JSON.parse(result.output[3].toString());
+}
+
+function median(values) {
+    var sorted = _.sortBy(values);
+    return sorted[Math.floor((sorted.length - 1) / 2)];
+}
+
+function main() {
+    var argv = parseArgs(process.argv.slice(2));
+    var runs = parseInt(argv.runs, 10) || 5;
+    var mode = argv.mode || 'both';
+    var modes = mode === 'both' ? ['glob', 'manifest'] : [mode];
+    var libraryManifest = require('../lib/library-manifest.js');
+
+    if (_.contains(modes, 'manifest') && !libraryManifest.read()) {
+        console.error('No usable manifest at ' + libraryManifest.path +
+            ', run `npm run build-manifest` first');
+        process.exit(1);
+    }
+
+    var report = {
+        version: require('../package.json').version,
+        node: process.version,
+        runs: runs,
+        modes: _.transform(modes, function(result, name) {
+            var samples = _.times(runs, function() {
+                return runOnce(name);
+            });
+            result[name] = {
+                graphs: samples[0].graphs,
+                medianMs: _.mapValues(samples[0].timings, function(value, phase) {
+                    return median(_.map(samples, function(sample) {
+                        return sample.timings[phase];
+                    }));
+                })
+            };
+        }, {})
+    };
+
+    var output = JSON.stringify(report, null, 2);
+    if (argv.output) {
+        fs.writeFileSync(argv.output, output);
+    }
+    console.log(output);
+}
+
+if (process.argv[2] === '--child') {
+    child();
+} else {
+    main();
+}
@@ -2,11 +2,20 @@
 
 'use strict';
 
+var parseArgs = require('minimist');
+var argv = parseArgs(process.argv.slice(2));
+
+// The task graph store backend, 'mongo' (the default) or 'memory'. The embedded
+// memory store has to replace TaskGraph.Store before the injector is built.
+var storeBackend = argv.store || process.env.TASKGRAPH_STORE || 'mongo';
+
 var di = require('di'),
     _ = require('lodash'),
     consul = require('consul'),
     core = require('on-core')(di),
     helper = core.helper,
+    memoryStore = require('./lib/stores/memory-store.js'),
+    libraryManifest = require('./lib/library-manifest.js'),
     injector = new di.Injector(
         _.flattenDeep([
             core.injectables,
@@ -21,10 +30,26 @@ var di = require('di'),
             require('./lib/service-graph.js'),
             require('./lib/completed-task-poller.js'),
             require('./lib/rx-mixins.js'),
-            helper.requireGlob(__dirname + '/lib/services/**/*.js'),
-            helper.requireGlob(__dirname + '/api/rest/view/**/*.js'),
+            require('./lib/bulk-store.js'),
+            require('./lib/bulk-messenger.js'),
+            require('./lib/graph-state-cache.js'),
+            require('./lib/active-graph-index.js'),
+            require('./lib/hash-ring.js'),
+            require('./lib/leader-election.js'),
+            require('./lib/metrics.js'),
+            require('./lib/event-record.js'),
+            require('./lib/graph-archive.js'),
+            require('./lib/graph-definition-cache.js'),
+            libraryManifest.requireModules('services', function() {
+                return helper.requireGlob(__dirname + '/lib/services/**/*.js');
+            }),
+            libraryManifest.requireModules('views', function() {
+                return helper.requireGlob(__dirname + '/api/rest/view/**/*.js');
+            }),
             require('./api/rpc/index.js'),
-            helper.simpleWrapper(consul, 'consul')
+            helper.simpleWrapper(consul, 'consul'),
+            memoryStore,
+            storeBackend === 'memory' ? memoryStore.asTaskGraphStore : []
         ])
     ),
     taskGraphRunner = injector.get('TaskGraph.Runner'),
@@ -32,8 +57,6 @@ var di = require('di'),
 
 var restApp = injector.get('rest');
 
-var parseArgs = require('minimist');
-var argv = parseArgs(process.argv.slice(2));
 var options = {
     runner: true,
     scheduler: true,
@@ -71,8 +94,15 @@ taskGraphRunner.start(options)
         });
     });
 
-process.on('SIGINT', function () {
-    taskGraphRunner.stop()
+var stopping = false;
+
+function shutdown() {
+    // A second signal while draining skips the rest of the drain
+    if (stopping) {
+        process.exit(1);
+    }
+    stopping = true;
+    taskGraphRunner.stop({ drain: true })
         .catch(function (error) {
             logger.critical('Task Graph Runner Shutdown Error.', { error: error });
         })
@@ -82,7 +112,10 @@ process.on('SIGINT', function () {
                 process.exit(1);
             });
         });
-});
+}
+
+process.on('SIGINT', shutdown);
+process.on('SIGTERM', shutdown);
 
 module.exports = {
     injector: injector,
@@ -0,0 +1,264 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+var LRU = require('lru-cache');
+
+module.exports = activeGraphIndexFactory;
+di.annotate(activeGraphIndexFactory, new di.Provide('TaskGraph.ActiveGraphIndex'));
+di.annotate(activeGraphIndexFactory,
+    new di.Inject(
+        'Services.Waterline',
+        'Services.Messenger',
+        'Services.Configuration',
+        'Constants',
+        'Logger',
+        'Promise'
+    )
+);
+
+function activeGraphIndexFactory(
+    waterline,
+    messenger,
+    configuration,
+    Constants,
+    Logger,
+    Promise
+) {
+    var logger = Logger.initialize(activeGraphIndexFactory);
+    var graphEventRoutingKeys = ['graph.started.#', 'graph.finished.#'];
+
+    /**
+     * The ActiveGraphIndex caches the active graph of each node, as looked up
+     * from the store, for the profile and template requests nodes make while
+     * they boot.
+     *
+     * A node's entry is dropped when a graph is started or finished for it, by
+     * this process or, through the graph started and finished events, by any
+     * other. Until the index is subscribed to those events, or if subscribing
+     * fails, nothing is cached and every lookup goes to the store. Entries also
+     * expire after maxAge in case an event is missed, and nodes without an
+     * active graph after the much shorter negativeMaxAge, since a graph started
+     * for them is what a booting node is waiting for. Checks that have to be
+     * consistent with the store, like refusing to start a second graph for a
+     * node, shouldn't use the index.
+     *
+     * @param {Object} options
+     * @param {Number} [options.max] - number of nodes to keep
+     * @param {Number} [options.maxAge] - ms to keep a node's active graph for
+     * @param {Number} [options.negativeMaxAge] - ms to remember that a node has
+     * no active graph
+     * @param {Number} [options.retryInterval] - ms between attempts to subscribe
+     * to graph events after one fails
+     * @constructor
+     */
+    function ActiveGraphIndex(options) {
+        options = options || {};
+        this.max = options.max || 10000;
+        this.maxAge = options.maxAge || 5000;
+        this.negativeMaxAge = Math.min(options.negativeMaxAge || 1000, this.maxAge);
+        this.retryInterval = options.retryInterval || 10000;
+        this.graphs = LRU({ max: this.max, maxAge: this.maxAge });
+        // Store lookups in flight, so concurrent requests for a node share one
+        this.lookups = {};
+        // Bumped by invalidate, so lookups that started before it aren't cached
+        this.generation = 0;
+        this.started = false;
+        this.subscriptions = null;
+        this.subscribing = null;
+        this.subscribeFailedAt = 0;
+        this.hits = 0;
+        this.misses = 0;
+    }
+
+    /**
+     * Subscribe to graph started and finished events. If that fails the index
+     * keeps going to the store, and subscribing is retried on a later lookup.
+     *
+     * @returns {Promise}
+     * @memberOf ActiveGraphIndex
+     */
+    ActiveGraphIndex.prototype.start = function() {
+        this.started = true;
+        return this.subscribe();
+    };
+
+    /**
+     * @returns {Promise}
+     * @memberOf ActiveGraphIndex
+     */
+    ActiveGraphIndex.prototype.stop = function() {
+        var self = this;
+        var subscriptions = self.subscriptions || [];
+        self.started = false;
+        self.subscriptions = null;
+        self.invalidateAll();
+        return Promise.map(subscriptions, function(subscription) {
+            return subscription.dispose();
+        });
+    };
+
+    /**
+     * @returns {Promise}
+     * @memberOf ActiveGraphIndex
+     */
+    ActiveGraphIndex.prototype.subscribe = function() {
+        var self = this;
+        if (self.subscriptions) {
+            return Promise.resolve();
+        }
+        if (!self.subscribing) {
+            var handler = self.handleGraphEvent.bind(self);
+            self.subscribing = Promise.map(graphEventRoutingKeys, function(routingKey) {
+                return messenger.subscribe(
+                    Constants.Protocol.Exchanges.Events.Name,
+                    routingKey,
+                    handler
+                );
+            })
+            .then(function(subscriptions) {
+                if (!self.started) {
+                    return Promise.map(subscriptions, function(subscription) {
+                        return subscription.dispose();
+                    });
+                }
+                // Anything looked up before now may have missed an event
+                self.invalidateAll();
+                self.subscriptions = subscriptions;
+            })
+            .catch(function(error) {
+                self.subscribeFailedAt = Date.now();
+                logger.warning('Error subscribing to graph events, ' +
+                    'active graphs will be looked up in the store', {
+                    error: error
+                });
+            })
+            .finally(function() {
+                self.subscribing = null;
+            });
+        }
+        return self.subscribing;
+    };
+
+    /**
+     * @param {Object} event - a graph started or finished event
+     * @memberOf ActiveGraphIndex
+     */
+    ActiveGraphIndex.prototype.handleGraphEvent = function(event) {
+        if (event && event.nodeId) {
+            this.invalidate(event.nodeId);
+        } else {
+            this.invalidateAll();
+        }
+    };
+
+    /**
+     * @param {String} nodeId
+     * @returns {Promise} the node's active graph as found by the store, which
+     * may be shared with other callers and mustn't be modified
+     * @memberOf ActiveGraphIndex
+     */
+    ActiveGraphIndex.prototype.findActiveGraphForTarget = function(nodeId) {
+        var self = this;
+
+        if (!self.subscriptions) {
+            if (self.started && Date.now() - self.subscribeFailedAt >= self.retryInterval) {
+                self.subscribe();
+            }
+            self.misses += 1;
+            return self.lookup(nodeId, false);
+        }
+
+        var entry = self.graphs.get(nodeId);
+        if (entry && (entry.graph || Date.now() < entry.expires)) {
+            self.hits += 1;
+            return Promise.resolve(entry.graph);
+        }
+        self.misses += 1;
+        return self.lookup(nodeId, true);
+    };
+
+    /**
+     * @param {String} nodeId
+     * @param {Boolean} cache - whether to cache what is found
+     * @returns {Promise}
+     * @memberOf ActiveGraphIndex
+     */
+    ActiveGraphIndex.prototype.lookup = function(nodeId, cache) {
+        var self = this;
+        if (!self.lookups[nodeId]) {
+            var generation = self.generation;
+            var lookup = self.lookups[nodeId] = Promise.resolve(waterline.graphobjects.findOne({
+                node: nodeId,
+                _status: Constants.Task.ActiveStates
+            }))
+            .tap(function(graph) {
+                if (cache && self.subscriptions && generation === self.generation) {
+                    self.graphs.set(nodeId, {
+                        graph: graph,
+                        expires: Date.now() + self.negativeMaxAge
+                    });
+                }
+            })
+            .finally(function() {
+                if (self.lookups[nodeId] === lookup) {
+                    delete self.lookups[nodeId];
+                }
+            });
+        }
+        return self.lookups[nodeId];
+    };
+
+    /**
+     * Drop a node's entry, after a graph has been started or finished for it.
+     *
+     * @param {String} nodeId
+     * @memberOf ActiveGraphIndex
+     */
+    ActiveGraphIndex.prototype.invalidate = function(nodeId) {
+        this.generation += 1;
+        if (nodeId) {
+            this.graphs.del(nodeId);
+            delete this.lookups[nodeId];
+        }
+    };
+
+    /**
+     * Drop every entry.
+     *
+     * @memberOf ActiveGraphIndex
+     */
+    ActiveGraphIndex.prototype.invalidateAll = function() {
+        this.generation += 1;
+        this.lookups = {};
+        this.graphs.reset();
+    };
+
+    /**
+     * @memberOf ActiveGraphIndex
+     */
+    ActiveGraphIndex.prototype.reset = function() {
+        this.invalidateAll();
+        this.hits = 0;
+        this.misses = 0;
+    };
+
+    /**
+     * @returns {Object} hit, miss and size counts
+     * @memberOf ActiveGraphIndex
+     */
+    ActiveGraphIndex.prototype.getStats = function() {
+        return {
+            hits: this.hits,
+            misses: this.misses,
+            size: this.graphs.itemCount
+        };
+    };
+
+    return new ActiveGraphIndex({
+        max: configuration.get('activeGraphIndexSize'),
+        maxAge: configuration.get('activeGraphIndexMaxAge'),
+        negativeMaxAge: configuration.get('activeGraphIndexNegativeMaxAge')
+    });
+}
@@ -0,0 +1,60 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+
+module.exports = bulkMessengerFactory;
+di.annotate(bulkMessengerFactory, new di.Provide('TaskGraph.BulkMessenger'));
+di.annotate(bulkMessengerFactory,
+    new di.Inject(
+        'Services.Messenger',
+        'Constants',
+        'Assert'
+    )
+);
+
+/**
+ * Task messages that carry a batch of tasks, so that the scheduler can cancel
+ * every pending task of a failed graph with one broadcast instead of one
+ * message per task. They go over the same task exchange as the single task
+ * messages of Task.Messenger.
+ */
+function bulkMessengerFactory(
+    messenger,
+    Constants,
+    assert
+) {
+    var exports = {};
+    var cancelTasksRoutingKey = 'methods.cancelTasks';
+
+    /**
+     * Tell every task runner to cancel a set of tasks.
+     *
+     * @param {Array} taskIds
+     * @returns {Promise}
+     */
+    exports.publishCancelTasks = function(taskIds) {
+        assert.arrayOfString(taskIds, 'taskIds');
+        return messenger.publish(
+            Constants.Protocol.Exchanges.Task.Name,
+            cancelTasksRoutingKey,
+            { taskIds: taskIds }
+        );
+    };
+
+    /**
+     * @param {Function} callback - called with { taskIds: [taskId] } for each message
+     * @returns {Promise} the subscription
+     */
+    exports.subscribeCancelTasks = function(callback) {
+        assert.func(callback, 'callback');
+        return messenger.subscribe(
+            Constants.Protocol.Exchanges.Task.Name,
+            cancelTasksRoutingKey,
+            callback
+        );
+    };
+
+    return exports;
+}
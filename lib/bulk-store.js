@@ -0,0 +1,634 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+
+module.exports = bulkStoreFactory;
+di.annotate(bulkStoreFactory, new di.Provide('TaskGraph.BulkStore'));
+di.annotate(bulkStoreFactory,
+    new di.Inject(
+        'TaskGraph.Store',
+        'Services.Waterline',
+        'Constants',
+        'Assert',
+        'Promise',
+        '_'
+    )
+);
+
+/**
+ * The BulkStore wraps TaskGraph.Store with operations that act on many documents
+ * at once. If the underlying store implements a method of the same name it is
+ * used directly. Otherwise, when the store is backed by MongoDB, the operation is
+ * issued through waterline as a few multi document queries whatever the size of
+ * the batch. Any other store falls back to the per-document store calls with
+ * bounded concurrency, so callers can always batch their work regardless of
+ * which store backend is configured.
+ */
+function bulkStoreFactory(
+    store,
+    waterline,
+    Constants,
+    assert,
+    Promise,
+    _
+) {
+    var exports = {
+        // Maximum number of outstanding per-document calls when falling back
+        concurrency: 20
+    };
+
+    /**
+     * @param {String} method
+     * @returns {Boolean} whether the underlying store implements a bulk method natively
+     */
+    exports.supports = function(method) {
+        return _.isFunction(store[method]);
+    };
+
+    /**
+     * A store that doesn't keep its documents in MongoDB, like the memory store,
+     * names its backend in its backend property. The MongoDB store doesn't name one.
+     *
+     * @returns {Boolean} whether the task documents are in MongoDB, so that bulk
+     * operations can be made with multi document queries through waterline
+     */
+    exports.supportsMongo = function() {
+        return (!store.backend || store.backend === 'mongo') &&
+            !!waterline.taskdependencies &&
+            _.isFunction(waterline.taskdependencies.updateMongo);
+    };
+
+    /**
+     * @param {Array} tasks - objects with taskId, state, and optionally error and context
+     * @returns {Object} a $set update recording the tasks' states in their graph object
+     */
+    function graphTaskStates(tasks) {
+        return _.transform(tasks, function(result, task) {
+            var path = 'tasks.' + task.taskId + '.';
+            result[path + 'state'] = task.state;
+            if (task.error) {
+                result[path + 'error'] = task.error;
+            }
+            if (task.context) {
+                result[path + 'context'] = task.context;
+            }
+        }, {});
+    }
+
+    /**
+     * Update the tasks waiting on a batch of finished tasks from one graph with two
+     * multi document updates. Tasks waiting on any of them in a state they didn't
+     * finish in are marked unreachable first, so every task that is still reachable
+     * afterwards had all of its dependencies in the batch met, and can have them
+     * all removed at once.
+     *
+     * @param {String} graphId
+     * @param {Array} tasks
+     * @returns {Promise}
+     */
+    function updateDependentTasksMongo(graphId, tasks) {
+        var metStates = function(task) {
+            return [task.state, Constants.Task.States.Finished];
+        };
+        var unmet = _.map(tasks, function(task) {
+            var condition = {};
+            condition['dependencies.' + task.taskId] = { $exists: true, $nin: metStates(task) };
+            return condition;
+        });
+        var met = _.map(tasks, function(task) {
+            var condition = {};
+            condition['dependencies.' + task.taskId] = { $in: metStates(task) };
+            return condition;
+        });
+        var unset = _.transform(tasks, function(result, task) {
+            result['dependencies.' + task.taskId] = '';
+        }, {});
+
+        return Promise.resolve(waterline.taskdependencies.updateMongo(
+            { graphId: graphId, reachable: true, $or: unmet },
+            { $set: { reachable: false } },
+            { multi: true }
+        ))
+        .then(function() {
+            return waterline.taskdependencies.updateMongo(
+                { graphId: graphId, reachable: true, $or: met },
+                { $unset: unset },
+                { multi: true }
+            );
+        });
+    }
+
+    /**
+     * The MongoDB path of updateTaskDependencies: one update of the graph object,
+     * two of the dependent tasks, and one to mark the batch as evaluated, however
+     * many tasks the batch holds.
+     *
+     * @param {String} graphId
+     * @param {Array} tasks
+     * @returns {Promise} the evaluated task documents
+     */
+    function updateTaskDependenciesMongo(graphId, tasks) {
+        var query = {
+            graphId: graphId,
+            taskId: { $in: _.pluck(tasks, 'taskId') },
+            reachable: true
+        };
+        return Promise.all([
+            waterline.taskdependencies.find(query),
+            waterline.graphobjects.updateMongo(
+                { instanceId: graphId },
+                { $set: graphTaskStates(tasks) },
+                {}
+            ),
+            updateDependentTasksMongo(graphId, tasks)
+        ])
+        .spread(function(docs) {
+            // Only mark the tasks evaluated once everything else has been written,
+            // so a failure leaves them for the unevaluated task poller to retry
+            return Promise.resolve(waterline.taskdependencies.updateMongo(
+                query,
+                { $set: { evaluated: true } },
+                { multi: true }
+            ))
+            .then(function() {
+                return _.map(docs, function(doc) {
+                    doc.evaluated = true;
+                    return doc;
+                });
+            });
+        });
+    }
+
+    /**
+     * Evaluate a batch of finished tasks that all belong to the same graph:
+     * record their states in the graph object, update the tasks waiting on
+     * them, and mark them as evaluated.
+     *
+     * @param {String} graphId
+     * @param {Array} tasks - task finished data, as emitted to evaluateTaskStream
+     * @returns {Promise} the evaluated task documents
+     */
+    exports.updateTaskDependencies = function(graphId, tasks) {
+        assert.string(graphId, 'graphId');
+        assert.arrayOfObject(tasks, 'tasks');
+
+        if (exports.supports('updateTaskDependencies')) {
+            return Promise.resolve(store.updateTaskDependencies(graphId, tasks));
+        }
+        if (exports.supportsMongo()) {
+            return updateTaskDependenciesMongo(graphId, tasks);
+        }
+        return Promise.map(tasks, function(task) {
+            return Promise.all([
+                store.setTaskStateInGraph(task),
+                store.updateDependentTasks(task),
+                store.updateUnreachableTasks(task)
+            ])
+            .then(function() {
+                return store.markTaskEvaluated(task);
+            });
+        }, { concurrency: exports.concurrency });
+    };
+
+    /**
+     * The MongoDB path of failGraphTasks: one update of the task documents for
+     * each distinct state, and one of the graph object.
+     *
+     * @param {String} graphId
+     * @param {Array} tasks
+     * @returns {Promise} the tasks
+     */
+    function failGraphTasksMongo(graphId, tasks) {
+        return Promise.map(_.pairs(_.groupBy(tasks, 'state')), function(pair) {
+            return waterline.taskdependencies.updateMongo(
+                {
+                    graphId: graphId,
+                    taskId: { $in: _.pluck(pair[1], 'taskId') },
+                    reachable: true
+                },
+                { $set: { state: pair[0], evaluated: true } },
+                { multi: true }
+            );
+        })
+        .then(function() {
+            return waterline.graphobjects.updateMongo(
+                { instanceId: graphId },
+                { $set: graphTaskStates(tasks) },
+                {}
+            );
+        })
+        .return(tasks);
+    }
+
+    /**
+     * Fail or cancel a set of tasks that all belong to the same graph: set their
+     * states, mark them as evaluated so they aren't picked up by the scheduler
+     * again, and record their states in the graph object.
+     *
+     * @param {String} graphId
+     * @param {Array} tasks - task objects with taskId, graphId and the new state
+     * @returns {Promise} the tasks
+     */
+    exports.failGraphTasks = function(graphId, tasks) {
+        assert.string(graphId, 'graphId');
+        assert.arrayOfObject(tasks, 'tasks');
+
+        if (exports.supports('failGraphTasks')) {
+            return Promise.resolve(store.failGraphTasks(graphId, tasks));
+        }
+        if (exports.supportsMongo()) {
+            return failGraphTasksMongo(graphId, tasks);
+        }
+        return Promise.map(tasks, function(task) {
+            return Promise.resolve(store.setTaskState(task))
+            .then(function() {
+                return store.markTaskEvaluated(task);
+            })
+            .then(function() {
+                return store.setTaskStateInGraph(task);
+            })
+            .return(task);
+        }, { concurrency: exports.concurrency });
+    };
+
+    // The heartbeat of the most recent MongoDB checkout made by this process
+    var lastClaimedAt = 0;
+
+    /**
+     * @returns {Date} a checkout time that no earlier checkout from this process
+     * has used, to tell the documents claimed by one batch apart from those
+     * claimed by the runner's other batches
+     */
+    function claimTime() {
+        lastClaimedAt = Math.max(Date.now(), lastClaimedAt + 1);
+        return new Date(lastClaimedAt);
+    }
+
+    /**
+     * The MongoDB path of checkoutTasks: lease every claimable task in the batch
+     * with one multi document update, then read back the ones this update
+     * claimed. If a heartbeat renews one of them in between, it won't be read
+     * back, and the runner's lost task handling gives up its lease.
+     *
+     * @param {String} taskRunnerId
+     * @param {Array} tasks
+     * @returns {Promise} the checked out task documents
+     */
+    function checkoutTasksMongo(taskRunnerId, tasks) {
+        var claimedAt = claimTime();
+        var taskIds = _.pluck(tasks, 'taskId');
+        return Promise.resolve(waterline.taskdependencies.updateMongo(
+            {
+                graphId: { $in: _.uniq(_.pluck(tasks, 'graphId')) },
+                taskId: { $in: taskIds },
+                taskRunnerLease: null,
+                reachable: true,
+                state: Constants.Task.States.Pending
+            },
+            { $set: { taskRunnerLease: taskRunnerId, taskRunnerHeartbeat: claimedAt } },
+            { multi: true }
+        ))
+        .then(function() {
+            return waterline.taskdependencies.find({
+                taskId: { $in: taskIds },
+                taskRunnerLease: taskRunnerId,
+                taskRunnerHeartbeat: claimedAt
+            });
+        });
+    }
+
+    /**
+     * The MongoDB path of getTasksByIds: one query for the graph objects of the
+     * whole batch.
+     *
+     * @param {Array} tasks
+     * @returns {Promise} the task data in the same order as tasks
+     */
+    function getTasksByIdsMongo(tasks) {
+        return Promise.resolve(waterline.graphobjects.find({
+            instanceId: { $in: _.uniq(_.pluck(tasks, 'graphId')) }
+        }))
+        .then(function(graphs) {
+            var byId = _.indexBy(graphs, 'instanceId');
+            return _.map(tasks, function(task) {
+                var graph = byId[task.graphId];
+                if (!graph) {
+                    return null;
+                }
+                return {
+                    graphId: graph.instanceId,
+                    context: graph.context,
+                    task: graph.tasks[task.taskId]
+                };
+            });
+        });
+    }
+
+    /**
+     * Check out a batch of tasks for a task runner. Tasks which are already leased
+     * by another runner are left out of the result.
+     *
+     * @param {String} taskRunnerId
+     * @param {Array} tasks - objects with taskId and graphId
+     * @returns {Promise} the checked out task documents
+     */
+    exports.checkoutTasks = function(taskRunnerId, tasks) {
+        assert.string(taskRunnerId, 'taskRunnerId');
+        assert.arrayOfObject(tasks, 'tasks');
+
+        if (exports.supports('checkoutTasks')) {
+            return Promise.resolve(store.checkoutTasks(taskRunnerId, tasks));
+        }
+        if (exports.supportsMongo()) {
+            return checkoutTasksMongo(taskRunnerId, tasks);
+        }
+        return Promise.map(tasks, function(task) {
+            return store.checkoutTask(taskRunnerId, task);
+        }, { concurrency: exports.concurrency })
+        .then(_.compact);
+    };
+
+    /**
+     * Fetch the task data for a batch of checked out tasks.
+     *
+     * @param {Array} tasks - checked out task documents
+     * @returns {Promise} the task data in the same order as tasks, with an empty
+     * entry for any task that wasn't found
+     */
+    exports.getTasksByIds = function(tasks) {
+        assert.arrayOfObject(tasks, 'tasks');
+
+        if (exports.supports('getTasksByIds')) {
+            return Promise.resolve(store.getTasksByIds(tasks));
+        }
+        if (exports.supportsMongo()) {
+            return getTasksByIdsMongo(tasks);
+        }
+        return Promise.map(tasks, function(task) {
+            return store.getTaskById(task);
+        }, { concurrency: exports.concurrency });
+    };
+
+    /**
+     * Count the completed task documents waiting to be deleted, the ones
+     * findCompletedTasks returns. This is a count on the indexed query rather
+     * than a read of the documents.
+     *
+     * @returns {Promise} the number of documents, or null if the store can't
+     * count them
+     */
+    exports.countCompletedTasks = function() {
+        if (exports.supports('countCompletedTasks')) {
+            return Promise.resolve(store.countCompletedTasks());
+        }
+        if (exports.supportsMongo() && _.isFunction(waterline.taskdependencies.count)) {
+            return Promise.resolve(waterline.taskdependencies.count({
+                evaluated: true,
+                reachable: true,
+                state: Constants.Task.FinishedStates
+            }));
+        }
+        return Promise.resolve(null);
+    };
+
+    /**
+     * The MongoDB path of expireLeases: find the expired leases, then clear them
+     * all with one multi document update. The update repeats the expiry
+     * conditions, so a lease renewed in between is left alone.
+     *
+     * @param {String} domain
+     * @param {Number} leaseAdjust
+     * @returns {Promise} the task documents whose leases were expired
+     */
+    function expireLeasesMongo(domain, leaseAdjust) {
+        var query = {
+            domain: domain,
+            taskRunnerLease: { $ne: null },
+            taskRunnerHeartbeat: { $lt: new Date(Date.now() - leaseAdjust) }
+        };
+        return Promise.resolve(waterline.taskdependencies.find(query))
+        .then(function(docs) {
+            if (_.isEmpty(docs)) {
+                return [];
+            }
+            return Promise.resolve(waterline.taskdependencies.updateMongo(
+                _.assign({ taskId: { $in: _.pluck(docs, 'taskId') } }, query),
+                { $set: { taskRunnerLease: null, taskRunnerHeartbeat: null } },
+                { multi: true }
+            ))
+            .return(docs);
+        });
+    }
+
+    /**
+     * Clear the task runner lease on every task in a domain whose lease hasn't been
+     * renewed within leaseAdjust ms.
+     *
+     * @param {String} domain
+     * @param {Number} leaseAdjust
+     * @returns {Promise} the task documents whose leases were expired
+     */
+    exports.expireLeases = function(domain, leaseAdjust) {
+        assert.string(domain, 'domain');
+        assert.number(leaseAdjust, 'leaseAdjust');
+
+        if (exports.supports('expireLeases')) {
+            return Promise.resolve(store.expireLeases(domain, leaseAdjust));
+        }
+        if (exports.supportsMongo()) {
+            return expireLeasesMongo(domain, leaseAdjust);
+        }
+        return Promise.resolve(store.findExpiredLeases(domain, leaseAdjust))
+        .then(function(docs) {
+            return Promise.map(docs || [], function(doc) {
+                return store.expireLease(doc.id);
+            }, { concurrency: exports.concurrency })
+            .return(docs || []);
+        });
+    };
+
+    /**
+     * Give up a task runner's leases on tasks, so that other runners can check
+     * them out straight away instead of waiting for the leases to expire.
+     *
+     * @param {String} taskRunnerId
+     * @param {Array} taskIds
+     * @returns {Promise}
+     */
+    exports.releaseLeases = function(taskRunnerId, taskIds) {
+        assert.string(taskRunnerId, 'taskRunnerId');
+        assert.arrayOfString(taskIds, 'taskIds');
+
+        if (exports.supports('releaseLeases')) {
+            return Promise.resolve(store.releaseLeases(taskRunnerId, taskIds));
+        }
+        if (exports.supportsMongo()) {
+            return waterline.taskdependencies.updateMongo(
+                { taskId: { $in: taskIds }, taskRunnerLease: taskRunnerId },
+                { $set: { taskRunnerLease: null, taskRunnerHeartbeat: null } },
+                { multi: true }
+            );
+        }
+        // expireLease takes task document ids, and isn't scoped to the runner,
+        // so only expire the runner's own leases on the listed tasks
+        return Promise.resolve(store.getOwnTasks(taskRunnerId))
+        .then(function(docs) {
+            var released = _.filter(docs, function(doc) {
+                return _.contains(taskIds, doc.taskId);
+            });
+            return Promise.map(released, function(doc) {
+                return store.expireLease(doc.id);
+            }, { concurrency: exports.concurrency });
+        });
+    };
+
+    /**
+     * Renew the leases a task runner holds and report only what changed: tasks
+     * the store says the runner owns that it didn't list (lost), and listed tasks
+     * the runner no longer owns (unowned).
+     *
+     * Without a native implementation, this heartbeats all of the runner's tasks
+     * and only reads its owned tasks back if the count differs from taskIds.
+     *
+     * @param {String} taskRunnerId
+     * @param {Array} taskIds - the tasks the runner believes it owns
+     * @returns {Promise} { lost: [taskId], unowned: [taskId] }
+     */
+    exports.renewLeases = function(taskRunnerId, taskIds) {
+        assert.string(taskRunnerId, 'taskRunnerId');
+        assert.arrayOfString(taskIds, 'taskIds');
+
+        if (exports.supports('renewLeases')) {
+            return Promise.resolve(store.renewLeases(taskRunnerId, taskIds));
+        }
+        return Promise.resolve(store.heartbeatTasksForRunner(taskRunnerId))
+        .then(function(count) {
+            if ((count || 0) === taskIds.length) {
+                return { lost: [], unowned: [] };
+            }
+            return Promise.resolve(store.getOwnTasks(taskRunnerId))
+            .then(function(ownTasks) {
+                var owned = _.pluck(ownTasks, 'taskId');
+                return {
+                    lost: _.difference(owned, taskIds),
+                    unowned: _.difference(taskIds, owned)
+                };
+            });
+        });
+    };
+
+    /**
+     * @param {Array} nodeIds
+     * @returns {Promise} the active graphs running against any of the nodes
+     */
+    exports.findActiveGraphsForTargets = function(nodeIds) {
+        assert.arrayOfString(nodeIds, 'nodeIds');
+
+        if (exports.supports('findActiveGraphsForTargets')) {
+            return Promise.resolve(store.findActiveGraphsForTargets(nodeIds));
+        }
+        if (exports.supportsMongo()) {
+            return Promise.resolve(waterline.graphobjects.find({
+                node: nodeIds,
+                _status: Constants.Task.ActiveStates
+            }));
+        }
+        return Promise.map(nodeIds, function(nodeId) {
+            return store.findActiveGraphForTarget(nodeId);
+        }, { concurrency: exports.concurrency })
+        .then(_.compact);
+    };
+
+    /**
+     * @param {Array} graphs
+     * @returns {Boolean} whether the graphs and their tasks can be inserted with
+     * one bulk insert each
+     */
+    function canInsertGraphs(graphs) {
+        return exports.supportsMongo() &&
+            _.isFunction(waterline.graphobjects.createEach) &&
+            _.every(graphs, function(graph) {
+                return _.isFunction(graph.createTaskDependencyItems);
+            });
+    }
+
+    /**
+     * The MongoDB path of persistGraphs: one bulk insert of the graph objects and
+     * one of the task documents of every graph. If the tasks can't be inserted,
+     * whatever was written is removed again, so no graph is left without its
+     * tasks.
+     *
+     * @param {Array} graphs
+     * @returns {Promise} the graphs
+     */
+    function persistGraphsMongo(graphs) {
+        var graphIds = _.pluck(graphs, 'instanceId');
+        var tasks = _.flatten(_.map(graphs, function(graph) {
+            return _.map(graph.createTaskDependencyItems(), function(item) {
+                return _.assign(JSON.parse(JSON.stringify(item)), {
+                    graphId: graph.instanceId,
+                    domain: item.domain || Constants.Task.DefaultDomain,
+                    dependencies: item.dependencies || {},
+                    state: Constants.Task.States.Pending,
+                    evaluated: false,
+                    reachable: true,
+                    taskRunnerLease: null,
+                    taskRunnerHeartbeat: null
+                });
+            });
+        }));
+
+        return Promise.resolve(waterline.graphobjects.createEach(
+            JSON.parse(JSON.stringify(graphs))
+        ))
+        .then(function() {
+            return Promise.resolve(waterline.taskdependencies.createEach(tasks))
+            .catch(function(error) {
+                return Promise.all([
+                    waterline.graphobjects.destroy({ instanceId: graphIds }),
+                    waterline.taskdependencies.destroy({ graphId: graphIds })
+                ])
+                .catch(_.noop)
+                .throw(error);
+            });
+        })
+        .return(graphs);
+    }
+
+    /**
+     * Persist a batch of newly created graphs along with their tasks. A store
+     * that implements persistGraphs natively, and MongoDB, write them all at
+     * once, and either persist all of them or none. Otherwise each graph is
+     * persisted on its own.
+     *
+     * @param {Array} graphs - TaskGraph objects
+     * @returns {Promise} for each graph in order, the persisted graph, or the
+     * error it failed to persist with
+     */
+    exports.persistGraphs = function(graphs) {
+        assert.arrayOfObject(graphs, 'graphs');
+
+        if (exports.supports('persistGraphs')) {
+            return Promise.resolve(store.persistGraphs(graphs))
+            .catch(function(error) {
+                return _.map(graphs, _.constant(error));
+            });
+        }
+        if (canInsertGraphs(graphs)) {
+            return persistGraphsMongo(graphs)
+            .catch(function(error) {
+                return _.map(graphs, _.constant(error));
+            });
+        }
+        return Promise.map(graphs, function(graph) {
+            return Promise.resolve(graph.persist())
+            .catch(function(error) {
+                return error;
+            });
+        }, { concurrency: exports.concurrency });
+    };
+
+    return exports;
+}
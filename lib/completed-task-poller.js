@@ -15,9 +15,12 @@ di.annotate(completedTaskPollerFactory,
         'Logger',
         'Assert',
         'Constants',
-        'Rx',
+        'Rx.Mixins',
         'Promise',
-        '_'
+        '_',
+        'TaskGraph.Metrics',
+        'TaskGraph.ActiveGraphIndex',
+        'TaskGraph.BulkStore'
     )
 );
 
@@ -30,10 +33,25 @@ function completedTaskPollerFactory(
     Constants,
     Rx,
     Promise,
-    _
+    _,
+    metrics,
+    activeGraphIndex,
+    bulkStore
 ) {
     var logger = Logger.initialize(completedTaskPollerFactory);
 
+    var storeDuration = metrics.histogram('taskgraph_store_call_duration_milliseconds',
+            'Latency of task graph store calls', ['method']);
+    var pollResultSize = metrics.histogram('taskgraph_poll_result_size',
+            'Number of documents returned by each poll of the store', ['poller'],
+            [0, 1, 5, 10, 25, 50, 100, 200, 500, 1000]);
+    var lastBatchSize = metrics.gauge('taskgraph_completed_tasks_last_batch_size',
+            'Completed task documents found by the most recent poll', ['domain']);
+    var backlogSize = metrics.gauge('taskgraph_completed_tasks_backlog',
+            'Completed task documents waiting to be deleted', ['domain']);
+    var deletedTotal = metrics.counter('taskgraph_completed_tasks_deleted_total',
+            'Completed task documents deleted', ['domain']);
+
     /**
      * The CompletedTaskPoller polls the store for any tasks that have been
      * finished or marked as unreachable (in the case of multiple branches of
@@ -41,8 +59,20 @@ function completedTaskPollerFactory(
      * completed tasks, and finally deletes them from the store so that it
      * doesn't grow to be too large.
      *
+     * In adaptive mode a poll that finds a full batch keeps draining: it runs the
+     * next batch straight away, doubling the batch size up to
+     * maxCompletedTaskBatchSize, until a batch comes back short. Polls that find
+     * nothing back the poll interval off up to maxPollInterval.
+     *
+     * The number of completed tasks still waiting is exported as a backlog gauge.
+     * A batch that comes back short held all of them, so the backlog is only
+     * counted in the store after a full batch, and at most once per pollInterval.
+     *
      * @param {String} domain
      * @param {Object} options
+     * @param {Boolean} [options.adaptive] - drain backlogs and back off while idle
+     * @param {Number} [options.maxCompletedTaskBatchSize] - largest batch to grow to
+     * @param {Number} [options.maxPollInterval] - longest poll period to back off to
      * @constructor CompletedTaskPoller
      */
     function CompletedTaskPoller(domain, options) {
@@ -52,6 +82,19 @@ function completedTaskPollerFactory(
         this.concurrentCounter = { count: 0, max: 1 };
         this.completedTaskBatchSize = options.completedTaskBatchSize || 200;
         assert.number(this.completedTaskBatchSize, 'completedTaskBatchSize');
+        this.adaptive = !!options.adaptive;
+        this.maxCompletedTaskBatchSize = options.maxCompletedTaskBatchSize ||
+            this.completedTaskBatchSize * 10;
+        this.pollState = {
+            interval: this.pollInterval,
+            min: this.pollInterval,
+            max: options.maxPollInterval || this.pollInterval * 10,
+            wakeups: 0,
+            saved: 0
+        };
+        this.lastBatchSize = 0;
+        this.backlog = 0;
+        this.backlogCountedAt = 0;
         this.domain = domain || Constants.Task.DefaultDomain;
         assert.string(this.domain, 'domain');
         this.debug = _.has(options, 'debug') ? options.debug : false;
@@ -89,9 +132,17 @@ function completedTaskPollerFactory(
          * The .map call is where the actual work is done, and the rest of the
          * calls are just coordination about when to do it.
          */
-        Rx.Observable.interval(self.pollInterval)
+        var trigger = self.adaptive ?
+            Rx.Observable.adaptiveInterval(self.pollState) :
+            Rx.Observable.interval(self.pollInterval);
+
+        var processBatch = self.adaptive ?
+            self.drainCompletedTasks.bind(self, self.completedTaskBatchSize) :
+            self.processCompletedTasks.bind(self, self.completedTaskBatchSize);
+
+        trigger
         .takeWhile(self.isRunning.bind(self))
-        .map(self.processCompletedTasks.bind(self, self.completedTaskBatchSize))
+        .map(processBatch)
         .mergeLossy(self.concurrentCounter)
         // Don't let processCompletedTasks return a waterline object to the logger
         // otherwise it will exceed the call stack trying to traverse a circular object
@@ -127,14 +178,93 @@ function completedTaskPollerFactory(
      * @memberOf CompletedTaskPoller
      */
     CompletedTaskPoller.prototype.processCompletedTasks = function(limit) {
+        var self = this;
+        self.lastBatchSize = 0;
         return Rx.Observable.just()
-        .flatMap(store.findCompletedTasks.bind(store, limit))
+        .flatMap(function() {
+            return storeDuration.time({ method: 'findCompletedTasks' }, function() {
+                return store.findCompletedTasks(limit);
+            });
+        })
+        .tap(function(tasks) {
+            self.lastBatchSize = _.size(tasks);
+            pollResultSize.observe(self.lastBatchSize, { poller: 'completed_tasks' });
+            lastBatchSize.set(self.lastBatchSize, { domain: self.domain });
+            self.measureBacklog(limit);
+        })
         .filter(function(tasks) { return !_.isEmpty(tasks); })
         .flatMap(this.deleteCompletedGraphs.bind(this))
         .flatMap(this.deleteTasks.bind(this))
         .catch(this.handleStreamError.bind(this, 'Error processing completed tasks'));
     };
 
+    /**
+     * Update the backlog gauge after a batch of completed tasks was found. The
+     * count is made in the background, so it never holds up the batch.
+     *
+     * @param {Number} limit - the size of the batch that was asked for
+     * @returns {Promise}
+     * @memberOf CompletedTaskPoller
+     */
+    CompletedTaskPoller.prototype.measureBacklog = function(limit) {
+        var self = this;
+        if (!limit || self.lastBatchSize < limit) {
+            self.backlog = self.lastBatchSize;
+            backlogSize.set(self.backlog, { domain: self.domain });
+            return Promise.resolve(self.backlog);
+        }
+        if (Date.now() - self.backlogCountedAt < self.pollInterval) {
+            return Promise.resolve(self.backlog);
+        }
+        self.backlogCountedAt = Date.now();
+        return storeDuration.time({ method: 'countCompletedTasks' }, function() {
+            return bulkStore.countCompletedTasks();
+        })
+        .then(function(count) {
+            if (_.isNumber(count)) {
+                self.backlog = count;
+                backlogSize.set(count, { domain: self.domain });
+            }
+            return self.backlog;
+        })
+        .catch(function(error) {
+            logger.debug('Error counting completed tasks', { error: error });
+            return self.backlog;
+        });
+    };
+
+    /**
+     * Process batches of completed tasks back to back for as long as they come
+     * back full, doubling the batch size each time up to maxCompletedTaskBatchSize.
+     * Then tighten or back off the poll interval depending on whether anything
+     * was found.
+     *
+     * @param {Number} limit
+     * @returns {Observable}
+     * @memberOf CompletedTaskPoller
+     */
+    CompletedTaskPoller.prototype.drainCompletedTasks = function(limit) {
+        var self = this;
+        return self.processCompletedTasks(limit)
+        // Only carry on draining if the batch was deleted, not after an error
+        .map(function() { return true; })
+        .defaultIfEmpty(false)
+        .flatMap(function(deleted) {
+            var found = self.lastBatchSize;
+            if (deleted && found >= limit && self.isRunning()) {
+                return self.drainCompletedTasks(
+                    Math.min(limit * 2, self.maxCompletedTaskBatchSize));
+            }
+            if (found > 0) {
+                self.pollState.interval = self.pollState.min;
+            } else {
+                self.pollState.interval = Math.min(self.pollState.interval * 2,
+                    self.pollState.max);
+            }
+            return Rx.Observable.just(found);
+        });
+    };
+
     /**
      * Determine if a graph is finished, and if so mark its finished state
      * in the store and publish an event to the messenger.
@@ -192,7 +322,9 @@ function completedTaskPollerFactory(
 
     /**
      * Evaluate an array of finished tasks, and check if a graph is finished
-     * for each task that is marked as being potentially terminal.
+     * for each graph that has a task in the batch marked as being potentially
+     * terminal. Each graph is checked once, using a failed terminal task if
+     * there is one, since that decides the graph's final state.
      *
      * @param {Array} tasks
      * @returns {Observable}
@@ -212,6 +344,11 @@ function completedTaskPollerFactory(
                 result.push(task);
             }
         });
+        terminalTasks = _.map(_.groupBy(terminalTasks, 'graphId'), function(graphTasks) {
+            return _.find(graphTasks, function(task) {
+                return _.contains(Constants.Task.FailedStates, task.state);
+            }) || _.first(graphTasks);
+        });
         if (_.isEmpty(terminalTasks)) {
             return Rx.Observable.just(tasks);
         }
@@ -231,13 +368,21 @@ function completedTaskPollerFactory(
      * @memberOf CompletedTaskPoller
      */
     CompletedTaskPoller.prototype.deleteTasks = function(tasks) {
+        var self = this;
         assert.arrayOfObject(tasks, 'tasks array');
         var objectIds = _.map(tasks, function(task) {
             return task._id;
         });
 
         return Rx.Observable.just(objectIds)
-        .flatMap(store.deleteTasks.bind(store))
+        .flatMap(function() {
+            return storeDuration.time({ method: 'deleteTasks' }, function() {
+                return store.deleteTasks(objectIds);
+            });
+        })
+        .tap(function() {
+            deletedTotal.inc(objectIds.length, { domain: self.domain });
+        })
         .catch(this.handleStreamError.bind(this, 'Error deleting completed tasks'));
     };
 
@@ -305,6 +450,7 @@ function completedTaskPollerFactory(
      * @memberOf CompletedTaskPoller
      */
     CompletedTaskPoller.prototype._publishGraphFinished = function(graph) {
+        activeGraphIndex.invalidate(graph.node);
         return eventsProtocol.publishGraphFinished(graph.instanceId, {
             graphId: graph.instanceId,
             graphName: graph.name,
@@ -0,0 +1,64 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+
+module.exports = eventRecordFactory;
+di.annotate(eventRecordFactory, new di.Provide('TaskGraph.EventRecord'));
+di.annotate(eventRecordFactory,
+    new di.Inject(
+        '_'
+    )
+);
+
+/**
+ * Helpers for passing task events through the scheduler and runner pipelines
+ * without deep copying them.
+ *
+ * Event records are frozen (shallowly), so that side effect taps such as progress
+ * publishing can hold on to the same object that continues down the pipeline.
+ * Any stage that needs a modified record makes a shallow copy of it first
+ * (copy-on-write), which costs a handful of property copies instead of a full
+ * traversal of the task and its context.
+ */
+function eventRecordFactory(
+    _
+) {
+    var exports = {};
+
+    /**
+     * Freeze an event record in place.
+     *
+     * @param {Object} record
+     * @returns {Object} the same record
+     */
+    exports.freeze = function(record) {
+        if (_.isObject(record)) {
+            Object.freeze(record);
+        }
+        return record;
+    };
+
+    /**
+     * Take a frozen snapshot of an object that will keep being modified, such as
+     * a running task. Own data properties are copied by reference, and the
+     * properties named in copyOnWrite (objects the owner writes into, like a
+     * task's context) are copied one level deep.
+     *
+     * @param {Object} source
+     * @param {Array} [copyOnWrite]
+     * @returns {Object} frozen snapshot
+     */
+    exports.snapshot = function(source, copyOnWrite) {
+        var record = _.omit(source, _.isFunction);
+        _.forEach(copyOnWrite, function(key) {
+            if (_.isObject(record[key])) {
+                record[key] = Object.freeze(_.clone(record[key]));
+            }
+        });
+        return Object.freeze(record);
+    };
+
+    return exports;
+}
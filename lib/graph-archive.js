@@ -0,0 +1,449 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+var path = require('path');
+var zlib = require('zlib');
+
+module.exports = graphArchiveFactory;
+di.annotate(graphArchiveFactory, new di.Provide('TaskGraph.GraphArchive'));
+di.annotate(graphArchiveFactory,
+    new di.Inject(
+        'Services.Waterline',
+        'TaskGraph.Store',
+        'Services.Configuration',
+        'Constants',
+        'Logger',
+        'Promise',
+        'uuid',
+        '_',
+        'fs'
+    )
+);
+
+/**
+ * Cold storage for finished graph objects, so that the graphobjects collection
+ * only has to hold active and recently finished graphs.
+ *
+ * Graphs are appended to daily segment files, each graph as its own gzip member.
+ * A segment therefore decompresses to plain JSON lines, and a single graph can be
+ * read back from its byte range without touching the rest of the segment. An
+ * append-only index file records the segment, offset and length of every archived
+ * graph along with its node, and is kept in memory by instanceId and node.
+ *
+ * Every archiver writes its own segment and index files, named after its writer
+ * id, and keeps track of their sizes itself, so archivers in several processes
+ * can never write at the same offsets. Only the leading scheduler archives, and
+ * if two archivers ever overlap, the worst case is a graph archived twice.
+ * Readers load the index files once and then only read what has been appended
+ * to them, at most once per indexRefreshInterval.
+ *
+ * The archive is configured with the graphArchive configuration key:
+ *
+ * {
+ *     path: <directory>,      // enables the archive, must be shared storage if
+ *                             // API processes run on other hosts than the archiver
+ *     archiveAfter: <ms>,     // how long after finishing a graph is archived
+ *     interval: <ms>,         // how often to look for graphs to archive
+ *     batchSize: <N>,         // graphs to archive per store query
+ *     indexRefreshInterval: <ms> // how often a lookup miss may re-read the index
+ * }
+ */
+function graphArchiveFactory(
+    waterline,
+    store,
+    configuration,
+    Constants,
+    Logger,
+    Promise,
+    uuid,
+    _,
+    fs
+) {
+    var logger = Logger.initialize(graphArchiveFactory);
+
+    var gzip = Promise.promisify(zlib.gzip);
+    var gunzip = Promise.promisify(zlib.gunzip);
+
+    var INDEX_FILE = /^index-.*\.jsonl$/;
+
+    // Buffer.alloc and Buffer.from replace the deprecated Buffer constructor
+    var newBufferApi = _.isFunction(Buffer.alloc);
+
+    function allocBuffer(size) {
+        return newBufferApi ? Buffer.alloc(size) : new Buffer(size);
+    }
+
+    function bufferFrom(string) {
+        return newBufferApi ? Buffer.from(string) : new Buffer(string);
+    }
+
+    /**
+     * @param {Object} options - see graphArchiveFactory
+     * @constructor
+     */
+    function GraphArchive(options) {
+        options = options || {};
+        this.path = options.path || null;
+        this.archiveAfter = options.archiveAfter || 7 * 24 * 60 * 60 * 1000;
+        this.interval = options.interval || 60 * 60 * 1000;
+        this.batchSize = options.batchSize || 100;
+        this.indexRefreshInterval = options.indexRefreshInterval || 10 * 1000;
+        this.writerId = uuid.v4();
+        this.byInstanceId = {};
+        this.byNode = {};
+        // Bytes of each index file that have been read into memory
+        this.indexSizes = {};
+        // Bytes written to each of this archiver's segments
+        this.segmentSizes = {};
+        this.indexLoad = null;
+        this.indexLoadedAt = 0;
+        this.appending = Promise.resolve();
+        this.timer = null;
+        this.archiving = null;
+        this.scheduler = null;
+    }
+
+    /**
+     * @returns {Boolean} whether an archive path is configured
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.isEnabled = function() {
+        return !!this.path;
+    };
+
+    /**
+     * Read the index entries appended to every index file since it was last
+     * read, which may have been written by archivers in other processes.
+     *
+     * @returns {Promise}
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.loadIndex = function() {
+        var self = this;
+        return fs.readdirAsync(self.path)
+        .catch(function(error) {
+            if (error.code !== 'ENOENT') {
+                throw error;
+            }
+            return [];
+        })
+        .then(function(files) {
+            return Promise.each(_.filter(files, function(file) {
+                return INDEX_FILE.test(file);
+            }), self.loadIndexFile.bind(self));
+        })
+        .then(function() {
+            self.indexLoadedAt = Date.now();
+        });
+    };
+
+    /**
+     * @param {String} file - an index file name
+     * @returns {Promise}
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.loadIndexFile = function(file) {
+        var self = this;
+        var start = self.indexSizes[file] || 0;
+        var filePath = path.join(self.path, file);
+        return fs.statAsync(filePath)
+        .then(function(stats) {
+            if (stats.size <= start) {
+                return;
+            }
+            var buffer = allocBuffer(stats.size - start);
+            return Promise.using(
+                fs.openAsync(filePath, 'r').disposer(function(fd) {
+                    return fs.closeAsync(fd);
+                }),
+                function(fd) {
+                    return fs.readAsync(fd, buffer, 0, buffer.length, start);
+                }
+            )
+            .then(function() {
+                // Only consume complete lines, the archiver may be midway through a write
+                var end = buffer.lastIndexOf('\n') + 1;
+                _.forEach(buffer.slice(0, end).toString().split('\n'), function(line) {
+                    if (line) {
+                        self.addToIndex(JSON.parse(line));
+                    }
+                });
+                self.indexSizes[file] = start + end;
+            });
+        });
+    };
+
+    /**
+     * Load the index for a lookup, unless it has been loaded within the last
+     * indexRefreshInterval ms. Concurrent lookups share one load.
+     *
+     * @returns {Promise}
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.refreshIndex = function() {
+        var self = this;
+        if (!self.indexLoad && Date.now() - self.indexLoadedAt >= self.indexRefreshInterval) {
+            self.indexLoad = self.loadIndex()
+            .finally(function() {
+                self.indexLoad = null;
+            });
+        }
+        return Promise.resolve(self.indexLoad);
+    };
+
+    /**
+     * @param {Object} entry - an index entry
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.addToIndex = function(entry) {
+        if (entry.node && !_.has(this.byInstanceId, entry.instanceId)) {
+            this.byNode[entry.node] = this.byNode[entry.node] || [];
+            this.byNode[entry.node].push(entry.instanceId);
+        }
+        this.byInstanceId[entry.instanceId] = entry;
+    };
+
+    /**
+     * Get an archived graph.
+     *
+     * @param {String} instanceId
+     * @returns {Promise} the graph, or null if it isn't in the archive
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.get = function(instanceId) {
+        var self = this;
+        if (!self.isEnabled()) {
+            return Promise.resolve(null);
+        }
+        return Promise.resolve()
+        .then(function() {
+            if (!_.has(self.byInstanceId, instanceId)) {
+                return self.refreshIndex();
+            }
+        })
+        .then(function() {
+            var entry = self.byInstanceId[instanceId];
+            return entry ? self.readEntry(entry) : null;
+        });
+    };
+
+    /**
+     * Get all archived graphs that ran against a node.
+     *
+     * @param {String} nodeId
+     * @returns {Promise} an array of graphs
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.findByNode = function(nodeId) {
+        var self = this;
+        if (!self.isEnabled()) {
+            return Promise.resolve([]);
+        }
+        return self.refreshIndex()
+        .then(function() {
+            return Promise.map(self.byNode[nodeId] || [], function(instanceId) {
+                return self.readEntry(self.byInstanceId[instanceId]);
+            });
+        });
+    };
+
+    /**
+     * Read and decompress a single graph from its segment.
+     *
+     * @param {Object} entry - an index entry
+     * @returns {Promise} the graph
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.readEntry = function(entry) {
+        var buffer = allocBuffer(entry.length);
+        return Promise.using(
+            fs.openAsync(path.join(this.path, entry.file), 'r').disposer(function(fd) {
+                return fs.closeAsync(fd);
+            }),
+            function(fd) {
+                return fs.readAsync(fd, buffer, 0, entry.length, entry.offset);
+            }
+        )
+        .then(function() {
+            return gunzip(buffer);
+        })
+        .then(function(contents) {
+            return JSON.parse(contents.toString());
+        });
+    };
+
+    /**
+     * Append graphs to this archiver's segment for today and add them to the
+     * index. Appends are made one at a time, so each one starts where the last
+     * one ended.
+     *
+     * @param {Array} graphs
+     * @returns {Promise} the new index entries
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.append = function(graphs) {
+        var self = this;
+        var appended = self.appending.then(function() {
+            return self.appendNow(graphs);
+        });
+        self.appending = appended.catch(_.noop);
+        return appended;
+    };
+
+    /**
+     * @param {Array} graphs
+     * @returns {Promise} the new index entries
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.appendNow = function(graphs) {
+        var self = this;
+        var file = 'graphs-' + new Date().toISOString().slice(0, 10) + '-' +
+            self.writerId + '.jsonl.gz';
+        var indexFile = 'index-' + self.writerId + '.jsonl';
+
+        return Promise.map(graphs, function(graph) {
+            return gzip(bufferFrom(JSON.stringify(graph) + '\n'));
+        })
+        .then(function(members) {
+            var offset = self.segmentSizes[file] || 0;
+            var entries = _.map(graphs, function(graph, i) {
+                var entry = {
+                    instanceId: graph.instanceId,
+                    node: graph.node || null,
+                    name: graph.name,
+                    status: graph._status,
+                    file: file,
+                    offset: offset,
+                    length: members[i].length
+                };
+                offset += members[i].length;
+                return entry;
+            });
+            var lines = bufferFrom(_.map(entries, function(entry) {
+                return JSON.stringify(entry) + '\n';
+            }).join(''));
+            return fs.appendFileAsync(path.join(self.path, file), Buffer.concat(members))
+            .then(function() {
+                self.segmentSizes[file] = offset;
+                return fs.appendFileAsync(path.join(self.path, indexFile), lines);
+            })
+            .then(function() {
+                self.indexSizes[indexFile] = (self.indexSizes[indexFile] || 0) + lines.length;
+                _.forEach(entries, self.addToIndex.bind(self));
+            })
+            .return(entries);
+        });
+    };
+
+    /**
+     * Move graphs that finished more than archiveAfter ms ago from the store into
+     * the archive, a batch at a time until there are none left. A graph is only
+     * deleted from the store once it has been written to the archive.
+     *
+     * @returns {Promise} the number of graphs archived
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.archiveFinishedGraphs = function() {
+        var self = this;
+        var cutoff = new Date(Date.now() - self.archiveAfter);
+
+        return Promise.resolve(waterline.graphobjects.find({
+            _status: Constants.Task.FinishedStates,
+            updatedAt: { '<': cutoff }
+        }).limit(self.batchSize))
+        .then(function(graphs) {
+            if (_.isEmpty(graphs)) {
+                return 0;
+            }
+            // Graphs already in the index were archived by an earlier pass that
+            // failed to delete them, and only need deleting
+            var unarchived = _.reject(graphs, function(graph) {
+                return _.has(self.byInstanceId, graph.instanceId);
+            });
+            return Promise.resolve(_.isEmpty(unarchived) ? [] : self.append(unarchived))
+            .then(function() {
+                return Promise.map(graphs, function(graph) {
+                    return store.deleteGraph(graph.instanceId);
+                }, { concurrency: 10 });
+            })
+            .then(function() {
+                if (graphs.length < self.batchSize) {
+                    return graphs.length;
+                }
+                return self.archiveFinishedGraphs()
+                .then(function(count) {
+                    return count + graphs.length;
+                });
+            });
+        });
+    };
+
+    /**
+     * Run one archive pass, unless one is already running or another scheduler
+     * in the domain is responsible for archiving.
+     *
+     * @returns {Promise}
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.run = function() {
+        var self = this;
+        if (self.archiving || (self.scheduler && !self.scheduler.isLeader())) {
+            return Promise.resolve();
+        }
+        self.archiving = self.archiveFinishedGraphs()
+        .then(function(count) {
+            if (count) {
+                logger.info('Archived finished graphs', { count: count, path: self.path });
+            }
+        })
+        .catch(function(error) {
+            logger.error('Error archiving finished graphs', { error: error });
+        })
+        .finally(function() {
+            self.archiving = null;
+        });
+        return self.archiving;
+    };
+
+    /**
+     * Start archiving in the background. Does nothing if no archive path is
+     * configured.
+     *
+     * @param {Object} [scheduler] - a TaskScheduler, only its leader archives
+     * @returns {Promise}
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.start = function(scheduler) {
+        var self = this;
+        if (!self.isEnabled() || self.timer) {
+            return Promise.resolve();
+        }
+        self.scheduler = scheduler || null;
+        return fs.mkdirAsync(self.path)
+        .catch(function(error) {
+            if (error.code !== 'EEXIST') {
+                throw error;
+            }
+        })
+        .then(function() {
+            return self.loadIndex();
+        })
+        .then(function() {
+            self.timer = setInterval(self.run.bind(self), self.interval);
+        });
+    };
+
+    /**
+     * @returns {Promise} resolves once any running archive pass has finished
+     * @memberOf GraphArchive
+     */
+    GraphArchive.prototype.stop = function() {
+        clearInterval(this.timer);
+        this.timer = null;
+        return Promise.resolve(this.archiving);
+    };
+
+    return new GraphArchive(configuration.get('graphArchive', {}));
+}
@@ -0,0 +1,110 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+var LRU = require('lru-cache');
+
+module.exports = graphDefinitionCacheFactory;
+di.annotate(graphDefinitionCacheFactory, new di.Provide('TaskGraph.GraphDefinitionCache'));
+di.annotate(graphDefinitionCacheFactory,
+    new di.Inject(
+        'Services.Configuration',
+        '_'
+    )
+);
+
+function graphDefinitionCacheFactory(
+    configuration,
+    _
+) {
+    /**
+     * The GraphDefinitionCache keeps the graph definitions this process has
+     * looked up by name to create graphs from, so that graphs that are run
+     * often don't each need a store query for their definition.
+     *
+     * Definitions changed through this process are invalidated when they're
+     * changed, and every definition is invalidated when a task definition is,
+     * since graphs are built from their tasks' definitions. Entries also expire after maxAge, which bounds how long a
+     * definition changed by another process can be served stale. Entries are
+     * evicted least recently used first.
+     *
+     * @param {Object} options
+     * @param {Number} [options.max] - number of definitions to keep
+     * @param {Number} [options.maxAge] - ms to keep a definition for
+     * @constructor
+     */
+    function GraphDefinitionCache(options) {
+        options = options || {};
+        this.max = options.max || 100;
+        this.maxAge = options.maxAge || 60 * 1000;
+        this.definitions = LRU({ max: this.max, maxAge: this.maxAge });
+        this.hits = 0;
+        this.misses = 0;
+    }
+
+    /**
+     * @param {String} injectableName
+     * @returns {Object|undefined} a copy of the graph definition, if cached
+     * @memberOf GraphDefinitionCache
+     */
+    GraphDefinitionCache.prototype.get = function(injectableName) {
+        var definition = this.definitions.get(injectableName);
+        if (definition) {
+            this.hits += 1;
+            return _.cloneDeep(definition);
+        }
+        this.misses += 1;
+    };
+
+    /**
+     * @param {Object} definition - a graph definition from the store
+     * @memberOf GraphDefinitionCache
+     */
+    GraphDefinitionCache.prototype.set = function(definition) {
+        this.definitions.set(definition.injectableName, _.cloneDeep(definition));
+    };
+
+    /**
+     * @param {String} injectableName
+     * @memberOf GraphDefinitionCache
+     */
+    GraphDefinitionCache.prototype.invalidate = function(injectableName) {
+        this.definitions.del(injectableName);
+    };
+
+    /**
+     * Drop every definition.
+     *
+     * @memberOf GraphDefinitionCache
+     */
+    GraphDefinitionCache.prototype.invalidateAll = function() {
+        this.definitions.reset();
+    };
+
+    /**
+     * @memberOf GraphDefinitionCache
+     */
+    GraphDefinitionCache.prototype.reset = function() {
+        this.invalidateAll();
+        this.hits = 0;
+        this.misses = 0;
+    };
+
+    /**
+     * @returns {Object} hit, miss and size counts
+     * @memberOf GraphDefinitionCache
+     */
+    GraphDefinitionCache.prototype.getStats = function() {
+        return {
+            hits: this.hits,
+            misses: this.misses,
+            size: this.definitions.itemCount
+        };
+    };
+
+    return new GraphDefinitionCache({
+        max: configuration.get('graphDefinitionCacheSize'),
+        maxAge: configuration.get('graphDefinitionCacheMaxAge')
+    });
+}
@@ -0,0 +1,275 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+var LRU = require('lru-cache');
+
+module.exports = graphStateCacheFactory;
+di.annotate(graphStateCacheFactory, new di.Provide('TaskGraph.GraphStateCache'));
+di.annotate(graphStateCacheFactory,
+    new di.Inject(
+        'Constants',
+        'Assert',
+        '_'
+    )
+);
+
+function graphStateCacheFactory(
+    Constants,
+    assert,
+    _
+) {
+    /**
+     * The GraphStateCache is an in-process index of the active graphs a scheduler
+     * is working on. For every graph it keeps the task adjacency list (which tasks
+     * wait on which), the states of the tasks, and a count of tasks that are
+     * still pending, and it is updated incrementally from task finished events.
+     * This lets the scheduler find ready tasks and rule out graph completion
+     * without querying the store, which remains the source of truth.
+     *
+     * Graphs are evicted least recently used first once the total number of
+     * cached tasks exceeds maxTasks.
+     *
+     * @param {Object} options
+     * @param {Number} [options.maxTasks] - memory cap, in number of cached tasks
+     * @constructor
+     */
+    function GraphStateCache(options) {
+        options = options || {};
+        this.maxTasks = options.maxTasks || 100000;
+        assert.number(this.maxTasks, 'maxTasks');
+        this.graphs = LRU({
+            max: this.maxTasks,
+            length: function(graph) { return graph.size; }
+        });
+    }
+
+    /**
+     * Add a graph to the cache from its graph object document.
+     *
+     * @param {Object} graph
+     * @returns {Object} the cached graph state
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.prototype.load = function(graph) {
+        assert.object(graph, 'graph');
+        assert.string(graph.instanceId, 'graph.instanceId');
+
+        var entry = {
+            graphId: graph.instanceId,
+            graphName: _.get(graph, 'context.graphName') || graph.name,
+            domain: _.get(graph, 'domain'),
+            tasks: {},
+            dependents: {},
+            pending: 0,
+            size: 0
+        };
+
+        _.forEach(graph.tasks, function(task, taskId) {
+            entry.tasks[taskId] = {
+                taskId: taskId,
+                taskName: task.injectableName,
+                state: task.state || Constants.Task.States.Pending,
+                waitingOn: task.waitingOn || {},
+                reachable: true,
+                scheduled: false
+            };
+            entry.size += 1;
+        });
+
+        _.forEach(entry.tasks, function(task) {
+            _.forEach(_.keys(task.waitingOn), function(dependency) {
+                entry.dependents[dependency] = entry.dependents[dependency] || [];
+                entry.dependents[dependency].push(task.taskId);
+            });
+        });
+
+        _.forEach(entry.tasks, function(task) {
+            if (_.contains(Constants.Task.FinishedStates, task.state)) {
+                this._markUnreachableDependents(entry, task);
+            }
+        }, this);
+
+        entry.pending = _.filter(entry.tasks, isPending).length;
+        this.graphs.set(entry.graphId, entry);
+        return entry;
+    };
+
+    /**
+     * @param {String} graphId
+     * @returns {Boolean}
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.prototype.has = function(graphId) {
+        return this.graphs.has(graphId);
+    };
+
+    /**
+     * Record that a task within a cached graph has finished.
+     *
+     * @param {String} graphId
+     * @param {String} taskId
+     * @param {String} state
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.prototype.taskFinished = function(graphId, taskId, state) {
+        var entry = this.graphs.get(graphId);
+        var task = entry && entry.tasks[taskId];
+        if (!task || !isPending(task)) {
+            return;
+        }
+        task.state = state;
+        entry.pending -= 1;
+        this._markUnreachableDependents(entry, task);
+    };
+
+    /**
+     * Find the tasks within a cached graph whose dependencies are all satisfied
+     * and that haven't already been returned by this method.
+     *
+     * @param {String} graphId
+     * @returns {Array|undefined} ready tasks, or undefined if the graph isn't cached
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.prototype.findReadyTasks = function(graphId) {
+        var entry = this.graphs.get(graphId);
+        if (!entry) {
+            return undefined;
+        }
+        return _.transform(entry.tasks, function(result, task) {
+            if (!isPending(task) || task.scheduled) {
+                return;
+            }
+            var ready = _.every(task.waitingOn, function(required, dependency) {
+                var dependencyTask = entry.tasks[dependency];
+                return dependencyTask && isSatisfied(required, dependencyTask.state);
+            });
+            if (ready) {
+                task.scheduled = true;
+                result.push({
+                    domain: entry.domain,
+                    graphId: entry.graphId,
+                    graphName: entry.graphName,
+                    taskId: task.taskId,
+                    taskName: task.taskName
+                });
+            }
+        }, []);
+    };
+
+    /**
+     * Let a task that findReadyTasks has returned be returned again, because its
+     * run task event couldn't be published or the lease a runner took on it was
+     * expired.
+     *
+     * @param {String} graphId
+     * @param {String} taskId
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.prototype.taskUnscheduled = function(graphId, taskId) {
+        var entry = this.graphs.get(graphId);
+        var task = entry && entry.tasks[taskId];
+        if (task && isPending(task)) {
+            task.scheduled = false;
+        }
+    };
+
+    /**
+     * @param {String} graphId
+     * @returns {Boolean|undefined} false if the graph still has pending tasks,
+     * true if it may be done, undefined if the graph isn't cached
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.prototype.isGraphDone = function(graphId) {
+        var entry = this.graphs.get(graphId);
+        if (!entry) {
+            return undefined;
+        }
+        return entry.pending === 0;
+    };
+
+    /**
+     * @param {String} graphId
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.prototype.evict = function(graphId) {
+        this.graphs.del(graphId);
+    };
+
+    /**
+     * Evict every graph.
+     *
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.prototype.clear = function() {
+        this.graphs.reset();
+    };
+
+    /**
+     * @returns {Object} number of cached graphs and tasks
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.prototype.getStats = function() {
+        return {
+            graphs: this.graphs.itemCount,
+            tasks: this.graphs.length,
+            maxTasks: this.maxTasks
+        };
+    };
+
+    /**
+     * Mark every pending task that waits on a finished task in a state that
+     * doesn't satisfy it as unreachable, and do the same for its own dependents.
+     *
+     * @param {Object} entry
+     * @param {Object} finishedTask
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.prototype._markUnreachableDependents = function(entry, finishedTask) {
+        _.forEach(entry.dependents[finishedTask.taskId], function(dependentId) {
+            var required = entry.tasks[dependentId].waitingOn[finishedTask.taskId];
+            if (!isSatisfied(required, finishedTask.state)) {
+                markUnreachable(entry, dependentId);
+            }
+        });
+    };
+
+    function markUnreachable(entry, taskId) {
+        var task = entry.tasks[taskId];
+        if (!task.reachable) {
+            return;
+        }
+        if (isPending(task)) {
+            entry.pending -= 1;
+        }
+        task.reachable = false;
+        // An unreachable task will never finish, so anything waiting on it
+        // is unreachable too.
+        _.forEach(entry.dependents[taskId], function(dependentId) {
+            markUnreachable(entry, dependentId);
+        });
+    }
+
+    function isPending(task) {
+        return task.reachable && !_.contains(Constants.Task.FinishedStates, task.state);
+    }
+
+    function isSatisfied(required, state) {
+        if (required === 'finished') {
+            return _.contains(Constants.Task.FinishedStates, state);
+        }
+        return _.contains(_.flatten([required]), state);
+    }
+
+    /**
+     * @param {Object} options
+     * @returns {Object} GraphStateCache instance
+     * @memberOf GraphStateCache
+     */
+    GraphStateCache.create = function(options) {
+        return new GraphStateCache(options);
+    };
+
+    return GraphStateCache;
+}
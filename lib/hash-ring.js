@@ -0,0 +1,95 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+var crypto = require('crypto');
+
+module.exports = hashRingFactory;
+di.annotate(hashRingFactory, new di.Provide('TaskGraph.HashRing'));
+di.annotate(hashRingFactory,
+    new di.Inject(
+        'Assert',
+        '_'
+    )
+);
+
+function hashRingFactory(
+    assert,
+    _
+) {
+    function hash(key) {
+        return parseInt(crypto.createHash('md5').update(String(key)).digest('hex').slice(0, 8), 16);
+    }
+
+    /**
+     * A consistent hash ring used to split keys (graph ids) between a set of
+     * members (scheduler ids). Each member is placed on the ring at a number of
+     * virtual points, so that when a member joins or leaves only the keys
+     * adjacent to its points move to a different member.
+     *
+     * @param {Array} members
+     * @param {Object} [options]
+     * @param {Number} [options.replicas] - virtual points per member
+     * @constructor
+     */
+    function HashRing(members, options) {
+        options = options || {};
+        this.replicas = options.replicas || 100;
+        assert.number(this.replicas, 'replicas');
+        this.setMembers(members || []);
+    }
+
+    /**
+     * Replace the ring membership.
+     *
+     * @param {Array} members
+     * @memberOf HashRing
+     */
+    HashRing.prototype.setMembers = function(members) {
+        assert.arrayOfString(members, 'members');
+        var self = this;
+        self.members = _.uniq(members).sort();
+        self.points = _.sortBy(_.flatten(_.map(self.members, function(member) {
+            return _.map(_.range(self.replicas), function(replica) {
+                return { hash: hash(member + ':' + replica), member: member };
+            });
+        })), 'hash');
+    };
+
+    /**
+     * @param {String} key
+     * @returns {String|undefined} the member that owns the key
+     * @memberOf HashRing
+     */
+    HashRing.prototype.owner = function(key) {
+        var points = this.points;
+        if (!points.length) {
+            return undefined;
+        }
+        var keyHash = hash(key);
+        // Binary search for the first point at or after the key, wrapping around
+        var low = 0;
+        var high = points.length;
+        while (low < high) {
+            var mid = Math.floor((low + high) / 2);
+            if (points[mid].hash < keyHash) {
+                low = mid + 1;
+            } else {
+                high = mid;
+            }
+        }
+        return points[low % points.length].member;
+    };
+
+    /**
+     * @param {Object} options
+     * @returns {Object} HashRing instance
+     * @memberOf HashRing
+     */
+    HashRing.create = function(members, options) {
+        return new HashRing(members, options);
+    };
+
+    return HashRing;
+}
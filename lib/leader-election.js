@@ -0,0 +1,154 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+
+module.exports = leaderElectionFactory;
+di.annotate(leaderElectionFactory, new di.Provide('TaskGraph.LeaderElection'));
+di.annotate(leaderElectionFactory,
+    new di.Inject(
+        'Logger',
+        'Assert',
+        'Promise'
+    )
+);
+
+function leaderElectionFactory(
+    Logger,
+    assert,
+    Promise
+) {
+    var logger = Logger.initialize(leaderElectionFactory);
+
+    /**
+     * Elects one leader among a set of candidates with a Consul lock: each
+     * candidate holds a session, and the one whose session acquires the key is
+     * the leader until its session is destroyed or stops being renewed.
+     *
+     * A candidate that can't reach Consul stops considering itself the leader,
+     * so that two candidates are never leader at the same time.
+     *
+     * @param {Object} consul - a promisified Consul client
+     * @param {Object} options
+     * @param {String} options.key - the Consul key to lock
+     * @param {String} options.candidateId
+     * @param {Number} [options.ttl] - session TTL in seconds, at least 10
+     * @constructor
+     */
+    function LeaderElection(consul, options) {
+        assert.object(consul, 'consul');
+        assert.object(options, 'options');
+        assert.string(options.key, 'key');
+        assert.string(options.candidateId, 'candidateId');
+        this.consul = consul;
+        this.key = options.key;
+        this.candidateId = options.candidateId;
+        this.ttl = Math.max(options.ttl || 15, 10);
+        this.session = null;
+        this.leader = false;
+    }
+
+    /**
+     * Renew this candidate's session, creating one if it has none, and try to
+     * acquire the lock with it. Errors are logged, and leadership given up.
+     *
+     * @returns {Promise} whether this candidate is the leader
+     * @memberOf LeaderElection
+     */
+    LeaderElection.prototype.refresh = function() {
+        var self = this;
+        return Promise.try(function() {
+            if (self.session) {
+                return self.consul.session.renew(self.session);
+            }
+            return Promise.resolve(self.consul.session.create({
+                name: self.key,
+                ttl: self.ttl + 's',
+                behavior: 'release'
+            }))
+            .spread(function(session) {
+                self.session = session.ID;
+            });
+        })
+        .then(function() {
+            return self.consul.kv.set({
+                key: self.key,
+                value: self.candidateId,
+                acquire: self.session
+            });
+        })
+        .spread(function(acquired) {
+            self.setLeader(acquired === true);
+        })
+        .catch(function(error) {
+            logger.warning('Error refreshing leader election', {
+                key: self.key,
+                candidateId: self.candidateId,
+                error: error
+            });
+            // The session may have been invalidated, so start a new one next time
+            self.session = null;
+            self.setLeader(false);
+        })
+        .then(function() {
+            return self.leader;
+        });
+    };
+
+    /**
+     * @param {Boolean} leader
+     * @memberOf LeaderElection
+     */
+    LeaderElection.prototype.setLeader = function(leader) {
+        if (leader !== this.leader) {
+            logger.info(leader ? 'Elected leader' : 'No longer leader', {
+                key: this.key,
+                candidateId: this.candidateId
+            });
+        }
+        this.leader = leader;
+    };
+
+    /**
+     * @returns {Boolean}
+     * @memberOf LeaderElection
+     */
+    LeaderElection.prototype.isLeader = function() {
+        return this.leader;
+    };
+
+    /**
+     * Give up leadership by destroying this candidate's session, which releases
+     * the lock for another candidate to acquire.
+     *
+     * @returns {Promise}
+     * @memberOf LeaderElection
+     */
+    LeaderElection.prototype.resign = function() {
+        var self = this;
+        var session = self.session;
+        self.session = null;
+        self.setLeader(false);
+        if (!session) {
+            return Promise.resolve();
+        }
+        return Promise.resolve(self.consul.session.destroy(session))
+        .catch(function(error) {
+            logger.warning('Error destroying leader election session', {
+                key: self.key,
+                candidateId: self.candidateId,
+                error: error
+            });
+        });
+    };
+
+    /**
+     * @memberOf LeaderElection
+     */
+    LeaderElection.create = function(consul, options) {
+        return new LeaderElection(consul, options);
+    };
+
+    return LeaderElection;
+}
@@ -9,31 +9,51 @@ di.annotate(leaseExpirationPollerFactory, new di.Provide('TaskGraph.LeaseExpirat
 di.annotate(leaseExpirationPollerFactory,
     new di.Inject(
         'TaskGraph.Store',
+        'TaskGraph.BulkStore',
         'Logger',
         'Assert',
         'Constants',
         'Rx',
-        '_'
+        '_',
+        'TaskGraph.Metrics'
     )
 );
 
 function leaseExpirationPollerFactory(
     store,
+    bulkStore,
     Logger,
     assert,
     Constants,
     Rx,
-    _
+    _,
+    metrics
 ) {
     var logger = Logger.initialize(leaseExpirationPollerFactory);
 
+    var storeDuration = metrics.histogram('taskgraph_store_call_duration_milliseconds',
+            'Latency of task graph store calls', ['method']);
+    var pollResultSize = metrics.histogram('taskgraph_poll_result_size',
+            'Number of documents returned by each poll of the store', ['poller'],
+            [0, 1, 5, 10, 25, 50, 100, 200, 500, 1000]);
+
     /**
      * The LeaseExpirationPoller polls the store for any active task documents
      * whose TaskRunnerLease heartbeat timer has expired, and resets them to
      * be scheduled again.
      *
+     * Every scheduler in a domain runs a poller, but only the leading scheduler
+     * sweeps: the first member of the ring when sharded, or the winner of a Consul
+     * election otherwise. Polls are jittered to keep pollers from sweeping in
+     * lockstep when there is no leader election to rely on.
+     *
      * @param {Object} scheduler - A TaskScheduler object
      * @param {Object} options
+     * @param {Number} [options.leaseAdjust] - how old a lease heartbeat can be before
+     * the lease is expired
+     * @param {Number} [options.pollInterval] - the longest time between polls
+     * @param {Number} [options.jitter] - the fraction of the poll interval that each poll
+     * may randomly come early by
      * @constructor
      */
     function LeaseExpirationPoller(scheduler, options) {
@@ -44,6 +64,8 @@ function leaseExpirationPollerFactory(
         this.running = false;
         this.leaseAdjust = options.leaseAdjust || Constants.Task.DefaultLeaseAdjust;
         this.pollInterval = options.pollInterval || this.leaseAdjust * 2;
+        this.jitter = _.has(options, 'jitter') ? options.jitter : 0.5;
+        this.scheduler = scheduler;
         this.schedulerId = scheduler.schedulerId;
         this.domain = scheduler.domain;
     }
@@ -57,14 +79,18 @@ function leaseExpirationPollerFactory(
         var self = this;
         assert.ok(self.running, 'lease expiration poller is running');
 
-        Rx.Observable.interval(self.pollInterval)
+        Rx.Observable.defer(function() {
+            return Rx.Observable.timer(self.getPollDelay());
+        })
+        .repeat()
         .takeWhile(self.isRunning.bind(self))
+        .filter(self.isLeader.bind(self))
         .flatMap(self.expireLeases.bind(self))
         .subscribe(
             function(expired) {
                 if (!_.isEmpty(expired)) {
                     logger.info('Found expired lease for TaskRunner', {
-                        objectId: expired._id.toString(),
+                        objectId: String(expired._id || expired.id),
                         expiredTaskRunnerId: expired.taskRunnerId,
                         schedulerId: self.schedulerId,
                         domain: self.domain
@@ -76,17 +102,45 @@ function leaseExpirationPollerFactory(
     };
 
     /**
-     * Query the store for expired leases, and set each ones TaskRunnerLease to null.
+     * @returns {Number} the time until the next poll, somewhere between
+     * (1 - jitter) * pollInterval and pollInterval
+     * @memberOf LeaseExpirationPoller
+     */
+    LeaseExpirationPoller.prototype.getPollDelay = function() {
+        return Math.round(this.pollInterval * (1 - Math.random() * this.jitter));
+    };
+
+    /**
+     * @returns {Boolean} whether this poller's scheduler is the one that should sweep
+     * the domain for expired leases
+     * @memberOf LeaseExpirationPoller
+     */
+    LeaseExpirationPoller.prototype.isLeader = function() {
+        return !_.isFunction(this.scheduler.isLeader) || this.scheduler.isLeader();
+    };
+
+    /**
+     * Set the TaskRunnerLease of every expired lease in the domain to null, in one
+     * bulk update.
      *
-     * @returns {Observable}
+     * @returns {Observable} the expired task documents
      * @memberOf LeaseExpirationPoller
      */
     LeaseExpirationPoller.prototype.expireLeases = function() {
+        var self = this;
         return Rx.Observable.just()
-        .flatMap(store.findExpiredLeases.bind(store, this.domain, this.leaseAdjust))
+        .flatMap(function() {
+            return storeDuration.time({ method: 'expireLeases' }, function() {
+                return bulkStore.expireLeases(self.domain, self.leaseAdjust);
+            });
+        })
+        .tap(function(docs) {
+            pollResultSize.observe(_.size(docs), { poller: 'expired_leases' });
+            if (!_.isEmpty(docs) && _.isFunction(self.scheduler.handleExpiredLeases)) {
+                self.scheduler.handleExpiredLeases(docs);
+            }
+        })
         .flatMap(function(docs) { return Rx.Observable.from(docs); })
-        .map(function(doc) { return doc.id; })
-        .flatMap(store.expireLease.bind(store))
         .catch(this.handleStreamError.bind(this, 'Error expiring task runner lease'));
     };
 
@@ -0,0 +1,188 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+/*
+ * A manifest compiled at build time (see scripts/build-manifest.js) holding the
+ * graph library and the paths of the service and view modules, so startup
+ * doesn't have to walk and require every file under lib/graphs.
+ *
+ * The manifest is stamped with the package version and a hash of the files it
+ * was compiled from, and is only used when both still match and NODE_ENV isn't
+ * 'development'. Otherwise the callers fall back to globbing the source tree.
+ * The size and modification time of each file are recorded too, and the files
+ * are only read and hashed when those no longer match, e.g. after a checkout.
+ */
+
+'use strict';
+
+var crypto = require('crypto');
+var fs = require('fs');
+var path = require('path');
+var _ = require('lodash');
+
+var ROOT = path.resolve(__dirname, '..');
+var MANIFEST_PATH = path.join(__dirname, 'manifest.json');
+
+// Which files under each directory make up each part of the library
+var SOURCES = {
+    graphs: { dir: 'lib/graphs', pattern: /-graph\.(js|json)$/ },
+    services: { dir: 'lib/services', pattern: /\.js$/ },
+    views: { dir: 'api/rest/view', pattern: /\.js$/ }
+};
+
+var cached;
+
+function packageVersion() {
+    return require('../package.json').version;
+}
+
+/**
+ * @param {String} dir - relative to the package root
+ * @param {RegExp} pattern
+ * @returns {Array} paths relative to the package root of the matching files
+ * under dir, in a stable order
+ */
+function walk(dir, pattern) {
+    return _.flatten(_.map(fs.readdirSync(path.join(ROOT, dir)).sort(), function(name) {
+        var relative = dir + '/' + name;
+        if (fs.statSync(path.join(ROOT, relative)).isDirectory()) {
+            return walk(relative, pattern);
+        }
+        return pattern.test(name) ? [relative] : [];
+    }));
+}
+
+/**
+ * @returns {String} a hash of the paths and contents of every file the manifest
+ * is compiled from
+ */
+function sourceHash() {
+    var hash = crypto.createHash('md5');
+    _.forEach(SOURCES, function(source) {
+        _.forEach(walk(source.dir, source.pattern), function(file) {
+            hash.update(file + '\n');
+            hash.update(fs.readFileSync(path.join(ROOT, file)));
+        });
+    });
+    return hash.digest('hex');
+}
+
+/**
+ * @returns {Object} the size and modification time of every file the manifest is
+ * compiled from, by path
+ */
+function sourceStats() {
+    var stats = {};
+    _.forEach(SOURCES, function(source) {
+        _.forEach(walk(source.dir, source.pattern), function(file) {
+            var stat = fs.statSync(path.join(ROOT, file));
+            stats[file] = { size: stat.size, mtime: stat.mtime.getTime() };
+        });
+    });
+    return stats;
+}
+
+/**
+ * Compile the manifest from the source tree.
+ *
+ * @returns {Object} the manifest
+ */
+function build() {
+    var graphs = _.map(walk(SOURCES.graphs.dir, SOURCES.graphs.pattern), function(file) {
+        var graph = require(path.join(ROOT, file));
+        // Anything JSON can't represent would be silently lost from the manifest
+        if (!_.isEqual(JSON.parse(JSON.stringify(graph)), graph)) {
+            throw new Error('Graph ' + file + ' cannot be serialized into the manifest');
+        }
+        return graph;
+    });
+
+    return {
+        version: packageVersion(),
+        sources: sourceHash(),
+        files: sourceStats(),
+        builtAt: new Date().toISOString(),
+        graphs: graphs,
+        modules: {
+            services: walk(SOURCES.services.dir, SOURCES.services.pattern),
+            views: walk(SOURCES.views.dir, SOURCES.views.pattern)
+        }
+    };
+}
+
+/**
+ * Compile the manifest and write it out.
+ *
+ * @param {String} [manifestPath]
+ * @returns {Object} the manifest
+ */
+function write(manifestPath) {
+    var manifest = build();
+    fs.writeFileSync(manifestPath || MANIFEST_PATH, JSON.stringify(manifest));
+    return manifest;
+}
+
+/**
+ * @param {String} [manifestPath]
+ * @returns {Object|null} the manifest, or null if there isn't a usable one
+ */
+function read(manifestPath) {
+    if (process.env.NODE_ENV === 'development') {
+        return null;
+    }
+    var manifest;
+    try {
+        manifest = JSON.parse(fs.readFileSync(manifestPath || MANIFEST_PATH, 'utf8'));
+    } catch (error) {
+        return null;
+    }
+    if (manifest.version !== packageVersion()) {
+        return null;
+    }
+    if (!_.isEqual(manifest.files, sourceStats()) && manifest.sources !== sourceHash()) {
+        return null;
+    }
+    return manifest;
+}
+
+/**
+ * @returns {Object|null} the manifest at the default path, read once per process
+ */
+function get() {
+    if (cached === undefined) {
+        cached = read();
+    }
+    return cached;
+}
+
+/**
+ * @param {Function} fallback - loads the graph library from the source tree
+ * @returns {Array} the graph definitions
+ */
+function graphLibrary(fallback) {
+    var manifest = get();
+    return manifest ? manifest.graphs : fallback();
+}
+
+/**
+ * @param {String} group - 'services' or 'views'
+ * @param {Function} fallback - requires the group's modules from the source tree
+ * @returns {Array} the group's modules
+ */
+function requireModules(group, fallback) {
+    var manifest = get();
+    if (!manifest) {
+        return fallback();
+    }
+    return _.map(manifest.modules[group], function(file) {
+        return require(path.join(ROOT, file));
+    });
+}
+
+module.exports = {
+    path: MANIFEST_PATH,
+    build: build,
+    write: write,
+    read: read,
+    graphLibrary: graphLibrary,
+    requireModules: requireModules
+};
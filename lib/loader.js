@@ -3,10 +3,15 @@
 'use strict';
 
 var di = require('di'),
+    crypto = require('crypto'),
     dihelper = require('on-core')(di).helper,
-    // Load all graphs within the on-taskgraph/lib/graphs directory (including nested directories)
-    // that match the naming convention '*-graph.js' or '*-graph.json'.
-    graphLibrary = dihelper.requireGlob(__dirname + '/graphs/**/*-graph.+(js|json)');
+    libraryManifest = require('./library-manifest.js'),
+    // Use the graph library compiled into the manifest at build time, or else load
+    // all graphs within the on-taskgraph/lib/graphs directory (including nested
+    // directories) that match the naming convention '*-graph.js' or '*-graph.json'.
+    graphLibrary = libraryManifest.graphLibrary(function() {
+        return dihelper.requireGlob(__dirname + '/graphs/**/*-graph.+(js|json)');
+    });
 
 module.exports = loaderFactory;
 di.annotate(loaderFactory, new di.Provide('TaskGraph.DataLoader'));
@@ -21,6 +26,27 @@ di.annotate(loaderFactory, new di.Inject(
 function loaderFactory(store, taskLibrary, Logger, assert, Promise, _) {
     var logger = Logger.initialize(loaderFactory);
 
+    // Fields the store adds to a definition, which aren't part of its content
+    var STORE_FIELDS = ['id', '_id', 'createdAt', 'updatedAt'];
+
+    /**
+     * Serialize a value to JSON with object keys in sorted order, so that equal
+     * definitions serialize the same whatever order their keys were stored in.
+     */
+    function canonicalJson(value) {
+        if (_.isArray(value)) {
+            return '[' + _.map(value, canonicalJson).join(',') + ']';
+        }
+        if (_.isPlainObject(value)) {
+            return '{' + _.keys(value).sort().filter(function(key) {
+                return value[key] !== undefined;
+            }).map(function(key) {
+                return JSON.stringify(key) + ':' + canonicalJson(value[key]);
+            }).join(',') + '}';
+        }
+        return JSON.stringify(value);
+    }
+
     /**
      * File loader class for loading graph definitions off disk, and persisting
      * both graph and task definitions into the store.
@@ -33,30 +59,85 @@ function loaderFactory(store, taskLibrary, Logger, assert, Promise, _) {
     }
 
     /**
-     * Persist task definitions into the store
+     * @param {Object} definition
+     * @returns {String} a hash of the definition's content
+     * @memberOf Loader
+     */
+    Loader.prototype.hashDefinition = function(definition) {
+        return crypto.createHash('md5')
+            .update(canonicalJson(_.omit(definition, STORE_FIELDS)))
+            .digest('hex');
+    };
+
+    /**
+     * @param {Array} definitions
+     * @returns {Object} content hashes keyed by injectableName
+     * @memberOf Loader
+     */
+    Loader.prototype.hashDefinitions = function(definitions) {
+        var self = this;
+        return _.transform(definitions, function(result, definition) {
+            result[definition.injectableName] = self.hashDefinition(definition);
+        }, {});
+    };
+
+    /**
+     * @param {Array} definitions
+     * @param {Object} [storedHashes] - content hashes of the definitions in the store
+     * @returns {Array} the definitions that are new or differ from the store
+     * @memberOf Loader
+     */
+    Loader.prototype.changedDefinitions = function(definitions, storedHashes) {
+        var self = this;
+        if (!storedHashes) {
+            return definitions;
+        }
+        return _.filter(definitions, function(definition) {
+            return storedHashes[definition.injectableName] !== self.hashDefinition(definition);
+        });
+    };
+
+    /**
+     * Persist task definitions into the store. If the content hashes of the
+     * stored definitions are given, only new or changed definitions are written.
      *
+     * @param {Array} definitions
+     * @param {Object} [storedHashes]
+     * @returns {Promise} the persisted definitions
      * @memberOf Loader
      */
-    Loader.prototype.persistTasks = function(definitions) {
-        return Promise.map(definitions, function(definition) {
+    Loader.prototype.persistTasks = function(definitions, storedHashes) {
+        _.forEach(definitions, function(definition) {
             assert.object(definition);
             assert.string(definition.injectableName);
-            return store.persistTaskDefinition(definition);
         });
+        return Promise.map(this.changedDefinitions(definitions, storedHashes),
+            function(definition) {
+                return store.persistTaskDefinition(definition);
+            }
+        );
     };
 
     /**
-     * Persist graph definitions into the store
+     * Persist graph definitions into the store. If the content hashes of the
+     * stored definitions are given, only new or changed definitions are written.
      *
+     * @param {Array} definitions
+     * @param {Object} [storedHashes]
+     * @returns {Promise} the persisted definitions
      * @memberOf Loader
      */
-    Loader.prototype.persistGraphs = function(definitions) {
-        return Promise.map(definitions, function(definition) {
+    Loader.prototype.persistGraphs = function(definitions, storedHashes) {
+        _.forEach(definitions, function(definition) {
             assert.object(definition);
             assert.string(definition.injectableName);
             assert.arrayOfObject(definition.tasks);
-            return store.persistGraphDefinition(definition);
         });
+        return Promise.map(this.changedDefinitions(definitions, storedHashes),
+            function(definition) {
+                return store.persistGraphDefinition(definition);
+            }
+        );
     };
 
     /**
@@ -102,44 +183,44 @@ function loaderFactory(store, taskLibrary, Logger, assert, Promise, _) {
      * that match the naming convention '*-graph.js' or '*-graph.json' and
      * persist those definitions into the store.
      *
+     * Only definitions whose content differs from the store are written, so a
+     * restart with an unchanged library makes no writes.
+     *
      * @memberOf Loader
      */
     Loader.prototype.load = function() {
         var self = this;
+        var taskResults;
+        var graphResults;
 
         return Promise.all([
             store.getTaskDefinitions(),
             store.getGraphDefinitions()
         ])
         .spread(function(taskCatalog, graphCatalog) {
-            var graphResults = self.mergeDefinitionArrays(self.graphLibrary, graphCatalog);
-            var taskResults = self.mergeDefinitionArrays(self.taskLibrary, taskCatalog);
+            graphResults = self.mergeDefinitionArrays(self.graphLibrary, graphCatalog);
+            taskResults = self.mergeDefinitionArrays(self.taskLibrary, taskCatalog);
             // Ignore persisting base tasks (task.implementsTask returns undefined in that case)
             taskResults = _.filter(taskResults, function(task) {
                 return task.implementsTask;
             });
 
             return [
-                self.persistTasks(taskResults),
-                self.persistGraphs(graphResults)
+                self.persistTasks(taskResults, self.hashDefinitions(taskCatalog)),
+                self.persistGraphs(graphResults, self.hashDefinitions(graphCatalog))
             ];
         })
-        .spread(function(taskResults, graphResults) {
-            logger.info("Loaded " + taskResults.length + " tasks from Task.taskLibrary dependency");
+        .spread(function(tasksWritten, graphsWritten) {
+            logger.info("Loaded " + taskResults.length + " tasks from Task.taskLibrary " +
+                "dependency, " + tasksWritten.length + " new or changed");
             logger.info("Loaded " + graphResults.length +
-                " graphs matching the pattern 'lib/graphs/**/*-graph.+(js|json)'");
-        })
-        .then(function() {
-            return [store.getTaskDefinitions(), store.getGraphDefinitions()];
-        })
-        .spread(function(taskCatalog, graphCatalog) {
+                " graphs matching the pattern 'lib/graphs/**/*-graph.+(js|json)', " +
+                graphsWritten.length + " new or changed");
+            // The merged definitions are what the store now holds, there's no
+            // need to read them back
             logger.info("Loaded task/graph definitions: ", {
-                tasks: _.map(taskCatalog, function(t) {
-                    return t.injectableName;
-                }),
-                graphs: _.map(graphCatalog, function(g) {
-                    return g.injectableName;
-                })
+                tasks: _.pluck(taskResults, 'injectableName'),
+                graphs: _.pluck(graphResults, 'injectableName')
             });
         });
     };
@@ -0,0 +1,259 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+
+module.exports = metricsFactory;
+di.annotate(metricsFactory, new di.Provide('TaskGraph.Metrics'));
+di.annotate(metricsFactory,
+    new di.Inject(
+        'Assert',
+        'Promise',
+        '_'
+    )
+);
+
+/**
+ * A small in-process metrics registry for the scheduler, runner and pollers,
+ * rendered in the Prometheus text exposition format.
+ *
+ * Metrics are registered by name, and registering the same name again returns
+ * the existing metric, so modules that record the same metric (e.g. store call
+ * timings) can each declare it. Values that are already tracked elsewhere (for
+ * example concurrency counters) are read at render time by collectors.
+ */
+function metricsFactory(
+    assert,
+    Promise,
+    _
+) {
+    var registry = {};
+    var collectors = [];
+
+    var exports = {
+        contentType: 'text/plain; version=0.0.4; charset=utf-8',
+        // Milliseconds
+        defaultBuckets: [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+    };
+
+    function elapsed(start) {
+        var diff = process.hrtime(start);
+        return diff[0] * 1e3 + diff[1] * 1e-6;
+    }
+
+    function escapeLabel(value) {
+        return String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"');
+    }
+
+    function formatLabels(labels) {
+        var pairs = _.map(labels, function(value, name) {
+            return name + '="' + escapeLabel(value) + '"';
+        });
+        return pairs.length ? '{' + pairs.join(',') + '}' : '';
+    }
+
+    function Metric(type, name, help, labelNames) {
+        this.type = type;
+        this.name = name;
+        this.help = help;
+        this.labelNames = labelNames || [];
+        this.values = {};
+    }
+
+    /**
+     * @param {Object} [labels]
+     * @returns {Object} the value entry for a label set, created on first use
+     */
+    Metric.prototype.entry = function(labels) {
+        labels = _.pick(labels || {}, this.labelNames);
+        var key = _.map(this.labelNames, function(name) { return labels[name]; }).join('\u0000');
+        if (!this.values[key]) {
+            this.values[key] = this.createEntry(labels);
+        }
+        return this.values[key];
+    };
+
+    Metric.prototype.createEntry = function(labels) {
+        return { labels: labels, value: 0 };
+    };
+
+    Metric.prototype.render = function() {
+        var self = this;
+        return _.map(self.values, function(entry) {
+            return self.name + formatLabels(entry.labels) + ' ' + entry.value;
+        });
+    };
+
+    /**
+     * @param {Number} [value=1]
+     * @param {Object} [labels]
+     */
+    Metric.prototype.inc = function(value, labels) {
+        this.entry(labels).value += _.isUndefined(value) ? 1 : value;
+    };
+
+    /**
+     * Set the value directly. For counters, only use this to export a total that
+     * is already counted elsewhere.
+     *
+     * @param {Number} value
+     * @param {Object} [labels]
+     */
+    Metric.prototype.set = function(value, labels) {
+        this.entry(labels).value = value;
+    };
+
+    function Histogram(name, help, labelNames, buckets) {
+        Metric.call(this, 'histogram', name, help, labelNames);
+        this.buckets = _.sortBy(buckets || exports.defaultBuckets);
+    }
+    Histogram.prototype = Object.create(Metric.prototype);
+    Histogram.prototype.constructor = Histogram;
+
+    Histogram.prototype.createEntry = function(labels) {
+        return {
+            labels: labels,
+            counts: _.map(this.buckets, function() { return 0; }),
+            sum: 0,
+            count: 0
+        };
+    };
+
+    /**
+     * @param {Number} value
+     * @param {Object} [labels]
+     */
+    Histogram.prototype.observe = function(value, labels) {
+        var entry = this.entry(labels);
+        _.forEach(this.buckets, function(bound, index) {
+            if (value <= bound) {
+                entry.counts[index] += 1;
+            }
+        });
+        entry.sum += value;
+        entry.count += 1;
+    };
+
+    /**
+     * @param {Object} [labels]
+     * @returns {Function} call to observe the time elapsed since startTimer, in milliseconds
+     */
+    Histogram.prototype.startTimer = function(labels) {
+        var self = this;
+        var start = process.hrtime();
+        return function() {
+            self.observe(elapsed(start), labels);
+        };
+    };
+
+    /**
+     * Time an asynchronous call.
+     *
+     * @param {Object} [labels]
+     * @param {Function} fn - function returning a promise or a value
+     * @returns {Promise} the result of fn
+     */
+    Histogram.prototype.time = function(labels, fn) {
+        var stop = this.startTimer(labels);
+        return Promise.try(fn).finally(stop);
+    };
+
+    Histogram.prototype.render = function() {
+        var self = this;
+        return _.flatten(_.map(self.values, function(entry) {
+            var lines = _.map(self.buckets, function(bound, index) {
+                return self.name + '_bucket' +
+                    formatLabels(_.assign({}, entry.labels, { le: bound })) +
+                    ' ' + entry.counts[index];
+            });
+            lines.push(self.name + '_bucket' +
+                formatLabels(_.assign({}, entry.labels, { le: '+Inf' })) + ' ' + entry.count);
+            lines.push(self.name + '_sum' + formatLabels(entry.labels) + ' ' + entry.sum);
+            lines.push(self.name + '_count' + formatLabels(entry.labels) + ' ' + entry.count);
+            return lines;
+        }));
+    };
+
+    function register(metric) {
+        var existing = registry[metric.name];
+        if (existing) {
+            assert.equal(existing.type, metric.type,
+                    'metric ' + metric.name + ' is already registered as a ' + existing.type);
+            return existing;
+        }
+        registry[metric.name] = metric;
+        return metric;
+    }
+
+    /**
+     * @param {String} name
+     * @param {String} help
+     * @param {Array} [labelNames]
+     * @returns {Object} counter
+     */
+    exports.counter = function(name, help, labelNames) {
+        return register(new Metric('counter', name, help, labelNames));
+    };
+
+    /**
+     * @param {String} name
+     * @param {String} help
+     * @param {Array} [labelNames]
+     * @returns {Object} gauge
+     */
+    exports.gauge = function(name, help, labelNames) {
+        return register(new Metric('gauge', name, help, labelNames));
+    };
+
+    /**
+     * @param {String} name
+     * @param {String} help
+     * @param {Array} [labelNames]
+     * @param {Array} [buckets] - upper bounds, defaults to defaultBuckets
+     * @returns {Object} histogram
+     */
+    exports.histogram = function(name, help, labelNames, buckets) {
+        return register(new Histogram(name, help, labelNames, buckets));
+    };
+
+    /**
+     * Register a function that updates metrics just before they are rendered.
+     *
+     * @param {Function} collector
+     * @returns {Function} call to unregister the collector
+     */
+    exports.collect = function(collector) {
+        assert.func(collector, 'collector');
+        collectors.push(collector);
+        return function() {
+            _.pull(collectors, collector);
+        };
+    };
+
+    /**
+     * @returns {String} all metrics in the Prometheus text format
+     */
+    exports.render = function() {
+        _.forEach(collectors, function(collector) {
+            collector();
+        });
+        return _(registry).sortBy('name').map(function(metric) {
+            return [
+                '# HELP ' + metric.name + ' ' + metric.help,
+                '# TYPE ' + metric.name + ' ' + metric.type
+            ].concat(metric.render());
+        }).flatten().value().join('\n') + '\n';
+    };
+
+    /**
+     * Clear all recorded values. Registered metrics and collectors are kept.
+     */
+    exports.reset = function() {
+        _.forEach(registry, function(metric) {
+            metric.values = {};
+        });
+    };
+
+    return exports;
+}
@@ -55,6 +55,8 @@ function rxMixins(
             if (this.concurrentCounter.count < this.concurrentCounter.max) {
                 this.concurrentCounter.count += 1;
                 this.handleSubscribe(innerSource);
+            } else if (typeof this.concurrentCounter.dropped === 'number') {
+                this.concurrentCounter.dropped += 1;
             }
         };
         MergeLossyObserver.prototype.onError = function (e) {
@@ -155,6 +157,9 @@ function rxMixins(
      * By using an object, the same concurrentCounter can be used across many
      * mergeLossy calls, allowing for flexible backpressure handling of any
      * arbitrary set of asynchronous calls.
+     *
+     * If the concurrentCounter has a numeric dropped property, it is incremented
+     * for every call that is dropped.
      */
     Rx.Observable.prototype.mergeLossy = function(concurrentCounter) {
         assert.object(concurrentCounter);
@@ -163,5 +168,204 @@ function rxMixins(
         return new MergeLossyObservable(this, concurrentCounter);
     };
 
+    var MergePriorityObserver = (function () {
+        function MergePriorityObserver(o, concurrentCounter, priority, onDropped, g) {
+            this.o = o;
+            this.g = g;
+            this.done = false;
+            this.active = 0;
+            this.pending = 0;
+            this.priority = priority;
+            this.onDropped = onDropped;
+            this.concurrentCounter = concurrentCounter;
+            this.isStopped = false;
+        }
+        MergePriorityObserver.prototype.handleSubscribe = function (xs) {
+            var sad = new Rx.SingleAssignmentDisposable();
+            this.g.add(sad);
+            this.active += 1;
+            this.concurrentCounter.count += 1;
+            Rx.helpers.isPromise(xs) && (xs = Rx.Observable.fromPromise(xs));
+            sad.setDisposable(xs.subscribe(new InnerObserver(this, sad)));
+        };
+        MergePriorityObserver.prototype.enqueue = function (xs) {
+            var queue = this.concurrentCounter.queue;
+            var priority = this.priority;
+            // Keep the queue sorted by priority, FIFO within the same priority
+            var index = queue.length;
+            while (index > 0 && queue[index - 1].priority > priority) {
+                index -= 1;
+            }
+            queue.splice(index, 0, { priority: priority, parent: this, source: xs });
+            this.pending += 1;
+            this.concurrentCounter.queued += 1;
+        };
+        MergePriorityObserver.prototype.onNext = function (innerSource) {
+            if (this.isStopped) { return; }
+            var counter = this.concurrentCounter;
+            if (counter.count < counter.max && counter.queue.length === 0) {
+                this.handleSubscribe(innerSource);
+            } else if (counter.queue.length < counter.maxQueueDepth) {
+                this.enqueue(innerSource);
+            } else {
+                counter.dropped += 1;
+                this.onDropped(innerSource);
+            }
+        };
+        MergePriorityObserver.prototype.onError = function (e) {
+            if (!this.isStopped) {
+                this.isStopped = true;
+                this.o.onError(e);
+            }
+        };
+        MergePriorityObserver.prototype.onCompleted = function () {
+            if (!this.isStopped) {
+                this.isStopped = true;
+                this.done = true;
+                this.checkCompleted();
+            }
+        };
+        MergePriorityObserver.prototype.checkCompleted = function () {
+            this.done && this.active === 0 && this.pending === 0 && this.o.onCompleted();
+        };
+        MergePriorityObserver.prototype.dispose = function() { this.isStopped = true; };
+
+        /*
+         * Start queued calls, highest priority first, until the counter is at
+         * max again. Queued calls belonging to a disposed or errored stream are
+         * discarded, and reported to its onDropped callback like dropped calls.
+         */
+        function drain(counter) {
+            while (counter.count < counter.max && counter.queue.length) {
+                var item = counter.queue.shift();
+                var parent = item.parent;
+                parent.pending -= 1;
+                if (parent.done || !parent.isStopped) {
+                    parent.handleSubscribe(item.source);
+                } else {
+                    parent.onDropped(item.source);
+                }
+            }
+        }
+
+        function InnerObserver(parent, sad) {
+            this.parent = parent;
+            this.sad = sad;
+            this.isStopped = false;
+        }
+        InnerObserver.prototype.onNext = function (x) {
+            if(!this.isStopped) { this.parent.o.onNext(x); }
+        };
+        InnerObserver.prototype.onError = function (e) {
+            if (!this.isStopped) {
+                this.isStopped = true;
+                this.parent.o.onError(e);
+            }
+        };
+        InnerObserver.prototype.onCompleted = function () {
+            if(!this.isStopped) {
+                this.isStopped = true;
+                var parent = this.parent;
+                parent.g.remove(this.sad);
+                parent.active -= 1;
+                parent.concurrentCounter.count -= 1;
+                drain(parent.concurrentCounter);
+                parent.checkCompleted();
+            }
+        };
+        InnerObserver.prototype.dispose = function() { this.isStopped = true; };
+
+        return MergePriorityObserver;
+    }());
+
+    function MergePriorityObservable(source, concurrentCounter, priority, onDropped) {
+        this.source = source;
+        this.concurrentCounter = concurrentCounter;
+        this.priority = priority;
+        this.onDropped = onDropped;
+        Rx.ObservableBase.call(this);
+    }
+    Rx.internals.inherits(MergePriorityObservable, Rx.ObservableBase);
+
+    MergePriorityObservable.prototype.subscribeCore = function(observer) {
+        var g = new Rx.CompositeDisposable();
+        g.add(this.source.subscribe(new MergePriorityObserver(
+                        observer, this.concurrentCounter, this.priority, this.onDropped, g)));
+        return g;
+    };
+
+    /**
+     * mergePriority() is an Rx.Observable prototype method with similar usage to
+     * mergeLossy(), except that calls over max are not dropped. Instead they
+     * are held in a bounded queue on the concurrentCounter and started, highest
+     * priority (lowest number) first, as soon as outstanding calls finish.
+     * Calls are only dropped if the queue is already maxQueueDepth items long.
+     *
+     * The concurrentCounter object looks like:
+     *
+     * var concurrentCounter = {
+     *     count: <N>,
+     *     max: <N>,
+     *     queue: [],
+     *     maxQueueDepth: <N>,
+     *     queued: <N>,   // total number of calls that had to wait in the queue
+     *     dropped: <N>   // total number of calls dropped because the queue was full
+     * }
+     *
+     * As with mergeLossy, the same concurrentCounter can be shared across many
+     * mergePriority calls. The queue is shared too, so when a slot frees up the
+     * stream with the highest priority is served first.
+     *
+     * A dropped call is never subscribed to, so anything it would have done on
+     * subscription or in a finally handler doesn't happen. Callers that need to
+     * undo work done before the call was merged can pass onDropped, which is
+     * called with every inner observable that is dropped, or discarded from the
+     * queue because the stream was disposed.
+     *
+     * @param {Object} concurrentCounter
+     * @param {Number} [priority=0]
+     * @param {Function} [onDropped]
+     */
+    Rx.Observable.prototype.mergePriority = function(concurrentCounter, priority, onDropped) {
+        assert.object(concurrentCounter);
+        assert.number(concurrentCounter.count);
+        assert.number(concurrentCounter.max);
+        assert.array(concurrentCounter.queue);
+        assert.number(concurrentCounter.maxQueueDepth);
+        assert.number(concurrentCounter.queued);
+        assert.number(concurrentCounter.dropped);
+        return new MergePriorityObservable(this, concurrentCounter, priority || 0,
+                onDropped || function() {});
+    };
+
+    /**
+     * adaptiveInterval() is an Rx.Observable static method with similar usage to interval(),
+     * except that the period is re-read from a shared pollState object before every tick.
+     * This lets the consumer of the stream back off or tighten the polling rate at runtime:
+     *
+     * var pollState = {
+     *     interval: <N>,  // period used for the next tick, in milliseconds
+     *     min: <N>,       // baseline period a fixed interval poller would use
+     *     wakeups: <N>,   // number of ticks emitted
+     *     saved: <N>      // number of baseline ticks that were skipped by backing off
+     * }
+     *
+     * Each emitted value is the running wakeups count.
+     */
+    Rx.Observable.adaptiveInterval = function(pollState) {
+        assert.object(pollState);
+        assert.number(pollState.interval);
+        assert.number(pollState.min);
+        return Rx.Observable.defer(function() {
+            var period = pollState.interval;
+            return Rx.Observable.timer(period).map(function() {
+                pollState.wakeups += 1;
+                pollState.saved += Math.max(Math.floor(period / pollState.min) - 1, 0);
+                return pollState.wakeups;
+            });
+        })
+        .repeat();
+    };
+
     return Rx;
 }
@@ -20,7 +20,11 @@ di.annotate(workflowApiServiceFactory,
         '_',
         'Services.Environment',
         'Services.Lookup',
-        'Services.GraphProgress'
+        'Services.GraphProgress',
+        'TaskGraph.GraphArchive',
+        'TaskGraph.GraphDefinitionCache',
+        'TaskGraph.BulkStore',
+        'TaskGraph.ActiveGraphIndex'
     )
 );
 
@@ -37,10 +41,66 @@ function workflowApiServiceFactory(
     _,
     env,
     lookupService,
-    graphProgressService
+    graphProgressService,
+    graphArchive,
+    graphDefinitionCache,
+    bulkStore,
+    activeGraphIndex
 ) {
     var logger = Logger.initialize(workflowApiServiceFactory);
 
+    function publishGraphStarted(graph) {
+        activeGraphIndex.invalidate(graph.node);
+        return eventsProtocol.publishGraphStarted(graph.instanceId, {
+            graphId: graph.instanceId,
+            graphName: graph.name,
+            status: graph._status
+        }, graph.node)
+        .catch(function(error) {
+            logger.error('Error publishing graph started event', {
+                graphId: graph.instanceId,
+                _status: graph._status,
+                error: error
+            });
+        })
+        .then(function() {
+            return graphProgressService.publishGraphStarted(graph, {swallowError: true});
+        });
+    }
+
+    /**
+     * Add a node's archived graphs that match a query to the graphs found for it
+     * in the store. Archived graphs can only be matched on plain values and lists
+     * of values, so a query using any other operator only returns graphs from
+     * the store.
+     *
+     * @param {String} nodeId
+     * @param {Object} query
+     * @param {Array} graphs - the graphs found in the store
+     * @returns {Promise} the graphs, followed by the matching archived graphs
+     */
+    function withArchivedGraphs(nodeId, query, graphs) {
+        var conditions = _.omit(query, 'node');
+        var matchable = _.every(conditions, function(value) {
+            return !_.isObject(value) || _.isArray(value);
+        });
+        if (!_.isString(nodeId) || !matchable || !_.isArray(graphs)) {
+            return Promise.resolve(graphs);
+        }
+        return graphArchive.findByNode(nodeId)
+        .then(function(archived) {
+            var found = _.indexBy(graphs, 'instanceId');
+            return graphs.concat(_.filter(archived, function(graph) {
+                return !_.has(found, graph.instanceId) &&
+                    _.every(conditions, function(value, key) {
+                        return _.isArray(value) ?
+                            _.contains(value, graph[key]) :
+                            graph[key] === value;
+                    });
+            }));
+        });
+    }
+
     function WorkflowApiService() {
     }
 
@@ -96,35 +156,224 @@ function workflowApiServiceFactory(
                         definition, configuration.options, context, configuration.domain, true);
             });
         })
-        .tap(function(graph) {
-            return eventsProtocol.publishGraphStarted(graph.instanceId, {
-                graphId: graph.instanceId,
-                graphName: graph.name,
-                status: graph._status
-            }, graph.node)
-            .catch(function(error) {
-                logger.error('Error publishing graph started event', {
-                    graphId: graph.instanceId,
-                    _status: graph._status,
-                    error: error
+        .tap(publishGraphStarted)
+        .then(function(graph) {
+            self.runTaskGraph(graph.instanceId, configuration.domain);
+            return graph;
+        });
+    };
+
+    /**
+     * Create and run a graph for each of a list of workflow configurations, as
+     * createAndRunGraph does for one. The nodes, their active graphs and the
+     * graph definitions are looked up together, and the graphs are persisted
+     * together. A configuration that fails doesn't stop the others, and only the
+     * first configuration for a node is run.
+     *
+     * @param {Array} configurations - objects with name, and optionally nodeId,
+     * options, context and domain
+     * @returns {Promise} a result for each configuration, in order, with its
+     * status code and either the graph as workflow or the error message
+     */
+    WorkflowApiService.prototype.createAndRunGraphs = function(configurations) {
+        var self = this;
+        var concurrency = bulkStore.concurrency;
+
+        if (!_.isArray(configurations)) {
+            return Promise.reject(new Errors.BadRequestError('Workflows must be an array'));
+        }
+
+        var items = _.map(configurations, function(configuration) {
+            return { configuration: configuration || {} };
+        });
+
+        function fail(item, error) {
+            item.error = item.error || error;
+        }
+
+        function pending() {
+            return _.reject(items, 'error');
+        }
+
+        _.forEach(items, function(item) {
+            var name = item.configuration.name;
+            if (!name || !_.isString(name)) {
+                fail(item, new Errors.BadRequestError('Graph name is missing or in wrong format'));
+            }
+        });
+
+        return Promise.try(function() {
+            var ids = _(pending()).map(function(item) {
+                return item.configuration.nodeId;
+            }).compact().uniq().value();
+            if (_.isEmpty(ids)) {
+                return;
+            }
+            return Promise.resolve(waterline.nodes.find({ id: ids }))
+            .then(function(nodes) {
+                var nodesById = _.indexBy(nodes, 'id');
+                var errors = {};
+                // Identifiers that aren't node ids, like MAC addresses, are
+                // looked up one at a time
+                return Promise.map(_.difference(ids, _.keys(nodesById)), function(id) {
+                    return waterline.nodes.needByIdentifier(id)
+                    .then(function(node) {
+                        nodesById[id] = node;
+                    })
+                    .catch(function(error) {
+                        errors[id] = error;
+                    });
+                }, { concurrency: concurrency })
+                .then(function() {
+                    _.forEach(pending(), function(item) {
+                        var id = item.configuration.nodeId;
+                        if (!id) {
+                            return;
+                        }
+                        if (nodesById[id]) {
+                            item.node = nodesById[id];
+                        } else {
+                            fail(item, errors[id] ||
+                                new Errors.NotFoundError('Node not found for ' + id));
+                        }
+                    });
                 });
             });
         })
-        .tap(function(graph) {
-            return graphProgressService.publishGraphStarted(graph, {swallowError: true});
+        .then(function() {
+            var nodeItems = _.filter(pending(), 'node');
+            if (_.isEmpty(nodeItems)) {
+                return;
+            }
+            return bulkStore.findActiveGraphsForTargets(_.uniq(_.map(nodeItems, function(item) {
+                return item.node.id;
+            })))
+            .then(function(activeGraphs) {
+                var busy = _.transform(activeGraphs, function(result, graph) {
+                    result[graph.node] = true;
+                }, {});
+                _.forEach(nodeItems, function(item) {
+                    if (busy[item.node.id]) {
+                        fail(item, new Error(
+                            "Unable to run multiple task graphs against a single target."));
+                    }
+                    busy[item.node.id] = true;
+                });
+            });
         })
-        .then(function(graph) {
-            self.runTaskGraph(graph.instanceId, configuration.domain);
-            return graph;
+        .then(function() {
+            var names = {};
+            var definitions = {};
+            return Promise.map(pending(), function(item) {
+                var name = item.configuration.name;
+                var sku = item.node && item.node.sku;
+                var key = sku ? sku + ':' + name : name;
+                if (!names[key]) {
+                    names[key] = sku ?
+                        Promise.resolve(env.get("config." + name, name,
+                            [sku, Constants.Scope.Global])) :
+                        Promise.resolve(name);
+                }
+                return names[key]
+                .then(function(graphName) {
+                    if (!definitions[graphName]) {
+                        definitions[graphName] = self.findGraphDefinitionByName(graphName);
+                    }
+                    return definitions[graphName];
+                })
+                .then(function(definition) {
+                    item.definition = definition;
+                })
+                .catch(function(error) {
+                    fail(item, error);
+                });
+            }, { concurrency: concurrency });
+        })
+        .then(function() {
+            return Promise.map(pending(), function(item) {
+                var configuration = item.configuration;
+                var context = configuration.context || {};
+                return Promise.try(function() {
+                    if (item.node) {
+                        context = _.defaults(context, { target: item.node.id });
+                        return lookupService.nodeIdToProxy(item.node.id)
+                        .catch(function(error) {
+                            logger.error('nodeIdToProxy Lookup', {error:error});
+                        });
+                    }
+                })
+                .then(function(proxy) {
+                    if (proxy) {
+                        context.proxy = proxy;
+                    }
+                    // Configurations for the same graph share the definition
+                    return self.createGraph(_.cloneDeep(item.definition),
+                        configuration.options, context, configuration.domain);
+                })
+                .then(function(graph) {
+                    graph._status = Constants.Task.States.Running;
+                    item.graph = graph;
+                })
+                .catch(function(error) {
+                    fail(item, error);
+                });
+            }, { concurrency: concurrency });
+        })
+        .then(function() {
+            var graphItems = pending();
+            if (_.isEmpty(graphItems)) {
+                return;
+            }
+            return bulkStore.persistGraphs(_.pluck(graphItems, 'graph'))
+            .then(function(results) {
+                _.forEach(graphItems, function(item, index) {
+                    if (results[index] instanceof Error) {
+                        fail(item, results[index]);
+                    } else {
+                        item.graph = results[index];
+                    }
+                });
+            });
+        })
+        .then(function() {
+            return Promise.map(pending(), function(item) {
+                return publishGraphStarted(item.graph)
+                .then(function() {
+                    self.runTaskGraph(item.graph.instanceId, item.configuration.domain);
+                });
+            }, { concurrency: concurrency });
+        })
+        .then(function() {
+            return _.map(items, function(item) {
+                if (item.error) {
+                    return {
+                        nodeId: item.configuration.nodeId,
+                        name: item.configuration.name,
+                        status: item.error.status || 500,
+                        error: item.error.message
+                    };
+                }
+                return {
+                    nodeId: item.configuration.nodeId,
+                    name: item.configuration.name,
+                    status: 201,
+                    workflow: item.graph
+                };
+            });
         });
     };
 
     WorkflowApiService.prototype.findGraphDefinitionByName = function(graphName) {
+        var cached = graphDefinitionCache.get(graphName);
+        if (cached) {
+            return Promise.resolve(cached);
+        }
         return taskGraphStore.getGraphDefinitions(graphName)
         .then(function(graph) {
             if (_.isEmpty(graph)) {
                 throw new Errors.NotFoundError('Graph definition not found for ' + graphName);
             } else {
+                graphDefinitionCache.set(graph[0]);
                 return graph[0];
             }
         });
@@ -212,6 +461,7 @@ function workflowApiServiceFactory(
             return taskGraphStore.persistGraphDefinition(definition);
         })
         .then(function(definition) {
+            graphDefinitionCache.invalidate(definition.injectableName);
             return definition.injectableName;
         })
         .catch(function(error) {
@@ -229,7 +479,11 @@ function workflowApiServiceFactory(
     };
 
     WorkflowApiService.prototype.defineTask = function(definition) {
-        return taskGraphStore.persistTaskDefinition(definition);
+        return taskGraphStore.persistTaskDefinition(definition)
+        .then(function(result) {
+            graphDefinitionCache.invalidateAll();
+            return result;
+        });
     };
 
     WorkflowApiService.prototype.getWorkflowsTasksByName = function(injectableName) {
@@ -246,6 +500,10 @@ function workflowApiServiceFactory(
                 }else{
                     return taskGraphStore.deleteTaskByName(injectableName);
                 }
+            })
+            .then(function(result) {
+                graphDefinitionCache.invalidateAll();
+                return result;
             });
     };
 
@@ -259,6 +517,10 @@ function workflowApiServiceFactory(
                 }else{
                     return taskGraphStore.persistTaskDefinition(definition);
                 }
+            })
+            .then(function(result) {
+                graphDefinitionCache.invalidateAll();
+                return result;
             });
     };
 
@@ -270,38 +532,81 @@ function workflowApiServiceFactory(
         return taskGraphStore.getTaskDefinitions(injectableName);
     };
 
+    /**
+     * Find a node's active graph through the ActiveGraphIndex, which drops a
+     * node's entry on the graph started and finished events for it.
+     *
+     * @param {String} target - the node id
+     * @returns {Promise} the active graph, or undefined if there isn't one
+     */
     WorkflowApiService.prototype.findActiveGraphForTarget = function(target) {
-        return waterline.graphobjects.findOne({
-            node: target,
-            _status: Constants.Task.ActiveStates
-        });
+        return activeGraphIndex.findActiveGraphForTarget(target);
     };
 
+    /**
+     * Get a node's graphs, including those moved to the archive.
+     *
+     * @param {String} id - the node id
+     * @param {Object} [query]
+     * @returns {Promise} the graphs
+     */
     WorkflowApiService.prototype.getWorkflowsByNodeId = function(id, query) {
         var nodeId = ({node: id});
         var mergedQuery = _.merge({}, nodeId, query);
-        return waterline.graphobjects.find(mergedQuery);
+        return Promise.resolve(waterline.graphobjects.find(mergedQuery))
+        .then(function(graphs) {
+            return withArchivedGraphs(id, mergedQuery, graphs);
+        });
     };
 
+    /**
+     * Get the graphs matching a query. Archived graphs are included when the
+     * query is for a single node and isn't paged, since pages are counted in
+     * the store alone.
+     *
+     * @param {Object} [query]
+     * @param {Object} [options] - skip and limit
+     * @returns {Promise} the graphs
+     */
     WorkflowApiService.prototype.getAllWorkflows = function(query, options) {
         options = options || {};
 
         return Promise.try(function() {
-            query = waterline.graphobjects.find(query);
+            var found = waterline.graphobjects.find(query);
 
-            if (options.skip) { query.skip(options.skip); }
-            if (options.limit) { query.limit(options.limit); }
+            if (options.skip) { found.skip(options.skip); }
+            if (options.limit) { found.limit(options.limit); }
 
-            return query;
+            return found;
+        })
+        .then(function(graphs) {
+            if (options.skip || options.limit) {
+                return graphs;
+            }
+            return withArchivedGraphs(_.get(query, 'node'), query, graphs);
         });
     };
 
     WorkflowApiService.prototype.getWorkflowByInstanceId = function(instanceId) {
-        return waterline.graphobjects.needOne({ instanceId: instanceId });
+        return waterline.graphobjects.needOne({ instanceId: instanceId })
+        .catch(Errors.NotFoundError, function(error) {
+            // Finished graphs may have been moved to the archive
+            return graphArchive.get(instanceId)
+            .then(function(graph) {
+                if (!graph) {
+                    throw error;
+                }
+                return graph;
+            });
+        });
     };
 
     WorkflowApiService.prototype.destroyGraphDefinition = function(injectableName) {
-        return taskGraphStore.destroyGraphDefinition(injectableName);
+        return taskGraphStore.destroyGraphDefinition(injectableName)
+        .then(function(result) {
+            graphDefinitionCache.invalidate(injectableName);
+            return result;
+        });
     };
 
     return new WorkflowApiService();
@@ -0,0 +1,1001 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+var di = require('di');
+
+module.exports = memoryStoreFactory;
+di.annotate(memoryStoreFactory, new di.Provide('TaskGraph.Stores.Memory'));
+di.annotate(memoryStoreFactory,
+    new di.Inject(
+        'Services.Configuration',
+        'Constants',
+        'Errors',
+        'Logger',
+        'Promise',
+        'uuid',
+        '_',
+        'fs'
+    )
+);
+
+/**
+ * Provides the memory store as TaskGraph.Store. Include this after the core
+ * injectables to replace the MongoDB backed store.
+ */
+module.exports.asTaskGraphStore = memoryTaskGraphStoreFactory;
+di.annotate(memoryTaskGraphStoreFactory, new di.Provide('TaskGraph.Store'));
+di.annotate(memoryTaskGraphStoreFactory, new di.Inject('TaskGraph.Stores.Memory'));
+function memoryTaskGraphStoreFactory(memoryStore) {
+    return memoryStore;
+}
+
+/**
+ * An embedded implementation of the TaskGraph.Store contract, for single node
+ * sites and for benchmarks that shouldn't depend on a database.
+ *
+ * All state is held in memory. Task documents are indexed by the queries the
+ * scheduler, runner and pollers make on every cycle (ready tasks, unevaluated
+ * tasks, completed tasks and leases per domain and runner), so none of them
+ * scan the whole task collection. The native bulk methods used by
+ * TaskGraph.BulkStore are implemented as well.
+ *
+ * With the memoryStore.journal configuration key set, every change is appended
+ * to that file as a JSON line and the file is replayed and compacted on startup.
+ * Lease heartbeats aren't journaled, so leases held before a restart are
+ * expired by the lease poller as usual.
+ */
+function memoryStoreFactory(
+    configuration,
+    Constants,
+    Errors,
+    Logger,
+    Promise,
+    uuid,
+    _,
+    fs
+) {
+    var logger = Logger.initialize(memoryStoreFactory);
+    var States = Constants.Task.States;
+
+    /**
+     * @param {Object} [options]
+     * @param {String} [options.journal] - path of the journal file
+     * @constructor
+     */
+    function MemoryStore(options) {
+        options = options || {};
+        // Keeps TaskGraph.BulkStore from querying MongoDB through waterline
+        this.backend = 'memory';
+        this.journalPath = options.journal || null;
+        this.pending = [];
+        this.flushing = null;
+        this.writing = null;
+        this.reset();
+    }
+
+    /**
+     * Drop everything held in memory. The journal is left as it is.
+     *
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.reset = function() {
+        this.graphs = {};
+        this.graphDefinitions = {};
+        this.taskDefinitions = {};
+        // Task documents by _id, and their indexes
+        this.tasks = {};
+        this.byTaskId = {};
+        this.byGraph = {};
+        this.byRunner = {};
+        this.ready = {};
+        this.unevaluated = {};
+        this.leased = {};
+        this.completed = {};
+    };
+
+    function addTo(index, key, id) {
+        index[key] = index[key] || {};
+        index[key][id] = true;
+    }
+
+    function removeFrom(index, key, id) {
+        if (index[key]) {
+            delete index[key][id];
+            if (_.isEmpty(index[key])) {
+                delete index[key];
+            }
+        }
+    }
+
+    function isFinished(state) {
+        return _.contains(Constants.Task.FinishedStates, state);
+    }
+
+    function isActive(graph) {
+        return !!graph && _.contains(Constants.Task.ActiveStates, graph._status);
+    }
+
+    /**
+     * A dependency is met when the task it waits on finished in one of the
+     * expected states, or in any finished state if it waits for 'finished'.
+     */
+    function dependencyMet(expected, state) {
+        var states = _.flatten([expected]);
+        return _.contains(states, state) ||
+            (_.contains(states, States.Finished) && isFinished(state));
+    }
+
+    function clone(doc) {
+        return doc ? _.cloneDeep(doc) : null;
+    }
+
+    function toDocument(object) {
+        return JSON.parse(JSON.stringify(object));
+    }
+
+    function matcher(conditions) {
+        if (_.isString(conditions)) {
+            return _.matches({ injectableName: conditions });
+        }
+        return _.matches(conditions || {});
+    }
+
+    /**
+     * @param {Object} doc - a task document
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.index = function(doc) {
+        this.byTaskId[doc.taskId] = doc._id;
+        addTo(this.byGraph, doc.graphId, doc._id);
+        if (doc.taskRunnerLease) {
+            addTo(this.byRunner, doc.taskRunnerLease, doc._id);
+            if (doc.reachable) {
+                addTo(this.leased, doc.domain, doc._id);
+            }
+        }
+        if (!doc.reachable) {
+            return;
+        }
+        if (doc.state === States.Pending) {
+            if (!doc.taskRunnerLease && _.isEmpty(doc.dependencies)) {
+                addTo(this.ready, doc.domain, doc._id);
+            }
+        } else if (isFinished(doc.state)) {
+            if (doc.evaluated) {
+                this.completed[doc._id] = true;
+            } else {
+                addTo(this.unevaluated, doc.domain, doc._id);
+            }
+        }
+    };
+
+    /**
+     * @param {Object} doc - a task document
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.unindex = function(doc) {
+        delete this.byTaskId[doc.taskId];
+        removeFrom(this.byGraph, doc.graphId, doc._id);
+        removeFrom(this.byRunner, doc.taskRunnerLease, doc._id);
+        removeFrom(this.leased, doc.domain, doc._id);
+        removeFrom(this.ready, doc.domain, doc._id);
+        removeFrom(this.unevaluated, doc.domain, doc._id);
+        delete this.completed[doc._id];
+    };
+
+    /**
+     * Apply a change to a task document, keeping the indexes up to date.
+     *
+     * @param {Object} doc
+     * @param {Object} changes
+     * @returns {Object} the document
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.updateTask = function(doc, changes) {
+        this.unindex(doc);
+        _.assign(doc, changes);
+        this.index(doc);
+        this.record('tasks', doc._id, doc);
+        return doc;
+    };
+
+    /**
+     * @param {Object} doc
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.removeTask = function(doc) {
+        this.unindex(doc);
+        delete this.tasks[doc._id];
+        this.record('tasks', doc._id, null);
+    };
+
+    /**
+     * @param {String} id - a task document _id or a taskId
+     * @returns {Object} the task document
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.findTask = function(id) {
+        return this.tasks[id] || this.tasks[this.byTaskId[id]];
+    };
+
+    /**
+     * @param {Object} data - object with graphId and taskId
+     * @returns {Object} the reachable task document
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.findReachableTask = function(data) {
+        var doc = this.tasks[this.byTaskId[data.taskId]];
+        if (doc && doc.reachable && (!data.graphId || doc.graphId === data.graphId)) {
+            return doc;
+        }
+    };
+
+    /**
+     * @param {Object} index - one of the task indexes
+     * @param {Number} [limit]
+     * @returns {Array} the indexed task documents
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.tasksIn = function(index, limit) {
+        var self = this;
+        var ids = _.keys(index);
+        if (limit) {
+            ids = ids.slice(0, limit);
+        }
+        return _.map(ids, function(id) {
+            return self.tasks[id];
+        });
+    };
+
+    /**
+     * @param {String} graphId
+     * @returns {Array} the graph's task documents
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.tasksInGraph = function(graphId) {
+        return this.tasksIn(this.byGraph[graphId]);
+    };
+
+    /**
+     * Queue a change to be appended to the journal.
+     *
+     * @param {String} collection
+     * @param {String} key
+     * @param {Object} value - the new document, or null if it was deleted
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.record = function(collection, key, value) {
+        if (this.journalPath) {
+            this.pending.push(JSON.stringify({ c: collection, k: key, v: value }) + '\n');
+        }
+    };
+
+    /**
+     * Append queued changes to the journal. Changes queued while a write is in
+     * progress go out together in the next write.
+     *
+     * @returns {Promise}
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.flush = function() {
+        var self = this;
+        if (!self.flushing) {
+            self.flushing = Promise.resolve(self.writing).catch(_.noop)
+            .then(function() {
+                var lines = self.pending;
+                self.pending = [];
+                self.flushing = null;
+                self.writing = _.isEmpty(lines) ? null :
+                    fs.appendFileAsync(self.journalPath, lines.join(''));
+                return self.writing;
+            });
+        }
+        return self.flushing;
+    };
+
+    /**
+     * Resolve with a result once the changes behind it are journaled.
+     *
+     * @param {*} result
+     * @returns {Promise}
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.commit = function(result) {
+        if (!this.journalPath || _.isEmpty(this.pending)) {
+            return Promise.resolve(result);
+        }
+        return this.flush().return(result);
+    };
+
+    /**
+     * Apply a journal entry.
+     *
+     * @param {String} collection
+     * @param {String} key
+     * @param {Object} value
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.apply = function(collection, key, value) {
+        if (collection !== 'tasks') {
+            if (value) {
+                this[collection][key] = value;
+            } else {
+                delete this[collection][key];
+            }
+            return;
+        }
+        if (this.tasks[key]) {
+            this.unindex(this.tasks[key]);
+            delete this.tasks[key];
+        }
+        if (value) {
+            if (value.taskRunnerHeartbeat) {
+                value.taskRunnerHeartbeat = new Date(value.taskRunnerHeartbeat);
+            }
+            this.tasks[key] = value;
+            this.index(value);
+        }
+    };
+
+    /**
+     * Rebuild the store from its journal, then rewrite the journal with only the
+     * current documents.
+     *
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.replay = function() {
+        var self = this;
+        var contents;
+        try {
+            contents = fs.readFileSync(self.journalPath, 'utf8');
+        } catch (error) {
+            if (error.code !== 'ENOENT') {
+                throw error;
+            }
+            return;
+        }
+        _.forEach(contents.split('\n'), function(line) {
+            if (!line) {
+                return;
+            }
+            var entry;
+            try {
+                entry = JSON.parse(line);
+            } catch (error) {
+                // A write cut short by a crash, everything before it is intact
+                logger.warning('Ignoring a truncated task graph store journal entry', {
+                    journal: self.journalPath
+                });
+                return;
+            }
+            self.apply(entry.c, entry.k, entry.v);
+        });
+
+        var snapshot = [];
+        _.forEach(['graphs', 'graphDefinitions', 'taskDefinitions', 'tasks'],
+            function(collection) {
+                _.forOwn(self[collection], function(value, key) {
+                    snapshot.push(JSON.stringify({ c: collection, k: key, v: value }) + '\n');
+                });
+            }
+        );
+        fs.writeFileSync(self.journalPath + '.tmp', snapshot.join(''));
+        fs.renameSync(self.journalPath + '.tmp', self.journalPath);
+        logger.info('Loaded task graph store journal', {
+            journal: self.journalPath,
+            graphs: _.size(self.graphs),
+            tasks: _.size(self.tasks)
+        });
+    };
+
+    /**
+     * Indexes are maintained on every write, there is nothing to create.
+     *
+     * @returns {Promise}
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.setIndexes = function() {
+        return Promise.resolve();
+    };
+
+    /**
+     * @param {Object} definition
+     * @returns {Promise} the definition
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.persistGraphDefinition = function(definition) {
+        var doc = toDocument(definition);
+        this.graphDefinitions[doc.injectableName] = doc;
+        this.record('graphDefinitions', doc.injectableName, doc);
+        return this.commit(clone(doc));
+    };
+
+    /**
+     * @param {Object} definition
+     * @returns {Promise} the definition
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.persistTaskDefinition = function(definition) {
+        var doc = toDocument(definition);
+        this.taskDefinitions[doc.injectableName] = doc;
+        this.record('taskDefinitions', doc.injectableName, doc);
+        return this.commit(clone(doc));
+    };
+
+    /**
+     * @param {String|Object} [conditions] - an injectableName or a query object
+     * @returns {Promise} matching graph definitions
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.getGraphDefinitions = function(conditions) {
+        return Promise.resolve(_.map(
+            _.filter(this.graphDefinitions, matcher(conditions)), clone));
+    };
+
+    /**
+     * @param {String|Object} [conditions] - an injectableName or a query object
+     * @returns {Promise} matching task definitions
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.getTaskDefinitions = function(conditions) {
+        return Promise.resolve(_.map(
+            _.filter(this.taskDefinitions, matcher(conditions)), clone));
+    };
+
+    /**
+     * @param {String} injectableName
+     * @returns {Promise} the task definition
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.getTaskDefinition = function(injectableName) {
+        var definition = this.taskDefinitions[injectableName];
+        if (!definition) {
+            return Promise.reject(new Errors.NotFoundError(
+                'Could not find task definition with injectableName ' + injectableName));
+        }
+        return Promise.resolve(clone(definition));
+    };
+
+    /**
+     * @param {String} injectableName
+     * @returns {Promise} the deleted definition
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.destroyGraphDefinition = function(injectableName) {
+        var definition = this.graphDefinitions[injectableName];
+        delete this.graphDefinitions[injectableName];
+        this.record('graphDefinitions', injectableName, null);
+        return this.commit(clone(definition));
+    };
+
+    /**
+     * @param {String} injectableName
+     * @returns {Promise} the deleted definition
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.deleteTaskByName = function(injectableName) {
+        var definition = this.taskDefinitions[injectableName];
+        delete this.taskDefinitions[injectableName];
+        this.record('taskDefinitions', injectableName, null);
+        return this.commit(clone(definition));
+    };
+
+    /**
+     * @param {Object} graph - a graph object
+     * @returns {Promise} the stored graph
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.persistGraphObject = function(graph) {
+        var doc = toDocument(graph);
+        var existing = this.graphs[doc.instanceId];
+        var now = new Date().toISOString();
+        doc._id = doc.id = existing ? existing._id : uuid.v4();
+        doc.createdAt = existing ? existing.createdAt : now;
+        doc.updatedAt = now;
+        this.graphs[doc.instanceId] = doc;
+        this.record('graphs', doc.instanceId, doc);
+        return this.commit(clone(doc));
+    };
+
+    /**
+     * @param {Object} taskDependencyItem - task dependency data from the graph
+     * @param {String} graphId
+     * @returns {Promise} the task document
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.persistTaskDependencies = function(taskDependencyItem, graphId) {
+        var id = uuid.v4();
+        var doc = _.assign(toDocument(taskDependencyItem), {
+            _id: id,
+            id: id,
+            graphId: graphId,
+            domain: taskDependencyItem.domain || Constants.Task.DefaultDomain,
+            dependencies: taskDependencyItem.dependencies || {},
+            state: States.Pending,
+            evaluated: false,
+            reachable: true,
+            taskRunnerLease: null,
+            taskRunnerHeartbeat: null
+        });
+        var existing = this.findTask(doc.taskId);
+        if (existing) {
+            this.removeTask(existing);
+        }
+        this.tasks[id] = doc;
+        this.index(doc);
+        this.record('tasks', id, doc);
+        return this.commit(clone(doc));
+    };
+
+    /**
+     * Persist a batch of newly created graphs along with their tasks. Every
+     * graph's tasks are created before anything is written, so either all of
+     * the graphs are stored or none.
+     *
+     * @param {Array} graphs - TaskGraph objects
+     * @returns {Promise} the graphs
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.persistGraphs = function(graphs) {
+        var self = this;
+        return Promise.try(function() {
+            return _.map(graphs, function(graph) {
+                return graph.createTaskDependencyItems();
+            });
+        })
+        .then(function(items) {
+            return Promise.all(_.flatten(_.map(graphs, function(graph, index) {
+                return [self.persistGraphObject(graph)].concat(
+                    _.map(items[index], function(item) {
+                        return self.persistTaskDependencies(item, graph.instanceId);
+                    })
+                );
+            })));
+        })
+        .return(graphs);
+    };
+
+    /**
+     * @param {String} graphId
+     * @returns {Promise} the graph if it is active, otherwise null
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.getActiveGraphById = function(graphId) {
+        if (_.isObject(graphId)) {
+            graphId = graphId.graphId;
+        }
+        var graph = this.graphs[graphId];
+        return Promise.resolve(isActive(graph) ? clone(graph) : null);
+    };
+
+    /**
+     * @param {String} target - a node id
+     * @returns {Promise} the active graph running against the node, or null
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.findActiveGraphForTarget = function(target) {
+        return Promise.resolve(clone(_.find(this.graphs, function(graph) {
+            return graph.node === target && isActive(graph);
+        })));
+    };
+
+    /**
+     * @returns {Promise} active service graphs
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.getServiceGraphs = function() {
+        return Promise.resolve(_.map(_.filter(this.graphs, function(graph) {
+            return graph.serviceGraph && isActive(graph);
+        }), clone));
+    };
+
+    /**
+     * Mark an active graph as done. Tasks of the graph that became unreachable
+     * will never run, so their documents are dropped.
+     *
+     * @param {String} state
+     * @param {Object} data - object with graphId
+     * @returns {Promise} the graph, or null if it was already done
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.setGraphDone = function(state, data) {
+        var self = this;
+        var graph = self.graphs[data.graphId];
+        if (!graph || graph._status !== States.Pending) {
+            return Promise.resolve(null);
+        }
+        graph._status = state;
+        graph.updatedAt = new Date().toISOString();
+        self.record('graphs', graph.instanceId, graph);
+        _.forEach(self.tasksInGraph(data.graphId), function(doc) {
+            if (!doc.reachable) {
+                self.removeTask(doc);
+            }
+        });
+        return self.commit(clone(graph));
+    };
+
+    /**
+     * @param {String} graphId
+     * @returns {Promise} an array with the deleted graph, if there was one
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.deleteGraph = function(graphId) {
+        var self = this;
+        var graph = self.graphs[graphId];
+        if (!graph) {
+            return Promise.resolve([]);
+        }
+        delete self.graphs[graphId];
+        self.record('graphs', graphId, null);
+        _.forEach(self.tasksInGraph(graphId), self.removeTask.bind(self));
+        return self.commit([graph]);
+    };
+
+    /**
+     * @param {Object} data - object with graphId and taskId
+     * @returns {Promise} object with the graphId, graph context and task
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.getTaskById = function(data) {
+        var graph = this.graphs[data.graphId];
+        if (!graph) {
+            return Promise.resolve(null);
+        }
+        return Promise.resolve({
+            graphId: graph.instanceId,
+            context: clone(graph.context),
+            task: clone(graph.tasks[data.taskId])
+        });
+    };
+
+    /**
+     * @param {Object} data - object with graphId, taskId, state, and optionally
+     * error and context
+     * @returns {Promise} the graph
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.setTaskStateInGraph = function(data) {
+        var graph = this.graphs[data.graphId];
+        if (!graph || !graph.tasks[data.taskId]) {
+            return Promise.resolve(null);
+        }
+        var task = graph.tasks[data.taskId];
+        task.state = data.state;
+        if (_.has(data, 'error')) {
+            task.error = toDocument({ error: data.error }).error;
+        }
+        if (_.has(data, 'context')) {
+            task.context = toDocument({ context: data.context }).context;
+        }
+        graph.updatedAt = new Date().toISOString();
+        this.record('graphs', graph.instanceId, graph);
+        return this.commit(clone(graph));
+    };
+
+    /**
+     * @param {Object} data - object with graphId, taskId and state
+     * @returns {Promise} the task document
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.setTaskState = function(data) {
+        var doc = this.findReachableTask(data);
+        if (!doc) {
+            return Promise.resolve(null);
+        }
+        return this.commit(clone(this.updateTask(doc, { state: data.state })));
+    };
+
+    /**
+     * @param {String} domain
+     * @param {String} [graphId] - only find ready tasks within this graph
+     * @returns {Promise} object with graphId and the ready task documents
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.findReadyTasks = function(domain, graphId) {
+        var ready = this.ready[domain] || {};
+        var tasks = graphId ?
+            _.filter(this.tasksInGraph(graphId), function(doc) {
+                return _.has(ready, doc._id);
+            }) :
+            this.tasksIn(ready);
+        return Promise.resolve({ graphId: graphId, tasks: _.map(tasks, clone) });
+    };
+
+    /**
+     * Remove a finished task from the dependencies of the tasks waiting on it, if
+     * it finished in a state they were waiting for.
+     *
+     * @param {Object} data - object with graphId, taskId and state
+     * @returns {Promise}
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.updateDependentTasks = function(data) {
+        var self = this;
+        _.forEach(self.tasksInGraph(data.graphId), function(doc) {
+            if (doc.reachable && _.has(doc.dependencies, data.taskId) &&
+                    dependencyMet(doc.dependencies[data.taskId], data.state)) {
+                self.updateTask(doc, {
+                    dependencies: _.omit(doc.dependencies, data.taskId)
+                });
+            }
+        });
+        return self.commit();
+    };
+
+    /**
+     * Mark tasks waiting on a finished task as unreachable, if it didn't finish
+     * in a state they were waiting for.
+     *
+     * @param {Object} data - object with graphId, taskId and state
+     * @returns {Promise}
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.updateUnreachableTasks = function(data) {
+        var self = this;
+        _.forEach(self.tasksInGraph(data.graphId), function(doc) {
+            if (doc.reachable && _.has(doc.dependencies, data.taskId) &&
+                    !dependencyMet(doc.dependencies[data.taskId], data.state)) {
+                self.updateTask(doc, { reachable: false });
+            }
+        });
+        return self.commit();
+    };
+
+    /**
+     * @param {Object} data - object with graphId and taskId
+     * @returns {Promise} the task document
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.markTaskEvaluated = function(data) {
+        var doc = this.findReachableTask(data);
+        if (!doc) {
+            return Promise.resolve(null);
+        }
+        return this.commit(clone(this.updateTask(doc, { evaluated: true })));
+    };
+
+    /**
+     * @param {String} domain
+     * @param {Number} [limit]
+     * @returns {Promise} finished task documents that haven't been evaluated
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.findUnevaluatedTasks = function(domain, limit) {
+        return Promise.resolve(_.map(this.tasksIn(this.unevaluated[domain], limit), clone));
+    };
+
+    /**
+     * @param {Number} [limit]
+     * @returns {Promise} finished and evaluated task documents
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.findCompletedTasks = function(limit) {
+        return Promise.resolve(_.map(this.tasksIn(this.completed, limit), clone));
+    };
+
+    /**
+     * @returns {Promise} the number of finished and evaluated task documents
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.countCompletedTasks = function() {
+        return Promise.resolve(_.size(this.completed));
+    };
+
+    /**
+     * @param {Array} objectIds - task document _ids
+     * @returns {Promise}
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.deleteTasks = function(objectIds) {
+        var self = this;
+        _.forEach(objectIds, function(id) {
+            var doc = self.tasks[String(id)];
+            if (doc) {
+                self.removeTask(doc);
+            }
+        });
+        return self.commit();
+    };
+
+    /**
+     * @param {Object} data - object with graphId
+     * @returns {Promise} data, with done set if no reachable task is pending
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.checkGraphSucceeded = function(data) {
+        data.done = !_.some(this.tasksInGraph(data.graphId), function(doc) {
+            return doc.reachable && doc.state === States.Pending;
+        });
+        return Promise.resolve(data);
+    };
+
+    /**
+     * @param {String} taskRunnerId
+     * @param {Object} data - object with graphId and taskId
+     * @returns {Promise} the task document, or null if it couldn't be checked out
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.checkoutTask = function(taskRunnerId, data) {
+        var doc = this.findReachableTask(data);
+        if (!doc || doc.taskRunnerLease || doc.state !== States.Pending) {
+            return Promise.resolve(null);
+        }
+        return this.commit(clone(this.updateTask(doc, {
+            taskRunnerLease: taskRunnerId,
+            taskRunnerHeartbeat: new Date()
+        })));
+    };
+
+    /**
+     * @param {String} taskRunnerId
+     * @returns {Promise} the task documents leased by the runner
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.getOwnTasks = function(taskRunnerId) {
+        return Promise.resolve(_.map(this.tasksIn(this.byRunner[taskRunnerId]), clone));
+    };
+
+    /**
+     * @param {String} taskRunnerId
+     * @returns {Promise} the number of leases renewed
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.heartbeatTasksForRunner = function(taskRunnerId) {
+        var now = new Date();
+        var docs = this.tasksIn(this.byRunner[taskRunnerId]);
+        _.forEach(docs, function(doc) {
+            doc.taskRunnerHeartbeat = now;
+        });
+        return Promise.resolve(docs.length);
+    };
+
+    /**
+     * @param {String} domain
+     * @param {Number} leaseAdjust
+     * @returns {Promise} task documents whose leases weren't renewed in time
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.findExpiredLeases = function(domain, leaseAdjust) {
+        var cutoff = Date.now() - leaseAdjust;
+        return Promise.resolve(_.map(_.filter(this.tasksIn(this.leased[domain]), function(doc) {
+            return doc.taskRunnerHeartbeat < cutoff;
+        }), clone));
+    };
+
+    /**
+     * @param {String} id - a task document _id or a taskId
+     * @returns {Promise} the task document
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.expireLease = function(id) {
+        var doc = this.findTask(String(id));
+        if (!doc) {
+            return Promise.resolve(null);
+        }
+        return this.commit(clone(this.updateTask(doc, {
+            taskRunnerLease: null,
+            taskRunnerHeartbeat: null
+        })));
+    };
+
+    /**
+     * @param {String} graphId
+     * @param {Array} tasks - task finished data
+     * @returns {Promise} the evaluated task documents
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.updateTaskDependencies = function(graphId, tasks) {
+        var self = this;
+        return Promise.map(tasks, function(task) {
+            return Promise.all([
+                self.setTaskStateInGraph(task),
+                self.updateDependentTasks(task),
+                self.updateUnreachableTasks(task)
+            ])
+            .then(function() {
+                return self.markTaskEvaluated(task);
+            });
+        });
+    };
+
+    /**
+     * @param {String} graphId
+     * @param {Array} tasks - task objects with taskId, graphId and the new state
+     * @returns {Promise} the tasks
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.failGraphTasks = function(graphId, tasks) {
+        var self = this;
+        return Promise.map(tasks, function(task) {
+            return Promise.all([
+                self.setTaskState(task),
+                self.markTaskEvaluated(task),
+                self.setTaskStateInGraph(task)
+            ])
+            .return(task);
+        });
+    };
+
+    /**
+     * @param {String} taskRunnerId
+     * @param {Array} tasks - objects with taskId and graphId
+     * @returns {Promise} the checked out task documents
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.checkoutTasks = function(taskRunnerId, tasks) {
+        var self = this;
+        return Promise.map(tasks, function(task) {
+            return self.checkoutTask(taskRunnerId, task);
+        })
+        .then(_.compact);
+    };
+
+    /**
+     * @param {Array} tasks - checked out task documents
+     * @returns {Promise} the task data in the same order as tasks
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.getTasksByIds = function(tasks) {
+        return Promise.map(tasks, this.getTaskById.bind(this));
+    };
+
+    /**
+     * @param {String} domain
+     * @param {Number} leaseAdjust
+     * @returns {Promise} the task documents whose leases were expired
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.expireLeases = function(domain, leaseAdjust) {
+        var self = this;
+        return self.findExpiredLeases(domain, leaseAdjust)
+        .tap(function(docs) {
+            return Promise.map(docs, function(doc) {
+                return self.expireLease(doc._id);
+            });
+        });
+    };
+
+    /**
+     * @param {String} taskRunnerId
+     * @param {Array} taskIds
+     * @returns {Promise}
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.releaseLeases = function(taskRunnerId, taskIds) {
+        var self = this;
+        _.forEach(taskIds, function(taskId) {
+            var doc = self.findTask(taskId);
+            if (doc && doc.taskRunnerLease === taskRunnerId) {
+                self.updateTask(doc, { taskRunnerLease: null, taskRunnerHeartbeat: null });
+            }
+        });
+        return self.commit();
+    };
+
+    /**
+     * @param {String} taskRunnerId
+     * @param {Array} taskIds - the tasks the runner thinks it owns
+     * @returns {Promise} object with lost and unowned taskIds
+     * @memberOf MemoryStore
+     */
+    MemoryStore.prototype.renewLeases = function(taskRunnerId, taskIds) {
+        var self = this;
+        return self.heartbeatTasksForRunner(taskRunnerId)
+        .then(function() {
+            var owned = _.pluck(self.tasksIn(self.byRunner[taskRunnerId]), 'taskId');
+            return {
+                lost: _.difference(owned, taskIds),
+                unowned: _.difference(taskIds, owned)
+            };
+        });
+    };
+
+    var store = new MemoryStore(configuration.get('memoryStore', {}));
+    if (store.journalPath) {
+        store.replay();
+    }
+    // Callers pass store methods around unbound, e.g. .flatMap(store.getActiveGraphById)
+    return _.bindAll(store);
+}
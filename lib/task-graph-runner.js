@@ -18,6 +18,8 @@ di.annotate(runnerFactory, new di.Inject(
         'TaskGraph.CompletedTaskPoller',
         'TaskGraph.ServiceGraph',
         'TaskGraph.Store',
+        'TaskGraph.GraphArchive',
+        'TaskGraph.ActiveGraphIndex',
         'Promise',
         'Profiles',
         'Templates',
@@ -35,6 +37,8 @@ function runnerFactory(
     CompletedTaskPoller,
     serviceGraph,
     store,
+    graphArchive,
+    activeGraphIndex,
     Promise,
     profiles,
     templates,
@@ -89,6 +93,8 @@ function runnerFactory(
                 startPromises.push(self.taskScheduler.start());
                 self.completedTaskPoller = CompletedTaskPoller.create(self.taskScheduler.domain);
                 startPromises.push(self.completedTaskPoller.start());
+                startPromises.push(graphArchive.start(self.taskScheduler));
+                startPromises.push(activeGraphIndex.start());
             }
             return startPromises;
         })
@@ -98,19 +104,27 @@ function runnerFactory(
     };
 
     /**
+     * @param {Object} [options] - passed on to TaskRunner.prototype.stop, e.g.
+     * { drain: true } to finish or hand off running tasks before stopping. The
+     * scheduler is only stopped once the runner is, so it can still evaluate the
+     * tasks that finish while the runner drains.
      * @memberOf Runner
      */
-    Runner.prototype.stop = function() {
+    Runner.prototype.stop = function(options) {
         var self = this;
 
         return Promise.resolve()
         .then(function() {
-            var stopPromises = [];
             if (self.taskRunner) {
-                stopPromises.push(self.taskRunner.stop());
+                return self.taskRunner.stop(options);
             }
+        })
+        .then(function() {
+            var stopPromises = [];
             if (self.taskScheduler) {
                 stopPromises.push(self.taskScheduler.stop());
+                stopPromises.push(graphArchive.stop());
+                stopPromises.push(activeGraphIndex.stop());
             }
             if (self.completedTaskPoller) {
                 stopPromises.push(self.completedTaskPoller.stop());
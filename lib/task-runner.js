@@ -17,7 +17,12 @@ di.annotate(taskRunnerFactory,
         'Rx',
         'Task.Task',
         'Task.Messenger',
-        'TaskGraph.Store'
+        'TaskGraph.BulkMessenger',
+        'Services.Configuration',
+        'TaskGraph.Store',
+        'TaskGraph.BulkStore',
+        'TaskGraph.Metrics',
+        'TaskGraph.EventRecord'
     )
 );
 
@@ -32,34 +37,86 @@ function taskRunnerFactory(
     Rx,
     Task,
     taskMessenger,
-    store
+    bulkMessenger,
+    configuration,
+    store,
+    bulkStore,
+    metrics,
+    eventRecord
 ) {
     var logger = Logger.initialize(taskRunnerFactory);
 
+    var storeDuration = metrics.histogram('taskgraph_store_call_duration_milliseconds',
+            'Latency of task graph store calls', ['method']);
+    var taskDuration = metrics.histogram('taskgraph_runner_task_duration_milliseconds',
+            'Time taken to run a task, from checkout until its state is persisted', ['state'],
+            [10, 100, 1000, 10000, 60000, 300000, 1800000, 7200000]);
+    var activeTaskCount = metrics.gauge('taskgraph_runner_active_tasks',
+            'Tasks currently running in this process');
+    var freeCapacity = metrics.gauge('taskgraph_runner_free_capacity',
+            'Tasks this process can still claim before reaching its concurrency limit');
+    var skippedTotal = metrics.counter('taskgraph_runner_skipped_tasks_total',
+            'Run task events left for other runners because this one was at capacity',
+            ['reason']);
+
     /**
      * The taskRunner runs tasks which are sent over AMQP by a scheduler; a runner
      * will only run tasks that share its domain
      *
      * @param {Object} options
      * @param {String} options.domain - The scheduling domain to accept tasks from
-     * @param {Object} options.heartbeatInterval - Rx.js observable interval to schedule heartbeats
+     * @param {Number} options.leaseAdjust - The lease length in ms, after which the lease
+     * poller considers a task abandoned if it hasn't been renewed
+     * @param {Number} options.heartbeatInterval - The interval in ms between lease renewals,
+     * defaults to a third of the lease length
      * @param {Number} options.lostBeatLimit - The number of heartbeats to allow
      * an inactive task before expiring its lease
+     * @param {Number} options.maxConcurrentTasks - The number of tasks this runner may
+     * have checked out at once, unlimited by default
+     * @param {Object} options.taskTypeLimits - Limits for individual task types, keyed by
+     * task injectableName or by the base task it implements
+     * @param {Number} options.checkoutBatchWindow - if set, collect run task events for
+     * this many ms and check them out together
+     * @param {Number} options.checkoutBatchSize - maximum run task events per checkout batch
+     * @param {Number} options.prefetchSize - number of run task events to hold on to while
+     * the runner is at capacity
+     * @param {Number} options.drainTimeout - how long in ms a draining stop waits for
+     * running tasks to finish before releasing their leases
      * @constructor
      */
     function TaskRunner(options) {
-        options = options || {};
+        options = _.defaults({}, options, configuration.get('taskRunner', {}));
         this.lostTasks = {};
         this.taskRunnerId = uuid.v4();
         this.completedTasks = [];
         this.runTaskStream = new Rx.Subject();
         this.cancelTaskStream = new Rx.Subject();
-        this.heartbeat = Rx.Observable.interval(options.heartbeatInterval || 1000);
+        this.leaseAdjust = options.leaseAdjust || Constants.Task.DefaultLeaseAdjust;
+        this.heartbeatInterval = options.heartbeatInterval ||
+            Math.max(Math.floor(this.leaseAdjust / 3), 1000);
+        this.heartbeat = Rx.Observable.interval(this.heartbeatInterval);
         this.subscriptions = [];
+        this.runTaskSubscription = null;
         this.running = false;
         this.activeTasks = {};
+        // Tasks this runner holds a lease on, from checkout until the task finishes
+        this.ownedTasks = {};
         this.lostBeatLimit = options.lostBeatLimit || 3;
+        this.maxConcurrentTasks = options.maxConcurrentTasks || Infinity;
+        this.taskTypeLimits = options.taskTypeLimits || {};
+        // Tasks claimed or being claimed, counted as a whole and per task type
+        this.claimedCount = 0;
+        this.claimedTypes = {};
+        this.checkoutBatchWindow = options.checkoutBatchWindow || 0;
+        this.checkoutBatchSize = options.checkoutBatchSize || 20;
+        this.prefetchSize = _.has(options, 'prefetchSize') ? options.prefetchSize : 10;
+        this.prefetchBuffer = [];
+        this.drainTimeout = options.drainTimeout || 30000;
+        this.draining = false;
+        // Tasks whose leases were released while they were still running
+        this.releasedTasks = {};
         this.domain = options.domain || Constants.Task.DefaultDomain;
+        this.stopCollectingMetrics = null;
     }
 
     /**
@@ -71,6 +128,16 @@ function taskRunnerFactory(
         return this.running;
     };
 
+    /**
+     * Returns true while leases need renewing, which is while the TaskRunner is
+     * running or draining
+     * @returns {Boolean}
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.isHeartbeating = function() {
+        return this.running || this.draining;
+    };
+
 
     /**
      * Initializes all permanent observable pipelines to handle
@@ -139,29 +206,287 @@ function taskRunnerFactory(
             );
     };
 
+    /**
+     * Subscribes to batched cancel task messages over AMQP and pushes a cancel
+     * event for each task into the cancelTaskStream
+     *
+     * @returns {Promise}
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.subscribeCancelTasks = function() {
+        var self = this;
+        return bulkMessenger.subscribeCancelTasks(function(data) {
+            _.forEach(data.taskIds, function(taskId) {
+                self.cancelTaskStream.onNext({ taskId: taskId });
+            });
+        });
+    };
+
     /**
      * Creates the Rx.Observable pipeline for running tasks:
      * Checks out a task, then gets the task defition, then instantiates and runs the task
      *
+     * With task type limits, the task definition is fetched first instead, and
+     * tasks whose type is at its limit are never checked out.
+     *
+     * If a checkout batch window is configured, run task events are collected for up
+     * to that long and checked out and fetched together in one store call each.
+     *
      * @param {Object} runTaskStream
      * @returns {Observable}
      * @memberOf TaskRunner
      */
     TaskRunner.prototype.createRunTaskSubscription = function(runTaskStream) {
         var self = this;
-        return runTaskStream
+        var batches = runTaskStream
             .takeWhile(self.isRunning.bind(self))
             .filter(function(taskData) {
-                return !_.has(self.activeTasks, taskData.taskId);
+                return !_.has(self.activeTasks, taskData.taskId) &&
+                    !_.has(self.ownedTasks, taskData.taskId);
+            })
+            .filter(function(taskData) {
+                if (self.hasCapacity()) {
+                    return true;
+                }
+                // Leave the task unclaimed, the scheduler republishes ready tasks
+                // that have no lease, so a less loaded runner can take it.
+                if (!self.prefetch(taskData)) {
+                    skippedTotal.inc(1, { reason: 'capacity' });
+                }
+                return false;
+            })
+            .tap(function() {
+                self.claimedCount += 1;
+            });
+
+        if (self.checkoutBatchWindow > 0) {
+            batches = batches
+                .bufferWithTimeOrCount(self.checkoutBatchWindow, self.checkoutBatchSize)
+                .filter(function(batch) { return !_.isEmpty(batch); });
+        } else {
+            batches = batches.map(function(taskData) { return [taskData]; });
+        }
+
+        return batches
+            .flatMap(function(batch) {
+                if (_.isEmpty(self.taskTypeLimits)) {
+                    return self.checkoutTasks(batch);
+                }
+                return self.checkoutTasksWithinTypeLimits(batch);
+            })
+            .flatMap(function(claim) {
+                return self.runTask(claim.data)
+                .finally(function() {
+                    self.releaseTaskTypes(claim.taskTypes);
+                    delete self.ownedTasks[claim.taskId];
+                    self.releaseClaims(1);
+                });
+            });
+    };
+
+    /**
+     * Checks out a batch of tasks and fetches their task data. Slots reserved for
+     * tasks which couldn't be checked out or fetched are released again.
+     *
+     * @param {Array} batch - run task events
+     * @returns {Observable} a { taskId, data } claim for each task that can be run
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.checkoutTasks = function(batch) {
+        var self = this;
+        var checkedOut = [];
+        var claimed = [];
+        return self.safeStream(function() {
+            return storeDuration.time({ method: 'checkoutTasks' }, function() {
+                return bulkStore.checkoutTasks(self.taskRunnerId, batch);
+            });
+        }, 'Error checking out task', batch)
+        .filter(function(tasks) { return !_.isEmpty(tasks); })
+        .tap(function(tasks) {
+            checkedOut = _.pluck(tasks, 'taskId');
+            _.forEach(checkedOut, function(taskId) {
+                self.ownedTasks[taskId] = true;
+            });
+        })
+        .flatMap(self.safeStream.bind(self, function(tasks) {
+            return storeDuration.time({ method: 'getTasksByIds' }, function() {
+                return bulkStore.getTasksByIds(tasks);
+            })
+            .then(function(results) {
+                return _.zip(checkedOut, results);
+            });
+        }, 'Error fetching task data'))
+        .flatMap(function(pairs) {
+            return Rx.Observable.from(pairs);
+        })
+        .filter(function(pair) { return !_.isEmpty(pair[1]); })
+        .map(function(pair) {
+            claimed.push(pair[0]);
+            return { taskId: pair[0], data: pair[1], taskTypes: [] };
+        })
+        .finally(function() {
+            // Tasks that were checked out but not fetched keep their lease until the
+            // heartbeat reports them as lost and expires it
+            _.forEach(_.difference(checkedOut, claimed), function(taskId) {
+                delete self.ownedTasks[taskId];
+            });
+            self.releaseClaims(batch.length - claimed.length);
+        });
+    };
+
+    /**
+     * Fetches the task data for a batch of tasks, counts each task against the
+     * limits for its types, and checks out only the tasks that fit. Tasks whose
+     * type is at its limit are left without a lease, so another runner can claim
+     * them when the scheduler republishes them.
+     *
+     * @param {Array} batch - run task events
+     * @returns {Observable} a { taskId, data, taskTypes } claim for each task that
+     * can be run
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.checkoutTasksWithinTypeLimits = function(batch) {
+        var self = this;
+        var candidates = [];
+        var claimed = [];
+        return self.safeStream(function() {
+            return storeDuration.time({ method: 'getTasksByIds' }, function() {
+                return bulkStore.getTasksByIds(batch);
+            });
+        }, 'Error fetching task data', batch)
+        .flatMap(function(results) {
+            candidates = _(batch)
+            .zip(results)
+            .filter(function(pair) { return !_.isEmpty(pair[1]); })
+            .map(function(pair) {
+                var taskTypes = self.claimTaskTypes(pair[1].task);
+                if (!taskTypes) {
+                    skippedTotal.inc(1, { reason: 'task_type' });
+                    return null;
+                }
+                return { taskId: pair[0].taskId, data: pair[1], taskTypes: taskTypes };
             })
-            .flatMap(self.safeStream.bind(
-                        self,
-                        store.checkoutTask.bind(store, self.taskRunnerId),
-                        'Error checking out task'))
-            .filter(function(data) { return !_.isEmpty(data);})
-            .flatMap(self.safeStream.bind(self, store.getTaskById, 'Error fetching task data'))
-            .filter(function(data) { return !_.isEmpty(data);})
-            .flatMap(self.runTask.bind(self));
+            .compact()
+            .value();
+            var toCheckout = _.filter(batch, function(taskData) {
+                return _.some(candidates, 'taskId', taskData.taskId);
+            });
+            if (_.isEmpty(toCheckout)) {
+                return Rx.Observable.empty();
+            }
+            return self.safeStream(function() {
+                return storeDuration.time({ method: 'checkoutTasks' }, function() {
+                    return bulkStore.checkoutTasks(self.taskRunnerId, toCheckout);
+                });
+            }, 'Error checking out task', toCheckout);
+        })
+        .flatMap(function(tasks) {
+            var checkedOut = _.pluck(tasks, 'taskId');
+            return Rx.Observable.from(_.filter(candidates, function(claim) {
+                return _.contains(checkedOut, claim.taskId);
+            }));
+        })
+        .tap(function(claim) {
+            self.ownedTasks[claim.taskId] = true;
+            claimed.push(claim);
+        })
+        .finally(function() {
+            _.forEach(_.difference(candidates, claimed), function(claim) {
+                self.releaseTaskTypes(claim.taskTypes);
+            });
+            self.releaseClaims(batch.length - claimed.length);
+        });
+    };
+
+    /**
+     * Buffers a run task event which arrived while the runner was at capacity, to
+     * be retried when a slot frees up
+     *
+     * @param {Object} taskData
+     * @returns {Boolean} whether the event was buffered
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.prefetch = function(taskData) {
+        if (_.some(this.prefetchBuffer, 'taskId', taskData.taskId)) {
+            return true;
+        }
+        if (this.prefetchBuffer.length >= this.prefetchSize) {
+            return false;
+        }
+        this.prefetchBuffer.push(taskData);
+        return true;
+    };
+
+    /**
+     * Gives back reserved slots, and replays buffered run task events into the
+     * runTaskStream while there is capacity for them
+     *
+     * @param {Number} count
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.releaseClaims = function(count) {
+        this.claimedCount -= count;
+        while (this.isRunning() && this.hasCapacity() && this.prefetchBuffer.length) {
+            this.runTaskStream.onNext(this.prefetchBuffer.shift());
+        }
+    };
+
+    /**
+     * @returns {Number} how many more tasks this runner can claim, may be Infinity
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.getFreeCapacity = function() {
+        return Math.max(this.maxConcurrentTasks - this.claimedCount, 0);
+    };
+
+    /**
+     * @returns {Boolean} whether the runner can claim another task
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.hasCapacity = function() {
+        return this.getFreeCapacity() > 0;
+    };
+
+    /**
+     * Count a task against the limits for its types, if none of them are full
+     *
+     * @param {Object} task - the task document from the graph
+     * @returns {Array|null} the types the task was counted under, or null if one
+     * of its types is at its limit
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.claimTaskTypes = function(task) {
+        var self = this;
+        var taskTypes = _.filter(_.uniq([
+            _.get(task, 'injectableName'),
+            _.get(task, 'implementsTask')
+        ]), function(taskType) {
+            return _.has(self.taskTypeLimits, taskType);
+        });
+        var full = _.some(taskTypes, function(taskType) {
+            return (self.claimedTypes[taskType] || 0) >= self.taskTypeLimits[taskType];
+        });
+        if (full) {
+            return null;
+        }
+        _.forEach(taskTypes, function(taskType) {
+            self.claimedTypes[taskType] = (self.claimedTypes[taskType] || 0) + 1;
+        });
+        return taskTypes;
+    };
+
+    /**
+     * @param {Array} taskTypes - types returned by claimTaskTypes
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.releaseTaskTypes = function(taskTypes) {
+        var self = this;
+        _.forEach(taskTypes, function(taskType) {
+            self.claimedTypes[taskType] -= 1;
+            if (self.claimedTypes[taskType] <= 0) {
+                delete self.claimedTypes[taskType];
+            }
+        });
     };
 
     /**
@@ -173,8 +498,9 @@ function taskRunnerFactory(
      */
     TaskRunner.prototype.createCancelTaskSubscription = function(cancelTaskStream) {
         var self = this;
+        // Tasks being drained can still be cancelled
         return cancelTaskStream
-            .takeWhile(self.isRunning.bind(self))
+            .takeWhile(self.isHeartbeating.bind(self))
             .flatMap(self.cancelTask.bind(self));
     };
 
@@ -203,7 +529,9 @@ function taskRunnerFactory(
     };
 
     /**
-     * Creates the heartbeat pipeline from the given observable
+     * Creates the heartbeat pipeline from the given observable. Each beat renews
+     * the leases on all of the runner's tasks in one store call, which only
+     * reports back tasks whose ownership differs from the local ownership map.
      *
      * @param {Object} heartInterval
      * @returns {Observable}
@@ -212,16 +540,15 @@ function taskRunnerFactory(
     TaskRunner.prototype.createHeartbeatSubscription = function(heartInterval) {
         var self = this;
         return  heartInterval
-                .takeWhile(self.isRunning.bind(self))
-                .flatMap(store.heartbeatTasksForRunner.bind(store, self.taskRunnerId))
-                .flatMap( function(taskCount) {
-                    if(taskCount < Object.keys(self.activeTasks).length){
-                        return self.handleUnownedTasks();
-                    } else if (taskCount > Object.keys(self.activeTasks).length) {
-                        return self.handleLostTasks();
-                    }
-                    return Rx.Observable.just(null);
+                .takeWhile(self.isHeartbeating.bind(self))
+                .flatMap(self.renewLeases.bind(self))
+                .flatMap(function(changes) {
+                    return Rx.Observable.forkJoin([
+                        self.handleUnownedTasks(changes.unowned),
+                        self.handleLostTasks(changes.lost)
+                    ]);
                 })
+                .map(function() { return null; })
                 .catch(function(error) {
                     logger.error('Failed to update heartbeat, stopping task runner and tasks', {
                         taskRunnerId: self.taskRunnerId,
@@ -233,53 +560,59 @@ function taskRunnerFactory(
     };
 
     /**
-     * Records the number of times specific tasks have been heartbeated while not active
-     * expires the leases on tasks which exceed the limit for heartbeats without being
-     * added to active tasks
+     * Renews the leases on every task this runner owns or is running
      *
+     * @returns {Promise} { lost: [taskId], unowned: [taskId] }
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.renewLeases = function() {
+        var self = this;
+        var taskIds = _.union(_.keys(self.ownedTasks), _.keys(self.activeTasks));
+        return storeDuration.time({ method: 'renewLeases' }, function() {
+            return bulkStore.renewLeases(self.taskRunnerId, taskIds);
+        });
+    };
+
+    /**
+     * Records the number of times specific tasks have been heartbeated while not owned
+     * locally, and expires the leases on tasks which exceed the limit
+     *
+     * @param {Array} lostTaskIds - tasks leased to this runner that it isn't running
      * @returns {Observable}
      * @memberOf TaskRunner
      */
-    TaskRunner.prototype.handleLostTasks = function() {
+    TaskRunner.prototype.handleLostTasks = function(lostTaskIds) {
         var self = this;
-        return Rx.Observable.fromPromise(store.getOwnTasks(self.taskRunnerId))
-            .flatMap(function(ownTasks) {
-                _.difference(_.pluck(ownTasks, 'taskId'), _.keys(self.activeTasks))
-                    .forEach(function(taskId){
-                        if(!self.lostTasks[taskId]) {
-                            self.lostTasks[taskId] = 0;
-                        }
-                            self.lostTasks[taskId] += 1;
-                        if(self.lostTasks[taskId] >= self.lostBeatLimit) {
-                            store.expireLease(taskId);
-                            delete self.lostTasks[taskId];
-                        }
-                    });
-                return Rx.Observable.just(null);
-            });
+        // Forget tasks which are no longer lost, so the counts don't accumulate
+        self.lostTasks = _.pick(self.lostTasks, lostTaskIds);
+        _.forEach(lostTaskIds, function(taskId) {
+            self.lostTasks[taskId] = (self.lostTasks[taskId] || 0) + 1;
+            if(self.lostTasks[taskId] >= self.lostBeatLimit) {
+                store.expireLease(taskId);
+                delete self.lostTasks[taskId];
+            }
+        });
+        return Rx.Observable.just(null);
     };
 
     /**
-     * Stops any tasks which are in activeTasks but are not being heartbeated
+     * Stops any tasks which this runner is running but no longer holds the lease on
      *
+     * @param {Array} unownedTaskIds
      * @returns {Observable}
      * @memberOf TaskRunner
      */
-    TaskRunner.prototype.handleUnownedTasks = function() {
+    TaskRunner.prototype.handleUnownedTasks = function(unownedTaskIds) {
         var self = this;
-        return Rx.Observable.fromPromise(store.getOwnTasks(self.taskRunnerId))
-            .flatMap(function(ownTasks) {
-                _.difference(Object.keys(self.activeTasks),
-                        _.pluck(ownTasks, 'taskId'))
-                .forEach(function(taskId) {
-                        logger.info('stopping unowned task ', {data: taskId});
-                        if(self.activeTasks[taskId]) {
-                            self.activeTasks[taskId].stop();
-                        }
-                            delete self.activeTasks[taskId];
-                });
-                return Rx.Observable.just(null);
-            });
+        _.forEach(unownedTaskIds, function(taskId) {
+            logger.info('stopping unowned task ', {data: taskId});
+            if(self.activeTasks[taskId]) {
+                self.activeTasks[taskId].stop();
+            }
+            delete self.activeTasks[taskId];
+            delete self.ownedTasks[taskId];
+        });
+        return Rx.Observable.just(null);
     };
 
     /**
@@ -330,6 +663,7 @@ function taskRunnerFactory(
      */
     TaskRunner.prototype.runTask = function(data) {
         var self = this;
+        var startTime = process.hrtime();
         return Rx.Observable.just(data)
             .flatMap(function(_data) {
                 return Task.create(
@@ -339,10 +673,13 @@ function taskRunnerFactory(
                 );
             })
             .tap(function(task) {
-                //The reason to cloneDeep the task is that the method tap in Rxjs is not waited
-                //to finish, and the data flowing into tap is modified by later stream operation.
-                var taskCopy = _.cloneDeep(task);
-                return graphProgressService.publishTaskStarted(taskCopy, {swallowError: true});
+                // The publish is not waited on, and the task keeps changing while it runs,
+                // so publish a frozen snapshot. Only the top level fields and the context,
+                // which the task writes to, are copied.
+                return graphProgressService.publishTaskStarted(
+                    eventRecord.snapshot(task, ['context']),
+                    {swallowError: true}
+                );
             })
             .tap(function(task) {
                 self.activeTasks[task.instanceId] = task;
@@ -356,19 +693,35 @@ function taskRunnerFactory(
                 return task.run();
             })
             .takeWhile(function(task) { return !_.isEmpty(task);})
+            .filter(function(task) {
+                // Another runner may already have checked out a task whose lease was
+                // released, so its state is no longer ours to record
+                if (_.has(self.releasedTasks, task.instanceId)) {
+                    delete self.releasedTasks[task.instanceId];
+                    delete self.activeTasks[task.instanceId];
+                    return false;
+                }
+                return true;
+            })
             .flatMap(function(task) {
                 return Rx.Observable.forkJoin([
                     Rx.Observable.just(task),
-                    store.setTaskState({
-                        taskId: task.instanceId,
-                        graphId: task.context.graphId,
-                        state: task.state,
-                        error: task.error,
-                        context: task.context
+                    storeDuration.time({ method: 'setTaskState' }, function() {
+                        return store.setTaskState({
+                            taskId: task.instanceId,
+                            graphId: task.context.graphId,
+                            state: task.state,
+                            error: task.error,
+                            context: task.context
+                        });
                     })
                 ]);
             })
             .map(_.first)
+            .tap(function(task) {
+                var diff = process.hrtime(startTime);
+                taskDuration.observe(diff[0] * 1e3 + diff[1] * 1e-6, { state: task.state });
+            })
             .tap(function(task) {
                 delete self.activeTasks[task.instanceId];
             })
@@ -383,16 +736,116 @@ function taskRunnerFactory(
     };
 
     /**
-     * Stops the TaskRunner and disposes resources as necessary
+     * Stops the TaskRunner and disposes resources as necessary.
      *
+     * A draining stop takes no new tasks, but keeps renewing leases while the
+     * running tasks finish. Once they have, or the timeout has passed, any tasks
+     * still running are stopped and their leases released, so other runners can
+     * pick them up without waiting for the leases to expire. Cancel messages are
+     * still handled until then.
+     *
+     * @param {Object} [options]
+     * @param {Boolean} [options.drain] - drain running tasks before stopping
+     * @param {Number} [options.timeout] - overrides the runner's drainTimeout
      * @returns {Promise}
      * @memberOf TaskRunner
      */
-    TaskRunner.prototype.stop = function() {
+    TaskRunner.prototype.stop = function(options) {
         var self = this;
+        options = options || {};
         self.running = false;
-        return Promise.map(this.subscriptions, function() {
-            return self.subscriptions.pop().dispose();
+        self.draining = !!options.drain;
+        self.prefetchBuffer = [];
+        if (self.stopCollectingMetrics) {
+            self.stopCollectingMetrics();
+            self.stopCollectingMetrics = null;
+        }
+        var runTaskSubscription = self.runTaskSubscription;
+        var subscriptions = _.without(self.subscriptions, runTaskSubscription);
+        self.runTaskSubscription = null;
+        self.subscriptions = [];
+        return Promise.resolve(runTaskSubscription && runTaskSubscription.dispose())
+        .then(function() {
+            if (options.drain) {
+                return self.drain(options.timeout || self.drainTimeout);
+            }
+        })
+        .finally(function() {
+            self.draining = false;
+            return Promise.map(subscriptions, function(subscription) {
+                return subscription.dispose();
+            });
+        });
+    };
+
+    /**
+     * Wait up to timeout ms for the tasks this runner owns to finish, then release
+     * the leases on any that haven't.
+     *
+     * @param {Number} timeout
+     * @returns {Promise}
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.drain = function(timeout) {
+        var self = this;
+        var deadline = Date.now() + timeout;
+
+        logger.info('Draining task runner', {
+            taskRunnerId: self.taskRunnerId,
+            taskIds: _.keys(self.ownedTasks),
+            timeout: timeout
+        });
+
+        function waitForTasks() {
+            var remaining = deadline - Date.now();
+            if (_.isEmpty(self.ownedTasks) || remaining <= 0) {
+                return Promise.resolve();
+            }
+            return Promise.delay(Math.min(remaining, 100)).then(waitForTasks);
+        }
+
+        return waitForTasks()
+        .then(function() {
+            return self.releaseLeases();
+        });
+    };
+
+    /**
+     * Stop every task this runner still owns and release their leases.
+     *
+     * @returns {Promise}
+     * @memberOf TaskRunner
+     */
+    TaskRunner.prototype.releaseLeases = function() {
+        var self = this;
+        var taskIds = _.union(_.keys(self.ownedTasks), _.keys(self.activeTasks));
+        if (_.isEmpty(taskIds)) {
+            return Promise.resolve();
+        }
+        return Promise.map(taskIds, function(taskId) {
+            var task = self.activeTasks[taskId];
+            self.releasedTasks[taskId] = true;
+            if (task) {
+                return Promise.try(task.stop.bind(task))
+                .catch(function(error) {
+                    logger.warning('Error stopping task before releasing its lease', {
+                        taskRunnerId: self.taskRunnerId,
+                        taskId: taskId,
+                        error: error
+                    });
+                });
+            }
+        })
+        .then(function() {
+            return storeDuration.time({ method: 'releaseLeases' }, function() {
+                return bulkStore.releaseLeases(self.taskRunnerId, taskIds);
+            });
+        })
+        .then(function() {
+            logger.info('Released task leases', {
+                taskRunnerId: self.taskRunnerId,
+                taskIds: taskIds
+            });
         });
     };
 
@@ -408,11 +861,23 @@ function taskRunnerFactory(
         .then(function() {
             self.running = true;
             self.initializePipeline();
-            return [self.subscribeCancelTask(), self.subscribeRunTask()];
+            self.stopCollectingMetrics = metrics.collect(function() {
+                activeTaskCount.set(_.size(self.activeTasks));
+                if (_.isFinite(self.maxConcurrentTasks)) {
+                    freeCapacity.set(self.getFreeCapacity());
+                }
+            });
+            return [
+                self.subscribeCancelTask(),
+                self.subscribeRunTask(),
+                self.subscribeCancelTasks()
+            ];
         })
-        .spread(function(cancelSubscription, runTaskSubscription) {
+        .spread(function(cancelSubscription, runTaskSubscription, cancelTasksSubscription) {
+            self.runTaskSubscription = runTaskSubscription;
             self.subscriptions.push(cancelSubscription);
             self.subscriptions.push(runTaskSubscription);
+            self.subscriptions.push(cancelTasksSubscription);
             logger.info('Task runner started', {
                 TaskRunnerId: self.taskRunnerId,
                 domain: self.domain
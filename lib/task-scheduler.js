@@ -10,7 +10,14 @@ di.annotate(taskSchedulerFactory,
     new di.Inject(
         'Protocol.Events',
         'TaskGraph.Store',
+        'TaskGraph.BulkStore',
         'TaskGraph.LeaseExpirationPoller',
+        'TaskGraph.GraphStateCache',
+        'TaskGraph.ActiveGraphIndex',
+        'TaskGraph.HashRing',
+        'TaskGraph.LeaderElection',
+        'TaskGraph.Metrics',
+        'TaskGraph.EventRecord',
         'Constants',
         'Logger',
         'Promise',
@@ -19,6 +26,7 @@ di.annotate(taskSchedulerFactory,
         '_',
         'Rx.Mixins',
         'Task.Messenger',
+        'TaskGraph.BulkMessenger',
         'Services.Configuration',
         'TaskGraph.TaskScheduler.Server',
         'consul',
@@ -29,7 +37,14 @@ di.annotate(taskSchedulerFactory,
 function taskSchedulerFactory(
     eventsProtocol,
     store,
+    bulkStore,
     LeaseExpirationPoller,
+    GraphStateCache,
+    activeGraphIndex,
+    HashRing,
+    LeaderElection,
+    metrics,
+    eventRecord,
     Constants,
     Logger,
     Promise,
@@ -38,13 +53,49 @@ function taskSchedulerFactory(
     _,
     Rx,
     taskMessenger,
+    bulkMessenger,
     configuration,
     SchedulerServer,
     Consul,
     graphProgressService
 ) {
     var logger = Logger.initialize(taskSchedulerFactory);
+
+    /*
+     * Queue priorities used with Rx.Observable.prototype.mergePriority. Lower
+     * numbers are served first when a concurrency counter frees up.
+     */
+    var priorities = {
+        scheduleTask: 0,
+        evaluateGraph: 1,
+        updateTaskDependencies: 2,
+        completeGraph: 3,
+        evaluateDomain: 4
+    };
     var url = require('url');
+    var LRU = require('lru-cache');
+
+    var stageDuration = metrics.histogram('taskgraph_scheduler_stage_duration_milliseconds',
+            'Latency of task scheduler pipeline stages', ['stage']);
+    var storeDuration = metrics.histogram('taskgraph_store_call_duration_milliseconds',
+            'Latency of task graph store calls', ['method']);
+    var pollResultSize = metrics.histogram('taskgraph_poll_result_size',
+            'Number of documents returned by each poll of the store', ['poller'],
+            [0, 1, 5, 10, 25, 50, 100, 200, 500, 1000]);
+    var dependencyBatchSize = metrics.histogram('taskgraph_scheduler_dependency_batch_size',
+            'Number of finished tasks evaluated per dependency update batch', [],
+            [1, 2, 5, 10, 25, 50, 100, 250, 500]);
+    var inFlight = metrics.gauge('taskgraph_scheduler_in_flight',
+            'Outstanding asynchronous calls per concurrency counter', ['counter']);
+    var queueDepth = metrics.gauge('taskgraph_scheduler_queue_depth',
+            'Calls waiting for a slot per concurrency counter', ['counter']);
+    var queuedTotal = metrics.counter('taskgraph_scheduler_queued_total',
+            'Calls that had to wait for a slot per concurrency counter', ['counter']);
+    var droppedTotal = metrics.counter('taskgraph_scheduler_dropped_total',
+            'Calls dropped over the concurrency and queue limits per concurrency counter',
+            ['counter']);
+    var coalescedTotal = metrics.counter('taskgraph_scheduler_coalesced_evaluations_total',
+            'Graph evaluation events coalesced into an evaluation already queued or running');
     var consulUrl = configuration.get('consulUrl');
     var consul;
 
@@ -81,6 +132,32 @@ function taskSchedulerFactory(
      * the decision engine for scheduling new tasks to be run within a graph.
      *
      * @param {Object} options
+     * @param {String} [options.schedulingMode] - 'poll' (default) wakes the fallback
+     * pollers every pollInterval. 'event' relies on messenger events to drive scheduling
+     * and backs the fallback pollers off up to maxPollInterval while idle.
+     * @param {Number} [options.maxPollInterval] - upper bound for the adaptive poll period
+     * @param {Number} [options.maxQueueDepth] - number of calls each concurrency counter
+     * will queue once it is at its maximum before dropping them
+     * @param {Number} [options.dependencyBatchWindow] - if set, collect finished task
+     * events for this many milliseconds and update their dependencies one graph at a time
+     * @param {Number} [options.dependencyBatchSize] - maximum finished task events per batch
+     * @param {Number} [options.graphNameCacheSize] - number of graphs to cache graph and
+     * task names for when scheduling tasks
+     * @param {Boolean|Object} [options.graphStateCache] - if set, keep the state of active
+     * graphs in memory and use it to find ready tasks and rule out graph completion without
+     * querying the store. Accepts GraphStateCache options, e.g. { maxTasks: 100000 }.
+     * The cache is only kept up to date by the events of the graphs a scheduler owns, so
+     * it is only used when sharded
+     * @param {Boolean} [options.sharded] - discover the other schedulers in the domain
+     * through Consul and only process the graphs this scheduler owns on a consistent
+     * hash ring of their schedulerIds
+     * @param {Number} [options.membershipInterval] - how often to refresh the ring
+     * membership when sharded, or the leader election when not, in milliseconds
+     * @param {Boolean} [options.batchedCancels] - cancel the tasks of a failed graph
+     * with one batched message instead of one message per task. Task runners from
+     * before the batched message don't subscribe to it, so only turn this on once
+     * every runner has been upgraded. Defaults to the batchedTaskCancels setting,
+     * which defaults to false
      * @constructor
      */
     function TaskScheduler(options) {
@@ -92,19 +169,60 @@ function taskSchedulerFactory(
         this.evaluateGraphStream = new Rx.Subject();
         this.checkGraphFinishedStream = new Rx.Subject();
         this.pollInterval = options.pollInterval || 500;
+        this.schedulingMode = options.schedulingMode || 'poll';
+        assert.ok(_.contains(['poll', 'event'], this.schedulingMode),
+                'schedulingMode must be one of poll, event');
+        this.maxPollInterval = options.maxPollInterval || this.pollInterval * 20;
+        this.pollStates = {
+            unevaluatedTasks: this.createPollState(),
+            evaluatedTasks: this.createPollState()
+        };
+        this.maxQueueDepth = options.maxQueueDepth || 10000;
         this.concurrencyMaximums = this.getConcurrencyMaximums(options.concurrent);
         this.findUnevaluatedTasksLimit = options.findUnevaluatedTasksLimit || 200;
+        this.dependencyBatchWindow = options.dependencyBatchWindow || 0;
+        this.dependencyBatchSize = options.dependencyBatchSize || 100;
+        this.dependencyBatchStats = {
+            batches: 0,
+            tasks: 0,
+            lastLatency: 0,
+            maxLatency: 0,
+            totalLatency: 0
+        };
+        this.graphNameCache = LRU({ max: options.graphNameCacheSize || 1000 });
+        this.sharded = !!options.sharded;
+        if (options.graphStateCache && !this.sharded) {
+            // Unsharded schedulers all handle events for every graph, so no one
+            // cache would see all of them
+            logger.warning('The graph state cache is only used by sharded schedulers', {
+                schedulerId: this.schedulerId
+            });
+        }
+        this.graphStateCache = options.graphStateCache && this.sharded ?
+            GraphStateCache.create(_.isObject(options.graphStateCache) ?
+                options.graphStateCache : {}) :
+            null;
+        this.graphEvaluations = {};
+        this.coalescedEvaluations = 0;
+        this.membershipInterval = options.membershipInterval || 5000;
+        this.ring = this.sharded ? HashRing.create([this.schedulerId]) : null;
+        this.election = null;
         this.subscriptions = [];
         this.leasePoller = null;
+        this.stopCollectingMetrics = null;
+        this.batchedCancels = _.has(options, 'batchedCancels') ?
+            !!options.batchedCancels : !!configuration.get('batchedTaskCancels', false);
         this.debug = _.has(options, 'debug') ? options.debug : false;
     }
 
     /**
      * Generate a concurrency counter object. This is used with the
-     * Rx.Observable.prototype.mergeLossy function from Rx.Mixins to keep
-     * ensure that a specified maximum of the same type of asynchronous
+     * Rx.Observable.prototype.mergePriority and mergeLossy functions from Rx.Mixins
+     * to keep ensure that a specified maximum of the same type of asynchronous
      * call be able to be unresolved at the same time (for example, only
      * wait on a max of 100 database calls to resolve at any point in time).
+     * Calls over the maximum are queued up to maxQueueDepth, and the queued
+     * and dropped totals are kept on the counter.
      *
      * @param {Number} max
      * @returns {Object} concurrency counter object
@@ -114,10 +232,93 @@ function taskSchedulerFactory(
         assert.number(max);
         return {
             count: 0,
-            max: max
+            max: max,
+            queue: [],
+            maxQueueDepth: this.maxQueueDepth,
+            queued: 0,
+            dropped: 0
         };
     };
 
+    /**
+     * Generate a poll state object. This is used with the
+     * Rx.Observable.adaptiveInterval function from Rx.Mixins when running in
+     * 'event' scheduling mode, and tracks how many poll wakeups were saved
+     * compared to polling on a fixed interval.
+     *
+     * @returns {Object} poll state object
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.createPollState = function() {
+        return {
+            interval: this.pollInterval,
+            min: this.pollInterval,
+            max: this.maxPollInterval,
+            events: 0,
+            wakeups: 0,
+            saved: 0
+        };
+    };
+
+    /**
+     * Create the trigger observable for one of the fallback pollers. In 'poll'
+     * mode this is a fixed interval, in 'event' mode the period adapts to load.
+     *
+     * @param {Object} pollState
+     * @returns {Observable}
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.createPollTrigger = function(pollState) {
+        if (this.schedulingMode === 'event') {
+            return Rx.Observable.adaptiveInterval(pollState);
+        }
+        return Rx.Observable.interval(this.pollInterval);
+    };
+
+    /**
+     * Tighten a poller back to its minimum period if it found work or if
+     * messenger events were seen since the last poll, otherwise double its
+     * period up to the configured maximum.
+     *
+     * @param {Object} pollState
+     * @param {Boolean} foundWork
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.adjustPollInterval = function(pollState, foundWork) {
+        if (this.schedulingMode !== 'event') {
+            return;
+        }
+        if (foundWork || pollState.events > 0) {
+            pollState.interval = pollState.min;
+        } else {
+            pollState.interval = Math.min(pollState.interval * 2, pollState.max);
+        }
+        pollState.events = 0;
+    };
+
+    /**
+     * Record scheduling activity pushed by messenger events, so that the
+     * fallback pollers tighten up while the system is busy.
+     *
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.recordSchedulingEvent = function() {
+        _.forEach(this.pollStates, function(pollState) {
+            pollState.events += 1;
+        });
+    };
+
+    /**
+     * @returns {Object} poll wakeup statistics for each fallback poller
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.getPollStats = function() {
+        var self = this;
+        return _.transform(self.pollStates, function(result, pollState, name) {
+            result[name] = _.pick(pollState, ['interval', 'wakeups', 'saved']);
+        }, { schedulingMode: self.schedulingMode });
+    };
+
     /**
      * Generate concurrency counter objects for the different IO calls we make
      * to the store and messenger. Basically a rudimentary method of adding throttling.
@@ -129,10 +330,8 @@ function taskSchedulerFactory(
     TaskScheduler.prototype.getConcurrencyMaximums = function(concurrentOptions) {
         var self = this;
         var _options = _.defaults(concurrentOptions || {}, {
-            // Favor evaluateGraphStream, since it's what results in actual
-            // scheduling. If we're at load, defer evaluation in favor of scheduling.
-            // TODO: Probably better as a priority queue, evaluateGraphStream events
-            // always come up first?
+            // Calls over these maximums are queued (see mergePriority), except for
+            // findUnevaluatedTasks which is a poller and safe to drop ticks from.
             findReadyTasks: 100,
             updateTaskDependencies: 100,
             handleScheduleTaskEvent: 100,
@@ -219,12 +418,87 @@ function taskSchedulerFactory(
     TaskScheduler.prototype.findReadyTasks = function(data) {
         assert.object(data);
         var self = this;
+        var stopTimer = stageDuration.startTimer({ stage: 'find_ready' });
 
         return Rx.Observable.just(data)
         .flatMap(function() {
-            return store.findReadyTasks(self.domain, data.graphId);
+            if (self.graphStateCache && data.graphId) {
+                return self.findReadyTasksInCache(data.graphId);
+            }
+            return storeDuration.time({ method: 'findReadyTasks' }, function() {
+                return store.findReadyTasks(self.domain, data.graphId);
+            });
         })
-        .catch(self.handleStreamError.bind(self, 'Error finding ready tasks'));
+        .map(function(result) {
+            if (result && result.tasks) {
+                result.tasks = _(result.tasks)
+                .map(self.projectReadyTask.bind(self))
+                .filter(function(task) { return self.ownsGraph(task.graphId); })
+                .value();
+            }
+            if (!data.graphId) {
+                pollResultSize.observe(_.size(result && result.tasks), { poller: 'ready_tasks' });
+            }
+            return result;
+        })
+        .catch(self.handleStreamError.bind(self, 'Error finding ready tasks'))
+        .finally(stopTimer);
+    };
+
+    /**
+     * Find ready tasks within a graph from the graph state cache, loading the
+     * graph into the cache on first use. Graphs that can't be cached (finished,
+     * or belonging to another domain) are looked up in the store instead.
+     *
+     * @param {String} graphId
+     * @returns {Promise}
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.findReadyTasksInCache = function(graphId) {
+        var self = this;
+        var cache = self.graphStateCache;
+
+        return Promise.try(function() {
+            if (cache.has(graphId)) {
+                return true;
+            }
+            return store.getActiveGraphById(graphId)
+            .then(function(graph) {
+                if (_.isEmpty(graph) || (graph.domain && graph.domain !== self.domain)) {
+                    return false;
+                }
+                cache.load(graph);
+                return true;
+            });
+        })
+        .then(function(cached) {
+            if (!cached) {
+                return store.findReadyTasks(self.domain, graphId);
+            }
+            return {
+                graphId: graphId,
+                tasks: _.map(cache.findReadyTasks(graphId), function(task) {
+                    return _.defaults(task, { domain: self.domain });
+                })
+            };
+        });
+    };
+
+    /**
+     * Reduce a ready task document to the fields needed to schedule it. The task
+     * and graph names are kept if the store returned them, so that scheduling
+     * the task doesn't need any further reads.
+     *
+     * @param {Object} task
+     * @returns {Object}
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.projectReadyTask = function(task) {
+        var projected = _.pick(task, ['domain', 'taskId', 'graphId', 'taskName', 'graphName']);
+        if (!projected.taskName && task.injectableName) {
+            projected.taskName = task.injectableName;
+        }
+        return projected;
     };
 
     /**
@@ -242,21 +516,49 @@ function taskSchedulerFactory(
 
         var self = this;
 
-        return taskHandlerStream
+        var tasks = taskHandlerStream
         .takeWhile(self.isRunning.bind(self))
-        .tap(self.handleStreamDebug.bind(self, 'Received evaluate task event'))
-        .map(self.updateTaskDependencies.bind(self))
-        .mergeLossy(self.concurrencyMaximums.updateTaskDependencies)
+        .filter(function(data) { return self.ownsGraph(data.graphId); })
+        .tap(self.handleStreamDebug.bind(self, 'Received evaluate task event'));
+
+        if (self.dependencyBatchWindow > 0) {
+            tasks = tasks
+            .bufferWithTimeOrCount(self.dependencyBatchWindow, self.dependencyBatchSize)
+            .filter(function(batch) { return !_.isEmpty(batch); })
+            // Split each batch into one group of unique tasks per graph
+            .flatMap(function(batch) {
+                return Rx.Observable.from(_.map(_.groupBy(batch, 'graphId'), function(group) {
+                    return _.uniq(group, 'taskId');
+                }));
+            })
+            .map(self.updateTaskDependenciesBatch.bind(self))
+            .mergePriority(self.concurrencyMaximums.updateTaskDependencies,
+                    priorities.updateTaskDependencies)
+            .flatMap(function(evaluated) { return Rx.Observable.from(evaluated); });
+        } else {
+            tasks = tasks
+            .map(self.updateTaskDependencies.bind(self))
+            .mergePriority(self.concurrencyMaximums.updateTaskDependencies,
+                    priorities.updateTaskDependencies);
+        }
+
+        return tasks
         .tap(function(task) {
             var _task = _.pick(task, ['domain', 'graphId', 'taskId']);
             self.handleStreamDebug('Updated dependencies for task', _task);
         })
         .filter(function(data) { return data; })
-        .tap(function(task){
-            //The reason to cloneDeep the task is that the method tap in Rxjs is not waited
-            //to finish, and the data flowing into tap is modified by later stream operation.
-            var taskCopy = _.cloneDeep(task);
-            return graphProgressService.publishTaskFinished(taskCopy, {swallowError: true});
+        // Evaluated task records are frozen from here on, so that the progress
+        // publish below can share them with the rest of the pipeline. Stages that
+        // need to change a record make a shallow copy of it first.
+        .map(eventRecord.freeze)
+        .tap(function(task) {
+            if (self.graphStateCache) {
+                self.graphStateCache.taskFinished(task.graphId, task.taskId, task.state);
+            }
+        })
+        .tap(function(task) {
+            return graphProgressService.publishTaskFinished(task, {swallowError: true});
         })
         .map(self.handleEvaluatedTask.bind(self, checkGraphFinishedStream, evaluateGraphStream));
     };
@@ -292,10 +594,39 @@ function taskSchedulerFactory(
      */
     TaskScheduler.prototype.createTasksToScheduleSubscription = function(evaluateGraphStream) {
         var self = this;
-        return evaluateGraphStream
+        // Evaluations for a specific graph (task finished, graph started) are served
+        // ahead of domain wide evaluations from the poller when findReadyTasks is busy.
+        var evaluations = evaluateGraphStream
         .takeWhile(self.isRunning.bind(self))
-        .map(self.findReadyTasks.bind(self))
-        .mergeLossy(self.concurrencyMaximums.findReadyTasks)
+        .partition(function(data) { return !!(data && data.graphId); });
+
+        var findReadyTasks = function(data) {
+            var evaluation = Rx.Observable.defer(function() {
+                return self.findReadyTasks(data);
+            })
+            .finally(self.releaseGraphEvaluation.bind(self, data));
+            // An evaluation dropped over the queue limit is never subscribed to,
+            // so its finally never runs and the claim has to be released here.
+            evaluation.evaluationData = data;
+            return evaluation;
+        };
+        var dropEvaluation = function(evaluation) {
+            self.releaseGraphEvaluation(evaluation.evaluationData);
+        };
+
+        return Rx.Observable.merge(
+            evaluations[0]
+            .filter(function(data) { return self.ownsGraph(data.graphId); })
+            .filter(self.claimGraphEvaluation.bind(self))
+            .map(findReadyTasks)
+            .mergePriority(self.concurrencyMaximums.findReadyTasks, priorities.evaluateGraph,
+                    dropEvaluation),
+            evaluations[1]
+            .filter(self.claimGraphEvaluation.bind(self))
+            .map(findReadyTasks)
+            .mergePriority(self.concurrencyMaximums.findReadyTasks, priorities.evaluateDomain,
+                    dropEvaluation)
+        )
         .filter(function(data) { return !_.isEmpty(data.tasks); })
         .pluck('tasks')
         // Ideally this would just be .pluck('tasks').from() but that didn't work.
@@ -306,19 +637,59 @@ function taskSchedulerFactory(
         // handleScheduleTaskEvent for each task independently of the others.
         .flatMap(function(tasks) { return Rx.Observable.from(tasks); })
         .map(self.handleScheduleTaskEvent.bind(self))
-        .mergeLossy(self.concurrencyMaximums.handleScheduleTaskEvent)
+        .mergePriority(self.concurrencyMaximums.handleScheduleTaskEvent, priorities.scheduleTask)
         .map(function(task) {
             return _.pick(task, ['domain', 'graphId', 'graphName', 'taskId','taskName']);
         });
     };
 
     /**
-     * Publish a task schedule event with the messenger.
+     * Used to filter evaluateGraphStream events. Only one evaluation per graph
+     * (or one domain wide evaluation, for events without a graphId) may be queued or
+     * in flight at a time. Duplicate events that arrive in the meantime are
+     * coalesced into a single re-run once the current evaluation finishes, so that
+     * findReadyTasks queries scale with the number of graphs rather than the number
+     * of events.
+     *
+     * @param {Object} data
+     * @returns {Boolean} true if the evaluation should run now
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.claimGraphEvaluation = function(data) {
+        var key = (data && data.graphId) || '*';
+        var evaluation = this.graphEvaluations[key];
+        if (evaluation) {
+            evaluation.rerun = true;
+            this.coalescedEvaluations += 1;
+            return false;
+        }
+        this.graphEvaluations[key] = { rerun: false };
+        return true;
+    };
+
+    /**
+     * Release the claim made by claimGraphEvaluation, and re-run the evaluation
+     * if any duplicate events were coalesced while it was queued or in flight.
      *
      * @param {Object} data
-     * @returns {Observable}
      * @memberOf TaskScheduler
-     */ 
+     */
+    TaskScheduler.prototype.releaseGraphEvaluation = function(data) {
+        var key = (data && data.graphId) || '*';
+        var evaluation = this.graphEvaluations[key];
+        delete this.graphEvaluations[key];
+        if (evaluation && evaluation.rerun && this.isRunning()) {
+            this.evaluateGraphStream.onNext(data || {});
+        }
+    };
+
+    /**
+     * Read the task document to find the task and graph names for a ready task.
+     *
+     * @param {Object} data
+     * @returns {Promise}
+     * @memberOf TaskScheduler
+     */
     TaskScheduler.prototype.getGraphNameAndTaskNameFromDB = function(data){
         var self = this;
         var task_data = store.getTaskById(data);
@@ -332,14 +703,128 @@ function taskSchedulerFactory(
             };
         });
     };
+
+    /**
+     * Resolve the graph name, and the injectable names of all of its tasks, for
+     * a graph. The result is cached per graph, so scheduling any number of tasks
+     * within a graph costs at most one store read.
+     *
+     * @param {String} graphId
+     * @returns {Promise} object with graphName and taskNames, or null if the graph
+     * is not active
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.getGraphNames = function(graphId) {
+        var self = this;
+        var names = self.graphNameCache.get(graphId);
+        if (!names) {
+            // Cache the promise so that concurrent lookups share one store read
+            names = Promise.resolve(store.getActiveGraphById(graphId))
+            .then(function(graph) {
+                if (_.isEmpty(graph)) {
+                    self.graphNameCache.del(graphId);
+                    return null;
+                }
+                return {
+                    graphName: _.get(graph, 'context.graphName') || graph.name,
+                    taskNames: _.mapValues(graph.tasks, 'injectableName')
+                };
+            })
+            .catch(function(error) {
+                self.graphNameCache.del(graphId);
+                throw error;
+            });
+            self.graphNameCache.set(graphId, names);
+        }
+        return names;
+    };
+
+    /**
+     * Build the run task data for a ready task, preferring the names projected
+     * by findReadyTasks, then the per graph name cache, and only reading the
+     * task document as a last resort.
+     *
+     * @param {Object} data
+     * @returns {Promise}
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.getScheduleTaskData = function(data) {
+        var self = this;
+        var scheduleData = function(taskName, graphName) {
+            return {
+                domain: self.domain,
+                taskId: data.taskId,
+                taskName: taskName,
+                graphId: data.graphId,
+                graphName: graphName
+            };
+        };
+
+        if (data.taskName && data.graphName) {
+            return Promise.resolve(scheduleData(data.taskName, data.graphName));
+        }
+        if (!data.graphId) {
+            return self.getGraphNameAndTaskNameFromDB(data);
+        }
+        return self.getGraphNames(data.graphId)
+        .then(function(names) {
+            var taskName = data.taskName || _.get(names, ['taskNames', data.taskId]);
+            if (names && taskName) {
+                return scheduleData(taskName, names.graphName);
+            }
+            return self.getGraphNameAndTaskNameFromDB(data);
+        });
+    };
+
+    /**
+     * Resolve the names for a ready task and publish a run task event for it.
+     *
+     * @param {Object} data
+     * @returns {Observable}
+     * @memberOf TaskScheduler
+     */
     TaskScheduler.prototype.handleScheduleTaskEvent = function(data) {
         var self = this;
         assert.object(data, 'task data object');
-         
+
         return Rx.Observable.just(data)
-        .flatMap(self.getGraphNameAndTaskNameFromDB.bind(self))
+        .flatMap(self.getScheduleTaskData.bind(self))
         .flatMap(self.publishScheduleTaskEvent.bind(self))
-        .catch(self.handleStreamError.bind(self, 'Error scheduling task'));
+        .catch(function(error) {
+            if (self.graphStateCache) {
+                self.graphStateCache.taskUnscheduled(data.graphId, data.taskId);
+            }
+            return self.handleStreamError('Error scheduling task', error);
+        });
+    };
+
+    /**
+     * Called by the lease expiration poller with the tasks whose leases it has
+     * expired. They are ready to run again, so evaluate the graphs this scheduler
+     * owns straight away. Graphs owned by other schedulers are found by their
+     * domain wide evaluations, which read the store.
+     *
+     * @param {Array} tasks - the expired task documents
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.handleExpiredLeases = function(tasks) {
+        var self = this;
+        var graphIds = _(tasks)
+        .filter(function(task) { return task.graphId && self.ownsGraph(task.graphId); })
+        .map(function(task) {
+            if (self.graphStateCache) {
+                self.graphStateCache.taskUnscheduled(task.graphId, task.taskId);
+            }
+            return task.graphId;
+        })
+        .uniq()
+        .value();
+
+        if (self.isRunning()) {
+            _.forEach(graphIds, function(graphId) {
+                self.evaluateGraphStream.onNext({ graphId: graphId });
+            });
+        }
     };
 
     /**
@@ -367,7 +852,7 @@ function taskSchedulerFactory(
                 return self.checkGraphSucceeded(data);
             }
         })
-        .mergeLossy(self.concurrencyMaximums.completeGraphs);
+        .mergePriority(self.concurrencyMaximums.completeGraphs, priorities.completeGraph);
     };
 
     /**
@@ -381,11 +866,28 @@ function taskSchedulerFactory(
     TaskScheduler.prototype.checkGraphSucceeded = function(data) {
         assert.object(data, 'graph data object');
         var self = this;
+        var stopTimer = stageDuration.startTimer({ stage: 'complete_graph' });
 
         return Rx.Observable.just(data)
-        .flatMap(store.checkGraphSucceeded.bind(store))
+        // The graph state cache can rule out completion without a store query,
+        // but only the store can confirm it.
+        .filter(function() {
+            return !self.graphStateCache ||
+                self.graphStateCache.isGraphDone(data.graphId) !== false;
+        })
+        .flatMap(function() {
+            return storeDuration.time({ method: 'checkGraphSucceeded' }, function() {
+                // The store marks the result on the object it is passed, and data
+                // may be a frozen task record.
+                return store.checkGraphSucceeded(_.clone(data));
+            });
+        })
         .filter(function(_data) { return _data.done; })
-        .flatMap(store.setGraphDone.bind(store, Constants.Task.States.Succeeded))
+        .flatMap(function(_data) {
+            return storeDuration.time({ method: 'setGraphDone' }, function() {
+                return store.setGraphDone(Constants.Task.States.Succeeded, _data);
+            });
+        })
         .filter(function(graph) { return !_.isEmpty(graph); })
         .tap(function(graph) {
             return graphProgressService.publishGraphFinished(
@@ -403,7 +905,8 @@ function taskSchedulerFactory(
             return obj;
         })
         .tap(self._publishGraphFinished.bind(self))
-        .catch(self.handleStreamError.bind(self, 'Error handling graph done event'));
+        .catch(self.handleStreamError.bind(self, 'Error handling graph done event'))
+        .finally(stopTimer);
     };
 
     /**
@@ -418,19 +921,25 @@ function taskSchedulerFactory(
     TaskScheduler.prototype.failGraph = function(data, graphState) {
         var self = this;
         var graphToBePublished;
+        var stopTimer = stageDuration.startTimer({ stage: 'complete_graph' });
         return Rx.Observable.just(data.graphId)
         .flatMap(store.getActiveGraphById)
         .filter(function(graph) {return !_.isEmpty(graph);})
         .map(function(doneGraph) {
             graphToBePublished = _.cloneDeep(doneGraph);
-            return _.map(doneGraph.tasks, function(taskObj) {
-                if(taskObj.state ===  Constants.Task.States.Pending) {
-                    taskObj.state = graphState;
-                }
+            // Tasks that have already finished keep their state, so only the
+            // pending ones need to be written and cancelled.
+            return _(doneGraph.tasks)
+            .filter(function(taskObj) {
+                return taskObj.state === Constants.Task.States.Pending;
+            })
+            .map(function(taskObj) {
+                taskObj.state = graphState;
                 taskObj.taskId = taskObj.instanceId;
                 taskObj.graphId = data.graphId;
                 return taskObj;
-            });
+            })
+            .value();
         })
         .flatMap(self.handleFailGraphTasks.bind(self))
         .flatMap(store.setGraphDone.bind(store, graphState, data))
@@ -451,24 +960,54 @@ function taskSchedulerFactory(
                 {swallowError: true}
             );
         })
-        .catch(self.handleStreamError.bind(self, 'Error failing/cancelling graph'));
+        .catch(self.handleStreamError.bind(self, 'Error failing/cancelling graph'))
+        .finally(stopTimer);
     };
 
     /**
-     * Fail pending tasks within a graph.
+     * Fail pending tasks within a graph with a single bulk store operation, then
+     * tell the task runners to cancel them.
      *
      * @param {Array} tasks
      * @returns {Observable}
      * @memberOf TaskScheduler
      */
     TaskScheduler.prototype.handleFailGraphTasks = function(tasks) {
+        var self = this;
         logger.debug('cancel/failing pending tasks', {data:_.pluck(tasks, 'taskId')});
+        if (_.isEmpty(tasks)) {
+            return Rx.Observable.just(tasks);
+        }
         return Rx.Observable.just(tasks)
-        .flatMap(Promise.map.bind(Promise, tasks, store.setTaskState))
-        .flatMap(Promise.map.bind(Promise, tasks, store.markTaskEvaluated))
-        .flatMap(Promise.map.bind(Promise, _.pluck(tasks, 'taskId'),
-                    taskMessenger.publishCancelTask))
-        .flatMap(Promise.map.bind(Promise, tasks, store.setTaskStateInGraph.bind(store)));
+        .flatMap(function() {
+            return storeDuration.time({ method: 'failGraphTasks' }, function() {
+                return bulkStore.failGraphTasks(tasks[0].graphId, tasks);
+            });
+        })
+        .flatMap(function() {
+            return self.publishCancelTasks(_.pluck(tasks, 'taskId'));
+        })
+        .map(tasks);
+    };
+
+    /**
+     * Publish cancel events for a set of tasks: one batched event if batchedCancels
+     * is on, otherwise one event per task, which every task runner understands.
+     *
+     * @param {Array} taskIds
+     * @returns {Promise}
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.publishCancelTasks = function(taskIds) {
+        var self = this;
+        return stageDuration.time({ stage: 'publish_cancel' }, function() {
+            if (self.batchedCancels) {
+                return bulkMessenger.publishCancelTasks(taskIds);
+            }
+            return Promise.map(taskIds, function(taskId) {
+                return taskMessenger.publishCancelTask(taskId);
+            }, { concurrency: bulkStore.concurrency });
+        });
     };
 
     /**
@@ -533,13 +1072,59 @@ function taskSchedulerFactory(
      */
     TaskScheduler.prototype.updateTaskDependencies = function(data) {
         assert.object(data, 'task dependency object');
+        var stopTimer = stageDuration.startTimer({ stage: 'update_dependencies' });
         return Rx.Observable.forkJoin([
             store.setTaskStateInGraph(data),
             store.updateDependentTasks(data),
             store.updateUnreachableTasks(data)
         ])
         .flatMap(store.markTaskEvaluated.bind(store, data))
-        .catch(this.handleStreamError.bind(this, 'Error updating task dependencies'));
+        .catch(this.handleStreamError.bind(this, 'Error updating task dependencies'))
+        .finally(stopTimer);
+    };
+
+    /**
+     * Evaluate a batch of finished tasks from the same graph with a single bulk
+     * store operation. This is the batched equivalent of updateTaskDependencies, and
+     * has the same failure semantics: if it fails, the tasks are left unevaluated and
+     * will be picked up again by the unevaluated task poller.
+     *
+     * @param {Array} tasks
+     * @returns {Observable}
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.updateTaskDependenciesBatch = function(tasks) {
+        assert.arrayOfObject(tasks, 'task dependency objects');
+        var self = this;
+        var startTime = Date.now();
+        var stopTimer = stageDuration.startTimer({ stage: 'update_dependencies' });
+
+        return Rx.Observable.just(tasks)
+        .flatMap(function() {
+            return storeDuration.time({ method: 'updateTaskDependencies' }, function() {
+                return bulkStore.updateTaskDependencies(tasks[0].graphId, tasks);
+            });
+        })
+        .tap(function() {
+            self.recordDependencyBatch(tasks.length, Date.now() - startTime);
+        })
+        .catch(self.handleStreamError.bind(self, 'Error updating task dependencies'))
+        .finally(stopTimer);
+    };
+
+    /**
+     * @param {Number} size - number of tasks in the batch
+     * @param {Number} latency - time taken by the batch, in milliseconds
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.recordDependencyBatch = function(size, latency) {
+        var stats = this.dependencyBatchStats;
+        stats.batches += 1;
+        stats.tasks += size;
+        stats.lastLatency = latency;
+        stats.maxLatency = Math.max(stats.maxLatency, latency);
+        stats.totalLatency += latency;
+        dependencyBatchSize.observe(size);
     };
 
     /**
@@ -553,7 +1138,7 @@ function taskSchedulerFactory(
     TaskScheduler.prototype.handleStreamSuccess = function(msg, data) {
         if (msg) {
             if (data) {
-                data.schedulerId = this.schedulerId;
+                data = _.defaults({ schedulerId: this.schedulerId }, data);
             }
             logger.debug(msg, data);
         }
@@ -591,7 +1176,7 @@ function taskSchedulerFactory(
     TaskScheduler.prototype.handleStreamDebug = function(msg, data) {
         if (this.debug) {
             if (data) {
-                data.schedulerId = this.schedulerId;
+                data = _.defaults({ schedulerId: this.schedulerId }, data);
             }
             logger.debug(msg, data);
         }
@@ -613,6 +1198,7 @@ function taskSchedulerFactory(
                     data: data,
                     schedulerId: self.schedulerId
                 });
+                self.recordSchedulingEvent();
                 self.evaluateTaskStream.onNext(data);
             }
         );
@@ -628,10 +1214,13 @@ function taskSchedulerFactory(
      */
     TaskScheduler.prototype.publishScheduleTaskEvent = function(data) {
         // TODO: Add more scheduling logic here when necessary
-        return taskMessenger.publishRunTask(this.domain, data.taskId, data.graphId)
-                .then(function() {
-                    return data;
-                });
+        var self = this;
+        return stageDuration.time({ stage: 'publish' }, function() {
+            return taskMessenger.publishRunTask(self.domain, data.taskId, data.graphId);
+        })
+        .then(function() {
+            return data;
+        });
     };
 
     /**
@@ -645,11 +1234,15 @@ function taskSchedulerFactory(
      */
     TaskScheduler.prototype.createUnevaluatedTaskPollerSubscription = function(evaluateTaskStream) {
         var self = this;
+        var pollState = self.pollStates.unevaluatedTasks;
 
-        return Rx.Observable.interval(self.pollInterval)
+        return self.createPollTrigger(pollState)
         .takeWhile(self.isRunning.bind(self))
         .map(self.findUnevaluatedTasks.bind(self, self.domain))
         .mergeLossy(self.concurrencyMaximums.findUnevaluatedTasks)
+        .tap(function(tasks) {
+            self.adjustPollInterval(pollState, !_.isEmpty(tasks));
+        })
         .flatMap(function(tasks) { return Rx.Observable.from(tasks); })
         .map(evaluateTaskStream.onNext.bind(evaluateTaskStream));
     };
@@ -665,9 +1258,13 @@ function taskSchedulerFactory(
      */
     TaskScheduler.prototype.createEvaluatedTaskPollerSubscription = function(evaluateGraphStream) {
         var self = this;
+        var pollState = self.pollStates.evaluatedTasks;
 
-        return Rx.Observable.interval(self.pollInterval)
+        return self.createPollTrigger(pollState)
         .takeWhile(self.isRunning.bind(self))
+        .tap(function() {
+            self.adjustPollInterval(pollState, false);
+        })
         .map(evaluateGraphStream.onNext.bind(evaluateGraphStream, {}));
     };
 
@@ -680,16 +1277,22 @@ function taskSchedulerFactory(
      * @memberOf TaskScheduler
      */
     TaskScheduler.prototype.findUnevaluatedTasks = function(domain) {
+        var self = this;
         return Rx.Observable.just()
-        .flatMap(store.findUnevaluatedTasks.bind(store, domain, this.findUnevaluatedTasksLimit))
+        .flatMap(function() {
+            return storeDuration.time({ method: 'findUnevaluatedTasks' }, function() {
+                return store.findUnevaluatedTasks(domain, self.findUnevaluatedTasksLimit);
+            });
+        })
         .tap(function(tasks) {
+            pollResultSize.observe(_.size(tasks), { poller: 'unevaluated_tasks' });
             if (tasks && tasks.length) {
                 logger.debug('Poller is triggering unevaluated tasks to be evaluated', {
                     tasks: _.map(tasks, 'taskId')
                 });
             }
         })
-        .catch(this.handleStreamError.bind(this, 'Error finding unevaluated tasks'));
+        .catch(self.handleStreamError.bind(self, 'Error finding unevaluated tasks'));
     };
 
     /**
@@ -712,9 +1315,157 @@ function taskSchedulerFactory(
     TaskScheduler.prototype.runTaskGraphCallback = function(data) {
         assert.object(data);
         assert.uuid(data.graphId);
+        this.recordSchedulingEvent();
         this.evaluateGraphStream.onNext(data);
     };
 
+    /**
+     * Metrics collector: export the concurrency counters and the coalesced
+     * evaluation count.
+     *
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.collectMetrics = function() {
+        _.forEach(this.concurrencyMaximums, function(counter, name) {
+            var labels = { counter: name };
+            inFlight.set(counter.count, labels);
+            queueDepth.set(counter.queue.length, labels);
+            queuedTotal.set(counter.queued, labels);
+            droppedTotal.set(counter.dropped, labels);
+        });
+        coalescedTotal.set(this.coalescedEvaluations);
+    };
+
+    /**
+     * @param {String} graphId
+     * @returns {Boolean} whether this scheduler should process the graph. Always
+     * true when not sharded.
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.ownsGraph = function(graphId) {
+        return !this.ring || !graphId || this.ring.owner(graphId) === this.schedulerId;
+    };
+
+    /**
+     * @returns {Boolean} whether this scheduler should do domain wide work that only
+     * one scheduler needs to do. When sharded that is the first member of the ring,
+     * otherwise the winner of a Consul leader election. Always true without Consul.
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.isLeader = function() {
+        if (this.ring) {
+            return _.first(this.ring.members) === this.schedulerId;
+        }
+        return !this.election || this.election.isLeader();
+    };
+
+    /**
+     * Update the hash ring with the current set of schedulers. When ownership
+     * changes, graphs this scheduler has newly taken over may have work that
+     * their previous owner left behind, so poll for it straight away.
+     *
+     * @param {Array} schedulerIds
+     * @returns {Boolean} whether the membership changed
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.updateMembership = function(schedulerIds) {
+        var members = _.uniq(schedulerIds.concat(this.schedulerId)).sort();
+        if (_.isEqual(members, this.ring.members)) {
+            return false;
+        }
+        logger.info('Scheduler membership changed, rebalancing graphs', {
+            schedulerId: this.schedulerId,
+            domain: this.domain,
+            previous: this.ring.members,
+            members: members
+        });
+        this.ring.setMembers(members);
+        if (this.graphStateCache) {
+            this.graphStateCache.clear();
+        }
+        _.forEach(this.pollStates, function(pollState) {
+            pollState.interval = pollState.min;
+        });
+        if (this.running) {
+            this.evaluateGraphStream.onNext({});
+        }
+        return true;
+    };
+
+    /**
+     * Pass this scheduler's Consul health check and refresh the ring membership
+     * from the healthy schedulers registered in the same domain. Errors are logged,
+     * and the previous membership kept.
+     *
+     * @returns {Promise}
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.refreshMembership = function() {
+        var self = this;
+        return Promise.try(function() {
+            return consul.agent.check.pass({ id: 'service:' + self.schedulerId });
+        })
+        .then(function() {
+            return consul.health.service({
+                service: 'taskgraph',
+                tag: 'domain:' + self.domain,
+                passing: true
+            });
+        })
+        .spread(function(entries) {
+            self.updateMembership(_(entries)
+                .pluck('Service')
+                .filter(function(service) { return _.contains(service.Tags, 'scheduler'); })
+                .pluck('ID')
+                .value());
+        })
+        .catch(function(error) {
+            logger.warning('Error refreshing scheduler membership', {
+                schedulerId: self.schedulerId,
+                error: error
+            });
+        });
+    };
+
+    /**
+     * Periodically refresh the ring membership while the scheduler is running.
+     *
+     * @returns {Observable}
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.createMembershipSubscription = function() {
+        var self = this;
+        return Rx.Observable.interval(self.membershipInterval)
+        .takeWhile(self.isRunning.bind(self))
+        .flatMap(self.refreshMembership.bind(self));
+    };
+
+    /**
+     * Join the leader election of the schedulers in this domain, and keep
+     * renewing the candidacy while the scheduler is running.
+     *
+     * @returns {Promise}
+     * @memberOf TaskScheduler
+     */
+    TaskScheduler.prototype.startElection = function() {
+        var self = this;
+        self.election = LeaderElection.create(consul, {
+            key: 'taskgraph/' + self.domain + '/leader',
+            candidateId: self.schedulerId,
+            ttl: Math.ceil(self.membershipInterval * 3 / 1000)
+        });
+        return self.election.refresh()
+        .then(function() {
+            self.subscriptions.push(Rx.Observable.interval(self.membershipInterval)
+                .takeWhile(self.isRunning.bind(self))
+                .flatMap(self.election.refresh.bind(self.election))
+                .subscribe(
+                    function() {},
+                    self.handleStreamError.bind(self, 'Error refreshing leader election')
+                ));
+        });
+    };
+
     /**
      * Start the task scheduler and its observable pipeline, as well as the expired lease poller.
      * Subscribe to messenger events.
@@ -728,6 +1479,7 @@ function taskSchedulerFactory(
         .then(function() {
             self.running = true;
             self.initializePipeline();
+            self.stopCollectingMetrics = metrics.collect(self.collectMetrics.bind(self));
             self.leasePoller = LeaseExpirationPoller.create(self, {});
             self.leasePoller.start();
             return [
@@ -764,14 +1516,46 @@ function taskSchedulerFactory(
         })
         .then(function() {
             if (consul) {
-                return consul.agent.service.register({
+                var service = {
                     name: 'taskgraph',
                     id: self.schedulerId,
-                    tags: [ 'scheduler' ],
+                    tags: [ 'scheduler', 'domain:' + self.domain ],
                     address: self.gRPC.options.hostname,
                     port: self.gRPC.options.port
+                };
+                if (self.sharded) {
+                    // Schedulers that die without deregistering drop out of the ring
+                    // once their check expires.
+                    service.check = {
+                        ttl: Math.ceil(self.membershipInterval * 3 / 1000) + 's'
+                    };
+                }
+                return consul.agent.service.register(service);
+            }
+        })
+        .then(function() {
+            if (!self.sharded) {
+                // Every unsharded scheduler handles every graph, but domain wide
+                // sweeps are left to one of them
+                return consul ? self.startElection() : undefined;
+            }
+            if (!consul) {
+                logger.warning('Sharded scheduling requires consulUrl, ' +
+                    'this scheduler will own every graph', {
+                    schedulerId: self.schedulerId
                 });
+                // Without a ring of every scheduler, other schedulers may handle
+                // the same graphs, so their state can't be cached
+                self.graphStateCache = null;
+                return;
             }
+            return self.refreshMembership()
+            .then(function() {
+                self.subscriptions.push(self.createMembershipSubscription().subscribe(
+                    function() {},
+                    self.handleStreamError.bind(self, 'Error refreshing scheduler membership')
+                ));
+            });
         });
     };
 
@@ -788,7 +1572,20 @@ function taskSchedulerFactory(
         if (self.leasePoller) {
             self.leasePoller.stop();
         }
+        if (self.stopCollectingMetrics) {
+            self.stopCollectingMetrics();
+            self.stopCollectingMetrics = null;
+        }
+        if (self.schedulingMode === 'event') {
+            logger.info('Task scheduler poll statistics', _.merge({
+                schedulerId: self.schedulerId
+            }, self.getPollStats()));
+        }
         return Promise.try(function() {
+            if (self.election) {
+                return self.election.resign();
+            }
+        }).then(function() {
             if (consul) {
                 return consul.agent.service.deregister({id: self.schedulerId});
             }
@@ -809,6 +1606,11 @@ function taskSchedulerFactory(
      * @memberOf TaskScheduler
      */
     TaskScheduler.prototype._publishGraphFinished = function(graph) {
+        this.graphNameCache.del(graph.instanceId);
+        if (this.graphStateCache) {
+            this.graphStateCache.evict(graph.instanceId);
+        }
+        activeGraphIndex.invalidate(graph.node);
         return eventsProtocol.publishGraphFinished(graph.instanceId, {
             graphId: graph.instanceId,
             graphName: graph.name,
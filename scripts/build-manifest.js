@@ -0,0 +1,20 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+/*
+ * Compile the graph library and the service and view module paths into
+ * lib/manifest.json, so startup doesn't have to walk the source tree.
+ *
+ * Usage: node scripts/build-manifest.js [path]
+ */
+
+'use strict';
+
+var libraryManifest = require('../lib/library-manifest.js');
+
+var manifestPath = process.argv[2] || libraryManifest.path;
+var manifest = libraryManifest.write(manifestPath);
+
+console.log('Wrote ' + manifest.graphs.length + ' graphs, ' +
+    manifest.modules.services.length + ' services and ' +
+    manifest.modules.views.length + ' views to ' + manifestPath +
+    ' (version ' + manifest.version + ')');
@@ -26,6 +26,7 @@ describe('Http.Api.Workflows.2.0', function () {
             helper.di.simpleWrapper({
                 getAllWorkflows: sinon.stub(),
                 createAndRunGraph: sinon.stub(),
+                createAndRunGraphs: sinon.stub(),
                 getWorkflowByInstanceId: sinon.stub(),
                 cancelTaskGraph: sinon.stub(),
                 deleteTaskGraph: sinon.stub()
@@ -98,6 +99,30 @@ describe('Http.Api.Workflows.2.0', function () {
         });
     });
 
+    describe('POST /workflows/bulk', function () {
+        var workflows = [
+            { nodeId: 'node1', name: 'Graph.Test' },
+            { nodeId: 'node2', name: 'Graph.Test' }
+        ];
+
+        it('should run the workflows', function () {
+            var workflowApiService = helper.injector.get('Http.Services.Api.Workflows');
+            workflowApiService.createAndRunGraphs.resolves('bulk results');
+            return workflowsApi.workflowsPostBulk({ body: { workflows: workflows } })
+            .then(function(results) {
+                expect(results).to.equal('bulk results');
+                expect(workflowApiService.createAndRunGraphs).to.have.been.calledWith(workflows);
+            });
+        });
+
+        it('should reject if workflowsPostBulk rejects', function() {
+            var workflowApiService = helper.injector.get('Http.Services.Api.Workflows');
+            workflowApiService.createAndRunGraphs.rejects('bulk error');
+            return workflowsApi.workflowsPostBulk({ body: { workflows: workflows } })
+                .should.be.rejectedWith('bulk error');
+        });
+    });
+
     describe('GET /workflows/:identifier', function () {
         it('should return a single persisted graph', function () {
 
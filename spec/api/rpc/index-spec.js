@@ -36,6 +36,7 @@ describe('TaskGraph.TaskScheduler.Server', function () {
         var workflowsMethods = [
             'workflowsGet',
             'workflowsPost',
+            'workflowsPostBulk',
             'workflowsGetByInstanceId',
             'workflowsAction'
         ];
@@ -0,0 +1,229 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Active Graph Index', function() {
+    var index;
+    var waterline;
+    var messenger;
+    var subscription;
+    var Constants;
+    var Promise;
+    var graph;
+
+    before(function() {
+        var di = require('di');
+        var core = require('on-core')(di, __dirname);
+
+        helper.setupInjector(_.flattenDeep([
+            core.workflowInjectables,
+            helper.require('/lib/active-graph-index.js')
+        ]));
+        index = helper.injector.get('TaskGraph.ActiveGraphIndex');
+        waterline = helper.injector.get('Services.Waterline');
+        messenger = helper.injector.get('Services.Messenger');
+        Constants = helper.injector.get('Constants');
+        Promise = helper.injector.get('Promise');
+    });
+
+    beforeEach(function() {
+        this.sandbox = sinon.sandbox.create();
+        subscription = { dispose: sinon.stub().resolves() };
+        this.sandbox.stub(messenger, 'subscribe').resolves(subscription);
+        index.reset();
+        graph = {
+            instanceId: 'graph1',
+            node: 'node1',
+            _status: 'running',
+            context: { target: 'node1' }
+        };
+        waterline.graphobjects = {
+            findOne: sinon.stub().resolves(graph)
+        };
+        return index.start();
+    });
+
+    afterEach(function() {
+        this.sandbox.restore();
+        return index.stop();
+    });
+
+    it('should subscribe to graph started and finished events', function() {
+        expect(messenger.subscribe).to.have.been.calledTwice;
+        expect(messenger.subscribe).to.have.been.calledWith(
+            Constants.Protocol.Exchanges.Events.Name, 'graph.started.#');
+        expect(messenger.subscribe).to.have.been.calledWith(
+            Constants.Protocol.Exchanges.Events.Name, 'graph.finished.#');
+    });
+
+    it('should look up a node\'s active graph in the store once', function() {
+        return index.findActiveGraphForTarget('node1')
+        .then(function(found) {
+            expect(found).to.deep.equal(graph);
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function(found) {
+            expect(found).to.deep.equal(graph);
+            expect(waterline.graphobjects.findOne).to.have.been.calledOnce;
+            expect(waterline.graphobjects.findOne).to.have.been.calledWith({
+                node: 'node1',
+                _status: Constants.Task.ActiveStates
+            });
+            expect(index.getStats()).to.deep.equal({ hits: 1, misses: 1, size: 1 });
+        });
+    });
+
+    it('should return the graph found by the store', function() {
+        return index.findActiveGraphForTarget('node1')
+        .then(function(found) {
+            expect(found).to.equal(graph);
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function(found) {
+            expect(found).to.equal(graph);
+        });
+    });
+
+    it('should remember nodes without an active graph for a shorter time', function() {
+        // Only Date is faked, the stubbed lookups resolve on real timers
+        var clock = sinon.useFakeTimers(Date.now(), 'Date');
+        waterline.graphobjects.findOne.resolves(undefined);
+        return index.findActiveGraphForTarget('node1')
+        .then(function() {
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function(found) {
+            expect(found).to.equal(undefined);
+            expect(waterline.graphobjects.findOne).to.have.been.calledOnce;
+            expect(index.negativeMaxAge).to.be.below(index.maxAge);
+            clock.tick(index.negativeMaxAge + 1);
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function() {
+            expect(waterline.graphobjects.findOne).to.have.been.calledTwice;
+        })
+        .finally(function() {
+            clock.restore();
+        });
+    });
+
+    it('should share a lookup between concurrent requests', function() {
+        return Promise.all([
+            index.findActiveGraphForTarget('node1'),
+            index.findActiveGraphForTarget('node1')
+        ])
+        .then(function(found) {
+            expect(found[0]).to.equal(graph);
+            expect(found[1]).to.equal(graph);
+            expect(waterline.graphobjects.findOne).to.have.been.calledOnce;
+        });
+    });
+
+    it('should go back to the store after a node is invalidated', function() {
+        return index.findActiveGraphForTarget('node1')
+        .then(function() {
+            index.invalidate('node1');
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function() {
+            expect(waterline.graphobjects.findOne).to.have.been.calledTwice;
+        });
+    });
+
+    it('should go back to the store after a graph event for the node', function() {
+        var handler = messenger.subscribe.firstCall.args[2];
+        return index.findActiveGraphForTarget('node1')
+        .then(function() {
+            handler({ typeId: 'graph2', nodeId: 'node1' });
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function() {
+            expect(waterline.graphobjects.findOne).to.have.been.calledTwice;
+        });
+    });
+
+    it('should drop every node on a graph event without a node', function() {
+        var handler = messenger.subscribe.firstCall.args[2];
+        return index.findActiveGraphForTarget('node1')
+        .then(function() {
+            handler({ graphId: 'graph2' });
+            expect(index.getStats().size).to.equal(0);
+        });
+    });
+
+    it('should go to the store on every lookup until it is subscribed', function() {
+        return index.stop()
+        .then(function() {
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function() {
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function(found) {
+            expect(found).to.equal(graph);
+            expect(waterline.graphobjects.findOne).to.have.been.calledTwice;
+            expect(index.getStats().size).to.equal(0);
+        });
+    });
+
+    it('should go to the store if subscribing to graph events fails', function() {
+        return index.stop()
+        .then(function() {
+            messenger.subscribe.rejects(new Error('test'));
+            return index.start();
+        })
+        .then(function() {
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function() {
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function() {
+            expect(waterline.graphobjects.findOne).to.have.been.calledTwice;
+            expect(index.getStats().size).to.equal(0);
+        });
+    });
+
+    it('should dispose of its subscriptions when stopped', function() {
+        return index.stop()
+        .then(function() {
+            expect(subscription.dispose).to.have.been.calledTwice;
+        });
+    });
+
+    it('should not cache a lookup that was in flight when a node was invalidated', function() {
+        var lookup = index.findActiveGraphForTarget('node1');
+        index.invalidate('node1');
+        return lookup
+        .then(function() {
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function() {
+            expect(waterline.graphobjects.findOne).to.have.been.calledTwice;
+        });
+    });
+
+    it('should go back to the store after an entry expires', function() {
+        // Only Date is faked, the stubbed lookups resolve on real timers
+        var clock = sinon.useFakeTimers(Date.now(), 'Date');
+        return index.findActiveGraphForTarget('node1')
+        .then(function() {
+            clock.tick(index.maxAge + 1);
+            return index.findActiveGraphForTarget('node1');
+        })
+        .then(function() {
+            expect(waterline.graphobjects.findOne).to.have.been.calledTwice;
+        })
+        .finally(function() {
+            clock.restore();
+        });
+    });
+
+    it('should not cache failed lookups', function() {
+        waterline.graphobjects.findOne.rejects(new Error('test'));
+        return expect(index.findActiveGraphForTarget('node1')).to.be.rejectedWith('test')
+        .then(function() {
+            expect(index.getStats().size).to.equal(0);
+        });
+    });
+});
@@ -0,0 +1,50 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Bulk Messenger', function() {
+    var bulkMessenger;
+    var messenger;
+    var Constants;
+
+    before(function() {
+        helper.setupInjector([
+            helper.require('/lib/bulk-messenger.js')
+        ]);
+        bulkMessenger = helper.injector.get('TaskGraph.BulkMessenger');
+        messenger = helper.injector.get('Services.Messenger');
+        Constants = helper.injector.get('Constants');
+        this.sandbox = sinon.sandbox.create();
+    });
+
+    afterEach(function() {
+        this.sandbox.restore();
+    });
+
+    it('should publish a batch of cancelled tasks in one message', function() {
+        this.sandbox.stub(messenger, 'publish').resolves();
+        return bulkMessenger.publishCancelTasks(['task1', 'task2'])
+        .then(function() {
+            expect(messenger.publish).to.have.been.calledOnce;
+            expect(messenger.publish).to.have.been.calledWith(
+                Constants.Protocol.Exchanges.Task.Name,
+                'methods.cancelTasks',
+                { taskIds: ['task1', 'task2'] }
+            );
+        });
+    });
+
+    it('should subscribe to batches of cancelled tasks', function() {
+        var callback = this.sandbox.stub();
+        this.sandbox.stub(messenger, 'subscribe').resolves({});
+        return bulkMessenger.subscribeCancelTasks(callback)
+        .then(function() {
+            expect(messenger.subscribe).to.have.been.calledOnce;
+            expect(messenger.subscribe).to.have.been.calledWith(
+                Constants.Protocol.Exchanges.Task.Name,
+                'methods.cancelTasks',
+                callback
+            );
+        });
+    });
+});
@@ -0,0 +1,632 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Bulk Store', function() {
+    var bulkStore;
+    var store;
+    var waterline;
+    var Constants;
+
+    before(function() {
+        var di = require('di');
+        var core = require('on-core')(di, __dirname);
+
+        helper.setupInjector(_.flattenDeep([
+            core.workflowInjectables,
+            helper.require('/lib/bulk-store.js')
+        ]));
+        bulkStore = helper.injector.get('TaskGraph.BulkStore');
+        store = helper.injector.get('TaskGraph.Store');
+        waterline = helper.injector.get('Services.Waterline');
+        Constants = helper.injector.get('Constants');
+        this.sandbox = sinon.sandbox.create();
+    });
+
+    afterEach(function() {
+        this.sandbox.restore();
+        delete waterline.taskdependencies;
+        delete waterline.graphobjects;
+    });
+
+    /*
+     * Stand in for the MongoDB backed waterline models, with updateMongo stubs
+     * and the given documents returned by find.
+     */
+    function useMongo(sandbox, docs) {
+        waterline.taskdependencies = {
+            updateMongo: sandbox.stub().resolves(),
+            find: sandbox.stub().resolves(docs || []),
+            createEach: sandbox.stub().resolves([]),
+            destroy: sandbox.stub().resolves([])
+        };
+        waterline.graphobjects = {
+            updateMongo: sandbox.stub().resolves(),
+            find: sandbox.stub().resolves([]),
+            createEach: sandbox.stub().resolves([]),
+            destroy: sandbox.stub().resolves([])
+        };
+    }
+
+    describe('supportsMongo', function() {
+        afterEach(function() {
+            delete store.backend;
+        });
+
+        it('should use MongoDB for the MongoDB store', function() {
+            useMongo(this.sandbox);
+            expect(bulkStore.supportsMongo()).to.equal(true);
+        });
+
+        it('should not use MongoDB for a store with another backend', function() {
+            useMongo(this.sandbox);
+            store.backend = 'memory';
+            expect(bulkStore.supportsMongo()).to.equal(false);
+        });
+    });
+
+    describe('updateTaskDependencies', function() {
+        var tasks;
+
+        beforeEach(function() {
+            tasks = [
+                { graphId: 'testgraphid', taskId: 'task1', state: 'succeeded' },
+                { graphId: 'testgraphid', taskId: 'task2', state: 'failed' }
+            ];
+        });
+
+        it('should use a native bulk store method if there is one', function() {
+            store.updateTaskDependencies = this.sandbox.stub().resolves(tasks);
+            return bulkStore.updateTaskDependencies('testgraphid', tasks)
+            .then(function(evaluated) {
+                expect(store.updateTaskDependencies).to.have.been.calledOnce;
+                expect(store.updateTaskDependencies)
+                    .to.have.been.calledWith('testgraphid', tasks);
+                expect(evaluated).to.deep.equal(tasks);
+            })
+            .finally(function() {
+                delete store.updateTaskDependencies;
+            });
+        });
+
+        it('should fall back to per task store calls', function() {
+            this.sandbox.stub(store, 'setTaskStateInGraph').resolves();
+            this.sandbox.stub(store, 'updateDependentTasks').resolves();
+            this.sandbox.stub(store, 'updateUnreachableTasks').resolves();
+            this.sandbox.stub(store, 'markTaskEvaluated', function(task) {
+                return Promise.resolve(task);
+            });
+
+            return bulkStore.updateTaskDependencies('testgraphid', tasks)
+            .then(function(evaluated) {
+                expect(store.setTaskStateInGraph).to.have.been.calledTwice;
+                expect(store.updateDependentTasks).to.have.been.calledTwice;
+                expect(store.updateUnreachableTasks).to.have.been.calledTwice;
+                expect(store.markTaskEvaluated).to.have.been.calledWith(tasks[0]);
+                expect(store.markTaskEvaluated).to.have.been.calledWith(tasks[1]);
+                expect(evaluated).to.deep.equal(tasks);
+            });
+        });
+
+        it('should update MongoDB with a fixed number of multi document queries', function() {
+            useMongo(this.sandbox, [
+                { graphId: 'testgraphid', taskId: 'task1', evaluated: false },
+                { graphId: 'testgraphid', taskId: 'task2', evaluated: false }
+            ]);
+            this.sandbox.stub(store, 'markTaskEvaluated').resolves();
+
+            return bulkStore.updateTaskDependencies('testgraphid', tasks)
+            .then(function(evaluated) {
+                var updates = waterline.taskdependencies.updateMongo;
+                expect(store.markTaskEvaluated).to.not.have.been.called;
+                expect(waterline.graphobjects.updateMongo).to.have.been.calledOnce;
+                expect(waterline.graphobjects.updateMongo).to.have.been.calledWith(
+                    { instanceId: 'testgraphid' },
+                    { $set: { 'tasks.task1.state': 'succeeded', 'tasks.task2.state': 'failed' } }
+                );
+                expect(updates).to.have.been.calledThrice;
+
+                // Tasks waiting on a state the batch didn't finish in
+                expect(updates.firstCall.args[0].$or).to.deep.equal([
+                    { 'dependencies.task1': { $exists: true, $nin: ['succeeded', 'finished'] } },
+                    { 'dependencies.task2': { $exists: true, $nin: ['failed', 'finished'] } }
+                ]);
+                expect(updates.firstCall.args[1]).to.deep.equal({ $set: { reachable: false } });
+                expect(updates.firstCall.args[2]).to.deep.equal({ multi: true });
+
+                // Then the dependencies that were met, on what is still reachable
+                expect(updates.secondCall.args[0].reachable).to.equal(true);
+                expect(updates.secondCall.args[0].$or).to.deep.equal([
+                    { 'dependencies.task1': { $in: ['succeeded', 'finished'] } },
+                    { 'dependencies.task2': { $in: ['failed', 'finished'] } }
+                ]);
+                expect(updates.secondCall.args[1]).to.deep.equal({
+                    $unset: { 'dependencies.task1': '', 'dependencies.task2': '' }
+                });
+
+                // And the batch is marked evaluated last
+                expect(updates.thirdCall.args[0]).to.deep.equal({
+                    graphId: 'testgraphid',
+                    taskId: { $in: ['task1', 'task2'] },
+                    reachable: true
+                });
+                expect(updates.thirdCall.args[1]).to.deep.equal({ $set: { evaluated: true } });
+                expect(updates.thirdCall.calledAfter(
+                    waterline.graphobjects.updateMongo.firstCall)).to.equal(true);
+                expect(_.pluck(evaluated, 'evaluated')).to.deep.equal([true, true]);
+            });
+        });
+
+        it('should not mark tasks evaluated if a MongoDB update fails', function() {
+            useMongo(this.sandbox);
+            waterline.graphobjects.updateMongo.rejects(new Error('test'));
+
+            return expect(bulkStore.updateTaskDependencies('testgraphid', tasks))
+            .to.be.rejectedWith('test')
+            .then(function() {
+                expect(waterline.taskdependencies.updateMongo).to.not.have.been.calledWith(
+                    sinon.match.any, { $set: { evaluated: true } });
+            });
+        });
+    });
+
+    describe('failGraphTasks', function() {
+        var tasks;
+
+        beforeEach(function() {
+            tasks = [
+                { graphId: 'testgraphid', taskId: 'task1', state: 'cancelled' },
+                { graphId: 'testgraphid', taskId: 'task2', state: 'cancelled' }
+            ];
+        });
+
+        it('should use a native bulk store method if there is one', function() {
+            store.failGraphTasks = this.sandbox.stub().resolves(tasks);
+            return bulkStore.failGraphTasks('testgraphid', tasks)
+            .then(function() {
+                expect(store.failGraphTasks).to.have.been.calledOnce;
+                expect(store.failGraphTasks).to.have.been.calledWith('testgraphid', tasks);
+            })
+            .finally(function() {
+                delete store.failGraphTasks;
+            });
+        });
+
+        it('should fall back to per task store calls', function() {
+            this.sandbox.stub(store, 'setTaskState').resolves();
+            this.sandbox.stub(store, 'markTaskEvaluated').resolves();
+            this.sandbox.stub(store, 'setTaskStateInGraph').resolves();
+
+            return bulkStore.failGraphTasks('testgraphid', tasks)
+            .then(function(failed) {
+                expect(store.setTaskState).to.have.been.calledTwice;
+                expect(store.setTaskState).to.have.been.calledWith(tasks[0]);
+                expect(store.markTaskEvaluated).to.have.been.calledTwice;
+                expect(store.setTaskStateInGraph).to.have.been.calledTwice;
+                expect(store.markTaskEvaluated).to.have.been.calledAfter(store.setTaskState);
+                expect(failed).to.deep.equal(tasks);
+            });
+        });
+
+        it('should update MongoDB with one query per state and one for the graph',
+                function() {
+            useMongo(this.sandbox);
+            tasks.push({ graphId: 'testgraphid', taskId: 'task3', state: 'failed' });
+
+            return bulkStore.failGraphTasks('testgraphid', tasks)
+            .then(function(failed) {
+                var updates = waterline.taskdependencies.updateMongo;
+                expect(updates).to.have.been.calledTwice;
+                expect(updates).to.have.been.calledWith(
+                    {
+                        graphId: 'testgraphid',
+                        taskId: { $in: ['task1', 'task2'] },
+                        reachable: true
+                    },
+                    { $set: { state: 'cancelled', evaluated: true } },
+                    { multi: true }
+                );
+                expect(updates).to.have.been.calledWith(
+                    { graphId: 'testgraphid', taskId: { $in: ['task3'] }, reachable: true },
+                    { $set: { state: 'failed', evaluated: true } },
+                    { multi: true }
+                );
+                expect(waterline.graphobjects.updateMongo).to.have.been.calledOnce;
+                expect(waterline.graphobjects.updateMongo).to.have.been.calledWith(
+                    { instanceId: 'testgraphid' },
+                    { $set: {
+                        'tasks.task1.state': 'cancelled',
+                        'tasks.task2.state': 'cancelled',
+                        'tasks.task3.state': 'failed'
+                    } },
+                    {}
+                );
+                expect(failed).to.deep.equal(tasks);
+            });
+        });
+    });
+
+    describe('checkoutTasks', function() {
+        var tasks;
+
+        beforeEach(function() {
+            tasks = [
+                { graphId: 'testgraphid', taskId: 'task1' },
+                { graphId: 'testgraphid', taskId: 'task2' }
+            ];
+        });
+
+        it('should use native bulk store methods if there are any', function() {
+            store.checkoutTasks = this.sandbox.stub().resolves([tasks[0]]);
+            store.getTasksByIds = this.sandbox.stub().resolves([{ task: {} }]);
+            return bulkStore.checkoutTasks('runnerid', tasks)
+            .then(function(checkedOut) {
+                expect(store.checkoutTasks).to.have.been.calledWith('runnerid', tasks);
+                expect(checkedOut).to.deep.equal([tasks[0]]);
+                return bulkStore.getTasksByIds(checkedOut);
+            })
+            .then(function(results) {
+                expect(store.getTasksByIds).to.have.been.calledWith([tasks[0]]);
+                expect(results).to.deep.equal([{ task: {} }]);
+            })
+            .finally(function() {
+                delete store.checkoutTasks;
+                delete store.getTasksByIds;
+            });
+        });
+
+        it('should fall back to per task store calls', function() {
+            this.sandbox.stub(store, 'checkoutTask');
+            store.checkoutTask.onCall(0).resolves(tasks[0]);
+            store.checkoutTask.onCall(1).resolves(undefined);
+            this.sandbox.stub(store, 'getTaskById');
+            store.getTaskById.onCall(0).resolves(undefined);
+            store.getTaskById.onCall(1).resolves({ task: {} });
+
+            return bulkStore.checkoutTasks('runnerid', tasks)
+            .then(function(checkedOut) {
+                expect(store.checkoutTask).to.have.been.calledWith('runnerid', tasks[0]);
+                expect(store.checkoutTask).to.have.been.calledWith('runnerid', tasks[1]);
+                expect(checkedOut).to.deep.equal([tasks[0]]);
+                return bulkStore.getTasksByIds(tasks);
+            })
+            .then(function(results) {
+                expect(results).to.deep.equal([undefined, { task: {} }]);
+            });
+        });
+
+        it('should check out from MongoDB with one update and one read', function() {
+            useMongo(this.sandbox, [tasks[0]]);
+            waterline.graphobjects.find.resolves([{
+                instanceId: 'testgraphid',
+                context: { graphId: 'testgraphid' },
+                tasks: { task1: { instanceId: 'task1' } }
+            }]);
+
+            return bulkStore.checkoutTasks('runnerid', tasks)
+            .then(function(checkedOut) {
+                var update = waterline.taskdependencies.updateMongo;
+                expect(update).to.have.been.calledOnce;
+                expect(update.firstCall.args[0]).to.deep.equal({
+                    graphId: { $in: ['testgraphid'] },
+                    taskId: { $in: ['task1', 'task2'] },
+                    taskRunnerLease: null,
+                    reachable: true,
+                    state: 'pending'
+                });
+                var claim = update.firstCall.args[1].$set;
+                expect(claim.taskRunnerLease).to.equal('runnerid');
+                expect(update.firstCall.args[2]).to.deep.equal({ multi: true });
+                expect(waterline.taskdependencies.find).to.have.been.calledWith({
+                    taskId: { $in: ['task1', 'task2'] },
+                    taskRunnerLease: 'runnerid',
+                    taskRunnerHeartbeat: claim.taskRunnerHeartbeat
+                });
+                expect(checkedOut).to.deep.equal([tasks[0]]);
+                return bulkStore.getTasksByIds([tasks[0], { graphId: 'other', taskId: 'x' }]);
+            })
+            .then(function(results) {
+                expect(waterline.graphobjects.find).to.have.been.calledOnce;
+                expect(waterline.graphobjects.find).to.have.been.calledWith({
+                    instanceId: { $in: ['testgraphid', 'other'] }
+                });
+                expect(results).to.deep.equal([
+                    {
+                        graphId: 'testgraphid',
+                        context: { graphId: 'testgraphid' },
+                        task: { instanceId: 'task1' }
+                    },
+                    null
+                ]);
+            });
+        });
+
+        it('should not reuse a MongoDB checkout time', function() {
+            useMongo(this.sandbox);
+            return Promise.all([
+                bulkStore.checkoutTasks('runnerid', [tasks[0]]),
+                bulkStore.checkoutTasks('runnerid', [tasks[1]])
+            ])
+            .then(function() {
+                var update = waterline.taskdependencies.updateMongo;
+                expect(update.firstCall.args[1].$set.taskRunnerHeartbeat.getTime())
+                    .to.not.equal(update.secondCall.args[1].$set.taskRunnerHeartbeat.getTime());
+            });
+        });
+    });
+
+    describe('releaseLeases', function() {
+        it('should use a native bulk store method if there is one', function() {
+            var releaseLeases = store.releaseLeases = this.sandbox.stub().resolves();
+            this.sandbox.stub(store, 'expireLease').resolves();
+            return bulkStore.releaseLeases('runnerid', ['task1', 'task2'])
+            .then(function() {
+                expect(releaseLeases).to.have.been.calledWith('runnerid', ['task1', 'task2']);
+                expect(store.expireLease).to.not.have.been.called;
+            })
+            .finally(function() {
+                delete store.releaseLeases;
+            });
+        });
+
+        it('should fall back to expiring each of the runner\'s leases', function() {
+            this.sandbox.stub(store, 'getOwnTasks').resolves([
+                { id: 'doc1', taskId: 'task1', taskRunnerLease: 'runnerid' },
+                { id: 'doc3', taskId: 'task3', taskRunnerLease: 'runnerid' }
+            ]);
+            this.sandbox.stub(store, 'expireLease').resolves();
+            return bulkStore.releaseLeases('runnerid', ['task1', 'task2'])
+            .then(function() {
+                expect(store.getOwnTasks).to.have.been.calledWith('runnerid');
+                expect(store.expireLease).to.have.been.calledOnce;
+                expect(store.expireLease).to.have.been.calledWith('doc1');
+            });
+        });
+
+        it('should release the leases in MongoDB with one update', function() {
+            useMongo(this.sandbox);
+            this.sandbox.stub(store, 'expireLease').resolves();
+            return bulkStore.releaseLeases('runnerid', ['task1', 'task2'])
+            .then(function() {
+                expect(waterline.taskdependencies.updateMongo).to.have.been.calledOnce;
+                expect(waterline.taskdependencies.updateMongo).to.have.been.calledWith(
+                    { taskId: { $in: ['task1', 'task2'] }, taskRunnerLease: 'runnerid' },
+                    { $set: { taskRunnerLease: null, taskRunnerHeartbeat: null } },
+                    { multi: true }
+                );
+                expect(store.expireLease).to.not.have.been.called;
+            });
+        });
+    });
+
+    describe('countCompletedTasks', function() {
+        it('should count the completed tasks in MongoDB', function() {
+            useMongo(this.sandbox);
+            waterline.taskdependencies.count = this.sandbox.stub().resolves(42);
+            return bulkStore.countCompletedTasks()
+            .then(function(count) {
+                expect(count).to.equal(42);
+                expect(waterline.taskdependencies.count).to.have.been.calledWith({
+                    evaluated: true,
+                    reachable: true,
+                    state: Constants.Task.FinishedStates
+                });
+            });
+        });
+
+        it('should resolve null if the store can\'t count', function() {
+            return expect(bulkStore.countCompletedTasks()).to.become(null);
+        });
+    });
+
+    describe('expireLeases', function() {
+        it('should expire the leases in MongoDB with one update', function() {
+            var docs = [
+                { taskId: 'task1', taskRunnerLease: 'runnerid' },
+                { taskId: 'task2', taskRunnerLease: 'runnerid' }
+            ];
+            useMongo(this.sandbox, docs);
+            this.sandbox.stub(store, 'expireLease').resolves();
+            return bulkStore.expireLeases('default', 1000)
+            .then(function(expired) {
+                var query = waterline.taskdependencies.find.firstCall.args[0];
+                expect(query.domain).to.equal('default');
+                expect(query.taskRunnerLease).to.deep.equal({ $ne: null });
+                expect(query.taskRunnerHeartbeat.$lt).to.be.an.instanceof(Date);
+                expect(waterline.taskdependencies.updateMongo).to.have.been.calledOnce;
+                expect(waterline.taskdependencies.updateMongo).to.have.been.calledWith(
+                    _.assign({ taskId: { $in: ['task1', 'task2'] } }, query),
+                    { $set: { taskRunnerLease: null, taskRunnerHeartbeat: null } },
+                    { multi: true }
+                );
+                expect(store.expireLease).to.not.have.been.called;
+                expect(expired).to.deep.equal(docs);
+            });
+        });
+
+        it('should not update MongoDB if no leases have expired', function() {
+            useMongo(this.sandbox);
+            return bulkStore.expireLeases('default', 1000)
+            .then(function(expired) {
+                expect(waterline.taskdependencies.updateMongo).to.not.have.been.called;
+                expect(expired).to.deep.equal([]);
+            });
+        });
+    });
+
+    describe('findActiveGraphsForTargets', function() {
+        it('should find the active graphs with one MongoDB query', function() {
+            var graphs = [{ instanceId: 'graph1', node: 'node1' }];
+            useMongo(this.sandbox);
+            waterline.graphobjects.find.resolves(graphs);
+            return bulkStore.findActiveGraphsForTargets(['node1', 'node2'])
+            .then(function(result) {
+                expect(result).to.equal(graphs);
+                expect(waterline.graphobjects.find).to.have.been.calledOnce;
+                expect(waterline.graphobjects.find).to.have.been.calledWith({
+                    node: ['node1', 'node2'],
+                    _status: Constants.Task.ActiveStates
+                });
+            });
+        });
+
+        it('should fall back to finding each node\'s active graph', function() {
+            var graph = { instanceId: 'graph1', node: 'node1' };
+            this.sandbox.stub(store, 'findActiveGraphForTarget', function(nodeId) {
+                return Promise.resolve(nodeId === 'node1' ? graph : null);
+            });
+            return bulkStore.findActiveGraphsForTargets(['node1', 'node2'])
+            .then(function(result) {
+                expect(store.findActiveGraphForTarget).to.have.been.calledTwice;
+                expect(result).to.deep.equal([graph]);
+            });
+        });
+    });
+
+    describe('persistGraphs', function() {
+        it('should use a native bulk store method if there is one', function() {
+            var graphs = [{ instanceId: 'graph1' }, { instanceId: 'graph2' }];
+            store.persistGraphs = this.sandbox.stub().resolves(graphs);
+            return bulkStore.persistGraphs(graphs)
+            .then(function(result) {
+                expect(store.persistGraphs).to.have.been.calledWith(graphs);
+                expect(result).to.equal(graphs);
+            })
+            .finally(function() {
+                delete store.persistGraphs;
+            });
+        });
+
+        it('should fail every graph if the native method fails', function() {
+            var error = new Error('test');
+            store.persistGraphs = this.sandbox.stub().rejects(error);
+            return bulkStore.persistGraphs([{ instanceId: 'graph1' }, { instanceId: 'graph2' }])
+            .then(function(result) {
+                expect(result).to.deep.equal([error, error]);
+            })
+            .finally(function() {
+                delete store.persistGraphs;
+            });
+        });
+
+        it('should fall back to persisting each graph', function() {
+            var error = new Error('test');
+            var graphs = [
+                { instanceId: 'graph1', persist: sinon.stub() },
+                { instanceId: 'graph2', persist: sinon.stub().rejects(error) }
+            ];
+            graphs[0].persist.resolves(graphs[0]);
+            return bulkStore.persistGraphs(graphs)
+            .then(function(result) {
+                expect(graphs[0].persist).to.have.been.calledOnce;
+                expect(graphs[1].persist).to.have.been.calledOnce;
+                expect(result).to.deep.equal([graphs[0], error]);
+            });
+        });
+
+        describe('with MongoDB', function() {
+            var graphs;
+
+            beforeEach(function() {
+                useMongo(this.sandbox);
+                graphs = _.map(['graph1', 'graph2'], function(graphId) {
+                    return {
+                        instanceId: graphId,
+                        persist: sinon.stub(),
+                        createTaskDependencyItems: sinon.stub().returns([
+                            { taskId: graphId + '-task', dependencies: {} }
+                        ])
+                    };
+                });
+            });
+
+            it('should insert the graphs and their tasks in bulk', function() {
+                return bulkStore.persistGraphs(graphs)
+                .then(function(result) {
+                    expect(result).to.equal(graphs);
+                    expect(graphs[0].persist).to.not.have.been.called;
+                    expect(waterline.graphobjects.createEach).to.have.been.calledOnce;
+                    expect(waterline.graphobjects.createEach.firstCall.args[0])
+                        .to.deep.equal([{ instanceId: 'graph1' }, { instanceId: 'graph2' }]);
+                    expect(waterline.taskdependencies.createEach).to.have.been.calledOnce;
+                    var tasks = waterline.taskdependencies.createEach.firstCall.args[0];
+                    expect(_.pluck(tasks, 'taskId')).to.deep.equal(['graph1-task', 'graph2-task']);
+                    expect(_.pluck(tasks, 'graphId')).to.deep.equal(['graph1', 'graph2']);
+                    expect(tasks[0]).to.have.property('state', 'pending');
+                    expect(tasks[0]).to.have.property('reachable', true);
+                    expect(tasks[0]).to.have.property('taskRunnerLease', null);
+                });
+            });
+
+            it('should persist each graph if the store has another backend', function() {
+                store.backend = 'memory';
+                _.forEach(graphs, function(graph) {
+                    graph.persist.resolves(graph);
+                });
+                return bulkStore.persistGraphs(graphs)
+                .then(function(result) {
+                    expect(result).to.deep.equal(graphs);
+                    expect(graphs[0].persist).to.have.been.calledOnce;
+                    expect(waterline.graphobjects.createEach).to.not.have.been.called;
+                    expect(waterline.taskdependencies.createEach).to.not.have.been.called;
+                })
+                .finally(function() {
+                    delete store.backend;
+                });
+            });
+
+            it('should remove the graphs and fail them all if their tasks fail', function() {
+                var error = new Error('test');
+                waterline.taskdependencies.createEach.rejects(error);
+                return bulkStore.persistGraphs(graphs)
+                .then(function(result) {
+                    expect(result).to.deep.equal([error, error]);
+                    expect(waterline.graphobjects.destroy).to.have.been.calledWith({
+                        instanceId: ['graph1', 'graph2']
+                    });
+                    expect(waterline.taskdependencies.destroy).to.have.been.calledWith({
+                        graphId: ['graph1', 'graph2']
+                    });
+                });
+            });
+        });
+    });
+
+    describe('renewLeases', function() {
+        it('should use a native bulk store method if there is one', function() {
+            var changes = { lost: ['task3'], unowned: [] };
+            store.renewLeases = this.sandbox.stub().resolves(changes);
+            return bulkStore.renewLeases('runnerid', ['task1', 'task2'])
+            .then(function(result) {
+                expect(store.renewLeases).to.have.been.calledWith('runnerid', ['task1', 'task2']);
+                expect(result).to.equal(changes);
+            })
+            .finally(function() {
+                delete store.renewLeases;
+            });
+        });
+
+        it('should not read back owned tasks if the lease count matches', function() {
+            this.sandbox.stub(store, 'heartbeatTasksForRunner').resolves(2);
+            this.sandbox.stub(store, 'getOwnTasks').resolves();
+            return bulkStore.renewLeases('runnerid', ['task1', 'task2'])
+            .then(function(result) {
+                expect(store.heartbeatTasksForRunner).to.have.been.calledWith('runnerid');
+                expect(store.getOwnTasks).to.not.have.been.called;
+                expect(result).to.deep.equal({ lost: [], unowned: [] });
+            });
+        });
+
+        it('should report lost and unowned tasks if the lease count differs', function() {
+            this.sandbox.stub(store, 'heartbeatTasksForRunner').resolves(3);
+            this.sandbox.stub(store, 'getOwnTasks').resolves([
+                { taskId: 'task1' }, { taskId: 'task3' }, { taskId: 'task4' }
+            ]);
+            return bulkStore.renewLeases('runnerid', ['task1', 'task2'])
+            .then(function(result) {
+                expect(store.getOwnTasks).to.have.been.calledOnce;
+                expect(result).to.deep.equal({ lost: ['task3', 'task4'], unowned: ['task2'] });
+            });
+        });
+    });
+});
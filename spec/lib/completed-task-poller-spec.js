@@ -13,6 +13,7 @@ describe("Completed Task Poller", function() {
         eventsProtocol,
         graphProgressService,
         store,
+        bulkStore,
         Rx;
 
     /*
@@ -33,6 +34,10 @@ describe("Completed Task Poller", function() {
     before(function() {
         helper.setupInjector([
             helper.require('/lib/completed-task-poller.js'),
+            helper.require('/lib/metrics.js'),
+            helper.require('/lib/active-graph-index.js'),
+            helper.require('/lib/bulk-store.js'),
+            helper.require('/lib/rx-mixins.js'),
             core.workflowInjectables
         ]);
         Rx = helper.injector.get('Rx');
@@ -40,6 +45,7 @@ describe("Completed Task Poller", function() {
         eventsProtocol = helper.injector.get('Protocol.Events');
         graphProgressService = helper.injector.get('Services.GraphProgress');
         store = helper.injector.get('TaskGraph.Store');
+        bulkStore = helper.injector.get('TaskGraph.BulkStore');
         Constants = helper.injector.get('Constants');
         Promise = helper.injector.get('Promise');
         this.sandbox = sinon.sandbox.create();
@@ -103,6 +109,107 @@ describe("Completed Task Poller", function() {
         expect(poller.debug).to.equal(true);
     });
 
+    describe('drainCompletedTasks', function() {
+        var batches;
+
+        beforeEach(function() {
+            poller = Poller.create(null, {
+                adaptive: true,
+                completedTaskBatchSize: 2,
+                maxCompletedTaskBatchSize: 4
+            });
+            poller.running = true;
+            batches = [];
+            this.sandbox.stub(poller, 'processCompletedTasks', function() {
+                var size = batches.shift();
+                poller.lastBatchSize = size;
+                return size ? Rx.Observable.just([]) : Rx.Observable.empty();
+            });
+        });
+
+        it('should keep draining with larger batches while they are full', function(done) {
+            batches = [2, 4, 4, 1];
+            poller.pollState.interval = 8000;
+
+            poller.drainCompletedTasks(2)
+            .subscribe(function() {}, done, subscribeWrapper(done, function() {
+                expect(_.pluck(poller.processCompletedTasks.args, 0))
+                    .to.deep.equal([2, 4, 4, 4]);
+                expect(poller.pollState.interval).to.equal(poller.pollInterval);
+            }));
+        });
+
+        it('should back off the poll interval while idle', function(done) {
+            batches = [0];
+
+            poller.drainCompletedTasks(2)
+            .subscribe(function() {}, done, subscribeWrapper(done, function() {
+                expect(poller.processCompletedTasks).to.have.been.calledOnce;
+                expect(poller.pollState.interval).to.equal(poller.pollInterval * 2);
+            }));
+        });
+
+        it('should stop draining if a batch could not be deleted', function(done) {
+            poller.processCompletedTasks.restore();
+            this.sandbox.stub(poller, 'processCompletedTasks', function() {
+                poller.lastBatchSize = 2;
+                return Rx.Observable.empty();
+            });
+
+            poller.drainCompletedTasks(2)
+            .subscribe(function() {}, done, subscribeWrapper(done, function() {
+                expect(poller.processCompletedTasks).to.have.been.calledOnce;
+            }));
+        });
+    });
+
+    describe('measureBacklog', function() {
+        beforeEach(function() {
+            this.sandbox.stub(bulkStore, 'countCompletedTasks').resolves(1500);
+        });
+
+        it('should not count the backlog after a short batch', function() {
+            poller.lastBatchSize = 50;
+            return poller.measureBacklog(200)
+            .then(function(backlog) {
+                expect(backlog).to.equal(50);
+                expect(bulkStore.countCompletedTasks).to.not.have.been.called;
+            });
+        });
+
+        it('should count the backlog after a full batch', function() {
+            poller.lastBatchSize = 200;
+            return poller.measureBacklog(200)
+            .then(function(backlog) {
+                expect(backlog).to.equal(1500);
+                expect(poller.backlog).to.equal(1500);
+                expect(bulkStore.countCompletedTasks).to.have.been.calledOnce;
+            });
+        });
+
+        it('should count the backlog at most once per poll interval', function() {
+            poller.lastBatchSize = 200;
+            return poller.measureBacklog(200)
+            .then(function() {
+                return poller.measureBacklog(200);
+            })
+            .then(function(backlog) {
+                expect(backlog).to.equal(1500);
+                expect(bulkStore.countCompletedTasks).to.have.been.calledOnce;
+            });
+        });
+
+        it('should keep the last backlog if the store can\'t count', function() {
+            bulkStore.countCompletedTasks.resolves(null);
+            poller.backlog = 10;
+            poller.lastBatchSize = 200;
+            return poller.measureBacklog(200)
+            .then(function(backlog) {
+                expect(backlog).to.equal(10);
+            });
+        });
+    });
+
     describe('processCompletedTasks', function() {
         it('should process a limited amount', function(done) {
             store.findCompletedTasks.resolves();
@@ -225,6 +332,45 @@ describe("Completed Task Poller", function() {
             }), done);
         });
 
+        it('should check each graph once per batch, preferring failed tasks', function(done) {
+            this.sandbox.stub(poller, 'handlePotentialFinishedGraph', function(data) {
+                return Rx.Observable.just(data);
+            });
+            var tasks = [
+                {
+                    taskId: 'taskId1',
+                    terminalOnStates: ['succeeded', 'failed'],
+                    state: 'succeeded',
+                    graphId: 'graphId1'
+                },
+                {
+                    taskId: 'taskId2',
+                    terminalOnStates: ['succeeded', 'failed'],
+                    state: 'failed',
+                    graphId: 'graphId1'
+                },
+                {
+                    taskId: 'taskId3',
+                    terminalOnStates: ['succeeded'],
+                    state: 'succeeded',
+                    graphId: 'graphId2'
+                },
+                {
+                    taskId: 'taskId4',
+                    terminalOnStates: ['succeeded'],
+                    state: 'succeeded',
+                    graphId: 'graphId2'
+                }
+            ];
+
+            poller.deleteCompletedGraphs(tasks)
+            .subscribe(subscribeWrapper(done, function() {
+                expect(poller.handlePotentialFinishedGraph).to.have.been.calledTwice;
+                expect(poller.handlePotentialFinishedGraph).to.have.been.calledWith(tasks[1]);
+                expect(poller.handlePotentialFinishedGraph).to.have.been.calledWith(tasks[2]);
+            }), done);
+        });
+
         it('should have an output that equals the input', function(done) {
             this.sandbox.stub(poller, 'handlePotentialFinishedGraph', function(data) {
                 return Rx.Observable.just(data);
@@ -0,0 +1,42 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Event Record', function() {
+    var eventRecord;
+
+    before(function() {
+        helper.setupInjector([
+            helper.require('/lib/event-record.js')
+        ]);
+        eventRecord = helper.injector.get('TaskGraph.EventRecord');
+    });
+
+    it('should freeze a record in place', function() {
+        var record = { taskId: 'task1' };
+        expect(eventRecord.freeze(record)).to.equal(record);
+        expect(Object.isFrozen(record)).to.equal(true);
+        expect(eventRecord.freeze(null)).to.equal(null);
+    });
+
+    it('should snapshot data properties and copy the named properties', function() {
+        function FakeTask() {
+            this.instanceId = 'task1';
+            this.state = 'pending';
+            this.definition = { injectableName: 'Task.Test' };
+            this.context = { graphId: 'graph1' };
+        }
+        FakeTask.prototype.run = function() {};
+        var task = new FakeTask();
+
+        var snapshot = eventRecord.snapshot(task, ['context']);
+        task.state = 'succeeded';
+        task.context.output = 'test';
+
+        expect(Object.isFrozen(snapshot)).to.equal(true);
+        expect(snapshot).to.not.have.property('run');
+        expect(snapshot.state).to.equal('pending');
+        expect(snapshot.definition).to.equal(task.definition);
+        expect(snapshot.context).to.deep.equal({ graphId: 'graph1' });
+    });
+});
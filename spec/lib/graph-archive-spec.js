@@ -0,0 +1,197 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Graph Archive', function() {
+    var fs = require('fs');
+    var os = require('os');
+    var path = require('path');
+    var archive;
+    var waterline;
+    var store;
+    var archivePath;
+    var graphs;
+    var Promise;
+
+    before(function() {
+        var di = require('di');
+        var core = require('on-core')(di, __dirname);
+
+        helper.setupInjector(_.flattenDeep([
+            core.workflowInjectables,
+            helper.require('/lib/graph-archive.js')
+        ]));
+        archive = helper.injector.get('TaskGraph.GraphArchive');
+        waterline = helper.injector.get('Services.Waterline');
+        store = helper.injector.get('TaskGraph.Store');
+        Promise = helper.injector.get('Promise');
+        this.sandbox = sinon.sandbox.create();
+    });
+
+    beforeEach(function() {
+        archivePath = path.join(os.tmpdir(), 'graph-archive-' + helper.injector.get('uuid').v4());
+        fs.mkdirSync(archivePath);
+        archive.path = archivePath;
+        archive.byInstanceId = {};
+        archive.byNode = {};
+        archive.indexSizes = {};
+        archive.segmentSizes = {};
+        archive.indexLoadedAt = 0;
+        graphs = [
+            { instanceId: 'graph1', node: 'node1', name: 'Graph.One', _status: 'succeeded',
+                tasks: { task1: { state: 'succeeded' } } },
+            { instanceId: 'graph2', node: 'node1', name: 'Graph.Two', _status: 'failed',
+                tasks: {} },
+            { instanceId: 'graph3', name: 'Graph.Three', _status: 'cancelled', tasks: {} }
+        ];
+    });
+
+    afterEach(function() {
+        this.sandbox.restore();
+        _.forEach(fs.readdirSync(archivePath), function(file) {
+            fs.unlinkSync(path.join(archivePath, file));
+        });
+        fs.rmdirSync(archivePath);
+    });
+
+    after(function() {
+        archive.path = null;
+    });
+
+    it('should read back appended graphs by instanceId', function() {
+        return archive.append(graphs)
+        .then(function(entries) {
+            expect(entries).to.have.length(3);
+            expect(entries[0].offset).to.equal(0);
+            expect(entries[1].offset).to.equal(entries[0].length);
+            return Promise.all([archive.get('graph1'), archive.get('graph3'), archive.get('nope')]);
+        })
+        .spread(function(graph1, graph3, missing) {
+            expect(graph1).to.deep.equal(graphs[0]);
+            expect(graph3).to.deep.equal(graphs[2]);
+            expect(missing).to.equal(null);
+        });
+    });
+
+    it('should pick up index entries written by another process', function() {
+        var other = new archive.constructor({ path: archivePath });
+        return other.append(graphs.slice(0, 1))
+        .then(function() {
+            return other.append(graphs.slice(1));
+        })
+        .then(function() {
+            return archive.findByNode('node1');
+        })
+        .then(function(found) {
+            expect(_.pluck(found, 'instanceId')).to.deep.equal(['graph1', 'graph2']);
+            return archive.get('graph3');
+        })
+        .then(function(graph) {
+            expect(graph).to.deep.equal(graphs[2]);
+        });
+    });
+
+    it('should not overlap the offsets of archivers in different processes', function() {
+        var other = new archive.constructor({ path: archivePath });
+        return Promise.all([
+            archive.append(graphs.slice(0, 2)),
+            other.append(graphs.slice(2)),
+            archive.append(graphs.slice(2))
+        ])
+        .spread(function(first, fromOther, second) {
+            expect(fromOther[0].file).to.not.equal(first[0].file);
+            expect(fromOther[0].offset).to.equal(0);
+            expect(second[0].file).to.equal(first[0].file);
+            expect(second[0].offset).to.equal(first[1].offset + first[1].length);
+            archive.byInstanceId = {};
+            archive.byNode = {};
+            archive.indexSizes = {};
+            return archive.loadIndex();
+        })
+        .then(function() {
+            expect(archive.byNode.node1).to.deep.equal(['graph1', 'graph2']);
+            return Promise.all([archive.get('graph1'), archive.get('graph3')]);
+        })
+        .spread(function(graph1, graph3) {
+            expect(graph1).to.deep.equal(graphs[0]);
+            expect(graph3).to.deep.equal(graphs[2]);
+        });
+    });
+
+    it('should only re-read the index once per refresh interval', function() {
+        var other = new archive.constructor({ path: archivePath });
+        this.sandbox.spy(archive, 'loadIndex');
+        return archive.get('graph1')
+        .then(function(graph) {
+            expect(graph).to.equal(null);
+            return other.append(graphs);
+        })
+        .then(function() {
+            return archive.get('graph1');
+        })
+        .then(function(graph) {
+            expect(graph).to.equal(null);
+            expect(archive.loadIndex).to.have.been.calledOnce;
+            archive.indexLoadedAt = 0;
+            return archive.get('graph1');
+        })
+        .then(function(graph) {
+            expect(graph).to.deep.equal(graphs[0]);
+            expect(archive.loadIndex).to.have.been.calledTwice;
+        });
+    });
+
+    it('should decompress a segment to JSON lines', function() {
+        return archive.append(graphs)
+        .then(function(entries) {
+            var segment = fs.readFileSync(path.join(archivePath, entries[0].file));
+            var lines = require('zlib').gunzipSync(segment).toString().trim().split('\n');
+            expect(_.map(lines, JSON.parse)).to.deep.equal(graphs);
+        });
+    });
+
+    it('should move finished graphs from the store into the archive', function() {
+        var limit = this.sandbox.stub().resolves(graphs);
+        this.sandbox.stub(waterline.graphobjects, 'find').returns({ limit: limit });
+        this.sandbox.stub(store, 'deleteGraph').resolves();
+
+        return archive.archiveFinishedGraphs()
+        .then(function(count) {
+            expect(count).to.equal(3);
+            expect(waterline.graphobjects.find).to.have.been.calledOnce;
+            expect(waterline.graphobjects.find.firstCall.args[0].updatedAt['<'])
+                .to.be.below(new Date(Date.now() - archive.archiveAfter + 1000));
+            expect(limit).to.have.been.calledWith(archive.batchSize);
+            expect(store.deleteGraph).to.have.been.calledThrice;
+            expect(store.deleteGraph).to.have.been.calledWith('graph2');
+            return archive.get('graph2');
+        })
+        .then(function(graph) {
+            expect(graph).to.deep.equal(graphs[1]);
+        });
+    });
+
+    it('should not delete graphs that could not be archived', function() {
+        this.sandbox.stub(waterline.graphobjects, 'find').returns({
+            limit: this.sandbox.stub().resolves(graphs)
+        });
+        this.sandbox.stub(store, 'deleteGraph').resolves();
+        this.sandbox.stub(archive, 'append').rejects(new Error('disk full'));
+
+        return expect(archive.archiveFinishedGraphs()).to.be.rejectedWith('disk full')
+        .then(function() {
+            expect(store.deleteGraph).to.not.have.been.called;
+        });
+    });
+
+    it('should not read anything when no archive path is configured', function() {
+        archive.path = null;
+        this.sandbox.spy(archive, 'loadIndex');
+        return archive.get('graph1')
+        .then(function(graph) {
+            archive.path = archivePath;
+            expect(graph).to.equal(null);
+            expect(archive.loadIndex).to.not.have.been.called;
+        });
+    });
+});
@@ -0,0 +1,69 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Graph Definition Cache', function() {
+    var cache;
+    var definition;
+
+    before(function() {
+        var di = require('di');
+        var core = require('on-core')(di, __dirname);
+
+        helper.setupInjector(_.flattenDeep([
+            core.workflowInjectables,
+            helper.require('/lib/graph-definition-cache.js')
+        ]));
+        cache = helper.injector.get('TaskGraph.GraphDefinitionCache');
+    });
+
+    beforeEach(function() {
+        cache.reset();
+        definition = {
+            injectableName: 'Graph.Reboot.Node',
+            friendlyName: 'Reboot Node',
+            tasks: [ { label: 'reboot', taskName: 'Task.Obm.Node.Reboot' } ]
+        };
+    });
+
+    it('should return copies of cached definitions', function() {
+        expect(cache.get('Graph.Reboot.Node')).to.equal(undefined);
+        cache.set(definition);
+
+        var cached = cache.get('Graph.Reboot.Node');
+        expect(cached).to.deep.equal(definition);
+        cached.tasks.push({ label: 'other' });
+        definition.friendlyName = 'changed';
+        expect(cache.get('Graph.Reboot.Node').tasks).to.have.length(1);
+        expect(cache.get('Graph.Reboot.Node').friendlyName).to.equal('Reboot Node');
+    });
+
+    it('should invalidate a definition', function() {
+        cache.set(definition);
+        cache.set({ injectableName: 'Graph.Other', tasks: [] });
+        cache.invalidate('Graph.Reboot.Node');
+
+        expect(cache.get('Graph.Reboot.Node')).to.equal(undefined);
+        expect(cache.get('Graph.Other')).to.be.ok;
+    });
+
+    it('should expire definitions', function() {
+        var clock = sinon.useFakeTimers(Date.now());
+        try {
+            cache.set(definition);
+            clock.tick(cache.maxAge + 1);
+            expect(cache.get('Graph.Reboot.Node')).to.equal(undefined);
+        } finally {
+            clock.restore();
+        }
+    });
+
+    it('should count hits and misses', function() {
+        cache.get('Graph.Reboot.Node');
+        cache.set(definition);
+        cache.get('Graph.Reboot.Node');
+        cache.get('Graph.Reboot.Node');
+
+        expect(cache.getStats()).to.deep.equal({ hits: 2, misses: 1, size: 1 });
+    });
+});
@@ -0,0 +1,121 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Graph State Cache', function() {
+    var di = require('di');
+    var core = require('on-core')(di, __dirname);
+
+    var GraphStateCache;
+    var Constants;
+    var cache;
+    var graph;
+
+    before(function() {
+        helper.setupInjector([
+            helper.require('/lib/graph-state-cache.js'),
+            core.workflowInjectables
+        ]);
+        GraphStateCache = helper.injector.get('TaskGraph.GraphStateCache');
+        Constants = helper.injector.get('Constants');
+    });
+
+    beforeEach(function() {
+        cache = GraphStateCache.create();
+        // task1 -> task2 -> task3, task4 runs only if task1 fails
+        graph = {
+            instanceId: 'graph1',
+            name: 'Graph.Test',
+            context: { graphName: 'Graph.Test' },
+            tasks: {
+                task1: { injectableName: 'Task.One', state: 'pending', waitingOn: {} },
+                task2: { injectableName: 'Task.Two', state: 'pending',
+                    waitingOn: { task1: 'succeeded' } },
+                task3: { injectableName: 'Task.Three', state: 'pending',
+                    waitingOn: { task2: 'finished' } },
+                task4: { injectableName: 'Task.Four', state: 'pending',
+                    waitingOn: { task1: ['failed', 'timeout'] } }
+            }
+        };
+    });
+
+    it('should find tasks with no dependencies once', function() {
+        cache.load(graph);
+        expect(cache.findReadyTasks('graph1')).to.deep.equal([{
+            domain: undefined,
+            graphId: 'graph1',
+            graphName: 'Graph.Test',
+            taskId: 'task1',
+            taskName: 'Task.One'
+        }]);
+        expect(cache.findReadyTasks('graph1')).to.deep.equal([]);
+    });
+
+    it('should return undefined for graphs that are not cached', function() {
+        expect(cache.findReadyTasks('graph1')).to.equal(undefined);
+        expect(cache.isGraphDone('graph1')).to.equal(undefined);
+    });
+
+    it('should find dependent tasks once their dependencies are satisfied', function() {
+        cache.load(graph);
+        cache.findReadyTasks('graph1');
+        cache.taskFinished('graph1', 'task1', Constants.Task.States.Succeeded);
+        expect(_.pluck(cache.findReadyTasks('graph1'), 'taskId')).to.deep.equal(['task2']);
+        cache.taskFinished('graph1', 'task2', Constants.Task.States.Failed);
+        expect(_.pluck(cache.findReadyTasks('graph1'), 'taskId')).to.deep.equal(['task3']);
+    });
+
+    it('should count unreachable tasks as no longer pending', function() {
+        cache.load(graph);
+        cache.taskFinished('graph1', 'task1', Constants.Task.States.Succeeded);
+        cache.taskFinished('graph1', 'task2', Constants.Task.States.Succeeded);
+        expect(cache.isGraphDone('graph1')).to.equal(false);
+        cache.taskFinished('graph1', 'task3', Constants.Task.States.Succeeded);
+        expect(cache.isGraphDone('graph1')).to.equal(true);
+    });
+
+    it('should mark dependents of unreachable tasks unreachable', function() {
+        cache.load(graph);
+        cache.taskFinished('graph1', 'task1', Constants.Task.States.Failed);
+        expect(cache.isGraphDone('graph1')).to.equal(false);
+        expect(_.pluck(cache.findReadyTasks('graph1'), 'taskId')).to.deep.equal(['task4']);
+        cache.taskFinished('graph1', 'task4', Constants.Task.States.Succeeded);
+        expect(cache.isGraphDone('graph1')).to.equal(true);
+    });
+
+    it('should load task states from the graph object', function() {
+        graph.tasks.task1.state = Constants.Task.States.Succeeded;
+        cache.load(graph);
+        expect(_.pluck(cache.findReadyTasks('graph1'), 'taskId')).to.deep.equal(['task2']);
+        expect(cache.getStats()).to.deep.equal({ graphs: 1, tasks: 4, maxTasks: 100000 });
+    });
+
+    it('should ignore duplicate task finished events', function() {
+        cache.load(graph);
+        cache.taskFinished('graph1', 'task1', Constants.Task.States.Succeeded);
+        cache.taskFinished('graph1', 'task1', Constants.Task.States.Succeeded);
+        cache.taskFinished('graph1', 'task2', Constants.Task.States.Succeeded);
+        expect(cache.isGraphDone('graph1')).to.equal(false);
+    });
+
+    it('should return an unscheduled task again until it finishes', function() {
+        cache.load(graph);
+        expect(_.pluck(cache.findReadyTasks('graph1'), 'taskId')).to.deep.equal(['task1']);
+        expect(cache.findReadyTasks('graph1')).to.be.empty;
+        cache.taskUnscheduled('graph1', 'task1');
+        expect(_.pluck(cache.findReadyTasks('graph1'), 'taskId')).to.deep.equal(['task1']);
+        cache.taskFinished('graph1', 'task1', Constants.Task.States.Succeeded);
+        cache.taskUnscheduled('graph1', 'task1');
+        expect(_.pluck(cache.findReadyTasks('graph1'), 'taskId')).to.not.contain('task1');
+    });
+
+    it('should evict least recently used graphs over the task limit', function() {
+        cache = GraphStateCache.create({ maxTasks: 6 });
+        cache.load(graph);
+        cache.load(_.defaults({ instanceId: 'graph2' }, graph));
+        expect(cache.has('graph1')).to.equal(false);
+        expect(cache.has('graph2')).to.equal(true);
+        cache.evict('graph2');
+        expect(cache.has('graph2')).to.equal(false);
+    });
+});
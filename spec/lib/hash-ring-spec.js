@@ -0,0 +1,53 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Hash Ring', function() {
+    var HashRing;
+    var keys;
+
+    before(function() {
+        helper.setupInjector([
+            helper.require('/lib/hash-ring.js')
+        ]);
+        HashRing = helper.injector.get('TaskGraph.HashRing');
+        keys = _.map(_.range(1000), function(i) { return 'graph' + i; });
+    });
+
+    function owners(ring) {
+        return _.map(keys, ring.owner.bind(ring));
+    }
+
+    it('should have no owner without members', function() {
+        expect(HashRing.create([]).owner('graph1')).to.equal(undefined);
+    });
+
+    it('should give every key to a single member', function() {
+        expect(_.uniq(owners(HashRing.create(['a'])))).to.deep.equal(['a']);
+    });
+
+    it('should assign keys the same way regardless of member order', function() {
+        expect(owners(HashRing.create(['a', 'b', 'c'])))
+            .to.deep.equal(owners(HashRing.create(['c', 'a', 'b'])));
+    });
+
+    it('should spread keys across members', function() {
+        var counts = _.countBy(owners(HashRing.create(['a', 'b', 'c', 'd'])));
+        _.forEach(['a', 'b', 'c', 'd'], function(member) {
+            expect(counts[member]).to.be.within(150, 350);
+        });
+    });
+
+    it('should only move keys owned by a member that leaves', function() {
+        var ring = HashRing.create(['a', 'b', 'c']);
+        var before = owners(ring);
+        ring.setMembers(['a', 'b']);
+        var after = owners(ring);
+        _.forEach(keys, function(key, i) {
+            if (before[i] !== 'c') {
+                expect(after[i]).to.equal(before[i]);
+            }
+        });
+        expect(ring.members).to.deep.equal(['a', 'b']);
+    });
+});
@@ -0,0 +1,104 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Leader Election', function() {
+    var LeaderElection;
+    var consul;
+    var election;
+
+    before(function() {
+        helper.setupInjector([
+            helper.require('/lib/leader-election.js')
+        ]);
+        LeaderElection = helper.injector.get('TaskGraph.LeaderElection');
+    });
+
+    beforeEach(function() {
+        consul = {
+            session: {
+                create: sinon.stub().resolves([{ ID: 'sessionid' }, {}]),
+                renew: sinon.stub().resolves([[{ ID: 'sessionid' }], {}]),
+                destroy: sinon.stub().resolves([true, {}])
+            },
+            kv: {
+                set: sinon.stub().resolves([true, {}])
+            }
+        };
+        election = LeaderElection.create(consul, {
+            key: 'taskgraph/default/leader',
+            candidateId: 'schedulerid'
+        });
+    });
+
+    it('should not be leader before it has acquired the lock', function() {
+        expect(election.isLeader()).to.equal(false);
+    });
+
+    it('should acquire the lock with a new session', function() {
+        return election.refresh()
+        .then(function(leader) {
+            expect(leader).to.equal(true);
+            expect(election.isLeader()).to.equal(true);
+            expect(consul.session.create).to.have.been.calledWith({
+                name: 'taskgraph/default/leader',
+                ttl: '15s',
+                behavior: 'release'
+            });
+            expect(consul.kv.set).to.have.been.calledWith({
+                key: 'taskgraph/default/leader',
+                value: 'schedulerid',
+                acquire: 'sessionid'
+            });
+        });
+    });
+
+    it('should renew its session on later refreshes', function() {
+        return election.refresh()
+        .then(function() {
+            return election.refresh();
+        })
+        .then(function() {
+            expect(consul.session.create).to.have.been.calledOnce;
+            expect(consul.session.renew).to.have.been.calledOnce;
+            expect(consul.session.renew).to.have.been.calledWith('sessionid');
+            expect(consul.kv.set).to.have.been.calledTwice;
+        });
+    });
+
+    it('should not be leader if another candidate holds the lock', function() {
+        consul.kv.set.resolves([false, {}]);
+        return election.refresh()
+        .then(function(leader) {
+            expect(leader).to.equal(false);
+        });
+    });
+
+    it('should give up leadership and its session if Consul fails', function() {
+        return election.refresh()
+        .then(function() {
+            consul.session.renew.rejects(new Error('Session id not found'));
+            return election.refresh();
+        })
+        .then(function(leader) {
+            expect(leader).to.equal(false);
+            expect(election.session).to.equal(null);
+            return election.refresh();
+        })
+        .then(function(leader) {
+            expect(leader).to.equal(true);
+            expect(consul.session.create).to.have.been.calledTwice;
+        });
+    });
+
+    it('should destroy its session when resigning', function() {
+        return election.refresh()
+        .then(function() {
+            return election.resign();
+        })
+        .then(function() {
+            expect(consul.session.destroy).to.have.been.calledWith('sessionid');
+            expect(election.isLeader()).to.equal(false);
+        });
+    });
+});
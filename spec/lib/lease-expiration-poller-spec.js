@@ -31,6 +31,8 @@ describe("Lease Expiration Poller", function() {
     before(function() {
         helper.setupInjector([
             helper.require('/lib/lease-expiration-poller.js'),
+            helper.require('/lib/metrics.js'),
+            helper.require('/lib/bulk-store.js'),
             core.workflowInjectables
         ]);
         Rx = helper.injector.get('Rx');
@@ -57,6 +59,48 @@ describe("Lease Expiration Poller", function() {
         expect(poller.pollInterval).to.equal(Constants.Task.DefaultLeaseAdjust * 2);
         expect(poller.schedulerId).to.equal('testid');
         expect(poller.domain).to.equal('default');
+        expect(poller.jitter).to.equal(0.5);
+    });
+
+    it('should jitter polls by up to a fraction of the poll interval', function() {
+        this.sandbox.stub(Math, 'random').returns(0);
+        expect(poller.getPollDelay()).to.equal(poller.pollInterval);
+        Math.random.returns(0.999);
+        expect(poller.getPollDelay()).to.equal(Math.round(poller.pollInterval * (1 - 0.4995)));
+        poller.jitter = 0;
+        expect(poller.getPollDelay()).to.equal(poller.pollInterval);
+    });
+
+    it('should only sweep on the leader scheduler', function() {
+        expect(poller.isLeader()).to.equal(true);
+        var scheduler = { schedulerId: 'testid', domain: 'default', isLeader: sinon.stub() };
+        var leaderPoller = Poller.create(scheduler, {});
+        scheduler.isLeader.returns(false);
+        expect(leaderPoller.isLeader()).to.equal(false);
+        scheduler.isLeader.returns(true);
+        expect(leaderPoller.isLeader()).to.equal(true);
+    });
+
+    it('should poll for expired leases while running', function(done) {
+        var scheduler = { schedulerId: 'testid', domain: 'default', isLeader: sinon.stub() };
+        scheduler.isLeader.onCall(0).returns(false);
+        scheduler.isLeader.returns(true);
+        poller = Poller.create(scheduler, { pollInterval: 1 });
+        this.sandbox.stub(poller, 'expireLeases', function() {
+            if (poller.expireLeases.callCount === 2) {
+                poller.stop();
+                setTimeout(function() {
+                    try {
+                        expect(scheduler.isLeader.callCount).to.equal(3);
+                        done();
+                    } catch (e) {
+                        done(e);
+                    }
+                }, 10);
+            }
+            return Rx.Observable.empty();
+        });
+        poller.start();
     });
 
 
@@ -98,6 +142,48 @@ describe("Lease Expiration Poller", function() {
             );
         });
 
+        it('should expire leases in one call if the store supports it', function(done) {
+            var leases = [{ id: 'testid1' }, { id: 'testid2' }];
+            var expireLeases = store.expireLeases = this.sandbox.stub().resolves(leases);
+            var expired = [];
+
+            poller.expireLeases()
+            .subscribe(
+                function(doc) { expired.push(doc); },
+                done,
+                subscribeWrapper(done, function() {
+                    delete store.expireLeases;
+                    expect(expireLeases).to.have.been.calledWith(
+                        poller.domain, poller.leaseAdjust);
+                    expect(store.findExpiredLeases).to.not.have.been.called;
+                    expect(store.expireLease).to.not.have.been.called;
+                    expect(expired).to.deep.equal(leases);
+                })
+            );
+        });
+
+        it('should hand the expired tasks to the scheduler', function(done) {
+            var leases = [{ id: 'testid1', graphId: 'graph1', taskId: 'task1' }];
+            var scheduler = {
+                schedulerId: 'testid',
+                domain: 'default',
+                handleExpiredLeases: sinon.stub()
+            };
+            store.findExpiredLeases.resolves(leases);
+            store.expireLease.resolves();
+            poller = Poller.create(scheduler, {});
+
+            poller.expireLeases()
+            .subscribe(
+                function() {},
+                done,
+                subscribeWrapper(done, function() {
+                    expect(scheduler.handleExpiredLeases).to.have.been.calledOnce;
+                    expect(scheduler.handleExpiredLeases).to.have.been.calledWith(leases);
+                })
+            );
+        });
+
         it('should expire leases', function(done) {
             var leases = [
                 { id: 'testid1' },
@@ -0,0 +1,97 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Library Manifest', function() {
+    var fs = require('fs');
+    var os = require('os');
+    var path = require('path');
+    var libraryManifest = helper.require('/lib/library-manifest.js');
+    var manifestPath = path.join(os.tmpdir(), 'on-taskgraph-manifest-spec.json');
+    var version = helper.require('/package.json').version;
+    var nodeEnv;
+
+    beforeEach(function() {
+        this.sandbox = sinon.sandbox.create();
+        nodeEnv = process.env.NODE_ENV;
+        delete process.env.NODE_ENV;
+    });
+
+    afterEach(function() {
+        this.sandbox.restore();
+        process.env.NODE_ENV = nodeEnv;
+        if (nodeEnv === undefined) {
+            delete process.env.NODE_ENV;
+        }
+        if (fs.existsSync(manifestPath)) {
+            fs.unlinkSync(manifestPath);
+        }
+    });
+
+    it('should compile the graph library and module paths', function() {
+        var manifest = libraryManifest.build();
+
+        expect(manifest.version).to.equal(version);
+        expect(manifest.graphs).to.not.be.empty;
+        _.forEach(manifest.graphs, function(graph) {
+            expect(graph).to.have.property('injectableName').that.is.a('string');
+        });
+        expect(manifest.modules.services).to.include(
+            'lib/services/workflow-api-service.js');
+        expect(manifest.modules.views).to.deep.equal(['api/rest/view/view.js']);
+    });
+
+    it('should read back a written manifest', function() {
+        var written = libraryManifest.write(manifestPath);
+
+        expect(libraryManifest.read(manifestPath)).to.deep.equal(written);
+    });
+
+    it('should not use a manifest built for another version', function() {
+        var manifest = libraryManifest.build();
+        manifest.version = '0.0.0';
+        fs.writeFileSync(manifestPath, JSON.stringify(manifest));
+
+        expect(libraryManifest.read(manifestPath)).to.equal(null);
+    });
+
+    it('should not use a manifest built from other sources', function() {
+        var manifest = libraryManifest.build();
+        manifest.sources = 'stale';
+        manifest.files['lib/graphs/stale-graph.js'] = { size: 1, mtime: 0 };
+        fs.writeFileSync(manifestPath, JSON.stringify(manifest));
+
+        expect(libraryManifest.read(manifestPath)).to.equal(null);
+    });
+
+    it('should not hash sources whose sizes and times are unchanged', function() {
+        var manifest = libraryManifest.build();
+        var readFileSync = this.sandbox.spy(fs, 'readFileSync');
+        fs.writeFileSync(manifestPath, JSON.stringify(manifest));
+
+        expect(libraryManifest.read(manifestPath)).to.deep.equal(manifest);
+        expect(readFileSync).to.have.been.calledOnce;
+        expect(readFileSync).to.have.been.calledWith(manifestPath);
+    });
+
+    it('should hash sources whose sizes or times changed', function() {
+        var manifest = libraryManifest.build();
+        _.forEach(manifest.files, function(stat) {
+            stat.mtime += 1000;
+        });
+        fs.writeFileSync(manifestPath, JSON.stringify(manifest));
+
+        expect(libraryManifest.read(manifestPath)).to.deep.equal(manifest);
+    });
+
+    it('should not use a manifest in development', function() {
+        libraryManifest.write(manifestPath);
+        process.env.NODE_ENV = 'development';
+
+        expect(libraryManifest.read(manifestPath)).to.equal(null);
+    });
+
+    it('should not use a missing manifest', function() {
+        expect(libraryManifest.read(manifestPath)).to.equal(null);
+    });
+});
@@ -136,5 +136,62 @@ describe('Loader', function () {
                 expect(loader.persistGraphs).to.have.been.calledWith(expectedResults);
             });
         });
+
+        it('should only write new or changed definitions', function() {
+            var self = this;
+            var changedGraph = _.cloneDeep(self.graphCatalog[0]);
+            changedGraph.friendlyName = 'Reboot Node Now';
+            var newTask = { injectableName: 'Task.Obm.Node.PowerOff',
+                            properties: { power: {} },
+                            friendlyName: 'Power Off Node',
+                            implementsTask: 'Task.Base.Obm.Node',
+                            options: { action: 'powerOff' } };
+
+            loader.graphLibrary = [changedGraph, _.cloneDeep(self.graphCatalog[1])];
+            loader.taskLibrary = _.cloneDeep(self.taskCatalog).concat([newTask]);
+
+            return loader.load()
+            .then(function() {
+                expect(store.persistGraphDefinition).to.have.been.calledOnce;
+                expect(store.persistGraphDefinition).to.have.been.calledWith(changedGraph);
+                expect(store.persistTaskDefinition).to.have.been.calledOnce;
+                expect(store.persistTaskDefinition).to.have.been.calledWith(newTask);
+            });
+        });
+
+        it('should ignore store fields and key order when comparing definitions', function() {
+            var self = this;
+            store.getTaskDefinitions.resolves(_.map(self.taskCatalog, function(task) {
+                return _.merge({ id: 'abc', createdAt: new Date(), updatedAt: new Date() },
+                    _.omit(task, 'injectableName'), { injectableName: task.injectableName });
+            }));
+            loader.graphLibrary = _.cloneDeep(self.graphCatalog);
+            loader.taskLibrary = _.cloneDeep(self.taskCatalog);
+
+            return loader.load()
+            .then(function() {
+                expect(store.persistTaskDefinition).to.not.have.been.called;
+                expect(store.persistGraphDefinition).to.not.have.been.called;
+            });
+        });
+
+        it('should not read definitions back from the store after writing', function() {
+            loader.graphLibrary = [];
+            loader.taskLibrary = [];
+
+            return loader.load()
+            .then(function() {
+                expect(store.getTaskDefinitions).to.have.been.calledOnce;
+                expect(store.getGraphDefinitions).to.have.been.calledOnce;
+            });
+        });
+
+        it('should write every definition when no stored hashes are given', function() {
+            var self = this;
+            return loader.persistTasks(self.taskCatalog)
+            .then(function() {
+                expect(store.persistTaskDefinition).to.have.callCount(self.taskCatalog.length);
+            });
+        });
     });
 });
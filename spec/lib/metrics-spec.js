@@ -0,0 +1,90 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Metrics', function() {
+    var metrics;
+    var Promise;
+
+    before(function() {
+        helper.setupInjector([
+            helper.require('/lib/metrics.js')
+        ]);
+        metrics = helper.injector.get('TaskGraph.Metrics');
+        Promise = helper.injector.get('Promise');
+    });
+
+    beforeEach(function() {
+        metrics.reset();
+    });
+
+    it('should render counters and gauges with labels', function() {
+        var counter = metrics.counter('test_events_total', 'Test events', ['kind']);
+        var gauge = metrics.gauge('test_depth', 'Test depth');
+        counter.inc(undefined, { kind: 'a' });
+        counter.inc(2, { kind: 'a' });
+        counter.inc(1, { kind: 'b"c' });
+        gauge.set(7);
+
+        var text = metrics.render();
+        expect(text).to.contain('# TYPE test_events_total counter\n');
+        expect(text).to.contain('test_events_total{kind="a"} 3\n');
+        expect(text).to.contain('test_events_total{kind="b\\"c"} 1\n');
+        expect(text).to.contain('# HELP test_depth Test depth\n# TYPE test_depth gauge\n' +
+            'test_depth 7\n');
+    });
+
+    it('should render histograms with cumulative buckets', function() {
+        var histogram = metrics.histogram('test_latency', 'Test latency', ['stage'], [10, 100]);
+        histogram.observe(5, { stage: 'x' });
+        histogram.observe(50, { stage: 'x' });
+        histogram.observe(500, { stage: 'x' });
+
+        var text = metrics.render();
+        expect(text).to.contain('test_latency_bucket{stage="x",le="10"} 1\n');
+        expect(text).to.contain('test_latency_bucket{stage="x",le="100"} 2\n');
+        expect(text).to.contain('test_latency_bucket{stage="x",le="+Inf"} 3\n');
+        expect(text).to.contain('test_latency_sum{stage="x"} 555\n');
+        expect(text).to.contain('test_latency_count{stage="x"} 3\n');
+    });
+
+    it('should return the existing metric when registered twice', function() {
+        var histogram = metrics.histogram('test_shared', 'Shared');
+        expect(metrics.histogram('test_shared', 'Shared')).to.equal(histogram);
+        expect(function() {
+            metrics.gauge('test_shared', 'Shared');
+        }).to.throw(Error);
+    });
+
+    it('should time asynchronous calls, including failures', function() {
+        var histogram = metrics.histogram('test_timed', 'Timed', ['method']);
+        return histogram.time({ method: 'ok' }, function() {
+            return Promise.delay(5).then(function() { return 'result'; });
+        })
+        .then(function(result) {
+            expect(result).to.equal('result');
+            return histogram.time({ method: 'fail' }, function() {
+                return Promise.reject(new Error('test'));
+            });
+        })
+        .then(function() {
+            throw new Error('expected the timed call to fail');
+        }, function(error) {
+            expect(error.message).to.equal('test');
+            var text = metrics.render();
+            expect(text).to.contain('test_timed_count{method="ok"} 1\n');
+            expect(text).to.contain('test_timed_count{method="fail"} 1\n');
+        });
+    });
+
+    it('should run collectors before rendering until they are removed', function() {
+        var gauge = metrics.gauge('test_collected', 'Collected');
+        var value = 1;
+        var stop = metrics.collect(function() { gauge.set(value); });
+
+        expect(metrics.render()).to.contain('test_collected 1\n');
+        stop();
+        value = 2;
+        expect(metrics.render()).to.contain('test_collected 1\n');
+    });
+});
@@ -60,4 +60,184 @@ describe('Rx Mixins', function () {
             }
         );
     });
+
+    it('should poll on an adaptive interval', function(done) {
+        var pollState = { interval: 1, min: 1, wakeups: 0, saved: 0 };
+        var results = [];
+
+        Rx.Observable.adaptiveInterval(pollState)
+        .tap(function() {
+            pollState.interval = 3;
+        })
+        .take(3)
+        .subscribe(
+            function(val) {
+                results.push(val);
+            },
+            done,
+            function() {
+                try {
+                    expect(results).to.deep.equal([1, 2, 3]);
+                    expect(pollState.wakeups).to.equal(3);
+                    expect(pollState.saved).to.equal(4);
+                    done();
+                } catch (e) {
+                    done(e);
+                }
+            }
+        );
+    });
+
+    describe('mergePriority', function() {
+        function counter(max, maxQueueDepth) {
+            return {
+                count: 0,
+                max: max,
+                queue: [],
+                maxQueueDepth: maxQueueDepth,
+                queued: 0,
+                dropped: 0
+            };
+        }
+
+        it('should queue async calls over max concurrent instead of dropping them',
+                function(done) {
+            var results = [];
+            var concurrentCounter = counter(2, 10);
+
+            Rx.Observable.from([1,2,3,4,5])
+            .map(function(val) {
+                return Promise.resolve(val);
+            })
+            .mergePriority(concurrentCounter)
+            .subscribe(
+                function(val) {
+                    results.push(val);
+                },
+                done,
+                function() {
+                    try {
+                        expect(results.sort()).to.deep.equal([1,2,3,4,5]);
+                        expect(concurrentCounter.count).to.equal(0);
+                        expect(concurrentCounter.queued).to.equal(3);
+                        expect(concurrentCounter.dropped).to.equal(0);
+                        done();
+                    } catch (e) {
+                        done(e);
+                    }
+                }
+            );
+        });
+
+        it('should drop calls once the queue is full', function(done) {
+            var results = [];
+            var concurrentCounter = counter(1, 2);
+
+            Rx.Observable.from([1,2,3,4,5])
+            .map(function(val) {
+                return Promise.resolve(val);
+            })
+            .mergePriority(concurrentCounter)
+            .subscribe(
+                function(val) {
+                    results.push(val);
+                },
+                done,
+                function() {
+                    try {
+                        expect(results).to.deep.equal([1,2,3]);
+                        expect(concurrentCounter.queued).to.equal(2);
+                        expect(concurrentCounter.dropped).to.equal(2);
+                        done();
+                    } catch (e) {
+                        done(e);
+                    }
+                }
+            );
+        });
+
+        it('should report dropped calls to onDropped', function(done) {
+            var dropped = [];
+            var concurrentCounter = counter(1, 1);
+            var sources = _.map([1,2,3,4], function(val) {
+                return Rx.Observable.just(val).delay(1);
+            });
+
+            Rx.Observable.from(sources)
+            .mergePriority(concurrentCounter, 0, function(source) {
+                dropped.push(source);
+            })
+            .toArray()
+            .subscribe(
+                function(results) {
+                    try {
+                        expect(results).to.deep.equal([1,2]);
+                        expect(dropped).to.have.length(2);
+                        expect(dropped[0]).to.equal(sources[2]);
+                        expect(dropped[1]).to.equal(sources[3]);
+                        done();
+                    } catch (e) {
+                        done(e);
+                    }
+                },
+                done
+            );
+        });
+
+        it('should serve queued calls from higher priority streams first', function(done) {
+            var results = [];
+            var concurrentCounter = counter(1, 10);
+            var blocker = new Rx.Subject();
+
+            function delayed(val) {
+                return Promise.delay(1).then(function() { return val; });
+            }
+
+            Rx.Observable.merge(
+                Rx.Observable.just(blocker).mergePriority(concurrentCounter, 0),
+                Rx.Observable.from(['low1', 'low2']).map(delayed)
+                    .mergePriority(concurrentCounter, 2),
+                Rx.Observable.from(['high1', 'high2']).map(delayed)
+                    .mergePriority(concurrentCounter, 1)
+            )
+            .subscribe(
+                function(val) {
+                    results.push(val);
+                },
+                done,
+                function() {
+                    try {
+                        expect(results).to.deep.equal(['high1', 'high2', 'low1', 'low2']);
+                        done();
+                    } catch (e) {
+                        done(e);
+                    }
+                }
+            );
+
+            blocker.onCompleted();
+        });
+
+        it('should count dropped calls for mergeLossy counters', function(done) {
+            var concurrentCounter = counter(1, 0);
+
+            Rx.Observable.from([1,2,3])
+            .map(function(val) {
+                return Promise.resolve(val);
+            })
+            .mergeLossy(concurrentCounter)
+            .subscribe(
+                function() {},
+                done,
+                function() {
+                    try {
+                        expect(concurrentCounter.dropped).to.equal(2);
+                        done();
+                    } catch (e) {
+                        done(e);
+                    }
+                }
+            );
+        });
+    });
 });
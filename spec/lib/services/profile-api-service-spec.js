@@ -28,6 +28,10 @@ describe("Http.Services.Api.Profiles", function () {
                 }
             }, 'Profiles'),
             helper.require("/lib/services/workflow-api-service"),
+            helper.require("/lib/graph-archive"),
+            helper.require("/lib/graph-definition-cache"),
+            helper.require("/lib/bulk-store"),
+            helper.require("/lib/active-graph-index"),
             helper.require("/lib/services/profile-api-service"),
             helper.require("/lib/services/swagger-api-service"),
             helper.require("/api/rest/view/view"),
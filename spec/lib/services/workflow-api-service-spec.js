@@ -21,6 +21,8 @@ describe('Taskgraph.Services.Api.Workflows', function () {
     var TaskGraphRunner;
     var eventsProtocol;
     var taskGraphProtocol;
+    var graphDefinitionCache;
+    var activeGraphIndex;
     var graphId;
     var nodeId;
 
@@ -55,6 +57,8 @@ describe('Taskgraph.Services.Api.Workflows', function () {
         TaskGraphRunner = helper.injector.get('TaskGraph.Runner');
         eventsProtocol = helper.injector.get('Protocol.Events');
         taskGraphProtocol = helper.injector.get('Protocol.TaskGraphRunner');
+        graphDefinitionCache = helper.injector.get('TaskGraph.GraphDefinitionCache');
+        activeGraphIndex = helper.injector.get('TaskGraph.ActiveGraphIndex');
         var uuid = helper.injector.get('uuid');
         graphId = uuid.v4();
         nodeId = uuid.v4();
@@ -92,6 +96,8 @@ describe('Taskgraph.Services.Api.Workflows', function () {
                                _status: 'cancelled',
                                active: sinon.spy()
                               };
+        graphDefinitionCache.reset();
+        activeGraphIndex.reset();
         TaskGraphRunner.taskScheduler = {
             evaluateGraphStream: {
                 onNext: sinon.stub()
@@ -390,6 +396,148 @@ describe('Taskgraph.Services.Api.Workflows', function () {
             .to.be.rejectedWith(Errors.NotFoundError);
     });
 
+    describe('createAndRunGraphs', function() {
+        var bulkStore;
+
+        beforeEach(function() {
+            bulkStore = helper.injector.get('TaskGraph.BulkStore');
+            this.sandbox.stub(bulkStore, 'persistGraphs', function(graphs) {
+                return Promise.resolve(graphs);
+            });
+            this.sandbox.stub(workflowApiService, 'createGraph',
+                function(definition, options, context) {
+                    return Promise.resolve({
+                        instanceId: 'graph-' + context.target,
+                        name: definition.injectableName,
+                        context: context
+                    });
+                }
+            );
+            workflowApiService.findGraphDefinitionByName.resolves(graphDefinition);
+            this.sandbox.stub(bulkStore, 'findActiveGraphsForTargets').resolves([]);
+            waterline.nodes.find = sinon.stub().resolves([{ id: 'node1' }, { id: 'node2' }]);
+        });
+
+        it('should look up nodes and active graphs together', function() {
+            return workflowApiService.createAndRunGraphs([
+                { nodeId: 'node1', name: 'Graph.Test', options: { test: 1 } },
+                { nodeId: 'node2', name: 'Graph.Test' }
+            ])
+            .then(function(results) {
+                expect(waterline.nodes.find).to.have.been.calledOnce;
+                expect(waterline.nodes.find).to.have.been.calledWith({ id: ['node1', 'node2'] });
+                expect(waterline.nodes.needByIdentifier).to.not.have.been.called;
+                expect(bulkStore.findActiveGraphsForTargets).to.have.been.calledOnce;
+                expect(bulkStore.findActiveGraphsForTargets)
+                    .to.have.been.calledWith(['node1', 'node2']);
+                expect(workflowApiService.findGraphDefinitionByName).to.have.been.calledOnce;
+                expect(workflowApiService.createGraph).to.have.been.calledWith(
+                    graphDefinition, { test: 1 }, { target: 'node1' });
+                expect(bulkStore.persistGraphs).to.have.been.calledOnce;
+                expect(bulkStore.persistGraphs.firstCall.args[0]).to.have.length(2);
+                expect(eventsProtocol.publishGraphStarted).to.have.been.calledTwice;
+                expect(workflowApiService.runTaskGraph).to.have.been.calledTwice;
+                expect(workflowApiService.runTaskGraph).to.have.been.calledWith('graph-node1');
+
+                expect(_.pluck(results, 'status')).to.deep.equal([201, 201]);
+                expect(results[0].nodeId).to.equal('node1');
+                expect(results[0].workflow.instanceId).to.equal('graph-node1');
+                expect(results[0].workflow._status).to.equal('running');
+            });
+        });
+
+        it('should return a result for each failed workflow', function() {
+            bulkStore.findActiveGraphsForTargets.resolves([
+                { node: 'node2', _status: 'running' }
+            ]);
+            return workflowApiService.createAndRunGraphs([
+                { nodeId: 'node1' },
+                { nodeId: 'node2', name: 'Graph.Test' },
+                { nodeId: 'node1', name: 'Graph.Test' },
+                { nodeId: 'node1', name: 'Graph.Test' }
+            ])
+            .then(function(results) {
+                expect(_.pluck(results, 'status')).to.deep.equal([400, 500, 201, 500]);
+                expect(results[0].error).to.match(/Graph name is missing/);
+                expect(results[1].error).to.match(/multiple task graphs/);
+                expect(results[3].error).to.match(/multiple task graphs/);
+                expect(bulkStore.persistGraphs.firstCall.args[0]).to.have.length(1);
+                expect(workflowApiService.runTaskGraph).to.have.been.calledOnce;
+            });
+        });
+
+        it('should look up identifiers that are not node ids one at a time', function() {
+            waterline.nodes.find.resolves([]);
+            waterline.nodes.needByIdentifier = sinon.spy(function(id) {
+                if (id === 'missing') {
+                    return Promise.reject(new Errors.NotFoundError('Not Found'));
+                }
+                return Promise.resolve({ id: 'node3' });
+            });
+            return workflowApiService.createAndRunGraphs([
+                { nodeId: '00:11:22:33:44:55', name: 'Graph.Test' },
+                { nodeId: 'missing', name: 'Graph.Test' }
+            ])
+            .then(function(results) {
+                expect(waterline.nodes.needByIdentifier).to.have.been.calledTwice;
+                expect(bulkStore.findActiveGraphsForTargets)
+                    .to.have.been.calledWith(['node3']);
+                expect(_.pluck(results, 'status')).to.deep.equal([201, 404]);
+            });
+        });
+
+        it('should not run graphs that failed to persist', function() {
+            bulkStore.persistGraphs.restore();
+            this.sandbox.stub(bulkStore, 'persistGraphs').resolves([new Error('test')]);
+            return workflowApiService.createAndRunGraphs([
+                { nodeId: 'node1', name: 'Graph.Test' }
+            ])
+            .then(function(results) {
+                expect(results[0].status).to.equal(500);
+                expect(results[0].error).to.equal('test');
+                expect(workflowApiService.runTaskGraph).to.not.have.been.called;
+            });
+        });
+
+        it('should reject if the workflows are not an array', function() {
+            return expect(workflowApiService.createAndRunGraphs({ name: 'Graph.Test' }))
+                .to.be.rejectedWith(Errors.BadRequestError);
+        });
+    });
+
+    it('should find active graphs through the active graph index', function () {
+        var activeGraph = { instanceId: 'graph1', node: 'testnodeid' };
+        var messenger = helper.injector.get('Services.Messenger');
+        this.sandbox.stub(messenger, 'subscribe').resolves({ dispose: sinon.stub() });
+        waterline.graphobjects.findOne.resolves(activeGraph);
+        return activeGraphIndex.start()
+        .then(function() {
+            return workflowApiService.findActiveGraphForTarget('testnodeid');
+        })
+        .then(function() {
+            return workflowApiService.findActiveGraphForTarget('testnodeid');
+        })
+        .then(function(found) {
+            expect(found).to.equal(activeGraph);
+            expect(waterline.graphobjects.findOne).to.have.been.calledOnce;
+        })
+        .finally(function() {
+            return activeGraphIndex.stop();
+        });
+    });
+
+    it('should invalidate a node\'s active graph when a graph is started for it', function () {
+        this.sandbox.spy(activeGraphIndex, 'invalidate');
+        workflowApiService.findGraphDefinitionByName.resolves(graphDefinition);
+        workflowApiService.createActiveGraph.resolves(_.assign({ node: 'testnodeid' }, graph));
+        store.findActiveGraphForTarget.resolves();
+
+        return workflowApiService.createAndRunGraph({ name: 'Graph.Test' }, 'testnodeid')
+        .then(function() {
+            expect(activeGraphIndex.invalidate).to.have.been.calledWith('testnodeid');
+        });
+    });
+
     it('should persist a graph definition', function () {
         store.persistGraphDefinition.resolves({ injectableName: 'test' });
         this.sandbox.stub(TaskGraph, 'validateDefinition').resolves();
@@ -421,6 +569,77 @@ describe('Taskgraph.Services.Api.Workflows', function () {
             .should.eventually.deep.equal({ graph: 'foo' });
     });
     
+    it('should cache graph definitions found by name', function() {
+        workflowApiService.findGraphDefinitionByName.restore();
+        store.getGraphDefinitions.resolves([{ injectableName: 'test', graph: 'foo' }]);
+        return workflowApiService.findGraphDefinitionByName('test')
+        .then(function() {
+            return workflowApiService.findGraphDefinitionByName('test');
+        })
+        .then(function(definition) {
+            expect(definition).to.deep.equal({ injectableName: 'test', graph: 'foo' });
+            expect(store.getGraphDefinitions).to.have.been.calledOnce;
+        });
+    });
+
+    it('should invalidate a cached graph definition when it is redefined', function() {
+        this.sandbox.stub(TaskGraph, 'validateDefinition').resolves();
+        graphDefinitionCache.set({ injectableName: 'Graph.Test', graph: 'old' });
+        store.persistGraphDefinition.resolves(graphDefinition);
+        return workflowApiService.defineTaskGraph(graphDefinition)
+        .then(function() {
+            expect(graphDefinitionCache.get('Graph.Test')).to.equal(undefined);
+        });
+    });
+
+    it('should invalidate a cached graph definition when it is destroyed', function() {
+        graphDefinitionCache.set({ injectableName: 'Graph.Test', graph: 'old' });
+        store.destroyGraphDefinition.resolves({ injectableName: 'Graph.Test' });
+        return workflowApiService.destroyGraphDefinition('Graph.Test')
+        .then(function() {
+            expect(graphDefinitionCache.get('Graph.Test')).to.equal(undefined);
+        });
+    });
+
+    it('should see a redefined task in the next graph definition found', function() {
+        workflowApiService.findGraphDefinitionByName.restore();
+        store.getGraphDefinitions.resolves([{ injectableName: 'test', graph: 'foo' }]);
+        store.persistTaskDefinition.resolves({ injectableName: 'Task.Test' });
+        return workflowApiService.findGraphDefinitionByName('test')
+        .then(function() {
+            store.getGraphDefinitions.resolves([{ injectableName: 'test', graph: 'bar' }]);
+            return workflowApiService.defineTask({ injectableName: 'Task.Test' });
+        })
+        .then(function() {
+            return workflowApiService.findGraphDefinitionByName('test');
+        })
+        .then(function(definition) {
+            expect(definition).to.deep.equal({ injectableName: 'test', graph: 'bar' });
+            expect(store.getGraphDefinitions).to.have.been.calledTwice;
+        });
+    });
+
+    it('should invalidate cached graph definitions when a task is replaced', function() {
+        graphDefinitionCache.set({ injectableName: 'Graph.Test', graph: 'old' });
+        store.getTaskDefinitions.resolves([{ injectableName: 'Task.Test' }]);
+        store.persistTaskDefinition.resolves({ injectableName: 'Task.Test' });
+        return workflowApiService.putWorkflowsTasksByName(
+            { injectableName: 'Task.Test' }, 'Task.Test')
+        .then(function() {
+            expect(graphDefinitionCache.get('Graph.Test')).to.equal(undefined);
+        });
+    });
+
+    it('should invalidate cached graph definitions when a task is deleted', function() {
+        graphDefinitionCache.set({ injectableName: 'Graph.Test', graph: 'old' });
+        store.getTaskDefinitions.resolves([{ injectableName: 'Task.Test' }]);
+        store.deleteTaskByName.resolves({ injectableName: 'Task.Test' });
+        return workflowApiService.deleteWorkflowsTasksByName('Task.Test')
+        .then(function() {
+            expect(graphDefinitionCache.get('Graph.Test')).to.equal(undefined);
+        });
+    });
+
     it('should get graph definitions', function() {
         workflowApiService.findGraphDefinitionByName.restore();
         store.getGraphDefinitions.resolves([{ graph: 'foo' }]);
@@ -527,6 +746,16 @@ describe('Taskgraph.Services.Api.Workflows', function () {
                .to.be.rejectedWith(Errors.NotFoundError);
     });
 
+    it('should return archived workflows by instanceId', function() {
+        var graphArchive = helper.injector.get('TaskGraph.GraphArchive');
+        waterline.graphobjects.needOne.rejects(new Errors.NotFoundError('Not Found'));
+        this.sandbox.stub(graphArchive, 'get').resolves(workflow);
+        return workflowApiService.getWorkflowByInstanceId(graphId).then(function(archived) {
+            expect(graphArchive.get).to.have.been.calledWith(graphId);
+            expect(archived).to.deep.equal(workflow);
+        });
+    });
+
     it('should return active workflows ', function() {
         var activeWorkflow = {
                                id      : 'testgraphid',
@@ -602,9 +831,166 @@ describe('Taskgraph.Services.Api.Workflows', function () {
         });
     });
     
+    it('should add archived graphs to a node\'s workflows', function() {
+        var graphArchive = helper.injector.get('TaskGraph.GraphArchive');
+        waterline.graphobjects.find.resolves([{ instanceId: 'graph1', node: 'node1' }]);
+        this.sandbox.stub(graphArchive, 'findByNode').resolves([
+            { instanceId: 'graph1', node: 'node1', _status: 'succeeded' },
+            { instanceId: 'graph2', node: 'node1', _status: 'succeeded' },
+            { instanceId: 'graph3', node: 'node1', _status: 'failed' }
+        ]);
+        return workflowApiService.getWorkflowsByNodeId('node1', {
+            _status: ['succeeded', 'cancelled']
+        })
+        .then(function(result) {
+            expect(graphArchive.findByNode).to.have.been.calledWith('node1');
+            expect(_.pluck(result, 'instanceId')).to.deep.equal(['graph1', 'graph2']);
+        });
+    });
+
+    it('should only search the archive for unpaged queries on one node', function() {
+        var graphArchive = helper.injector.get('TaskGraph.GraphArchive');
+        waterline.graphobjects.find.resolves([]);
+        this.sandbox.stub(graphArchive, 'findByNode').resolves([{ instanceId: 'graph1' }]);
+        return Promise.all([
+            workflowApiService.getAllWorkflows({ node: 'node1' }),
+            workflowApiService.getAllWorkflows({ node: 'node1', _status: { '!': 'pending' } }),
+            workflowApiService.getAllWorkflows({})
+        ])
+        .spread(function(byNode, withOperator, all) {
+            expect(graphArchive.findByNode).to.have.been.calledOnce;
+            expect(byNode).to.deep.equal([{ instanceId: 'graph1' }]);
+            expect(withOperator).to.deep.equal([]);
+            expect(all).to.deep.equal([]);
+        });
+    });
+
     it('should throw error getting all workflows', function() {
         waterline.graphobjects.find.rejects('an error');
         return expect(workflowApiService.getAllWorkflows())
             .to.be.rejectedWith({err: new Error('an error')});
     });
 });
+
+describe('Taskgraph.Services.Api.Workflows with the memory store', function () {
+    var di = require('di');
+    var core = require('on-core')(di, __dirname);
+    var memoryStore = helper.require('/lib/stores/memory-store.js');
+    var workflowApiService;
+    var store;
+    var waterline;
+    var Constants;
+
+    function mockConsul() {
+        return {
+            agent: {
+                service: {
+                    list: sinon.stub().resolves({}),
+                    register: sinon.stub().resolves({}),
+                    deregister: sinon.stub().resolves({})
+                }
+            }
+        };
+    }
+
+    before(function() {
+        helper.setupInjector([
+            helper.requireGlob('/lib/*.js'),
+            helper.requireGlob('/lib/services/*.js'),
+            helper.require('/api/rpc/index.js'),
+            helper.di.simpleWrapper(mockConsul, 'consul'),
+            require('on-tasks').injectables,
+            core.workflowInjectables,
+            memoryStore,
+            memoryStore.asTaskGraphStore
+        ]);
+        workflowApiService = helper.injector.get('Http.Services.Api.Workflows');
+        store = helper.injector.get('TaskGraph.Store');
+        waterline = helper.injector.get('Services.Waterline');
+        Constants = helper.injector.get('Constants');
+    });
+
+    beforeEach(function() {
+        this.sandbox = sinon.sandbox.create();
+        store.reset();
+        waterline.nodes = {
+            find: sinon.stub().resolves([{ id: 'node1' }, { id: 'node2' }])
+        };
+        // MongoDB must not be touched while the memory store is in use
+        waterline.taskdependencies = {
+            updateMongo: sinon.stub().resolves(),
+            createEach: sinon.stub().resolves([])
+        };
+        waterline.graphobjects = {
+            updateMongo: sinon.stub().resolves(),
+            find: sinon.stub().resolves([]),
+            createEach: sinon.stub().resolves([])
+        };
+        this.sandbox.stub(workflowApiService, 'findGraphDefinitionByName')
+            .resolves({ injectableName: 'Graph.Test' });
+        this.sandbox.stub(workflowApiService, 'createGraph',
+            function(definition, options, context) {
+                return Promise.resolve({
+                    instanceId: 'graph-' + context.target,
+                    name: definition.injectableName,
+                    node: context.target,
+                    context: context,
+                    createTaskDependencyItems: function() {
+                        return [{ taskId: 'task-' + context.target, dependencies: {} }];
+                    }
+                });
+            }
+        );
+        this.sandbox.stub(workflowApiService, 'runTaskGraph');
+        this.sandbox.stub(helper.injector.get('Services.Lookup'), 'nodeIdToProxy').resolves();
+        this.sandbox.stub(helper.injector.get('Protocol.Events'), 'publishGraphStarted')
+            .resolves();
+        this.sandbox.stub(helper.injector.get('Services.GraphProgress'), 'publishGraphStarted')
+            .resolves();
+    });
+
+    afterEach(function() {
+        this.sandbox.restore();
+    });
+
+    it('should create and run graphs in the memory store', function() {
+        return workflowApiService.createAndRunGraphs([
+            { nodeId: 'node1', name: 'Graph.Test' },
+            { nodeId: 'node2', name: 'Graph.Test' }
+        ])
+        .then(function(results) {
+            expect(_.pluck(results, 'status')).to.deep.equal([201, 201]);
+            expect(waterline.graphobjects.find).to.not.have.been.called;
+            expect(waterline.graphobjects.createEach).to.not.have.been.called;
+            expect(waterline.taskdependencies.createEach).to.not.have.been.called;
+            expect(workflowApiService.runTaskGraph).to.have.been.calledTwice;
+            return Promise.all([
+                store.findActiveGraphForTarget('node1'),
+                store.findReadyTasks(Constants.Task.DefaultDomain)
+            ]);
+        })
+        .spread(function(activeGraph, ready) {
+            expect(activeGraph.instanceId).to.equal('graph-node1');
+            expect(_.pluck(ready.tasks, 'taskId')).to.deep.equal(['task-node1', 'task-node2']);
+        });
+    });
+
+    it('should not run a second graph against a node busy in the memory store', function() {
+        return store.persistGraphObject({
+            instanceId: 'graph-busy',
+            node: 'node2',
+            _status: Constants.Task.States.Running
+        })
+        .then(function() {
+            return workflowApiService.createAndRunGraphs([
+                { nodeId: 'node1', name: 'Graph.Test' },
+                { nodeId: 'node2', name: 'Graph.Test' }
+            ]);
+        })
+        .then(function(results) {
+            expect(_.pluck(results, 'status')).to.deep.equal([201, 500]);
+            expect(results[1].error).to.match(/multiple task graphs/);
+            expect(workflowApiService.runTaskGraph).to.have.been.calledOnce;
+        });
+    });
+});
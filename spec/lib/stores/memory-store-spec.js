@@ -0,0 +1,288 @@
+// Copyright © 2017 Dell Inc. or its subsidiaries. All Rights Reserved.
+
+'use strict';
+
+describe('Memory Store', function() {
+    var fs = require('fs');
+    var os = require('os');
+    var path = require('path');
+    var store;
+    var Constants;
+    var Promise;
+    var graph;
+
+    before(function() {
+        var di = require('di');
+        var core = require('on-core')(di, __dirname);
+
+        helper.setupInjector(_.flattenDeep([
+            core.workflowInjectables,
+            helper.require('/lib/stores/memory-store.js')
+        ]));
+        store = helper.injector.get('TaskGraph.Stores.Memory');
+        Constants = helper.injector.get('Constants');
+        Promise = helper.injector.get('Promise');
+    });
+
+    beforeEach(function() {
+        store.reset();
+        store.journalPath = null;
+        graph = {
+            instanceId: 'graph1',
+            name: 'Graph.Test',
+            node: 'node1',
+            _status: Constants.Task.States.Pending,
+            context: { graphName: 'Graph.Test' },
+            tasks: {
+                task1: { instanceId: 'task1', injectableName: 'Task.One', state: 'pending' },
+                task2: { instanceId: 'task2', injectableName: 'Task.Two', state: 'pending' },
+                task3: { instanceId: 'task3', injectableName: 'Task.Three', state: 'pending' }
+            }
+        };
+        return store.persistGraphObject(graph)
+        .then(function() {
+            return Promise.all([
+                store.persistTaskDependencies({ taskId: 'task1', dependencies: {},
+                    terminalOnStates: [] }, 'graph1'),
+                store.persistTaskDependencies({ taskId: 'task2',
+                    dependencies: { task1: Constants.Task.States.Succeeded },
+                    terminalOnStates: ['succeeded'] }, 'graph1'),
+                store.persistTaskDependencies({ taskId: 'task3',
+                    dependencies: { task1: Constants.Task.States.Failed },
+                    terminalOnStates: ['failed'] }, 'graph1')
+            ]);
+        });
+    });
+
+    function finishTask(taskId, state) {
+        var data = { graphId: 'graph1', taskId: taskId, state: state };
+        return store.setTaskState(data)
+        .then(function() {
+            return store.updateTaskDependencies('graph1', [data]);
+        });
+    }
+
+    it('should find only tasks without dependencies as ready', function() {
+        return store.findReadyTasks(Constants.Task.DefaultDomain)
+        .then(function(result) {
+            expect(_.pluck(result.tasks, 'taskId')).to.deep.equal(['task1']);
+            return store.findReadyTasks('otherdomain');
+        })
+        .then(function(result) {
+            expect(result.tasks).to.be.empty;
+        });
+    });
+
+    it('should only let one runner check out a task', function() {
+        var data = { graphId: 'graph1', taskId: 'task1' };
+        return store.checkoutTask('runner1', data)
+        .then(function(doc) {
+            expect(doc.taskRunnerLease).to.equal('runner1');
+            return store.checkoutTask('runner2', data);
+        })
+        .then(function(doc) {
+            expect(doc).to.equal(null);
+            return store.findReadyTasks(Constants.Task.DefaultDomain);
+        })
+        .then(function(result) {
+            expect(result.tasks).to.be.empty;
+            return store.getOwnTasks('runner1');
+        })
+        .then(function(docs) {
+            expect(_.pluck(docs, 'taskId')).to.deep.equal(['task1']);
+        });
+    });
+
+    it('should update dependent and unreachable tasks when a task finishes', function() {
+        return finishTask('task1', Constants.Task.States.Succeeded)
+        .then(function() {
+            return store.findReadyTasks(Constants.Task.DefaultDomain, 'graph1');
+        })
+        .then(function(result) {
+            expect(_.pluck(result.tasks, 'taskId')).to.deep.equal(['task2']);
+            return store.getActiveGraphById('graph1');
+        })
+        .then(function(activeGraph) {
+            expect(activeGraph.tasks.task1.state).to.equal(Constants.Task.States.Succeeded);
+            return store.findCompletedTasks(10);
+        })
+        .then(function(docs) {
+            expect(_.pluck(docs, 'taskId')).to.deep.equal(['task1']);
+            return store.countCompletedTasks();
+        })
+        .then(function(count) {
+            expect(count).to.equal(1);
+            return finishTask('task2', Constants.Task.States.Succeeded);
+        })
+        .then(function() {
+            // task3 was waiting for task1 to fail, so it will never run
+            return store.checkGraphSucceeded({ graphId: 'graph1' });
+        })
+        .then(function(data) {
+            expect(data.done).to.equal(true);
+        });
+    });
+
+    it('should find finished tasks that have not been evaluated', function() {
+        return store.setTaskState({
+            graphId: 'graph1',
+            taskId: 'task1',
+            state: Constants.Task.States.Failed
+        })
+        .then(function() {
+            return store.findUnevaluatedTasks(Constants.Task.DefaultDomain, 10);
+        })
+        .then(function(docs) {
+            expect(_.pluck(docs, 'taskId')).to.deep.equal(['task1']);
+            return store.markTaskEvaluated({ graphId: 'graph1', taskId: 'task1' });
+        })
+        .then(function() {
+            return store.findUnevaluatedTasks(Constants.Task.DefaultDomain, 10);
+        })
+        .then(function(docs) {
+            expect(docs).to.be.empty;
+        });
+    });
+
+    it('should expire leases that have not been renewed', function() {
+        return store.checkoutTasks('runner1', [{ graphId: 'graph1', taskId: 'task1' }])
+        .then(function() {
+            store.tasks[store.byTaskId.task1].taskRunnerHeartbeat = new Date(Date.now() - 10000);
+            return store.findExpiredLeases(Constants.Task.DefaultDomain, 60000);
+        })
+        .then(function(docs) {
+            expect(docs).to.be.empty;
+            return store.expireLeases(Constants.Task.DefaultDomain, 5000);
+        })
+        .then(function(docs) {
+            expect(_.pluck(docs, 'taskId')).to.deep.equal(['task1']);
+            return store.findReadyTasks(Constants.Task.DefaultDomain);
+        })
+        .then(function(result) {
+            expect(_.pluck(result.tasks, 'taskId')).to.deep.equal(['task1']);
+        });
+    });
+
+    it('should report lost and unowned tasks when renewing leases', function() {
+        return store.checkoutTask('runner1', { graphId: 'graph1', taskId: 'task1' })
+        .then(function() {
+            return store.renewLeases('runner1', ['task2']);
+        })
+        .then(function(changes) {
+            expect(changes).to.deep.equal({ lost: ['task1'], unowned: ['task2'] });
+            return store.releaseLeases('runner1', ['task1']);
+        })
+        .then(function() {
+            return store.getOwnTasks('runner1');
+        })
+        .then(function(docs) {
+            expect(docs).to.be.empty;
+        });
+    });
+
+    it('should only mark an active graph as done once', function() {
+        return store.setGraphDone(Constants.Task.States.Failed, { graphId: 'graph1' })
+        .then(function(doneGraph) {
+            expect(doneGraph._status).to.equal(Constants.Task.States.Failed);
+            return store.setGraphDone(Constants.Task.States.Failed, { graphId: 'graph1' });
+        })
+        .then(function(doneGraph) {
+            expect(doneGraph).to.equal(null);
+            return store.getActiveGraphById('graph1');
+        })
+        .then(function(activeGraph) {
+            expect(activeGraph).to.equal(null);
+        });
+    });
+
+    it('should not hand out its own documents', function() {
+        return store.getActiveGraphById('graph1')
+        .then(function(activeGraph) {
+            activeGraph.tasks.task1.state = 'failed';
+            return store.getActiveGraphById('graph1');
+        })
+        .then(function(activeGraph) {
+            expect(activeGraph.tasks.task1.state).to.equal('pending');
+        });
+    });
+
+    it('should persist graphs and their tasks together', function() {
+        store.reset();
+        var graphs = _.map(['graph2', 'graph3'], function(graphId) {
+            return {
+                instanceId: graphId,
+                _status: Constants.Task.States.Running,
+                createTaskDependencyItems: sinon.stub().returns([
+                    { taskId: graphId + '-task', dependencies: {} }
+                ])
+            };
+        });
+        return store.persistGraphs(graphs)
+        .then(function(result) {
+            expect(result).to.equal(graphs);
+            expect(_.keys(store.graphs)).to.deep.equal(['graph2', 'graph3']);
+            return store.findReadyTasks(Constants.Task.DefaultDomain);
+        })
+        .then(function(result) {
+            expect(_.pluck(result.tasks, 'taskId')).to.deep.equal(['graph2-task', 'graph3-task']);
+            expect(_.pluck(result.tasks, 'graphId')).to.deep.equal(['graph2', 'graph3']);
+        });
+    });
+
+    it('should persist no graph if any graph fails to create its tasks', function() {
+        store.reset();
+        var graphs = [
+            {
+                instanceId: 'graph2',
+                createTaskDependencyItems: sinon.stub().returns([{ taskId: 'task4' }])
+            },
+            {
+                instanceId: 'graph3',
+                createTaskDependencyItems: sinon.stub().throws(new Error('test'))
+            }
+        ];
+        return expect(store.persistGraphs(graphs)).to.be.rejectedWith(/test/)
+        .then(function() {
+            expect(store.graphs).to.be.empty;
+            expect(store.tasks).to.be.empty;
+        });
+    });
+
+    it('should rebuild itself from its journal', function() {
+        var journal = path.join(os.tmpdir(), 'memory-store-' +
+            helper.injector.get('uuid').v4() + '.jsonl');
+        store.reset();
+        store.journalPath = journal;
+
+        return store.persistTaskDefinition({ injectableName: 'Task.One', friendlyName: 'One' })
+        .then(function() {
+            return store.persistGraphObject(graph);
+        })
+        .then(function() {
+            return store.persistTaskDependencies({ taskId: 'task1', dependencies: {} },
+                'graph1');
+        })
+        .then(function() {
+            return finishTask('task1', Constants.Task.States.Succeeded);
+        })
+        .then(function() {
+            store.reset();
+            store.replay();
+            return Promise.all([
+                store.getTaskDefinition('Task.One'),
+                store.getActiveGraphById('graph1'),
+                store.findCompletedTasks()
+            ]);
+        })
+        .then(function(results) {
+            expect(results[0].friendlyName).to.equal('One');
+            expect(results[1].tasks.task1.state).to.equal(Constants.Task.States.Succeeded);
+            expect(_.pluck(results[2], 'taskId')).to.deep.equal(['task1']);
+            // Compacted to one line per document
+            expect(fs.readFileSync(journal, 'utf8').trim().split('\n')).to.have.length(3);
+        })
+        .finally(function() {
+            fs.unlinkSync(journal);
+        });
+    });
+});
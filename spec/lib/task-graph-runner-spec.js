@@ -18,6 +18,7 @@ describe('TaskGraph.Runner', function () {
     var taskGraphRunner;
     var sandbox;
     var waterline;
+    var activeGraphIndex;
 
     function mockConsul() {
         return {
@@ -52,6 +53,7 @@ describe('TaskGraph.Runner', function () {
         store = helper.injector.get('TaskGraph.Store');
         taskGraphRunner = helper.injector.get('TaskGraph.Runner');
         waterline = helper.injector.get('Services.Waterline');
+        activeGraphIndex = helper.injector.get('TaskGraph.ActiveGraphIndex');
         waterline.profiles = {
             destroy: function() {}
         };
@@ -70,6 +72,8 @@ describe('TaskGraph.Runner', function () {
         sandbox.stub(TaskScheduler, 'create').resolves();
         sandbox.stub(CompletedTaskPoller, 'create').resolves();
         sandbox.stub(serviceGraph, 'start').resolves();
+        sandbox.stub(activeGraphIndex, 'start').resolves();
+        sandbox.stub(activeGraphIndex, 'stop').resolves();
         sandbox.stub(waterline.profiles, 'destroy').resolves();
         sandbox.stub(waterline.templates, 'destroy').resolves();
     });
@@ -101,6 +105,7 @@ describe('TaskGraph.Runner', function () {
                 expect(runnerStartStub).to.be.called.once;
                 expect(schedulerStartStub).to.be.called.once;
                 expect(completedTaskPollerStartStub).to.be.called.once;
+                expect(activeGraphIndex.start).to.have.been.calledOnce;
                 expect(serviceGraph.start).to.be.called.once;
             });
         });
@@ -127,6 +132,7 @@ describe('TaskGraph.Runner', function () {
                 expect(runnerStartStub).to.be.called.once;
                 expect(schedulerStartStub).not.to.be.called;
                 expect(completedTaskPollerStartStub).not.to.be.called;
+                expect(activeGraphIndex.start).not.to.be.called;
                 expect(serviceGraph.start).to.be.called.once;
             });
         });
@@ -158,10 +164,44 @@ describe('TaskGraph.Runner', function () {
                 expect(runnerStopStub).to.be.called.once;
                 expect(schedulerStopStub).to.be.called.once;
                 expect(completedTaskPollerStopStub).to.be.called.once;
+                expect(activeGraphIndex.stop).to.have.been.calledOnce;
                 expect(servicesCore.stop).to.be.called.once;
             });
         });
 
+        it('should pass drain options on to the runner', function() {
+            return taskGraphRunner.start({
+                runner: true,
+                scheduler: false,
+                domain: 'default'
+            }).then(function() {
+                return taskGraphRunner.stop({ drain: true });
+            }).then(function() {
+                expect(runnerStopStub).to.have.been.calledWith({ drain: true });
+            });
+        });
+
+        it('should stop the scheduler after the runner has drained', function() {
+            runnerStopStub = sinon.spy(function() {
+                return Promise.delay(10).then(function() {
+                    expect(schedulerStopStub).not.to.be.called;
+                    expect(completedTaskPollerStopStub).not.to.be.called;
+                });
+            });
+            TaskRunner.create.returns({start: sinon.stub(), stop: runnerStopStub});
+            return taskGraphRunner.start({
+                runner: true,
+                scheduler: true,
+                domain: 'default'
+            }).then(function() {
+                return taskGraphRunner.stop({ drain: true });
+            }).then(function() {
+                expect(schedulerStopStub).to.have.been.calledAfter(runnerStopStub);
+                expect(schedulerStopStub).to.have.been.calledOnce;
+                expect(completedTaskPollerStopStub).to.have.been.calledOnce;
+            });
+        });
+
         it('should stop only a scheduler', function() {
             return taskGraphRunner.start({
                 runner: false,
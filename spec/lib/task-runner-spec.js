@@ -13,6 +13,7 @@ describe("Task Runner", function() {
     },
     TaskRunner,
     taskMessenger = {},
+    bulkMessenger = {},
     store = {
         checkoutTask: function(){},
         getTaskById: function(){},
@@ -60,7 +61,12 @@ describe("Task Runner", function() {
         helper.setupInjector([
             core.workflowInjectables,
             require('../../lib/task-runner.js'),
+            require('../../lib/bulk-store.js'),
+            require('../../lib/metrics.js'),
+            require('../../lib/event-record.js'),
+            require('../../lib/stores/memory-store.js'),
             helper.di.simpleWrapper(taskMessenger, 'Task.Messengers.AMQP'),
+            helper.di.simpleWrapper(bulkMessenger, 'TaskGraph.BulkMessenger'),
             helper.di.simpleWrapper(Task, 'Task.Task'),
             helper.di.simpleWrapper(store, 'TaskGraph.Store')
         ]);
@@ -87,6 +93,7 @@ describe("Task Runner", function() {
             runner = TaskRunner.create();
             this.sandbox.stub(runner, 'subscribeCancelTask').resolves();
             this.sandbox.stub(runner, 'subscribeRunTask').resolves();
+            this.sandbox.stub(runner, 'subscribeCancelTasks').resolves();
             this.sandbox.stub(runner, 'initializePipeline');
             runner.running = false;
         });
@@ -217,6 +224,243 @@ describe("Task Runner", function() {
             });
         });
 
+        it('should track ownership of a task from checkout until it finishes', function(done) {
+            var owned;
+            runner.running = true;
+            runner.runTask.restore();
+            this.sandbox.stub(runner, 'runTask', function() {
+                owned = _.keys(runner.ownedTasks);
+                return Promise.resolve(taskStatus);
+            });
+            var taskStream = runner.createRunTaskSubscription(Rx.Observable.just(taskAndGraphId));
+
+            streamOnCompletedWrapper(taskStream, done, function() {
+                expect(owned).to.deep.equal(['someTaskId']);
+                expect(runner.ownedTasks).to.be.empty;
+            });
+        });
+
+        it('should release ownership of a task that could not be fetched', function(done) {
+            runner.running = true;
+            store.getTaskById.resolves(undefined);
+            var taskStream = runner.createRunTaskSubscription(Rx.Observable.just(taskAndGraphId));
+
+            streamOnCompletedWrapper(taskStream, done, function() {
+                expect(runner.ownedTasks).to.be.empty;
+            });
+        });
+
+        it('should not check out tasks when the runner is at capacity', function(done) {
+            runner.running = true;
+            runner.maxConcurrentTasks = 1;
+            runner.claimedCount = 1;
+            var taskStream = runner.createRunTaskSubscription(Rx.Observable.just(taskAndGraphId));
+
+            streamOnCompletedWrapper(taskStream, done, function() {
+                expect(store.checkoutTask).to.not.have.been.called;
+                expect(runner.getFreeCapacity()).to.equal(0);
+            });
+        });
+
+        it('should release the claim on a task when it finishes', function(done) {
+            var freeWhileRunning;
+            runner.running = true;
+            runner.maxConcurrentTasks = 2;
+            runner.runTask.restore();
+            this.sandbox.stub(runner, 'runTask', function() {
+                freeWhileRunning = runner.getFreeCapacity();
+                return Promise.resolve(taskStatus);
+            });
+            var taskStream = runner.createRunTaskSubscription(Rx.Observable.just(taskAndGraphId));
+
+            streamOnCompletedWrapper(taskStream, done, function() {
+                expect(freeWhileRunning).to.equal(1);
+                expect(runner.getFreeCapacity()).to.equal(2);
+            });
+        });
+
+        it('should not check out a task whose type is at capacity', function(done) {
+            runner.running = true;
+            runner.taskTypeLimits = { 'Task.Base.Obm': 1 };
+            runner.claimedTypes = { 'Task.Base.Obm': 1 };
+            store.getTaskById.resolves({
+                task: { injectableName: 'Task.Obm.Node', implementsTask: 'Task.Base.Obm' }
+            });
+            this.sandbox.stub(store, 'expireLease').resolves();
+            var taskStream = runner.createRunTaskSubscription(Rx.Observable.just(taskAndGraphId));
+
+            streamOnCompletedWrapper(taskStream, done, function() {
+                expect(store.getTaskById).to.have.been.calledOnce;
+                expect(store.checkoutTask).to.not.have.been.called;
+                expect(store.expireLease).to.not.have.been.called;
+                expect(runner.runTask).to.not.have.been.called;
+                expect(runner.claimedTypes).to.deep.equal({ 'Task.Base.Obm': 1 });
+                expect(runner.claimedCount).to.equal(0);
+            });
+        });
+
+        it('should check out a task within its type limit and count it', function(done) {
+            var claimedWhileRunning;
+            runner.running = true;
+            runner.taskTypeLimits = { 'Task.Base.Obm': 1 };
+            store.getTaskById.resolves({
+                task: { injectableName: 'Task.Obm.Node', implementsTask: 'Task.Base.Obm' }
+            });
+            runner.runTask.restore();
+            this.sandbox.stub(runner, 'runTask', function() {
+                claimedWhileRunning = _.clone(runner.claimedTypes);
+                return Promise.resolve(taskStatus);
+            });
+            var taskStream = runner.createRunTaskSubscription(Rx.Observable.just(taskAndGraphId));
+
+            streamOnCompletedWrapper(taskStream, done, function() {
+                expect(store.checkoutTask).to.have.been.calledOnce;
+                expect(claimedWhileRunning).to.deep.equal({ 'Task.Base.Obm': 1 });
+                expect(runner.claimedTypes).to.be.empty;
+                expect(runner.ownedTasks).to.be.empty;
+            });
+        });
+
+        it('should leave a prefetched task over its type limit to another runner', function() {
+            var memoryStore = helper.injector.get('TaskGraph.Stores.Memory');
+            var otherRunner = TaskRunner.create();
+            var subscriptions = [];
+            memoryStore.reset();
+            store.checkoutTask.restore();
+            store.getTaskById.restore();
+            this.sandbox.stub(store, 'checkoutTask', memoryStore.checkoutTask.bind(memoryStore));
+            this.sandbox.stub(store, 'getTaskById', memoryStore.getTaskById.bind(memoryStore));
+            this.sandbox.stub(otherRunner, 'runTask').resolves(taskStatus);
+            _.forEach([runner, otherRunner], function(taskRunner) {
+                taskRunner.running = true;
+                taskRunner.taskTypeLimits = { 'Task.Base.Obm': 1 };
+                subscriptions.push(
+                    taskRunner.createRunTaskSubscription(taskRunner.runTaskStream).subscribe());
+            });
+            // At capacity, and already running a task of the same type
+            runner.maxConcurrentTasks = 1;
+            runner.claimedCount = 1;
+            runner.claimedTypes = { 'Task.Base.Obm': 1 };
+
+            return memoryStore.persistGraphObject({
+                instanceId: 'someGraphId',
+                context: {},
+                tasks: {
+                    someTaskId: {
+                        instanceId: 'someTaskId',
+                        injectableName: 'Task.Obm.Node',
+                        implementsTask: 'Task.Base.Obm'
+                    }
+                }
+            })
+            .then(function() {
+                return memoryStore.persistTaskDependencies({ taskId: 'someTaskId' },
+                    'someGraphId');
+            })
+            .then(function() {
+                runner.runTaskStream.onNext(taskAndGraphId);
+                expect(_.pluck(runner.prefetchBuffer, 'taskId')).to.deep.equal(['someTaskId']);
+                // A slot frees up, but the task's type is still at its limit
+                runner.releaseClaims(1);
+                return Promise.delay(10);
+            })
+            .then(function() {
+                expect(runner.prefetchBuffer).to.be.empty;
+                expect(runner.runTask).to.not.have.been.called;
+                return memoryStore.getOwnTasks(runner.taskRunnerId);
+            })
+            .then(function(owned) {
+                expect(owned).to.be.empty;
+                otherRunner.runTaskStream.onNext(taskAndGraphId);
+                return Promise.delay(10);
+            })
+            .then(function() {
+                expect(otherRunner.runTask).to.have.been.calledOnce;
+                return memoryStore.getOwnTasks(otherRunner.taskRunnerId);
+            })
+            .then(function(owned) {
+                expect(_.pluck(owned, 'taskId')).to.deep.equal(['someTaskId']);
+            })
+            .finally(function() {
+                _.invoke(subscriptions, 'dispose');
+                memoryStore.reset();
+            });
+        });
+
+        it('should check out and fetch a batch of tasks together', function(done) {
+            runner.running = true;
+            runner.checkoutBatchWindow = 10;
+            var tasks = [
+                { taskId: 'task1', graphId: 'someGraphId' },
+                { taskId: 'task2', graphId: 'someGraphId' }
+            ];
+            var checkoutTasks = store.checkoutTasks = this.sandbox.stub().resolves(tasks);
+            var getTasksByIds = store.getTasksByIds =
+                this.sandbox.stub().resolves([taskData, undefined]);
+            var taskStream = runner.createRunTaskSubscription(Rx.Observable.from(tasks));
+
+            streamOnCompletedWrapper(taskStream, done, function() {
+                delete store.checkoutTasks;
+                delete store.getTasksByIds;
+                expect(checkoutTasks).to.have.been.calledOnce;
+                expect(checkoutTasks).to.have.been.calledWith(runner.taskRunnerId, tasks);
+                expect(getTasksByIds).to.have.been.calledOnce;
+                expect(store.checkoutTask).to.not.have.been.called;
+                expect(runner.runTask).to.have.been.calledOnce;
+                expect(runner.claimedCount).to.equal(0);
+                expect(runner.ownedTasks).to.be.empty;
+            });
+        });
+
+        it('should check out prefetched tasks when capacity frees up', function() {
+            var finishTask;
+            runner.running = true;
+            runner.maxConcurrentTasks = 1;
+            store.checkoutTask.restore();
+            this.sandbox.stub(store, 'checkoutTask', function(taskRunnerId, data) {
+                return Promise.resolve(data);
+            });
+            runner.runTask.restore();
+            this.sandbox.stub(runner, 'runTask', function() {
+                return new Promise(function(resolve) {
+                    finishTask = resolve;
+                });
+            });
+            var subscription = runner.createRunTaskSubscription(runner.runTaskStream).subscribe();
+
+            runner.runTaskStream.onNext({ taskId: 'task1', graphId: 'someGraphId' });
+            runner.runTaskStream.onNext({ taskId: 'task2', graphId: 'someGraphId' });
+            runner.runTaskStream.onNext({ taskId: 'task2', graphId: 'someGraphId' });
+
+            return Promise.delay(10)
+            .then(function() {
+                expect(runner.runTask).to.have.been.calledOnce;
+                expect(_.pluck(runner.prefetchBuffer, 'taskId')).to.deep.equal(['task2']);
+                finishTask(taskStatus);
+                return Promise.delay(10);
+            })
+            .then(function() {
+                expect(runner.runTask).to.have.been.calledTwice;
+                expect(store.checkoutTask.secondCall.args[1].taskId).to.equal('task2');
+                expect(runner.prefetchBuffer).to.be.empty;
+            })
+            .finally(function() {
+                subscription.dispose();
+            });
+        });
+
+        it('should count tasks against the limits for their types', function() {
+            runner.taskTypeLimits = { 'Task.Obm.Node': 2, 'Task.Base.Obm': 1 };
+            var task = { injectableName: 'Task.Obm.Node', implementsTask: 'Task.Base.Obm' };
+
+            var taskTypes = runner.claimTaskTypes(task);
+            expect(taskTypes).to.deep.equal(['Task.Obm.Node', 'Task.Base.Obm']);
+            expect(runner.claimTaskTypes(task)).to.equal(null);
+            expect(runner.claimTaskTypes({ injectableName: 'Task.Other' })).to.deep.equal([]);
+            runner.releaseTaskTypes(taskTypes);
+            expect(runner.claimedTypes).to.be.empty;
+        });
+
         it('should handle stream errors without crashing the main stream', function(done) {
             runner.running = true;
             var streamOnCompleteWrapper = function(stream, done, cb) {
@@ -249,6 +493,14 @@ describe("Task Runner", function() {
 
     describe('createHeartbeatSubscription', function() {
 
+        it('should derive the heartbeat interval from the lease length', function() {
+            expect(TaskRunner.create({ leaseAdjust: 30000 }).heartbeatInterval)
+                .to.equal(10000);
+            expect(TaskRunner.create({ leaseAdjust: 30000, heartbeatInterval: 5 })
+                .heartbeatInterval).to.equal(5);
+            expect(runner.leaseAdjust).to.equal(Constants.Task.DefaultLeaseAdjust);
+        });
+
         beforeEach(function() {
             this.sandbox.restore();
             runner = TaskRunner.create();
@@ -321,6 +573,21 @@ describe("Task Runner", function() {
             });
         });
 
+        it('should renew leases for owned and running tasks in one call', function(done) {
+            runner.running = true;
+            runner.ownedTasks.checkedOut = true;
+            runner.activeTasks.running = { taskId: 'running' };
+            store.heartbeatTasksForRunner.resolves(2);
+            var heartStream = runner.createHeartbeatSubscription(Rx.Observable.interval(1)).take(3);
+
+            streamOnCompletedWrapper(heartStream, done, function() {
+                expect(store.heartbeatTasksForRunner).to.have.been.calledThrice;
+                expect(store.getOwnTasks).to.not.have.been.called;
+                expect(runner.handleLostTasks).to.have.been.calledWith([]);
+                expect(runner.handleUnownedTasks).to.have.been.calledWith([]);
+            });
+        });
+
         it('should expire lost tasks', function(done) {
             runner.running = true;
             var excessTask1 = {
@@ -372,6 +639,78 @@ describe("Task Runner", function() {
                 expect(sub2.dispose).to.have.been.calledOnce;
             });
         });
+
+        it('should keep cancel subscriptions until leases are released', function() {
+            var bulkStore = helper.injector.get('TaskGraph.BulkStore');
+            var cancelSubscription = { dispose: sinon.stub().resolves() };
+            var runTaskSubscription = { dispose: sinon.stub().resolves() };
+            runner.subscriptions = [cancelSubscription, runTaskSubscription];
+            runner.runTaskSubscription = runTaskSubscription;
+            runner.ownedTasks = { testTaskId: true };
+            this.sandbox.stub(bulkStore, 'releaseLeases', function() {
+                expect(runTaskSubscription.dispose).to.have.been.calledOnce;
+                expect(cancelSubscription.dispose).to.not.have.been.called;
+                return Promise.resolve();
+            });
+            return runner.stop({ drain: true, timeout: 10 })
+            .then(function() {
+                expect(bulkStore.releaseLeases).to.have.been.calledOnce;
+                expect(cancelSubscription.dispose).to.have.been.calledOnce;
+                expect(runner.subscriptions).to.be.empty;
+                expect(runner.runTaskSubscription).to.equal(null);
+            });
+        });
+
+        it('should not drain unless asked to', function() {
+            this.sandbox.stub(runner, 'drain').resolves();
+            return runner.stop()
+            .then(function() {
+                expect(runner.drain).to.not.have.been.called;
+            });
+        });
+
+        it('should keep heartbeating while draining', function() {
+            runner.running = true;
+            this.sandbox.stub(runner, 'drain', function() {
+                expect(runner.isRunning()).to.equal(false);
+                expect(runner.isHeartbeating()).to.equal(true);
+                return Promise.resolve();
+            });
+            return runner.stop({ drain: true, timeout: 500 })
+            .then(function() {
+                expect(runner.drain).to.have.been.calledWith(500);
+                expect(runner.isHeartbeating()).to.equal(false);
+            });
+        });
+
+        it('should wait for owned tasks to finish before releasing leases', function() {
+            var bulkStore = helper.injector.get('TaskGraph.BulkStore');
+            this.sandbox.stub(bulkStore, 'releaseLeases').resolves();
+            runner.ownedTasks = { testTaskId: true };
+            setTimeout(function() {
+                delete runner.ownedTasks.testTaskId;
+            }, 50);
+            return runner.drain(5000)
+            .then(function() {
+                expect(runner.ownedTasks).to.be.empty;
+                expect(bulkStore.releaseLeases).to.not.have.been.called;
+            });
+        });
+
+        it('should stop tasks and release their leases after the timeout', function() {
+            var bulkStore = helper.injector.get('TaskGraph.BulkStore');
+            var task = { stop: this.sandbox.stub().resolves() };
+            this.sandbox.stub(bulkStore, 'releaseLeases').resolves();
+            runner.ownedTasks = { activeTask: true, checkedOutTask: true };
+            runner.activeTasks = { activeTask: task };
+            return runner.drain(50)
+            .then(function() {
+                expect(task.stop).to.have.been.calledOnce;
+                expect(bulkStore.releaseLeases).to.have.been.calledWith(
+                    runner.taskRunnerId, ['activeTask', 'checkedOutTask']);
+                expect(runner.releasedTasks).to.have.keys(['activeTask', 'checkedOutTask']);
+            });
+        });
     });
 
 
@@ -402,6 +741,19 @@ describe("Task Runner", function() {
             expect(taskMessenger.subscribeCancelTask).to.have.been.calledOnce;
         });
 
+        it('should feed batched cancels into the cancelTask stream', function() {
+            var cancelled = [];
+            runner.cancelTaskStream.subscribe(function(data) { cancelled.push(data); });
+            bulkMessenger.subscribeCancelTasks = this.sandbox.stub().resolves({});
+            return runner.subscribeCancelTasks()
+            .then(function() {
+                bulkMessenger.subscribeCancelTasks.firstCall.args[0]({
+                    taskIds: ['task1', 'task2']
+                });
+                expect(cancelled).to.deep.equal([{ taskId: 'task1' }, { taskId: 'task2' }]);
+            });
+        });
+
         it('should cancel tasks fed through the cancelTask stream', function(done) {
             runner.running = true;
             var cancelStub = this.sandbox.stub().resolves();
@@ -418,6 +770,23 @@ describe("Task Runner", function() {
             });
 
         });
+
+        it('should cancel tasks while draining', function(done) {
+            runner.running = false;
+            runner.draining = true;
+            var cancelStub = this.sandbox.stub().resolves();
+
+            runner.activeTasks.testTaskId = {
+                cancel: cancelStub,
+                toJSON: this.sandbox.stub()
+            };
+            var cancelStream = runner.createCancelTaskSubscription(
+                    Rx.Observable.just({taskId: 'testTaskId'}));
+
+            streamOnCompletedWrapper(cancelStream, done, function() {
+                expect(cancelStub).to.have.been.calledOnce;
+            });
+        });
     });
 
     describe('runTask', function() {
@@ -490,6 +859,21 @@ describe("Task Runner", function() {
             });
         });
 
+        it('should publish a snapshot of the task when it starts', function(done) {
+            stubbedTask.state = 'pending';
+            stubbedTask.context = { graphId: 'aGraphId' };
+            streamOnCompletedWrapper(runner.runTask(data), done, function() {
+                var started = graphProgressService.publishTaskStarted.firstCall.args[0];
+                stubbedTask.state = 'succeeded';
+                stubbedTask.context.output = 'written while running';
+                expect(Object.isFrozen(started)).to.equal(true);
+                expect(started).to.not.equal(stubbedTask);
+                expect(started.state).to.equal('pending');
+                expect(started.context).to.deep.equal({ graphId: 'aGraphId' });
+                expect(started.definition).to.equal(stubbedTask.definition);
+            });
+        });
+
         it('should publish a task finished event', function(done) {
             streamOnCompletedWrapper(runner.runTask(data), done, function() {
                 expect(taskMessenger.publishTaskFinished).to.have.been.calledOnce;
@@ -62,6 +62,10 @@ describe('Task Scheduler', function() {
         };
     };
 
+    function counter(max) {
+        return { count: 0, max: max, queue: [], maxQueueDepth: 10000, queued: 0, dropped: 0 };
+    }
+
     function mockConsul() {
         return {
             agent: {
@@ -90,6 +94,14 @@ describe('Task Scheduler', function() {
             core.workflowInjectables,
             tasks.injectables,
             require('../../lib/task-scheduler'),
+            require('../../lib/bulk-store'),
+            require('../../lib/bulk-messenger'),
+            require('../../lib/graph-state-cache'),
+            require('../../lib/active-graph-index'),
+            require('../../lib/hash-ring'),
+            require('../../lib/leader-election'),
+            require('../../lib/metrics'),
+            require('../../lib/event-record'),
             require('../../lib/lease-expiration-poller'),
             require('../../lib/rx-mixins'),
             require('../../api/rpc/index.js'),
@@ -151,21 +163,37 @@ describe('Task Scheduler', function() {
             expect(taskScheduler.evaluateGraphStream).to.be.an.instanceof(Rx.Subject);
             expect(taskScheduler.checkGraphFinishedStream).to.be.an.instanceof(Rx.Subject);
             expect(taskScheduler.pollInterval).to.equal(500);
+            expect(taskScheduler.schedulingMode).to.equal('poll');
+            expect(taskScheduler.maxPollInterval).to.equal(10000);
             expect(taskScheduler.concurrencyMaximums).to.deep.equal(
                 {
-                    findReadyTasks: { count: 0, max: 100 },
-                    updateTaskDependencies: { count: 0, max: 100 },
-                    handleScheduleTaskEvent: { count: 0, max: 100 },
-                    completeGraphs: { count: 0, max: 100 },
-                    findUnevaluatedTasks: { count: 0, max: 1 }
+                    findReadyTasks: counter(100),
+                    updateTaskDependencies: counter(100),
+                    handleScheduleTaskEvent: counter(100),
+                    completeGraphs: counter(100),
+                    findUnevaluatedTasks: counter(1)
                 }
             );
             expect(taskScheduler.findUnevaluatedTasksLimit).to.equal(200);
             expect(taskScheduler.subscriptions).to.deep.equal([]);
             expect(taskScheduler.leasePoller).to.equal(null);
+            expect(taskScheduler.batchedCancels).to.equal(false);
             expect(taskScheduler.debug).to.equal(false);
         });
 
+        it('should take batched cancels from options or configuration', function() {
+            expect(TaskScheduler.create({ batchedCancels: true }).batchedCancels)
+                .to.equal(true);
+            configuration.set('batchedTaskCancels', true);
+            try {
+                expect(TaskScheduler.create().batchedCancels).to.equal(true);
+                expect(TaskScheduler.create({ batchedCancels: false }).batchedCancels)
+                    .to.equal(false);
+            } finally {
+                configuration.set('batchedTaskCancels', false);
+            }
+        });
+
         it('should be created with optional values', function() {
             taskScheduler = TaskScheduler.create({
                 domain: 'testdomain',
@@ -183,11 +211,11 @@ describe('Task Scheduler', function() {
             });
             expect(taskScheduler.concurrencyMaximums).to.deep.equal(
                 {
-                    findReadyTasks: { count: 0, max: 25 },
-                    updateTaskDependencies: { count: 0, max: 25 },
-                    handleScheduleTaskEvent: { count: 0, max: 25 },
-                    completeGraphs: { count: 0, max: 25 },
-                    findUnevaluatedTasks: { count: 0, max: 0 }
+                    findReadyTasks: counter(25),
+                    updateTaskDependencies: counter(25),
+                    handleScheduleTaskEvent: counter(25),
+                    completeGraphs: counter(25),
+                    findUnevaluatedTasks: counter(0)
                 }
             );
             expect(taskScheduler.domain).to.equal('testdomain');
@@ -197,6 +225,75 @@ describe('Task Scheduler', function() {
             expect(taskScheduler.findUnevaluatedTasksLimit).to.equal(100);
         });
 
+        it('should reject an unknown scheduling mode', function() {
+            expect(function() {
+                TaskScheduler.create({ schedulingMode: 'bogus' });
+            }).to.throw(/schedulingMode/);
+        });
+
+        describe('event scheduling mode', function() {
+            beforeEach(function() {
+                taskScheduler = TaskScheduler.create({
+                    schedulingMode: 'event',
+                    pollInterval: 100,
+                    maxPollInterval: 400
+                });
+            });
+
+            it('should back off the poll interval while idle', function() {
+                var pollState = taskScheduler.pollStates.unevaluatedTasks;
+                taskScheduler.adjustPollInterval(pollState, false);
+                expect(pollState.interval).to.equal(200);
+                taskScheduler.adjustPollInterval(pollState, false);
+                expect(pollState.interval).to.equal(400);
+                taskScheduler.adjustPollInterval(pollState, false);
+                expect(pollState.interval).to.equal(400);
+            });
+
+            it('should tighten the poll interval when work is found', function() {
+                var pollState = taskScheduler.pollStates.unevaluatedTasks;
+                pollState.interval = 400;
+                taskScheduler.adjustPollInterval(pollState, true);
+                expect(pollState.interval).to.equal(100);
+            });
+
+            it('should tighten the poll interval after messenger events', function() {
+                var pollState = taskScheduler.pollStates.evaluatedTasks;
+                pollState.interval = 400;
+                taskScheduler.recordSchedulingEvent();
+                taskScheduler.adjustPollInterval(pollState, false);
+                expect(pollState.interval).to.equal(100);
+                expect(pollState.events).to.equal(0);
+            });
+
+            it('should not adjust the poll interval in poll mode', function() {
+                taskScheduler = TaskScheduler.create({ pollInterval: 100 });
+                var pollState = taskScheduler.pollStates.unevaluatedTasks;
+                taskScheduler.adjustPollInterval(pollState, false);
+                expect(pollState.interval).to.equal(100);
+            });
+
+            it('should report saved wakeups', function(done) {
+                taskScheduler = TaskScheduler.create({
+                    schedulingMode: 'event',
+                    pollInterval: 1
+                });
+                var pollState = taskScheduler.pollStates.evaluatedTasks;
+                pollState.interval = 4;
+
+                streamCompletedWrapper(
+                    taskScheduler.createPollTrigger(pollState).take(2),
+                    done,
+                    function() {
+                        var stats = taskScheduler.getPollStats();
+                        expect(stats.schedulingMode).to.equal('event');
+                        expect(stats.evaluatedTasks.wakeups).to.equal(2);
+                        expect(stats.evaluatedTasks.saved).to.equal(6);
+                    }
+                );
+            });
+        });
+
         it('start', function() {
             var stub = {
                 dispose: sinon.stub().resolves()
@@ -452,6 +549,75 @@ describe('Task Scheduler', function() {
 
             });
 
+            describe('getScheduleTaskData', function() {
+                beforeEach(function() {
+                    this.sandbox.stub(store, 'getActiveGraphById');
+                    this.sandbox.stub(store, 'getTaskById');
+                });
+
+                it('should not read the store if the names were projected', function() {
+                    return taskScheduler.getScheduleTaskData({
+                        taskId: 'testtaskid',
+                        graphId: 'testgraphid',
+                        taskName: 'Task.Test',
+                        graphName: 'Graph.Test'
+                    })
+                    .then(function(data) {
+                        expect(store.getActiveGraphById).to.not.have.been.called;
+                        expect(store.getTaskById).to.not.have.been.called;
+                        expect(data).to.deep.equal({
+                            domain: taskScheduler.domain,
+                            taskId: 'testtaskid',
+                            taskName: 'Task.Test',
+                            graphId: 'testgraphid',
+                            graphName: 'Graph.Test'
+                        });
+                    });
+                });
+
+                it('should read each graph only once', function() {
+                    store.getActiveGraphById.resolves({
+                        instanceId: 'testgraphid',
+                        name: 'Graph.Test',
+                        context: {},
+                        tasks: {
+                            task1: { instanceId: 'task1', injectableName: 'Task.One' },
+                            task2: { instanceId: 'task2', injectableName: 'Task.Two' }
+                        }
+                    });
+                    return Promise.all([
+                        taskScheduler.getScheduleTaskData({ taskId: 'task1', graphId: 'testgraphid' }),
+                        taskScheduler.getScheduleTaskData({ taskId: 'task2', graphId: 'testgraphid' })
+                    ])
+                    .spread(function(task1, task2) {
+                        expect(store.getActiveGraphById).to.have.been.calledOnce;
+                        expect(store.getTaskById).to.not.have.been.called;
+                        expect(task1.taskName).to.equal('Task.One');
+                        expect(task1.graphName).to.equal('Graph.Test');
+                        expect(task2.taskName).to.equal('Task.Two');
+                    });
+                });
+
+                it('should fall back to the task document if the graph is not active', function() {
+                    store.getActiveGraphById.resolves(null);
+                    store.getTaskById.resolves({
+                        graphId: 'testgraphid',
+                        task: { instanceId: 'task1', injectableName: 'Task.One' },
+                        context: { graphName: 'Graph.Test' }
+                    });
+                    return taskScheduler.getScheduleTaskData({
+                        taskId: 'task1',
+                        graphId: 'testgraphid'
+                    })
+                    .then(function(data) {
+                        expect(store.getTaskById).to.have.been.calledOnce;
+                        expect(data.taskName).to.equal('Task.One');
+                        expect(data.graphName).to.equal('Graph.Test');
+                        expect(taskScheduler.graphNameCache.has('testgraphid')).to.equal(false);
+                    });
+                });
+            });
+
             it('should handle handleScheduleTaskEvent errors', function(done) {
                 var testError = new Error('test handleScheduleTaskEvent error');
 
@@ -472,6 +638,76 @@ describe('Task Scheduler', function() {
                 });
             });
 
+            it('should coalesce evaluations of the same graph', function(done) {
+                var testGraph = { graphId: 'testgraphid' };
+                taskScheduler.findReadyTasks.resolves({ tasks: [] });
+                this.sandbox.stub(taskScheduler.evaluateGraphStream, 'onNext');
+                observable = taskScheduler.createTasksToScheduleSubscription(
+                    Rx.Observable.from([ testGraph, testGraph, testGraph, {}, {} ]));
+
+                streamCompletedWrapper(observable, done, function() {
+                    expect(taskScheduler.findReadyTasks).to.have.been.calledTwice;
+                    expect(taskScheduler.findReadyTasks).to.have.been.calledWith(testGraph);
+                    expect(taskScheduler.findReadyTasks).to.have.been.calledWith({});
+                    expect(taskScheduler.coalescedEvaluations).to.equal(3);
+                    expect(taskScheduler.graphEvaluations).to.be.empty;
+                    // Coalesced events are re-run once after the evaluation finishes
+                    expect(taskScheduler.evaluateGraphStream.onNext).to.have.been.calledTwice;
+                    expect(taskScheduler.evaluateGraphStream.onNext)
+                        .to.have.been.calledWith(testGraph);
+                    expect(taskScheduler.evaluateGraphStream.onNext)
+                        .to.have.been.calledWith({});
+                });
+            });
+
+            it('should not re-run an evaluation that was not coalesced', function() {
+                this.sandbox.stub(taskScheduler.evaluateGraphStream, 'onNext');
+                expect(taskScheduler.claimGraphEvaluation({ graphId: 'testgraphid' }))
+                    .to.equal(true);
+                taskScheduler.releaseGraphEvaluation({ graphId: 'testgraphid' });
+                expect(taskScheduler.evaluateGraphStream.onNext).to.not.have.been.called;
+                expect(taskScheduler.claimGraphEvaluation({ graphId: 'testgraphid' }))
+                    .to.equal(true);
+            });
+
+            it('should release the claims of evaluations dropped over the queue limit',
+                    function() {
+                var evaluateGraphStream = new Rx.Subject();
+                taskScheduler = TaskScheduler.create({
+                    maxQueueDepth: 1,
+                    concurrent: { findReadyTasks: 1 }
+                });
+                taskScheduler.running = true;
+                this.sandbox.stub(taskScheduler, 'findReadyTasks').resolves({ tasks: [] });
+                var subscription = taskScheduler.createTasksToScheduleSubscription(
+                    evaluateGraphStream).subscribe(function() {});
+
+                // One evaluation runs, one is queued, and the rest are dropped
+                evaluateGraphStream.onNext({ graphId: 'graph1' });
+                evaluateGraphStream.onNext({ graphId: 'graph2' });
+                evaluateGraphStream.onNext({ graphId: 'graph3' });
+                evaluateGraphStream.onNext({});
+                expect(taskScheduler.concurrencyMaximums.findReadyTasks.dropped).to.equal(2);
+                expect(taskScheduler.graphEvaluations).to.have.keys(['graph1', 'graph2']);
+
+                return Promise.delay(10)
+                .then(function() {
+                    evaluateGraphStream.onNext({ graphId: 'graph3' });
+                    evaluateGraphStream.onNext({});
+                    return Promise.delay(10);
+                })
+                .then(function() {
+                    expect(taskScheduler.findReadyTasks).to.have.callCount(4);
+                    expect(taskScheduler.findReadyTasks).to.have.been.calledWith(
+                        { graphId: 'graph3' });
+                    expect(taskScheduler.findReadyTasks).to.have.been.calledWith({});
+                    expect(taskScheduler.graphEvaluations).to.be.empty;
+                })
+                .finally(function() {
+                    subscription.dispose();
+                });
+            });
+
             it('should handle findReadyTasks errors', function(done) {
                 var testError = new Error('test findReadyTasks error');
                 taskScheduler.findReadyTasks.restore();
@@ -479,7 +715,7 @@ describe('Task Scheduler', function() {
                 store.findReadyTasks.resolves({ tasks: [{}] });
                 taskScheduler.handleScheduleTaskEvent.resolves();
                 observable = taskScheduler.createTasksToScheduleSubscription(
-                                Rx.Observable.from([ {}, {} ]))
+                                Rx.Observable.from([ { graphId: 'graph1' }, { graphId: 'graph2' } ]))
                                 .take(2);
 
                 streamCompletedWrapper(observable, done, function() {
@@ -581,6 +817,25 @@ describe('Task Scheduler', function() {
             taskHandlerStream.onNext({});
         });
 
+        it('should publish the frozen task record without copying it', function(done) {
+            this.sandbox.stub(graphProgressService, 'publishTaskFinished');
+            var data = {
+                terminalOnStates: ['failed'],
+                state: 'succeeded',
+                graphId: 'testgraphid',
+                context: { large: _.range(1000) }
+            };
+            store.markTaskEvaluated.resolves(data);
+
+            streamSuccessWrapper(observable, done, function() {
+                expect(graphProgressService.publishTaskFinished).to.have.been.calledWith(
+                    sinon.match.same(data));
+                expect(Object.isFrozen(data)).to.equal(true);
+            });
+
+            taskHandlerStream.onNext({});
+        });
+
         it('should handle errors related to updating task dependencies', function(done) {
             this.sandbox.stub(graphProgressService, 'publishTaskFinished');
             var testError = new Error('test update dependencies error');
@@ -607,6 +862,73 @@ describe('Task Scheduler', function() {
         });
     });
 
+    describe('createUpdateTaskDependenciesSubscription with batching', function() {
+        var taskScheduler;
+        var evaluateGraphStream;
+        var checkGraphFinishedStream;
+        var bulkStore;
+
+        beforeEach(function() {
+            bulkStore = helper.injector.get('TaskGraph.BulkStore');
+            this.sandbox.stub(graphProgressService, 'publishTaskFinished');
+            this.sandbox.stub(bulkStore, 'updateTaskDependencies', function(graphId, tasks) {
+                return Promise.resolve(tasks);
+            });
+            evaluateGraphStream = new Rx.Subject();
+            checkGraphFinishedStream = new Rx.Subject();
+            this.sandbox.spy(evaluateGraphStream, 'onNext');
+
+            taskScheduler = TaskScheduler.create({
+                dependencyBatchWindow: 10,
+                dependencyBatchSize: 10
+            });
+            taskScheduler.running = true;
+        });
+
+        it('should update dependencies once per graph for a batch of tasks', function(done) {
+            var tasks = [
+                { graphId: 'graph1', taskId: 'task1', state: 'succeeded', terminalOnStates: [] },
+                { graphId: 'graph2', taskId: 'task2', state: 'succeeded', terminalOnStates: [] },
+                { graphId: 'graph1', taskId: 'task3', state: 'succeeded', terminalOnStates: [] },
+                { graphId: 'graph1', taskId: 'task1', state: 'succeeded', terminalOnStates: [] }
+            ];
+            var observable = taskScheduler.createUpdateTaskDependenciesSubscription(
+                Rx.Observable.from(tasks),
+                evaluateGraphStream,
+                checkGraphFinishedStream
+            );
+
+            streamCompletedWrapper(observable, done, function() {
+                expect(bulkStore.updateTaskDependencies).to.have.been.calledTwice;
+                expect(bulkStore.updateTaskDependencies).to.have.been.calledWith(
+                    'graph1', [tasks[0], tasks[2]]);
+                expect(bulkStore.updateTaskDependencies).to.have.been.calledWith(
+                    'graph2', [tasks[1]]);
+                expect(evaluateGraphStream.onNext).to.have.been.calledThrice;
+                expect(graphProgressService.publishTaskFinished).to.have.been.calledThrice;
+                expect(taskScheduler.dependencyBatchStats.batches).to.equal(2);
+                expect(taskScheduler.dependencyBatchStats.tasks).to.equal(3);
+            });
+        });
+
+        it('should handle bulk update errors', function(done) {
+            var testError = new Error('test bulk update error');
+            bulkStore.updateTaskDependencies.restore();
+            this.sandbox.stub(bulkStore, 'updateTaskDependencies').rejects(testError);
+            var observable = taskScheduler.createUpdateTaskDependenciesSubscription(
+                Rx.Observable.just({ graphId: 'graph1', taskId: 'task1' }),
+                evaluateGraphStream,
+                checkGraphFinishedStream
+            );
+
+            streamCompletedWrapper(observable, done, function() {
+                expect(taskScheduler.handleStreamError).to.have.been.calledWith(
+                    'Error updating task dependencies', testError);
+                expect(evaluateGraphStream.onNext).to.not.have.been.called;
+            });
+        });
+    });
+
     describe('createCheckGraphFinishedSubscription', function() {
         var taskScheduler;
         var checkGraphFinishedStream;
@@ -713,6 +1035,70 @@ describe('Task Scheduler', function() {
             });
         });
 
+        it('failGraph should fail and cancel only pending tasks in bulk', function(done) {
+            var bulkStore = helper.injector.get('TaskGraph.BulkStore');
+            this.sandbox.stub(store, 'getActiveGraphById').resolves({
+                instanceId: 'testgraphid',
+                tasks: {
+                    task1: { instanceId: 'task1', state: Constants.Task.States.Succeeded },
+                    task2: { instanceId: 'task2', state: Constants.Task.States.Pending },
+                    task3: { instanceId: 'task3', state: Constants.Task.States.Pending }
+                }
+            });
+            this.sandbox.stub(bulkStore, 'failGraphTasks').resolves();
+            this.sandbox.stub(taskScheduler, 'publishCancelTasks').resolves();
+            this.sandbox.stub(store, 'setGraphDone').resolves({
+                _id: 'testobjectid',
+                instanceId: 'testgraphid'
+            });
+            this.sandbox.stub(taskScheduler, '_publishGraphFinished').resolves();
+            this.sandbox.stub(graphProgressService, 'publishGraphFinished').resolves();
+            taskScheduler.failGraph.restore();
+
+            var observable = taskScheduler.failGraph(
+                { graphId: 'testgraphid' }, Constants.Task.States.Cancelled);
+
+            streamSuccessWrapper(observable, done, function() {
+                expect(bulkStore.failGraphTasks).to.have.been.calledOnce;
+                var tasks = bulkStore.failGraphTasks.firstCall.args[1];
+                expect(bulkStore.failGraphTasks.firstCall.args[0]).to.equal('testgraphid');
+                expect(_.pluck(tasks, 'taskId')).to.deep.equal(['task2', 'task3']);
+                expect(_.uniq(_.pluck(tasks, 'state'))).to.deep.equal(
+                    [Constants.Task.States.Cancelled]);
+                expect(taskScheduler.publishCancelTasks).to.have.been.calledOnce;
+                expect(taskScheduler.publishCancelTasks).to.have.been.calledWith(
+                    ['task2', 'task3']);
+                expect(store.setGraphDone).to.have.been.calledOnce;
+            });
+        });
+
+        it('publishCancelTasks should publish one cancel per task by default', function() {
+            var bulkMessenger = helper.injector.get('TaskGraph.BulkMessenger');
+            this.sandbox.stub(bulkMessenger, 'publishCancelTasks').resolves();
+            this.sandbox.stub(taskMessenger, 'publishCancelTask').resolves();
+            return taskScheduler.publishCancelTasks(['task1', 'task2'])
+            .then(function() {
+                expect(taskMessenger.publishCancelTask).to.have.been.calledTwice;
+                expect(taskMessenger.publishCancelTask).to.have.been.calledWith('task1');
+                expect(taskMessenger.publishCancelTask).to.have.been.calledWith('task2');
+                expect(bulkMessenger.publishCancelTasks).to.not.have.been.called;
+            });
+        });
+
+        it('publishCancelTasks should publish one batched cancel if enabled', function() {
+            var bulkMessenger = helper.injector.get('TaskGraph.BulkMessenger');
+            this.sandbox.stub(bulkMessenger, 'publishCancelTasks').resolves();
+            this.sandbox.stub(taskMessenger, 'publishCancelTask').resolves();
+            taskScheduler.batchedCancels = true;
+            return taskScheduler.publishCancelTasks(['task1', 'task2'])
+            .then(function() {
+                expect(bulkMessenger.publishCancelTasks).to.have.been.calledOnce;
+                expect(bulkMessenger.publishCancelTasks).to.have.been.calledWith(
+                    ['task1', 'task2']);
+                expect(taskMessenger.publishCancelTask).to.not.have.been.called;
+            });
+        });
+
         it('checkGraphSucceeded should persist and publish on finish', function(done) {
             this.sandbox.stub(eventsProtocol, 'publishGraphFinished').resolves();
             this.sandbox.stub(graphProgressService, 'publishGraphFinished');
@@ -780,4 +1166,223 @@ describe('Task Scheduler', function() {
             });
         });
     });
+
+    describe('graph state cache', function() {
+        var taskScheduler;
+        var graph;
+
+        beforeEach(function() {
+            taskScheduler = TaskScheduler.create({
+                sharded: true,
+                graphStateCache: { maxTasks: 100 }
+            });
+            taskScheduler.running = true;
+            graph = {
+                instanceId: 'testgraphid',
+                name: 'Graph.Test',
+                context: { graphName: 'Graph.Test' },
+                tasks: {
+                    task1: { injectableName: 'Task.One', state: 'pending', waitingOn: {} },
+                    task2: { injectableName: 'Task.Two', state: 'pending',
+                        waitingOn: { task1: 'succeeded' } }
+                }
+            };
+            this.sandbox.stub(store, 'getActiveGraphById').resolves(graph);
+            this.sandbox.stub(store, 'findReadyTasks').resolves({ tasks: [] });
+            this.sandbox.stub(store, 'checkGraphSucceeded');
+        });
+
+        it('should find ready tasks for a graph without querying the store', function(done) {
+            var observable = taskScheduler.findReadyTasks({ graphId: 'testgraphid' });
+            streamSuccessWrapper(observable, done, function(result) {
+                expect(store.getActiveGraphById).to.have.been.calledOnce;
+                expect(store.findReadyTasks).to.not.have.been.called;
+                expect(result.tasks).to.deep.equal([{
+                    domain: taskScheduler.domain,
+                    graphId: 'testgraphid',
+                    graphName: 'Graph.Test',
+                    taskId: 'task1',
+                    taskName: 'Task.One'
+                }]);
+            });
+        });
+
+        it('should query the store for domain wide evaluations', function(done) {
+            var observable = taskScheduler.findReadyTasks({});
+            streamSuccessWrapper(observable, done, function() {
+                expect(store.getActiveGraphById).to.not.have.been.called;
+                expect(store.findReadyTasks).to.have.been.calledWith(
+                    taskScheduler.domain, undefined);
+            });
+        });
+
+        it('should fall back to the store for graphs in another domain', function(done) {
+            graph.domain = 'otherdomain';
+            var observable = taskScheduler.findReadyTasks({ graphId: 'testgraphid' });
+            streamSuccessWrapper(observable, done, function() {
+                expect(store.findReadyTasks).to.have.been.calledWith(
+                    taskScheduler.domain, 'testgraphid');
+                expect(taskScheduler.graphStateCache.has('testgraphid')).to.equal(false);
+            });
+        });
+
+        it('should not check the store for completion while tasks are pending', function(done) {
+            taskScheduler.graphStateCache.load(graph);
+            taskScheduler.graphStateCache.taskFinished('testgraphid', 'task1', 'succeeded');
+            var observable = taskScheduler.checkGraphSucceeded({ graphId: 'testgraphid' });
+            streamCompletedWrapper(observable, done, function() {
+                expect(store.checkGraphSucceeded).to.not.have.been.called;
+            });
+        });
+
+        it('should evict a graph once it is finished', function() {
+            this.sandbox.stub(eventsProtocol, 'publishGraphFinished').resolves();
+            taskScheduler.graphStateCache.load(graph);
+            return taskScheduler._publishGraphFinished({ instanceId: 'testgraphid' })
+            .then(function() {
+                expect(taskScheduler.graphStateCache.has('testgraphid')).to.equal(false);
+            });
+        });
+
+        it('should only cache graph state when sharded', function() {
+            expect(TaskScheduler.create({ graphStateCache: true }).graphStateCache)
+                .to.equal(null);
+        });
+
+        it('should find a task again if its run task event failed to publish', function() {
+            var testError = new Error('test');
+            var cache = taskScheduler.graphStateCache;
+            this.sandbox.stub(taskScheduler, 'publishScheduleTaskEvent').rejects(testError);
+            cache.load(graph);
+            expect(_.pluck(cache.findReadyTasks('testgraphid'), 'taskId')).to.deep.equal(['task1']);
+
+            return taskScheduler.handleScheduleTaskEvent({
+                domain: taskScheduler.domain,
+                graphId: 'testgraphid',
+                graphName: 'Graph.Test',
+                taskId: 'task1',
+                taskName: 'Task.One'
+            })
+            .toPromise(Promise)
+            .then(function() {
+                expect(taskScheduler.handleStreamError).to.have.been.calledWith(
+                    'Error scheduling task', testError);
+                expect(_.pluck(cache.findReadyTasks('testgraphid'), 'taskId'))
+                    .to.deep.equal(['task1']);
+            });
+        });
+
+        it('should find a task again and evaluate its graph once its lease expires',
+                function() {
+            var cache = taskScheduler.graphStateCache;
+            this.sandbox.stub(taskScheduler.evaluateGraphStream, 'onNext');
+            cache.load(graph);
+            cache.findReadyTasks('testgraphid');
+
+            taskScheduler.handleExpiredLeases([
+                { graphId: 'testgraphid', taskId: 'task1' },
+                { graphId: 'testgraphid', taskId: 'task2' }
+            ]);
+
+            expect(_.pluck(cache.findReadyTasks('testgraphid'), 'taskId')).to.deep.equal(['task1']);
+            expect(taskScheduler.evaluateGraphStream.onNext).to.have.been.calledOnce;
+            expect(taskScheduler.evaluateGraphStream.onNext).to.have.been.calledWith(
+                { graphId: 'testgraphid' });
+        });
+    });
+
+    describe('sharding', function() {
+        var taskScheduler;
+        var otherId = 'otherschedulerid';
+
+        beforeEach(function() {
+            taskScheduler = TaskScheduler.create({ sharded: true });
+            taskScheduler.running = true;
+        });
+
+        function graphOwnedBy(schedulerId) {
+            var uuid = helper.injector.get('uuid');
+            return _.find(_.map(_.range(1000), function() { return uuid.v4(); }),
+                function(graphId) {
+                    return taskScheduler.ring.owner(graphId) === schedulerId;
+                });
+        }
+
+        it('should own every graph while it is the only member', function() {
+            expect(taskScheduler.ownsGraph('testgraphid')).to.equal(true);
+            expect(taskScheduler.isLeader()).to.equal(true);
+        });
+
+        it('should own every graph when not sharded', function() {
+            taskScheduler = TaskScheduler.create();
+            expect(taskScheduler.ring).to.equal(null);
+            expect(taskScheduler.ownsGraph('testgraphid')).to.equal(true);
+            expect(taskScheduler.isLeader()).to.equal(true);
+        });
+
+        it('should lead when it wins the leader election when not sharded', function() {
+            var LeaderElection = helper.injector.get('TaskGraph.LeaderElection');
+            taskScheduler = TaskScheduler.create();
+            taskScheduler.election = LeaderElection.create({}, {
+                key: 'taskgraph/default/leader',
+                candidateId: taskScheduler.schedulerId
+            });
+            expect(taskScheduler.isLeader()).to.equal(false);
+            taskScheduler.election.setLeader(true);
+            expect(taskScheduler.isLeader()).to.equal(true);
+        });
+
+        it('should rebalance and poll when membership changes', function() {
+            this.sandbox.stub(taskScheduler.evaluateGraphStream, 'onNext');
+            expect(taskScheduler.updateMembership([otherId])).to.equal(true);
+            expect(taskScheduler.ring.members).to.deep.equal(
+                [otherId, taskScheduler.schedulerId].sort());
+            expect(taskScheduler.evaluateGraphStream.onNext).to.have.been.calledWith({});
+            expect(taskScheduler.updateMembership([otherId])).to.equal(false);
+            expect(taskScheduler.evaluateGraphStream.onNext).to.have.been.calledOnce;
+        });
+
+        it('should only update dependencies for owned graphs', function(done) {
+            taskScheduler.updateMembership([otherId]);
+            var owned = { graphId: graphOwnedBy(taskScheduler.schedulerId), taskId: 'task1' };
+            var unowned = { graphId: graphOwnedBy(otherId), taskId: 'task2' };
+            this.sandbox.stub(taskScheduler, 'updateTaskDependencies').resolves();
+
+            var observable = taskScheduler.createUpdateTaskDependenciesSubscription(
+                Rx.Observable.from([owned, unowned]), new Rx.Subject(), new Rx.Subject());
+
+            streamCompletedWrapper(observable, done, function() {
+                expect(taskScheduler.updateTaskDependencies).to.have.been.calledOnce;
+                expect(taskScheduler.updateTaskDependencies).to.have.been.calledWith(owned);
+            });
+        });
+
+        it('should only schedule ready tasks for owned graphs', function(done) {
+            taskScheduler.updateMembership([otherId]);
+            var owned = { graphId: graphOwnedBy(taskScheduler.schedulerId), taskId: 'task1' };
+            var unowned = { graphId: graphOwnedBy(otherId), taskId: 'task2' };
+            this.sandbox.stub(store, 'findReadyTasks').resolves({ tasks: [owned, unowned] });
+
+            var observable = taskScheduler.findReadyTasks({});
+            streamSuccessWrapper(observable, done, function(result) {
+                expect(_.pluck(result.tasks, 'taskId')).to.deep.equal(['task1']);
+            });
+        });
+    });
+
+    describe('metrics', function() {
+        it('should export concurrency counters', function() {
+            var metrics = helper.injector.get('TaskGraph.Metrics');
+            var taskScheduler = TaskScheduler.create();
+            taskScheduler.concurrencyMaximums.findReadyTasks.count = 3;
+            taskScheduler.concurrencyMaximums.findReadyTasks.dropped = 2;
+            var stop = metrics.collect(taskScheduler.collectMetrics.bind(taskScheduler));
+
+            var text = metrics.render();
+            stop();
+            expect(text).to.contain('taskgraph_scheduler_in_flight{counter="findReadyTasks"} 3\n');
+            expect(text).to.contain(
+                'taskgraph_scheduler_dropped_total{counter="findReadyTasks"} 2\n');
+        });
+    });
 });